@@ -0,0 +1,244 @@
+"""
+Нагрузочный клиент для API: повторяет запросы из файла через общий пул соединений с keep-alive
+с заданной параллельностью, частотой и длительностью и выводит достигнутый RPS, перцентили задержки
+и разбивку ошибок. Вместо сервера можно указать приложение ASGI, тогда запросы выполняются в том же
+процессе без сети.
+
+Запуск из корня проекта:
+    python -m api_scripts.load_test --queries queries.txt --concurrency 16 --duration 30
+    python -m api_scripts.load_test --app app.main:app --rate 200 --duration 10 --output report.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import time
+from collections import Counter
+from contextlib import AsyncExitStack
+from dataclasses import asdict, dataclass, field
+from itertools import cycle
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import httpx
+import numpy as np
+
+BASE_URL = "http://127.0.0.1:8000"
+
+# Эндпоинты, к которым можно отправлять запросы
+ENDPOINTS = {
+    "search": "/api/search",
+    "preprocess": "/api/preprocess",
+}
+
+DEFAULT_QUERY = "Какие товары пользователи считают удобными в использовании?"
+
+
+@dataclass
+class LoadReport:
+    """Итоги нагрузки"""
+    requests: int
+    succeeded: int
+    seconds: float
+    rps: float
+    # Перцентили задержки успешных запросов в миллисекундах
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    # Количество ошибок по коду ответа ("503") или типу исключения ("ConnectError")
+    errors: Dict[str, int] = field(default_factory=dict)
+
+
+def load_queries(path: Optional[Path]) -> List[str]:
+    """
+    Читает запросы из файла: по одному на строку, либо JSON-массив строк или объектов с полем text
+    :param path: Путь к файлу (без него используется один запрос по умолчанию)
+    :return: Список запросов
+    """
+    if path is None:
+        return [DEFAULT_QUERY]
+    content = Path(path).read_text(encoding="utf-8")
+    if Path(path).suffix == ".json":
+        items = json.loads(content)
+        queries = [item["text"] if isinstance(item, dict) else item for item in items]
+    else:
+        queries = [line.strip() for line in content.splitlines()]
+    queries = [query for query in queries if isinstance(query, str) and query.strip()]
+    if not queries:
+        raise ValueError(f"В файле '{path}' нет запросов")
+    return queries
+
+
+def make_payload(endpoint: str, query: str, top_k: int) -> dict:
+    """Формирует тело запроса к эндпоинту"""
+    if endpoint == "search":
+        return {"text": query, "top_k": top_k}
+    return {"text": query}
+
+
+def summarize(latencies: List[float], errors: Counter, seconds: float) -> LoadReport:
+    """
+    Подводит итоги нагрузки
+    :param latencies: Задержки успешных запросов в секундах
+    :param errors: Количество ошибок по виду
+    :param seconds: Длительность нагрузки
+    :return: Итоги
+    """
+    total = len(latencies) + sum(errors.values())
+    report = LoadReport(total, len(latencies), seconds, total / seconds if seconds else 0.0,
+                        errors=dict(errors.most_common()))
+    if latencies:
+        values = np.array(latencies) * 1000
+        report.latency_ms = {f"p{q}": float(np.percentile(values, q)) for q in (50, 90, 99)}
+        report.latency_ms["max"] = float(values.max())
+    return report
+
+
+async def run_load(client: httpx.AsyncClient, queries: List[str], endpoint: str = "search",
+                   concurrency: int = 8, rate: float = 0.0, duration: float = 10.0,
+                   max_requests: Optional[int] = None, top_k: int = 3) -> LoadReport:
+    """
+    Отправляет запросы параллельными клиентами через общий пул соединений.
+    Без частоты (rate=0) каждый из concurrency клиентов отправляет следующий запрос сразу после ответа.
+    С частотой запросы запускаются по расписанию независимо от ответов, а задержка отсчитывается от времени
+    по расписанию: если сервер не успевает, ожидание в очереди клиента тоже входит в задержку
+    :param client: HTTP-клиент
+    :param queries: Запросы, которые повторяются по кругу
+    :param endpoint: Эндпоинт ("search" или "preprocess")
+    :param concurrency: Количество одновременных запросов
+    :param rate: Частота запросов в секунду (0 — без ограничения)
+    :param duration: Длительность нагрузки в секундах
+    :param max_requests: Максимальное количество запросов
+    :param top_k: Количество результатов поиска
+    :return: Итоги нагрузки
+    """
+    if endpoint not in ENDPOINTS:
+        raise ValueError(f"Неизвестный эндпоинт '{endpoint}', доступны: {', '.join(ENDPOINTS)}")
+    if concurrency < 1 or rate < 0 or duration <= 0:
+        raise ValueError("Параллельность и длительность должны быть положительными, частота — неотрицательной")
+
+    path = ENDPOINTS[endpoint]
+    payloads: Iterator[dict] = (make_payload(endpoint, query, top_k) for query in cycle(queries))
+    latencies: List[float] = []
+    errors: Counter = Counter()
+    start = time.perf_counter()
+    deadline = start + duration
+    sent = 0
+
+    def next_request() -> Optional[dict]:
+        nonlocal sent
+        if max_requests is not None and sent >= max_requests:
+            return None
+        sent += 1
+        return next(payloads)
+
+    async def send(payload: dict, scheduled: float):
+        try:
+            response = await client.post(path, json=payload)
+        except httpx.HTTPError as e:
+            errors[type(e).__name__] += 1
+            return
+        if response.is_success:
+            latencies.append(time.perf_counter() - scheduled)
+        else:
+            errors[str(response.status_code)] += 1
+
+    async def closed_loop_worker():
+        while time.perf_counter() < deadline:
+            payload = next_request()
+            if payload is None:
+                return
+            await send(payload, time.perf_counter())
+
+    async def open_loop_worker(schedule: asyncio.Queue):
+        while True:
+            item = await schedule.get()
+            if item is None:
+                return
+            scheduled, payload = item
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await send(payload, scheduled)
+
+    if rate == 0:
+        await asyncio.gather(*(closed_loop_worker() for _ in range(concurrency)))
+    else:
+        schedule: asyncio.Queue = asyncio.Queue()
+        workers = [asyncio.create_task(open_loop_worker(schedule)) for _ in range(concurrency)]
+        # Время n-го запроса считается от начала, а не прибавлением интервала: иначе ошибки округления
+        # накапливаются и за длительность успевает уйти лишний запрос
+        while sent / rate < duration:
+            scheduled = start + sent / rate
+            payload = next_request()
+            if payload is None:
+                break
+            # Расписание заполняется не дальше чем на секунду вперёд
+            while scheduled - time.perf_counter() > 1:
+                await asyncio.sleep(0.1)
+            schedule.put_nowait((scheduled, payload))
+        for _ in workers:
+            schedule.put_nowait(None)
+        await asyncio.gather(*workers)
+
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def load_app(target: str):
+    """
+    Импортирует приложение ASGI по строке вида "модуль:атрибут"
+    :param target: Например, "app.main:app"
+    :return: Приложение
+    """
+    module_name, _, attribute = target.partition(":")
+    return getattr(importlib.import_module(module_name), attribute or "app")
+
+
+async def run(args) -> LoadReport:
+    """Создаёт клиент с пулом соединений (или транспортом ASGI) и запускает нагрузку"""
+    queries = load_queries(args.queries)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with AsyncExitStack() as stack:
+        if args.app:
+            app = load_app(args.app)
+            # Приложение загружает индекс и запускает пул обработчиков при старте, как под uvicorn
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport = httpx.ASGITransport(app=app)
+            client = httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout)
+        else:
+            client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout)
+        client = await stack.enter_async_context(client)
+        return await run_load(client, queries, args.endpoint, args.concurrency, args.rate, args.duration,
+                              args.requests, args.top_k)
+
+
+def print_report(report: LoadReport):
+    """Выводит итоги нагрузки"""
+    print(f"Запросов: {report.requests}, успешных: {report.succeeded}, за {report.seconds:.1f} с")
+    print(f"RPS: {report.rps:.1f}")
+    if report.latency_ms:
+        print("Задержка, мс: " + ", ".join(f"{name} {value:.1f}" for name, value in report.latency_ms.items()))
+    if report.errors:
+        print("Ошибки: " + ", ".join(f"{kind}: {count}" for kind, count in report.errors.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочное тестирование API")
+    parser.add_argument("--url", default=BASE_URL, help="Адрес сервера")
+    parser.add_argument("--app", help="Приложение ASGI для запросов без сети, например app.main:app")
+    parser.add_argument("--endpoint", choices=list(ENDPOINTS), default="search", help="Эндпоинт")
+    parser.add_argument("--queries", type=Path, help="Файл с запросами (по строке на запрос или JSON-массив)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Количество одновременных запросов")
+    parser.add_argument("--rate", type=float, default=0.0, help="Частота запросов в секунду (0 — без ограничения)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Длительность нагрузки в секундах")
+    parser.add_argument("--requests", type=int, help="Максимальное количество запросов")
+    parser.add_argument("--top-k", type=int, default=3, help="Количество результатов поиска")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Тайм-аут запроса в секундах")
+    parser.add_argument("--output", type=Path, help="Файл JSON для сохранения итогов")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(asdict(report), ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+# Значение, которое возвращает get при промахе, если default не задан
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Потокобезопасный кэш ограниченного размера с вытеснением давно не использованных записей
+    и счётчиками попаданий и промахов. Размер 0 отключает кэш
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize < 0:
+            raise ValueError("Размер кэша не может быть отрицательным")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """
+        Возвращает значение по ключу и отмечает запись как недавно использованную
+        :param key: Ключ
+        :param default: Значение, возвращаемое при промахе
+        :return: Значение из кэша или default
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Сохраняет значение, вытесняя самую старую запись при превышении размера
+        :param key: Ключ
+        :param value: Значение
+        """
+        self.merge(key, value, lambda old, new: new)
+
+    def merge(self, key: Hashable, value: Any, combine: Callable[[Any, Any], Any]):
+        """
+        Атомарно сохраняет значение, объединяя его с уже сохранённым
+        :param key: Ключ
+        :param value: Новое значение
+        :param combine: Функция (старое значение, новое значение) -> сохраняемое значение
+        """
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            if key in self._data:
+                value = combine(self._data[key], value)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Очищает кэш и счётчики"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает статистику кэша
+        :return: Словарь с размером, ограничением, попаданиями, промахами и долей попаданий
+        """
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / requests if requests else 0.0,
+            }
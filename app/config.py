@@ -0,0 +1,90 @@
+import os
+from pathlib import Path
+
+# Настройки приложения задаются переменными окружения
+
+# Режим отладки: ответы содержат заголовок Server-Timing со временем этапов обработки запроса
+DEBUG = os.getenv("DEBUG", "0").lower() in ("1", "true", "yes")
+
+# Корень проекта и папка TF-IDF индекса
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+TFIDF_FOLDER = Path(os.getenv("TFIDF_FOLDER", PROJECT_ROOT / "tfidf"))
+
+# Прогрев при старте приложения (загрузка модели spaCy и индекса): "background" — в фоне, сервер сразу
+# принимает запросы, а /ready отвечает 503 до окончания прогрева; "blocking" — сервер начинает принимать
+# запросы после прогрева; "lazy" — без прогрева, модель и индекс загружаются при первом запросе
+WARM_UP = os.getenv("WARM_UP", "background")
+
+# Движок поиска: "matrix" — оценка всех документов умножением на матрицу TF-IDF,
+# "inverted" — инвертированный индекс с отсечением по верхним границам (MaxScore),
+# "semantic" — приближённый поиск ближайших соседей в пространстве LSA (индекс собирается с --lsa-components),
+# "impact" — целочисленная оценка по квантованным весам с точной переоценкой лучших (индекс собирается с --impact-bits)
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "matrix")
+
+# Количество списков IVF, просматриваемых движком "semantic" на запрос: больше — выше полнота
+# относительно точного перебора векторов LSA, но дольше поиск
+SEMANTIC_N_PROBE = int(os.getenv("SEMANTIC_N_PROBE", "16"))
+
+# Количество кандидатов движка "impact", которые переоцениваются точно, на один запрошенный результат:
+# больше — меньше расхождение с полным перебором, но дольше переоценка
+IMPACT_RESCORE_FACTOR = int(os.getenv("IMPACT_RESCORE_FACTOR", "4"))
+
+# Количество частей, на которые делится матрица индекса для параллельной оценки запроса
+# (0 — как при сохранении индекса), и количество потоков для оценки частей
+SEARCH_SHARDS = int(os.getenv("SEARCH_SHARDS", "0"))
+SEARCH_THREADS = int(os.getenv("SEARCH_THREADS", str(os.cpu_count() or 1)))
+
+# Количество распакованных блоков сжатых текстов индекса, которые хранятся в LRU-кэше процесса
+# (блок — около 16 КБ текстов; 0 — кэш отключён)
+DOC_STORE_CACHE_BLOCKS = int(os.getenv("DOC_STORE_CACHE_BLOCKS", "1024"))
+
+# Максимальное количество результатов, которое можно запросить параметром top_k
+MAX_TOP_K = int(os.getenv("MAX_TOP_K", "100"))
+
+# Максимальное количество запросов в одном обращении к /api/search/batch
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "1000"))
+
+# Языковая модель spaCy (имя пакета или путь к папке модели)
+SPACY_MODEL = os.getenv("SPACY_MODEL", "ru_core_news_sm")
+
+# Режим предобработки текста: "full" — все компоненты модели spaCy,
+# "fast" — только компоненты, нужные лемматизатору, "pymorphy" — лемматизация напрямую через pymorphy3
+TEXT_PROCESSING_MODE = os.getenv("TEXT_PROCESSING_MODE", "full")
+
+# Размер LRU-кэша результатов предобработки целых строк (0 — кэш отключён)
+PREPROCESS_CACHE_SIZE = int(os.getenv("PREPROCESS_CACHE_SIZE", "10000"))
+
+# Размер таблицы «словоформа -> лемма» (0 — таблица отключена) и максимальное количество слов в тексте,
+# который можно обработать по таблице без нейросетевого конвейера spaCy
+LEMMA_CACHE_SIZE = int(os.getenv("LEMMA_CACHE_SIZE", "100000"))
+LEMMA_CACHE_MAX_TOKENS = int(os.getenv("LEMMA_CACHE_MAX_TOKENS", "8"))
+
+# Потоковая предобработка /api/preprocess/stream: количество текстов в одном пакете nlp.pipe, количество пакетов,
+# одновременно обрабатываемых исполнителем (следующие тексты не читаются, пока не отправлены результаты
+# самого старого пакета), и максимальный размер одного текста в байтах
+PREPROCESS_STREAM_BATCH_SIZE = int(os.getenv("PREPROCESS_STREAM_BATCH_SIZE", "256"))
+PREPROCESS_STREAM_IN_FLIGHT = int(os.getenv("PREPROCESS_STREAM_IN_FLIGHT", "4"))
+PREPROCESS_STREAM_MAX_ITEM_BYTES = int(os.getenv("PREPROCESS_STREAM_MAX_ITEM_BYTES", str(1024 * 1024)))
+
+# Выполнение предобработки и поиска вне цикла событий: "inline" — прямо в обработчике запроса,
+# "thread" — пул потоков, "process" — пул процессов с загруженной в каждом моделью spaCy
+EXECUTOR_KIND = os.getenv("EXECUTOR_KIND", "thread")
+# Количество потоков или процессов
+EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", "4"))
+# Максимальное количество принятых и ещё не выполненных задач; сверх него запросы получают ответ 503
+EXECUTOR_MAX_PENDING = int(os.getenv("EXECUTOR_MAX_PENDING", "64"))
+
+# Объединение одновременных запросов /api/search в пакеты: максимальный размер пакета (0 — запросы
+# выполняются по одному), максимальное ожидание в миллисекундах и количество одновременно выполняемых пакетов;
+# пока выполняется меньше пакетов, запрос отправляется сразу, без ожидания
+SEARCH_BATCHING_MAX_SIZE = int(os.getenv("SEARCH_BATCHING_MAX_SIZE", "0"))
+SEARCH_BATCHING_MAX_WAIT_MS = float(os.getenv("SEARCH_BATCHING_MAX_WAIT_MS", "5"))
+SEARCH_BATCHING_CONCURRENCY = int(os.getenv("SEARCH_BATCHING_CONCURRENCY", "1"))
+
+# Кэш выдач поиска: максимальное количество выдач (0 — кэш отключён) и срок жизни выдачи в секундах
+# (0 — без ограничения; выдачи прежнего индекса перестают находиться сразу после его перезагрузки)
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "10000"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+# Хранилище кэша выдач: "local" — память процесса, "sqlite" — файл SQLite, общий для воркеров uvicorn
+SEARCH_CACHE_BACKEND = os.getenv("SEARCH_CACHE_BACKEND", "local")
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "search_cache.sqlite3")
@@ -0,0 +1,142 @@
+import asyncio
+import contextvars
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, List, Optional, Tuple
+from app import config
+
+# Способы выполнения задач: "inline" — прямо в обработчике (блокирует цикл событий),
+# "thread" — пул потоков, "process" — пул процессов с заранее загруженной моделью spaCy
+EXECUTOR_KINDS = ("inline", "thread", "process")
+
+
+class ExecutorOverloadedError(Exception):
+    """Очередь задач заполнена, новый запрос не может быть принят"""
+
+
+# Итоги прогрева процесса-обработчика
+_worker_warm_up = None
+
+
+def _init_process_worker():
+    """Загружает модель spaCy и индекс при старте процесса-обработчика, а не при первом запросе"""
+    global _worker_warm_up
+    from app.warmup import warm_up
+    _worker_warm_up = warm_up()
+
+
+def _get_worker_warm_up() -> Tuple[int, Any]:
+    """Возвращает номер процесса-обработчика и итоги его прогрева"""
+    return os.getpid(), _worker_warm_up
+
+
+class TaskExecutor:
+    """
+    Выполняет синхронные CPU-ёмкие функции вне цикла событий asyncio.
+    Количество принятых, но ещё не завершённых задач ограничено: при превышении лимита
+    новые задачи сразу отклоняются с ExecutorOverloadedError
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = 4, max_pending: int = 64):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Неизвестный тип исполнителя '{kind}', доступны: {', '.join(EXECUTOR_KINDS)}")
+        if max_workers < 1 or max_pending < 1:
+            raise ValueError("Количество обработчиков и размер очереди должны быть положительными")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+
+    def start(self):
+        """Создаёт пул обработчиков, если он ещё не создан"""
+        if self._executor is not None or self.kind == "inline":
+            return
+        if self.kind == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="worker")
+
+    def shutdown(self):
+        """Останавливает пул обработчиков"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def warm_up(self) -> List[Any]:
+        """
+        Прогревает обработчики: в пуле процессов каждый процесс загружает модель и индекс при старте,
+        и метод дожидается прогрева всех процессов; потоки и режим "inline" используют общую модель
+        процесса, которая загружается в отдельном потоке, не блокируя цикл событий
+        :return: Итоги прогрева каждого процесса (WarmUpReport)
+        """
+        from app.warmup import warm_up
+
+        if self.kind != "process":
+            return [await asyncio.to_thread(warm_up)]
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        reports = {}
+        # Пул запускает по процессу на каждую задачу, пока их меньше max_workers, а процесс берёт задачи
+        # только после прогрева; уже прогретый процесс может забрать чужую задачу, поэтому опрос
+        # повторяется, пока не ответят все процессы
+        while True:
+            results = await asyncio.gather(*(loop.run_in_executor(self._executor, _get_worker_warm_up)
+                                             for _ in range(self.max_workers - len(reports))))
+            reports.update(results)
+            if len(reports) >= self.max_workers:
+                return list(reports.values())
+            await asyncio.sleep(0.05)
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """
+        Выполняет функцию в пуле обработчиков и возвращает её результат
+        :param func: Синхронная функция (для пула процессов — доступная для сериализации)
+        :param args: Аргументы функции
+        :return: Результат функции
+        """
+        if self.pending >= self.max_pending:
+            raise ExecutorOverloadedError("Сервер перегружен, повторите запрос позже")
+
+        if self.kind == "inline":
+            return func(*args)
+
+        self.start()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if self.kind == "thread":
+                # Поток получает копию контекста запроса, чтобы этапы поиска попали в заголовок Server-Timing
+                return await loop.run_in_executor(self._executor, contextvars.copy_context().run, func, *args)
+            return await loop.run_in_executor(self._executor, partial(func, *args))
+        finally:
+            self.pending -= 1
+
+
+executor = TaskExecutor(config.EXECUTOR_KIND, config.EXECUTOR_WORKERS, config.EXECUTOR_MAX_PENDING)
+
+
+def configure_executor(kind: str, max_workers: int, max_pending: int) -> TaskExecutor:
+    """
+    Заменяет общий исполнитель приложения новым
+    :param kind: Тип исполнителя
+    :param max_workers: Количество потоков или процессов
+    :param max_pending: Максимальное количество принятых и незавершённых задач
+    :return: Новый исполнитель
+    """
+    global executor
+    executor.shutdown()
+    executor = TaskExecutor(kind, max_workers, max_pending)
+    return executor
+
+
+def get_executor() -> TaskExecutor:
+    """Возвращает общий исполнитель приложения"""
+    return executor
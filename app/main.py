@@ -1,18 +1,72 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI, Request, HTTPException, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from app import config
+from app.executor import get_executor
+from app.metrics import CONTENT_TYPE, MetricsMiddleware, registry
 from app.text_processing.router import router as processing_router
 from app.text_search.router import router as text_search_router
+from app.warmup import WARM_UP_MODES, get_readiness, run_warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.WARM_UP not in WARM_UP_MODES:
+        raise ValueError(f"Неизвестный режим прогрева '{config.WARM_UP}', доступны: {', '.join(WARM_UP_MODES)}")
+
+    # Пул обработчиков для CPU-ёмких задач предобработки и поиска
+    executor = get_executor()
+    executor.start()
+
+    # Загрузка модели spaCy и TF-IDF индекса при старте, чтобы первый запрос не ждал их загрузки
+    readiness = get_readiness()
+    warm_up_task = None
+    if config.WARM_UP == "lazy":
+        readiness.start()
+        readiness.finish([])
+    elif config.WARM_UP == "blocking":
+        await run_warm_up(executor, readiness)
+    else:
+        warm_up_task = asyncio.create_task(run_warm_up(executor, readiness))
+    yield
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await warm_up_task
+    executor.shutdown()
+
 
 # Инициализация FastAPI приложения
 app = FastAPI(
-    title="Поиск по тексту"
+    title="Поиск по тексту",
+    lifespan=lifespan
 )
 
 # Подключение роутеров
 app.include_router(processing_router, prefix="/api", tags=["Text Processing"])
 app.include_router(text_search_router, prefix="/api", tags=["Text Search"])
 
+# Счётчики запросов и гистограммы времени обработки по маршрутам
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/metrics", summary="Метрики", description="Метрики приложения в текстовом формате Prometheus",
+         include_in_schema=False)
+async def metrics_endpoint():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/ready", summary="Готовность", description="Готовность к запросам: 503, пока идёт прогрев при старте",
+         include_in_schema=False)
+async def ready_endpoint():
+    readiness = get_readiness()
+    if readiness.ready:
+        return readiness.to_dict()
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=readiness.to_dict(),
+                        headers={"Retry-After": "1"})
+
 
 # Обработчик исключений Pydantic валидации
 @app.exception_handler(RequestValidationError)
@@ -38,7 +92,8 @@ async def app_base_exception_handler(request: Request, e: HTTPException):
 
     return JSONResponse(
         status_code=e.status_code,
-        content={"detail": e.detail}
+        content={"detail": e.detail},
+        headers=e.headers
     )
 
 
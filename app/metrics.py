@@ -0,0 +1,278 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from app import config
+
+# Границы корзин гистограмм в секундах: для запросов целиком и для отдельных этапов поиска
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                 0.25, 0.5, 1.0, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    """Экранирует значение метки"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Форматирует метки в виде {name="value",...}"""
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """Счётчик с метками: значения только растут"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        """
+        Увеличивает счётчик
+        :param labels: Значения меток в порядке labelnames
+        :param amount: Величина увеличения
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Возвращает значение счётчика для меток"""
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def collect(self) -> List[str]:
+        """Возвращает строки с текущими значениями"""
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in values]
+
+
+class Histogram:
+    """Гистограмма с метками: количество наблюдений по корзинам, их сумма и количество"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = REQUEST_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Для каждого набора меток: количества по корзинам (последняя — +Inf) и сумма наблюдений
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        """
+        Добавляет наблюдение
+        :param value: Значение (для времени — в секундах)
+        :param labels: Значения меток в порядке labelnames
+        """
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][bucket] += 1
+            entry[1][0] += value
+
+    def count(self, *labels: str) -> int:
+        """Возвращает количество наблюдений для меток"""
+        with self._lock:
+            entry = self._values.get(labels)
+            return sum(entry[0]) if entry else 0
+
+    def collect(self) -> List[str]:
+        """Возвращает строки с накопленными количествами по корзинам, суммой и количеством наблюдений"""
+        with self._lock:
+            values = sorted((labels, (list(counts), total[0])) for labels, (counts, total) in self._values.items())
+        lines = []
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricGroup:
+    """
+    Группа метрик, значения которых вычисляются одним вызовом функции в момент выгрузки метрик —
+    для источников, у которых получение значений дорого (например, статистика кэша выдач с запросом к SQLite).
+    metrics — тип ("gauge" или "counter") и описание метрики по полям словаря, который возвращает func;
+    имя метрики — {name}_{поле}, у счётчиков — с суффиксом _total
+    """
+
+    def __init__(self, name: str, metrics: Dict[str, Tuple[str, str]], func: Callable[[], Dict[str, float]]):
+        self.name = name
+        self.metrics = metrics
+        self.func = func
+
+    def render(self) -> List[str]:
+        values = self.func()
+        lines = []
+        for field, (kind, documentation) in self.metrics.items():
+            name = f"{self.name}_{field}_total" if kind == "counter" else f"{self.name}_{field}"
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {_format_value(values[field])}")
+        return lines
+
+
+class Registry:
+    """Набор метрик приложения, выгружаемый в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Добавляет метрику (метрика с тем же именем заменяется)"""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Выгружает все метрики
+        :return: Текст в формате Prometheus (text/plain; version=0.0.4)
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            if isinstance(metric, MetricGroup):
+                lines.extend(metric.render())
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "Количество HTTP-запросов", ("method", "route", "status")))
+http_errors = registry.register(Counter(
+    "http_request_errors_total", "Количество запросов, завершившихся ошибкой сервера (5xx)", ("method", "route")))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ("method", "route"), REQUEST_BUCKETS))
+stage_latency = registry.register(Histogram(
+    "search_stage_duration_seconds", "Время этапов обработки запроса", ("stage",), STAGE_BUCKETS))
+
+# Этапы текущего запроса для заголовка Server-Timing (только в режиме отладки)
+_request_stages: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_stages", default=None)
+
+
+class stage_timer:
+    """
+    Контекстный менеджер: измеряет время этапа и добавляет его в гистограмму этапов, а в режиме отладки —
+    в заголовок Server-Timing текущего запроса. Сделан классом, а не генератором, чтобы на каждый этап
+    тратилось не больше пары микросекунд
+    :param stage: Название этапа
+    """
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter() - self.start
+        stage_latency.observe(duration, self.stage)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.append((self.stage, duration))
+
+
+def format_server_timing(stages: List[Tuple[str, float]], total: float) -> str:
+    """
+    Формирует значение заголовка Server-Timing
+    :param stages: Пары (этап, время в секундах); одинаковые этапы суммируются
+    :param total: Общее время обработки запроса в секундах
+    :return: Значение заголовка (время в миллисекундах)
+    """
+    durations: Dict[str, float] = {}
+    for stage, duration in stages:
+        durations[stage] = durations.get(stage, 0.0) + duration
+    durations["total"] = total
+    return ", ".join(f"{stage};dur={duration * 1000:.3f}" for stage, duration in durations.items())
+
+
+def get_route_name(scope: dict) -> str:
+    """
+    Возвращает метку маршрута запроса — шаблон пути найденного маршрута (например, /api/search/documents/{doc_id}),
+    чтобы количество меток не росло от значений параметров пути. Запросы, для которых маршрут не найден,
+    объединяются под меткой "unmatched"
+    """
+    return getattr(scope.get("route"), "path_format", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: считает запросы и ошибки и измеряет время обработки по маршрутам.
+    При config.DEBUG добавляет в ответ заголовок Server-Timing с этапами поиска и общим временем
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        stages = [] if config.DEBUG else None
+        token = _request_stages.set(stages)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if stages is not None:
+                    timing = format_server_timing(stages, time.perf_counter() - start)
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"server-timing", timing.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stages.reset(token)
+            route = get_route_name(scope)
+            method = scope["method"]
+            http_latency.observe(time.perf_counter() - start, method, route)
+            http_requests.inc(method, route, str(status))
+            if status >= 500:
+                http_errors.inc(method, route)
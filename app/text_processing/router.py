@@ -1,7 +1,11 @@
 from typing import Optional
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from app import config
+from app.executor import ExecutorOverloadedError, get_executor
 from app.text_processing.schemas import TextRequest
-from app.text_search.service import preprocess_text
+from app.text_processing.service import preprocess_text
+from app.text_processing.stream import (NDJSON_MEDIA_TYPE, NDJSON_MEDIA_TYPES, RequestStreamingResponse,
+                                        iter_json_array_texts, iter_ndjson_texts, preprocess_stream)
 
 router = APIRouter()
 
@@ -10,7 +14,26 @@ router = APIRouter()
 async def preprocess_endpoint(request: Optional[TextRequest]):
     """Эндпоинт для обработки текста"""
     try:
-        processed_text = preprocess_text(request.text)
+        processed_text = await get_executor().run(preprocess_text, request.text)
         return {"processed_text": processed_text}
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/preprocess/stream", summary="Потоковая обработка текстов",
+             description="Принимает JSON-массив или NDJSON (application/x-ndjson) из строк или объектов с полем "
+                         "text и возвращает NDJSON с обработанными словами каждого текста в порядке входных данных")
+async def preprocess_stream_endpoint(request: Request):
+    """Эндпоинт для потоковой обработки текстов: тело запроса читается по мере обработки"""
+    media_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if media_type in NDJSON_MEDIA_TYPES:
+        texts = iter_ndjson_texts(request.stream(), config.PREPROCESS_STREAM_MAX_ITEM_BYTES)
+    elif media_type == "application/json":
+        texts = iter_json_array_texts(request.stream(), config.PREPROCESS_STREAM_MAX_ITEM_BYTES)
+    else:
+        raise HTTPException(status_code=415, detail=f"Неподдерживаемый тип содержимого '{media_type}'")
+    return RequestStreamingResponse(preprocess_stream(texts, config.PREPROCESS_STREAM_BATCH_SIZE,
+                                                      config.PREPROCESS_STREAM_IN_FLIGHT),
+                                    media_type=NDJSON_MEDIA_TYPE)
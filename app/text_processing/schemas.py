@@ -1,6 +1,22 @@
 # Модель для валидации входных данных
+from typing import List
 from pydantic import BaseModel
 
 
 class TextRequest(BaseModel):
     text: str
+
+
+class SearchRequest(TextRequest):
+    top_k: int = 3
+    min_score: float = 0.0
+    offset: int = 0
+    # Длина фрагментов: если больше нуля, вместо текстов возвращаются идентификаторы документов и фрагменты
+    snippet_length: int = 0
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    top_k: int = 3
+    min_score: float = 0.0
+    offset: int = 0
@@ -1,8 +1,291 @@
-from typing import List
-import spacy
+import hashlib
+import json
+import threading
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional
+from app import config
+from app.cache import MISSING, LRUCache
+from app.text_processing.token_cache import TokenCache
 
-# Загрузка русской языковой модели spaCy
-nlp = spacy.load("ru_core_news_sm")
+if TYPE_CHECKING:
+    from spacy.language import Language
+    from spacy.tokens import Doc
+
+# Размер пакета текстов для nlp.pipe по умолчанию
+DEFAULT_BATCH_SIZE = 256
+
+# Режимы предобработки текста
+PROCESSING_MODES = ("full", "fast", "pymorphy")
+
+# Компоненты модели, от которых не зависят леммы и стоп-слова: лемматизатору ru_core_news_sm
+# нужны только tok2vec, morphologizer и attribute_ruler
+FAST_MODE_EXCLUDE = ["parser", "senter", "ner"]
+
+# Версия логики извлечения слов (extract_tokens); увеличивается при её изменении, чтобы сбросить кэш на диске
+PREPROCESSING_VERSION = 1
+
+# Сколько пакетов nlp.pipe набирается в одну порцию при обработке с кэшем на диске
+TOKEN_CACHE_CHUNK_BATCHES = 16
+
+
+class TextPreprocessor:
+    """
+    Предобработка текста в одном из режимов:
+    "full" — модель spaCy со всеми компонентами,
+    "fast" — модель spaCy только с компонентами, нужными лемматизатору,
+    "pymorphy" — токенизатор spaCy без нейросетевых компонентов и лемматизация напрямую через pymorphy3.
+
+    Результаты кэшируются на двух уровнях: LRU-кэш результатов для целых строк (с нормализованными
+    пробелами) и таблица «словоформа -> лемма», по которой короткие тексты из уже встречавшихся слов
+    обрабатываются одним токенизатором, без нейросетевого конвейера. Словоформы, получавшие в разных
+    контекстах разные леммы, считаются неоднозначными и для такого пропуска не используются
+    """
+
+    def __init__(self, mode: str = "full", model_name: str = "ru_core_news_sm", text_cache_size: int = 0,
+                 lemma_cache_size: int = 0, lemma_cache_max_tokens: int = 8):
+        if mode not in PROCESSING_MODES:
+            raise ValueError(f"Неизвестный режим предобработки '{mode}', доступны: {', '.join(PROCESSING_MODES)}")
+        self.mode = mode
+        self.model_name = model_name
+        self.nlp = self._load_pipeline()
+        self._lemmatizer_version = None
+        self._lemmatize = self._create_pymorphy_lemmatizer() if mode == "pymorphy" else None
+
+        self.text_cache = LRUCache(text_cache_size)
+        # В режиме pymorphy конвейер состоит из одного токенизатора, пропускать нечего
+        self.lemma_cache = LRUCache(lemma_cache_size if self._lemmatize is None else 0)
+        self.lemma_cache_max_tokens = lemma_cache_max_tokens
+
+    def _load_pipeline(self) -> "Language":
+        """Загружает конвейер spaCy для выбранного режима"""
+        import spacy
+
+        if self.mode == "fast":
+            return spacy.load(self.model_name, exclude=FAST_MODE_EXCLUDE)
+        if self.mode == "pymorphy":
+            # Токенизатор, стоп-слова и признак is_alpha берутся из языковых данных spaCy без модели
+            return spacy.blank("ru")
+        return spacy.load(self.model_name)
+
+    def _create_pymorphy_lemmatizer(self):
+        """Создаёт лемматизатор pymorphy3 с кэшем лемм по словоформе"""
+        import pymorphy3
+
+        morph = pymorphy3.MorphAnalyzer(lang="ru")
+        dictionary = morph.dictionary.meta
+        self._lemmatizer_version = (f"pymorphy3 {pymorphy3.__version__}, словарь {dictionary.get('source_version')}"
+                                    f" ({dictionary.get('source_revision')})")
+
+        @lru_cache(maxsize=100000)
+        def lemmatize(word: str) -> str:
+            return morph.parse(word)[0].normal_form
+
+        return lemmatize
+
+    def fingerprint(self) -> str:
+        """
+        Возвращает отпечаток настроек, от которых зависит результат предобработки: режим, модель spaCy
+        и её версия, версия лемматизатора, стоп-слова и версия логики извлечения слов
+        :return: Хэш настроек
+        """
+        import spacy
+
+        settings = {
+            "preprocessing_version": PREPROCESSING_VERSION,
+            "mode": self.mode,
+            "model": f"{self.nlp.meta.get('lang')}_{self.nlp.meta.get('name')}",
+            "model_version": self.nlp.meta.get("version"),
+            "spacy_version": spacy.__version__,
+            "pipeline": self.nlp.pipe_names,
+            "lemmatizer": self._lemmatizer_version,
+            "stop_words": sorted(self.nlp.Defaults.stop_words),
+        }
+        return hashlib.sha256(json.dumps(settings, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def extract_tokens(self, doc: "Doc") -> List[str]:
+        """
+        Извлекает из обработанного документа леммы без стоп-слов и неалфавитных символов
+        :param doc: документ spaCy
+        :return: список обработанных слов
+        """
+        tokens = [token for token in doc if token.is_alpha and not token.is_stop]
+        if self._lemmatize is not None:
+            return [self._lemmatize(token.lower_) for token in tokens]
+        return [token.lemma_.lower() for token in tokens]
+
+    def preprocess(self, text: str) -> List[str]:
+        """
+        Обрабатывает текст: токенизация, удаление стоп-слов, приведение к нижнему регистру и лемматизация.
+        :param text: строка с текстом для обработки
+        :return: список обработанных слов
+        """
+        if not isinstance(text, str):
+            raise ValueError("Входной текст должен быть строкой")
+
+        if not text.strip():  # Если текст пустой, вернуть пустой список
+            return []
+
+        key = " ".join(text.split())
+        cached = self.text_cache.get(key)
+        if cached is not MISSING:
+            return list(cached)
+
+        tokens = self._lookup_lemmas(key)
+        if tokens is None:
+            # Обработка текста через spaCy
+            doc = self.nlp(text)
+
+            # Лемматизация, удаление стоп-слов и неалфавитных символов
+            tokens = self.extract_tokens(doc)
+            self._remember_lemmas(doc)
+
+        self.text_cache.put(key, tuple(tokens))
+        return tokens
+
+    def preprocess_many(self, texts: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List[List[str]]:
+        """
+        Обрабатывает несколько независимых текстов с теми же кэшами, что и preprocess: тексты, которых
+        нет в кэшах, проходят через конвейер одним вызовом nlp.pipe. Результат совпадает с preprocess
+        :param texts: тексты для обработки
+        :param batch_size: количество текстов в одном пакете nlp.pipe
+        :return: списки обработанных слов в порядке входных текстов
+        """
+        results: List[Optional[List[str]]] = [None] * len(texts)
+        missing = []
+        for i, text in enumerate(_validate_texts(texts)):
+            if not text.strip():
+                results[i] = []
+                continue
+            key = " ".join(text.split())
+            cached = self.text_cache.get(key)
+            if cached is not MISSING:
+                results[i] = list(cached)
+                continue
+            tokens = self._lookup_lemmas(key)
+            if tokens is None:
+                missing.append((i, key, text))
+            else:
+                self.text_cache.put(key, tuple(tokens))
+                results[i] = tokens
+
+        docs = self.nlp.pipe([text for _, _, text in missing], batch_size=batch_size)
+        for (i, key, _), doc in zip(missing, docs):
+            tokens = self.extract_tokens(doc)
+            self._remember_lemmas(doc)
+            self.text_cache.put(key, tuple(tokens))
+            results[i] = tokens
+        return results
+
+    def _lookup_lemmas(self, text: str) -> Optional[List[str]]:
+        """
+        Обрабатывает короткий текст одним токенизатором, если леммы всех его слов уже известны
+        :param text: текст с нормализованными пробелами
+        :return: список обработанных слов или None, если нужен полный конвейер
+        """
+        if self.lemma_cache.maxsize == 0 or text.count(" ") >= self.lemma_cache_max_tokens:
+            return None
+
+        words = [token.lower_ for token in self.nlp.tokenizer(text) if token.is_alpha and not token.is_stop]
+        if len(words) > self.lemma_cache_max_tokens:
+            return None
+        lemmas = []
+        for word in words:
+            lemma = self.lemma_cache.get(word)
+            # None — неоднозначная словоформа
+            if lemma is MISSING or lemma is None:
+                return None
+            lemmas.append(lemma)
+        return lemmas
+
+    def _remember_lemmas(self, doc: "Doc"):
+        """Запоминает леммы словоформ обработанного документа"""
+        if self.lemma_cache.maxsize == 0:
+            return
+        for token in doc:
+            if token.is_alpha and not token.is_stop:
+                self.lemma_cache.merge(token.lower_, token.lemma_.lower(),
+                                       lambda old, new: old if old == new else None)
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Возвращает статистику кэшей предобработки
+        :return: Статистика кэша строк и таблицы лемм
+        """
+        return {"text_cache": self.text_cache.stats(), "lemma_cache": self.lemma_cache.stats()}
+
+    def clear_caches(self):
+        """Очищает кэш строк, таблицу лемм и кэш лемматизатора pymorphy3 (для воспроизводимых замеров)"""
+        self.text_cache.clear()
+        self.lemma_cache.clear()
+        if self._lemmatize is not None:
+            self._lemmatize.cache_clear()
+
+    def preprocess_batch(self, texts: Iterable[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                         n_process: int = 1, token_cache: Optional[TokenCache] = None) -> Iterator[List[str]]:
+        """
+        Обрабатывает тексты пакетами через nlp.pipe. Результат для каждого текста совпадает с preprocess.
+        С кэшем на диске тексты читаются порциями: найденные в кэше берутся из него, а через nlp.pipe
+        проходят только остальные
+        :param texts: тексты для обработки
+        :param batch_size: количество текстов в одном пакете
+        :param n_process: количество процессов spaCy
+        :param token_cache: кэш результатов на диске (должен быть открыт с отпечатком этого обработчика)
+        :return: итератор списков обработанных слов в порядке входных текстов
+        """
+        texts = _validate_texts(texts)
+        if token_cache is None:
+            for doc in self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+                yield self.extract_tokens(doc)
+            return
+
+        chunk_size = batch_size * max(n_process, 1) * TOKEN_CACHE_CHUNK_BATCHES
+        while chunk := list(islice(texts, chunk_size)):
+            cached = token_cache.get_many(chunk)
+            missing = [text for text, tokens in zip(chunk, cached) if tokens is None]
+            processed = [self.extract_tokens(doc) for doc in
+                         self.nlp.pipe(missing, batch_size=batch_size, n_process=n_process)] if missing else []
+            token_cache.put_many(zip(missing, processed))
+
+            processed = iter(processed)
+            for tokens in cached:
+                yield tokens if tokens is not None else next(processed)
+
+
+def _validate_texts(texts: Iterable[str]) -> Iterator[str]:
+    """Проверяет, что все тексты являются строками"""
+    for text in texts:
+        if not isinstance(text, str):
+            raise ValueError("Входной текст должен быть строкой")
+        yield text
+
+
+# Общий обработчик в режиме из настроек; модель spaCy загружается при первом обращении
+_preprocessor: Optional[TextPreprocessor] = None
+_preprocessor_lock = threading.Lock()
+
+
+def get_preprocessor() -> TextPreprocessor:
+    """
+    Возвращает общий обработчик текста, при первом вызове загружая русскую языковую модель spaCy.
+    Импорт модуля модель не загружает, поэтому запуск приложения и утилит её не ждёт
+    :return: Обработчик
+    """
+    global _preprocessor
+    if _preprocessor is None:
+        with _preprocessor_lock:
+            if _preprocessor is None:
+                _preprocessor = TextPreprocessor(config.TEXT_PROCESSING_MODE, config.SPACY_MODEL,
+                                                 text_cache_size=config.PREPROCESS_CACHE_SIZE,
+                                                 lemma_cache_size=config.LEMMA_CACHE_SIZE,
+                                                 lemma_cache_max_tokens=config.LEMMA_CACHE_MAX_TOKENS)
+    return _preprocessor
+
+
+def is_preprocessor_loaded() -> bool:
+    """Проверяет, загружен ли уже общий обработчик текста"""
+    return _preprocessor is not None
 
 
 def preprocess_text(text: str) -> List[str]:
@@ -11,19 +294,48 @@ def preprocess_text(text: str) -> List[str]:
     :param text: строка с текстом для обработки
     :return: список обработанных слов
     """
-    if not isinstance(text, str):
-        raise ValueError("Входной текст должен быть строкой")
+    return get_preprocessor().preprocess(text)
+
+
+def preprocess_texts_batch(texts: Iterable[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                           n_process: int = 1, token_cache: Optional[TokenCache] = None) -> Iterator[List[str]]:
+    """
+    Обрабатывает тексты пакетами через nlp.pipe. Результат для каждого текста совпадает с preprocess_text
+    :param texts: тексты для обработки
+    :param batch_size: количество текстов в одном пакете
+    :param n_process: количество процессов spaCy
+    :param token_cache: кэш результатов на диске между сборками индекса
+    :return: итератор списков обработанных слов в порядке входных текстов
+    """
+    return get_preprocessor().preprocess_batch(texts, batch_size=batch_size, n_process=n_process,
+                                               token_cache=token_cache)
+
+
+def preprocess_texts_chunk(texts: List[str]) -> List[List[str]]:
+    """
+    Обрабатывает порцию текстов одним вызовом nlp.pipe без кэша строк (например, пакет потоковой
+    предобработки в пуле обработчиков). Результат для каждого текста совпадает с preprocess_text
+    :param texts: тексты для обработки
+    :return: списки обработанных слов в порядке входных текстов
+    """
+    return list(preprocess_texts_batch(texts, batch_size=max(len(texts), 1)))
 
-    if not text.strip():  # Если текст пустой, вернуть пустой список
-        return []
 
-    # Обработка текста через spaCy
-    doc = nlp(text)
+def preprocess_texts_many(texts: List[str]) -> List[List[str]]:
+    """
+    Обрабатывает несколько независимых текстов (например, одновременных поисковых запросов) одним вызовом
+    nlp.pipe, используя кэши preprocess_text. Результат для каждого текста совпадает с preprocess_text
+    :param texts: тексты для обработки
+    :return: списки обработанных слов в порядке входных текстов
+    """
+    return get_preprocessor().preprocess_many(texts)
 
-    # Лемматизация, удаление стоп-слов и неалфавитных символов
-    processed_tokens = [
-        token.lemma_.lower() for token in doc
-        if token.is_alpha and not token.is_stop
-    ]
 
-    return processed_tokens
+def open_token_cache(path: Path) -> TokenCache:
+    """
+    Открывает кэш результатов предобработки на диске для текущих настроек предобработки.
+    Если модель, стоп-слова или логика предобработки изменились, сохранённые результаты сбрасываются
+    :param path: Путь к файлу кэша
+    :return: Кэш
+    """
+    return TokenCache(path, get_preprocessor().fingerprint())
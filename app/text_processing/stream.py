@@ -0,0 +1,218 @@
+import asyncio
+import codecs
+import json
+import re
+from collections import deque
+from typing import Any, AsyncIterator, Deque, List
+from starlette.responses import StreamingResponse
+from starlette.types import Message, Receive, Scope, Send
+from app.executor import ExecutorOverloadedError, get_executor
+from app.text_processing.service import preprocess_texts_chunk
+
+# Типы содержимого потока: NDJSON — по элементу в строке; остальное разбирается как JSON-массив
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl")
+NDJSON_MEDIA_TYPE = NDJSON_MEDIA_TYPES[0]
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def get_item_text(item: Any) -> str:
+    """
+    Возвращает текст элемента потока
+    :param item: Строка или объект с полем text
+    :return: Текст
+    """
+    if isinstance(item, dict):
+        item = item.get("text")
+    if not isinstance(item, str):
+        raise ValueError("Элемент потока должен быть строкой или объектом с полем text")
+    return item
+
+
+class JsonArrayParser:
+    """
+    Разбирает JSON-массив по частям по мере поступления данных и возвращает готовые элементы.
+    В буфере хранится только ещё не разобранный элемент, поэтому память не зависит от размера массива.
+    Размер незавершённого элемента ограничен max_item_bytes байтами UTF-8 — так же, как строка NDJSON
+    """
+
+    def __init__(self, max_item_bytes: int):
+        self.max_item_bytes = max_item_bytes
+        self.buffer = ""
+        # Ожидаемая часть массива: "start" — открывающая скобка, "first" — первый элемент или конец,
+        # "item" — элемент после запятой, "separator" — запятая или конец, "end" — массив закончился
+        self.state = "start"
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        Добавляет данные и разбирает все полностью полученные элементы
+        :param text: Очередная часть данных
+        :return: Разобранные элементы
+        """
+        self.buffer += text
+        items = []
+        pos = 0
+        while True:
+            pos = _WHITESPACE.match(self.buffer, pos).end()
+            if pos == len(self.buffer):
+                break
+            char = self.buffer[pos]
+            if self.state == "start":
+                if char != "[":
+                    raise ValueError("Ожидается JSON-массив")
+                self.state, pos = "first", pos + 1
+            elif self.state == "first" and char == "]":
+                self.state, pos = "end", pos + 1
+            elif self.state in ("first", "item"):
+                try:
+                    item, pos_end = self._decoder.raw_decode(self.buffer, pos)
+                except json.JSONDecodeError:
+                    # Элемент ещё не получен целиком (или некорректен — это выяснится в конце потока)
+                    if self._item_too_large(pos):
+                        raise ValueError("Элемент потока слишком большой или некорректен")
+                    break
+                items.append(item)
+                self.state, pos = "separator", pos_end
+            elif self.state == "separator" and char in ",]":
+                self.state, pos = ("item" if char == "," else "end"), pos + 1
+            else:
+                raise ValueError("Некорректный JSON-массив")
+        self.buffer = self.buffer[pos:]
+        return items
+
+    def _item_too_large(self, pos: int) -> bool:
+        """Проверяет, превышает ли незавершённый элемент с позиции pos лимит в байтах"""
+        n_chars = len(self.buffer) - pos
+        # Символ занимает в UTF-8 от 1 до 4 байт: кодировать элемент нужно, только если эти границы не решают
+        if n_chars > self.max_item_bytes:
+            return True
+        if n_chars * 4 <= self.max_item_bytes:
+            return False
+        return len(self.buffer[pos:].encode("utf-8")) > self.max_item_bytes
+
+    def close(self):
+        """Проверяет, что массив закончился"""
+        if self.state != "end" or self.buffer.strip():
+            raise ValueError("JSON-массив не завершён")
+
+
+async def iter_json_array_texts(chunks: AsyncIterator[bytes], max_item_bytes: int) -> AsyncIterator[str]:
+    """
+    Читает тексты из JSON-массива строк или объектов с полем text по мере поступления данных
+    :param chunks: Части тела запроса
+    :param max_item_bytes: Максимальный размер одного элемента в байтах
+    :return: Тексты в порядке массива
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    parser = JsonArrayParser(max_item_bytes)
+    async for chunk in chunks:
+        for item in parser.feed(decoder.decode(chunk)):
+            yield get_item_text(item)
+    for item in parser.feed(decoder.decode(b"", final=True)):
+        yield get_item_text(item)
+    parser.close()
+
+
+def parse_ndjson_line(line: bytes) -> str:
+    """Разбирает строку NDJSON"""
+    try:
+        return get_item_text(json.loads(line))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Некорректная строка NDJSON: {e}")
+
+
+async def iter_ndjson_texts(chunks: AsyncIterator[bytes], max_item_bytes: int) -> AsyncIterator[str]:
+    """
+    Читает тексты из NDJSON: в каждой непустой строке — строка JSON или объект с полем text
+    :param chunks: Части тела запроса
+    :param max_item_bytes: Максимальный размер одной строки
+    :return: Тексты в порядке строк
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", start)) >= 0:
+            if buffer[start:end].strip():
+                yield parse_ndjson_line(buffer[start:end])
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_item_bytes:
+            raise ValueError("Строка NDJSON слишком большая")
+    if buffer.strip():
+        yield parse_ndjson_line(buffer)
+
+
+def format_line(value: Any) -> bytes:
+    """Кодирует значение строкой NDJSON"""
+    return (json.dumps(value, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def preprocess_stream(texts: AsyncIterator[str], batch_size: int, in_flight: int) -> AsyncIterator[bytes]:
+    """
+    Обрабатывает поток текстов пакетами через nlp.pipe в пуле обработчиков и возвращает результаты строками
+    NDJSON {"processed_text": [...]} в порядке входных текстов. Одновременно обрабатывается не больше
+    in_flight пакетов: следующие тексты читаются, только когда результаты самого старого пакета отправлены,
+    поэтому память ограничена независимо от размера потока, а медленный клиент замедляет чтение запроса.
+    Ошибка в данных или перегрузка исполнителя завершают поток строкой {"error": ...} после результатов
+    уже обработанных текстов
+    :param texts: Тексты
+    :param batch_size: Количество текстов в одном пакете
+    :param in_flight: Количество одновременно обрабатываемых пакетов
+    :return: Строки NDJSON
+    """
+    if batch_size < 1 or in_flight < 1:
+        raise ValueError("Размер пакета и количество одновременных пакетов должны быть положительными")
+    executor = get_executor()
+    pending: Deque[asyncio.Future] = deque()
+
+    def submit(batch: List[str]):
+        pending.append(asyncio.ensure_future(executor.run(preprocess_texts_chunk, batch)))
+
+    error = None
+    try:
+        batch = []
+        try:
+            async for text in texts:
+                batch.append(text)
+                if len(batch) < batch_size:
+                    continue
+                submit(batch)
+                batch = []
+                if len(pending) >= in_flight:
+                    for tokens in await pending.popleft():
+                        yield format_line({"processed_text": tokens})
+        except ValueError as e:
+            # Тексты до ошибки в данных уже приняты и обрабатываются
+            error = e
+        if batch:
+            submit(batch)
+        while pending:
+            for tokens in await pending.popleft():
+                yield format_line({"processed_text": tokens})
+    except (ExecutorOverloadedError, ValueError) as e:
+        error = e
+    finally:
+        for future in pending:
+            future.cancel()
+    if error is not None:
+        yield format_line({"error": str(error)})
+
+
+async def _never_disconnect() -> Message:
+    """Канал receive, в котором отключение клиента не наступает никогда"""
+    await asyncio.Event().wait()
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    Потоковый ответ, который формируется по мере чтения тела запроса. StreamingResponse (Starlette 0.41.3)
+    при версии ASGI ниже 2.4 параллельно ждёт отключения клиента через receive и забирал бы себе части тела
+    запроса. Поэтому ожиданию отключения передаётся канал, в котором ничего не происходит (по окончании потока
+    Starlette отменяет это ожидание), а настоящий receive остаётся у чтения тела запроса — оно и обнаруживает
+    отключение клиента
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await super().__call__(scope, _never_disconnect, send)
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Количество ключей в одном запросе SELECT ... IN (...): старые сборки SQLite ограничивают число параметров 999
+LOOKUP_BATCH_SIZE = 500
+
+
+class TokenCache:
+    """
+    Кэш результатов предобработки на диске (SQLite) между сборками индекса. Ключ — хэш текста,
+    значение — список обработанных слов. Вместе с кэшем хранится отпечаток настроек предобработки
+    (модель, её версия, стоп-слова, версия логики); при открытии с другим отпечатком кэш очищается
+    """
+
+    def __init__(self, path: Path, fingerprint: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._connection = sqlite3.connect(str(self.path))
+        # Кэш можно восстановить повторной предобработкой, поэтому надёжность записи не важна
+        self._connection.execute("PRAGMA synchronous = OFF")
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS tokens (hash BLOB PRIMARY KEY, tokens TEXT NOT NULL) WITHOUT ROWID")
+            row = self._connection.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+            if row is None or row[0] != fingerprint:
+                self._connection.execute("DELETE FROM tokens")
+                self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)",
+                                         (fingerprint,))
+
+    @staticmethod
+    def text_hash(text: str) -> bytes:
+        """Возвращает хэш текста, по которому хранится результат"""
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[str]]]:
+        """
+        Возвращает сохранённые результаты предобработки текстов
+        :param texts: Тексты
+        :return: Списки обработанных слов в порядке текстов (None для текстов, которых нет в кэше)
+        """
+        hashes = [self.text_hash(text) for text in texts]
+        found = {}
+        for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+            batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+            query = f"SELECT hash, tokens FROM tokens WHERE hash IN ({', '.join('?' * len(batch))})"
+            found.update(self._connection.execute(query, batch))
+
+        results = [json.loads(found[key]) if key in found else None for key in hashes]
+        n_hits = sum(tokens is not None for tokens in results)
+        self.hits += n_hits
+        self.misses += len(results) - n_hits
+        return results
+
+    def put_many(self, items: Iterable[Tuple[str, List[str]]]):
+        """
+        Сохраняет результаты предобработки
+        :param items: Пары (текст, список обработанных слов)
+        """
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO tokens (hash, tokens) VALUES (?, ?)",
+                ((self.text_hash(text), json.dumps(tokens, ensure_ascii=False)) for text, tokens in items))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает статистику кэша
+        :return: Словарь с размером, попаданиями, промахами и долей попаданий
+        """
+        requests = self.hits + self.misses
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+        }
+
+    def close(self):
+        """Закрывает базу кэша"""
+        self._connection.close()
+
+    def __enter__(self) -> "TokenCache":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,159 @@
+import asyncio
+import contextvars
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from app import config
+from app.executor import ExecutorOverloadedError, get_executor
+from app.metrics import STAGE_BUCKETS, Histogram, registry
+from app.text_search.service import SearchParams, get_relevant_texts_many
+
+# Границы корзин гистограммы размеров пакетов
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+batch_size_histogram = registry.register(Histogram(
+    "search_batch_size", "Количество запросов /api/search в одном пакете", (), BATCH_SIZE_BUCKETS))
+batch_wait_histogram = registry.register(Histogram(
+    "search_batch_wait_seconds", "Время ожидания запроса /api/search до отправки его пакета", (), STAGE_BUCKETS))
+
+
+@dataclass
+class _PendingSearch:
+    """Запрос, ожидающий отправки в пакете"""
+    params: SearchParams
+    tfidf_folder: Path
+    future: asyncio.Future
+    enqueued: float
+
+
+class SearchBatcher:
+    """
+    Объединяет одновременные запросы /api/search в пакеты, которые выполняются одним вызовом
+    get_relevant_texts_many в исполнителе приложения (одним nlp.pipe и одним произведением матриц).
+
+    Размер пакета и ожидание подстраиваются под нагрузку: пока выполняется меньше max_in_flight пакетов,
+    запрос отправляется сразу, без ожидания, поэтому при низкой нагрузке задержка не растёт. Когда все места
+    заняты, запросы копятся и уходят одним пакетом, как только освободится место, наберётся max_size запросов
+    или истечёт max_wait секунд с момента поступления первого из них
+    """
+
+    def __init__(self, max_size: int = 32, max_wait: float = 0.005, max_in_flight: int = 1,
+                 max_pending: int = 1024):
+        if max_size < 0 or max_wait < 0:
+            raise ValueError("Размер пакета и время ожидания не могут быть отрицательными")
+        if max_in_flight < 1 or max_pending < 1:
+            raise ValueError("Количество пакетов и размер очереди должны быть положительными")
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        self.max_pending = max_pending
+        self.in_flight = 0
+        self._pending: List[_PendingSearch] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Ссылки на выполняющиеся пакеты, чтобы их задачи не были удалены сборщиком мусора
+        self._tasks = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @property
+    def pending(self) -> int:
+        """Количество запросов, ожидающих отправки"""
+        return len(self._pending)
+
+    async def search(self, query: str, tfidf_folder: Path, top_k: int = 3, min_score: float = 0.0,
+                     offset: int = 0, snippet_length: int = 0) -> List[Tuple[Union[str, Dict[str, str]], float]]:
+        """
+        Ставит запрос в очередь и дожидается его выдачи
+        :param query: Текст запроса
+        :param tfidf_folder: Путь к папке с TF-IDF моделью и матрицей
+        :param top_k: Количество возвращаемых текстов
+        :param min_score: Минимальная релевантность возвращаемых текстов
+        :param offset: Количество пропускаемых результатов
+        :param snippet_length: Длина фрагментов вместо полных текстов (0 — полные тексты)
+        :return: Список текстов и их релевантности
+        """
+        if len(self._pending) >= self.max_pending:
+            raise ExecutorOverloadedError("Сервер перегружен, повторите запрос позже")
+        future = asyncio.get_running_loop().create_future()
+        params = SearchParams(query, top_k, min_score, offset, snippet_length)
+        self._pending.append(_PendingSearch(params, Path(tfidf_folder), future, time.perf_counter()))
+        self._schedule()
+        return await future
+
+    def _schedule(self):
+        """Отправляет накопленные запросы, если есть свободное место или пакет заполнен, иначе ставит таймер"""
+        if not self._pending:
+            return
+        if self.in_flight < self.max_in_flight or len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._flush()
+
+    def _flush(self):
+        """Отправляет все накопленные запросы пакетами не больше max_size"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        now = time.perf_counter()
+        # Запросы к разным папкам индекса выполняются разными пакетами
+        groups: Dict[Path, List[_PendingSearch]] = {}
+        for item in pending:
+            if not item.future.done():
+                batch_wait_histogram.observe(now - item.enqueued)
+                groups.setdefault(item.tfidf_folder, []).append(item)
+        for tfidf_folder, items in groups.items():
+            for start in range(0, len(items), self.max_size):
+                self.in_flight += 1
+                # Пакет выполняется в пустом контексте: его этапы не относятся ни к одному из запросов
+                task = asyncio.create_task(self._run(tfidf_folder, items[start:start + self.max_size]),
+                                           context=contextvars.Context())
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, tfidf_folder: Path, items: List[_PendingSearch]):
+        """Выполняет пакет в исполнителе приложения и передаёт каждому запросу его выдачу или ошибку"""
+        batch_size_histogram.observe(len(items))
+        try:
+            results = await get_executor().run(get_relevant_texts_many, [item.params for item in items],
+                                               tfidf_folder)
+        except Exception as e:
+            results = [e] * len(items)
+        finally:
+            self.in_flight -= 1
+            self._schedule()
+
+        for item, result in zip(items, results):
+            if item.future.done():
+                continue
+            if isinstance(result, Exception):
+                item.future.set_exception(result)
+            else:
+                item.future.set_result(result)
+
+
+search_batcher = SearchBatcher(config.SEARCH_BATCHING_MAX_SIZE, config.SEARCH_BATCHING_MAX_WAIT_MS / 1000,
+                               config.SEARCH_BATCHING_CONCURRENCY, config.EXECUTOR_MAX_PENDING)
+
+
+def configure_search_batcher(batcher: SearchBatcher) -> SearchBatcher:
+    """
+    Заменяет общий планировщик пакетов приложения
+    :param batcher: Новый планировщик
+    :return: Новый планировщик
+    """
+    global search_batcher
+    search_batcher = batcher
+    return search_batcher
+
+
+def get_search_batcher() -> SearchBatcher:
+    """Возвращает общий планировщик пакетов приложения"""
+    return search_batcher
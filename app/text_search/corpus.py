@@ -0,0 +1,188 @@
+import gzip
+import json
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any, Iterable, Iterator, List, NamedTuple, Optional
+
+# Поддерживаемые файлы с данными: массив или объект JSON, JSON Lines (по записи на строку) и их сжатые gzip версии
+DATA_FILE_PATTERNS = ("*.json", "*.jsonl", "*.json.gz", "*.jsonl.gz")
+
+# Размер порции, которой читается файл JSON при потоковом разборе массива
+READ_CHUNK_SIZE = 1 << 20
+
+_decoder = json.JSONDecoder()
+
+
+class Document(NamedTuple):
+    """Документ корпуса: идентификатор и исходный текст"""
+    doc_id: str
+    text: str
+
+
+def list_data_files(folder_path: Path) -> List[Path]:
+    """
+    Возвращает отсортированный список файлов с данными в папке
+    :param folder_path: Путь к папке
+    :return: Пути к файлам
+    """
+    return sorted({path for pattern in DATA_FILE_PATTERNS for path in folder_path.glob(pattern)})
+
+
+def _open_text(file_path: Path) -> IO[str]:
+    """Открывает файл на чтение как текст, распаковывая gzip на лету"""
+    if file_path.suffix == ".gz":
+        return gzip.open(file_path, "rt", encoding="utf-8")
+    return file_path.open("r", encoding="utf-8")
+
+
+def _is_jsonl(file_path: Path) -> bool:
+    """Проверяет, что файл в формате JSON Lines"""
+    return file_path.name.endswith((".jsonl", ".jsonl.gz"))
+
+
+def iter_json_array(file: IO[str], chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Потоково разбирает массив JSON верхнего уровня: элементы возвращаются по одному,
+    а в памяти одновременно находится только порция файла и текущий элемент
+    :param file: Файл, открытый как текст
+    :param chunk_size: Размер порции чтения в символах
+    :return: Итератор элементов массива
+    """
+    buffer = file.read(chunk_size)
+    while buffer and not buffer.strip() and (more := file.read(chunk_size)):
+        buffer = more
+    eof = not buffer
+    pos = _skip_whitespace(buffer, 0)
+    if pos == len(buffer) or buffer[pos] != "[":
+        raise json.JSONDecodeError("Ожидался массив JSON", buffer, pos)
+    pos += 1
+
+    # Состояния: "first" — сразу после "[", "value" — после запятой, "separator" — после элемента
+    state = "first"
+    while True:
+        pos = _skip_whitespace(buffer, pos)
+        if pos == len(buffer):
+            if eof:
+                raise json.JSONDecodeError("Массив JSON не завершён", buffer, pos)
+            more = file.read(chunk_size)
+            eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+
+        char = buffer[pos]
+        if state == "separator":
+            if char == "]":
+                return
+            if char != ",":
+                raise json.JSONDecodeError("Ожидалась запятая между элементами массива", buffer, pos)
+            pos += 1
+            state = "value"
+            continue
+        if char == "]" and state == "first":
+            return
+
+        try:
+            value, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            value, end = None, None
+        # Элемент обрезан концом порции. Число могло раскодироваться частично ("12" из "12.5"),
+        # поэтому за ним должен быть виден разделитель
+        if not eof and (end is None or _skip_whitespace(buffer, end) == len(buffer) or (
+                isinstance(value, (int, float)) and buffer[_skip_whitespace(buffer, end)] not in ",]")):
+            more = file.read(chunk_size)
+            eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+
+        yield value
+        pos, state = end, "separator"
+        if pos > chunk_size:
+            buffer, pos = buffer[pos:], 0
+
+
+def _skip_whitespace(buffer: str, pos: int) -> int:
+    """Возвращает позицию первого непробельного символа, начиная с pos"""
+    while pos < len(buffer) and buffer[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+
+def _first_char(file: IO[str]) -> str:
+    """Возвращает первый непробельный символ файла и перематывает файл в начало"""
+    char = ""
+    while piece := file.read(1024):
+        stripped = piece.lstrip()
+        if stripped:
+            char = stripped[0]
+            break
+    file.seek(0)
+    return char
+
+
+def iter_records(file_path: Path) -> Iterator[Any]:
+    """
+    Потоково читает записи из файла с данными: элементы массива JSON, объект JSON или строки JSON Lines
+    :param file_path: Путь к файлу (.json, .jsonl, возможно сжатому gzip)
+    :return: Итератор записей
+    """
+    with _open_text(file_path) as file:
+        if _is_jsonl(file_path):
+            for line_number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Ошибка в строке {line_number} файла {file_path}: {e}") from e
+        elif _first_char(file) == "[":
+            yield from iter_json_array(file)
+        else:
+            data = json.load(file)
+            if not isinstance(data, dict):
+                raise ValueError(
+                    f"Формат данных в файле {file_path} не поддерживается (ожидается список или словарь)")
+            yield data
+
+
+def iter_documents(file_path: Path, key: Optional[str] = None, id_key: str = "name") -> Iterator[Document]:
+    """
+    Потоково читает документы из файла с данными
+    :param file_path: Путь к файлу
+    :param key: Ключ текста в записях-словарях (None — запись целиком, приведённая к строке)
+    :param id_key: Ключ идентификатора документа; если его нет, идентификатор составляется из имени файла и номера
+    :return: Итератор документов
+    """
+    for number, record in enumerate(iter_records(file_path)):
+        if not isinstance(record, dict) or (key is not None and key not in record):
+            continue
+        doc_id = record.get(id_key)
+        doc_id = str(doc_id) if doc_id is not None else f"{file_path.name}:{number}"
+        yield Document(doc_id, record[key] if key else str(record))
+
+
+def iter_folder_documents(folder_path: Path, key: Optional[str] = None, id_key: str = "name") -> Iterator[Document]:
+    """
+    Потоково читает документы из всех файлов с данными в папке
+    :param folder_path: Путь к папке
+    :param key: Ключ текста в записях-словарях
+    :param id_key: Ключ идентификатора документа
+    :return: Итератор документов
+    """
+    if not folder_path.exists():
+        raise FileNotFoundError(f"Папка '{folder_path}' не найдена")
+    for file_path in list_data_files(folder_path):
+        yield from iter_documents(file_path, key, id_key)
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """
+    Разбивает поток на списки не длиннее size
+    :param items: Поток элементов
+    :param size: Размер порции
+    :return: Итератор порций
+    """
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -1,44 +1,51 @@
-import json
+import argparse
+import tempfile
+import time
+from contextlib import ExitStack
 from pathlib import Path
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
 from sklearn.feature_extraction.text import TfidfVectorizer
-from typing import List, Tuple
-import pickle
-from app.text_processing.service import preprocess_text
+from sklearn.preprocessing import normalize
+from typing import Iterable, Iterator, List, Optional, Tuple
+from app.config import PROJECT_ROOT, TFIDF_FOLDER
+from app.text_processing.service import DEFAULT_BATCH_SIZE, open_token_cache, preprocess_texts_batch
+from app.text_processing.token_cache import TokenCache
+from app.text_search.corpus import Document, chunked, iter_documents, iter_folder_documents
+from app.text_search.doc_store import DEFAULT_BLOCK_SIZE
+from app.text_search.hashing import DEFAULT_N_FEATURES, HashingTfidfVectorizer
+from app.text_search.impact_index import IMPACT_DTYPES, build_impact_index, get_matrix_nbytes
+from app.text_search.semantic import DEFAULT_N_COMPONENTS, build_semantic_index
+from app.text_search.shards import get_shard_bounds
+from app.text_search.storage import TextStore, TextStoreWriter, Vectorizer, save_index
 
-PROJECT_ROOT = Path(__file__).resolve().parents[2]
 DATA_FOLDER = PROJECT_ROOT / "data"
-TFIDF_FOLDER = PROJECT_ROOT / "tfidf"
+
+# Количество документов, количества терминов которых собираются в одну разреженную матрицу при потоковой сборке
+DEFAULT_CHUNK_SIZE = 10000
+
+# Файл кэша результатов предобработки между сборками индекса (в папке индекса)
+TOKEN_CACHE_FILE = "token_cache.sqlite3"
+
+
+def load_texts_from_file(file_path: Path, key: str = None) -> List[str]:
+    """
+    Загружает тексты из одного файла с данными (.json, .jsonl, возможно сжатого gzip)
+    :param file_path: Путь к файлу
+    :param key: Ключ для извлечения текстов из объектов JSON (если данные представлены в виде словаря)
+    :return: Список строк, каждая из которых — содержимое текстового поля из JSON
+    """
+    return [document.text for document in iter_documents(file_path, key)]
 
 
 def load_texts_from_folder(folder_path: Path, key: str = None) -> List[str]:
     """
-    Загружает тексты из всех .json файлов в указанной папке
-    :param folder_path: Путь к папке с файлами .json
+    Загружает тексты из всех файлов с данными в указанной папке
+    :param folder_path: Путь к папке с файлами данных
     :param key: Ключ для извлечения текстов из объектов JSON (если данные представлены в виде словаря)
     :return: Список строк, каждая из которых — содержимое текстового поля из JSON
     """
-    if not folder_path.exists():
-        raise FileNotFoundError(f"Папка '{folder_path}' не найдена")
-
-    texts = []
-    for file_path in folder_path.glob("*.json"):
-        with file_path.open("r", encoding="utf-8") as file:
-            data = json.load(file)
-
-            if isinstance(data, list):
-                # Если JSON содержит список объектов
-                texts.extend(item[key] if key else str(item) for item in data if
-                             isinstance(item, dict) and (key is None or key in item))
-            elif isinstance(data, dict):
-                # Если JSON является словарём
-                if key:
-                    if key in data:
-                        texts.append(data[key])
-                else:
-                    texts.append(str(data))
-            else:
-                raise ValueError(
-                    f"Формат данных в файле {file_path} не поддерживается (ожидается список или словарь)")
+    texts = [document.text for document in iter_folder_documents(folder_path, key)]
 
     if not texts:
         raise ValueError(f"В папке '{folder_path}' нет подходящих файлов .json или они пусты")
@@ -46,57 +53,256 @@ def load_texts_from_folder(folder_path: Path, key: str = None) -> List[str]:
     return texts
 
 
-def preprocess_texts(raw_texts: List[str]) -> List[str]:
+def preprocess_texts(raw_texts: List[str], batch_size: int = DEFAULT_BATCH_SIZE, n_process: int = 1,
+                     progress_every: int = 10000, token_cache: Optional[TokenCache] = None) -> List[str]:
     """
-    Обрабатывает список текстов
+    Обрабатывает список текстов пакетами через nlp.pipe, выводя прогресс и скорость обработки
     :param raw_texts: исходные тексты
+    :param batch_size: количество текстов в одном пакете
+    :param n_process: количество процессов для обработки
+    :param progress_every: через сколько текстов выводить прогресс
+    :param token_cache: кэш результатов предобработки на диске (тексты из кэша не обрабатываются повторно)
     :return: обработанные тексты
     """
-    return [" ".join(preprocess_text(text)) for text in raw_texts]
+    processed_texts = []
+    start = time.perf_counter()
+    for tokens in preprocess_texts_batch(raw_texts, batch_size=batch_size, n_process=n_process,
+                                         token_cache=token_cache):
+        processed_texts.append(" ".join(tokens))
+        if len(processed_texts) % progress_every == 0:
+            elapsed = time.perf_counter() - start
+            print(f"Обработано {len(processed_texts)}/{len(raw_texts)} текстов "
+                  f"({len(processed_texts) / elapsed:.0f} док/с)")
+
+    if processed_texts:
+        elapsed = time.perf_counter() - start
+        print(f"Обработано {len(processed_texts)} текстов за {elapsed:.1f} с "
+              f"({len(processed_texts) / elapsed:.0f} док/с, процессов: {n_process})")
+    if token_cache is not None:
+        print_token_cache_stats(token_cache)
+    return processed_texts
 
 
-def create_tfidf_model_and_index(processed_texts: List[str]) -> Tuple[TfidfVectorizer, List[str]]:
+def print_token_cache_stats(token_cache: TokenCache):
+    """Выводит долю текстов, результаты предобработки которых взяты из кэша"""
+    stats = token_cache.stats()
+    print(f"Кэш предобработки: {stats['hits']} из {stats['hits'] + stats['misses']} текстов "
+          f"({stats['hit_ratio']:.1%}), записей в кэше: {stats['size']}")
+
+
+def create_tfidf_model_and_index(processed_texts: List[str]) -> Tuple[TfidfVectorizer, csr_matrix]:
     """
     Создаёт TF-IDF индекс из обработанных текстов
     :param processed_texts: список обработанных текстов
-    :return: модель TF-IDF и матрица текста
+    :return: модель TF-IDF и разреженная матрица текста (строки нормированы по L2)
     """
     if not processed_texts:
         raise ValueError("Обработанные тексты пусты. Создание TF-IDF невозможно")
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix = vectorizer.fit_transform(processed_texts).toarray()
+    vectorizer = TfidfVectorizer(norm="l2")
+    tfidf_matrix = csr_matrix(vectorizer.fit_transform(processed_texts))
     return vectorizer, tfidf_matrix
 
 
-def save_tfidf_model_and_index(data_folder, tfidf_folder):
-    try:
-        # Загрузка текстов
-        print("Загрузка текстов...")
-        texts = load_texts_from_folder(data_folder, "text")
-        print(f"Загружено {len(texts)} текстов")
+class TermCounter:
+    """
+    Считает количества терминов в обработанных текстах с пополняемым словарём.
+    Тексты разбиваются на термины так же, как в TfidfVectorizer
+    """
+
+    def __init__(self, terms: Optional[List[str]] = None):
+        self.terms: List[str] = list(terms or [])
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+        self._analyzer = TfidfVectorizer().build_analyzer()
 
-        # Предобработка текстов
-        print("Предобработка текстов...")
-        processed_texts = preprocess_texts(texts)
+    def count(self, processed_texts: Iterable[str]) -> csr_matrix:
+        """
+        Считает количества терминов, добавляя в словарь новые термины
+        :param processed_texts: Обработанные тексты (леммы через пробел)
+        :return: Матрица количеств (тексты x термины словаря на момент подсчёта)
+        """
+        rows, cols = [], []
+        n_texts = 0
+        for row, text in enumerate(processed_texts):
+            n_texts += 1
+            for token in self._analyzer(text):
+                term_id = self.term_ids.get(token)
+                if term_id is None:
+                    term_id = self.term_ids[token] = len(self.terms)
+                    self.terms.append(token)
+                rows.append(row)
+                cols.append(term_id)
+        counts = csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(n_texts, len(self.terms)))
+        counts.sum_duplicates()
+        return counts
 
-        print("Создание TF-IDF индекса...")
-        vectorizer, tfidf_matrix = create_tfidf_model_and_index(processed_texts)
+    def widen(self, counts: csr_matrix) -> csr_matrix:
+        """
+        Расширяет матрицу количеств, посчитанную при меньшем словаре, до текущего словаря
+        :param counts: Матрица количеств
+        :return: Матрица количеств с числом столбцов, равным размеру словаря
+        """
+        return csr_matrix((counts.data, counts.indices, counts.indptr), shape=(counts.shape[0], len(self.terms)))
 
-        # Сохранение модели и индекса
-        print("Сохранение модели и матрицы...")
+
+def create_tfidf_from_counts(counts: csr_matrix, terms: List[str]) -> Tuple[TfidfVectorizer, csr_matrix]:
+    """
+    Создаёт TF-IDF индекс из количеств терминов так же, как TfidfVectorizer.fit_transform:
+    сглаженный IDF, нормировка строк по L2, словарь из встречающихся терминов по алфавиту
+    :param counts: Матрица количеств (документы x термины)
+    :param terms: Термины, соответствующие столбцам матрицы
+    :return: модель TF-IDF и разреженная матрица текста (строки нормированы по L2)
+    """
+    n_docs = counts.shape[0]
+    if n_docs == 0:
+        raise ValueError("Обработанные тексты пусты. Создание TF-IDF невозможно")
+    counts = csr_matrix(counts)
+    df = np.bincount(counts.indices, minlength=counts.shape[1])
+    used_terms = np.flatnonzero(df)
+    if len(used_terms) == 0:
+        raise ValueError("Словарь пуст: обработанные тексты не содержат слов")
+    used_terms = used_terms[np.argsort(np.asarray(terms, dtype=object)[used_terms])]
+
+    idf = np.log((n_docs + 1) / (df[used_terms] + 1)) + 1
+    tfidf_matrix = normalize(csr_matrix(counts[:, used_terms].multiply(idf), dtype=np.float64), norm="l2", copy=False)
+
+    vectorizer = TfidfVectorizer(norm="l2")
+    vectorizer.vocabulary_ = {terms[term]: i for i, term in enumerate(used_terms)}
+    vectorizer.idf_ = idf
+    return vectorizer, tfidf_matrix
+
+
+def stream_tfidf_index(documents: Iterable[Document], work_folder: Path, batch_size: int = DEFAULT_BATCH_SIZE,
+                       n_process: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE, progress_every: int = 10000,
+                       token_cache: Optional[TokenCache] = None, n_features: int = 0
+                       ) -> Tuple[Vectorizer, csr_matrix, TextStore, TextStore]:
+    """
+    Создаёт TF-IDF индекс из потока документов, не держа в памяти ни исходные, ни обработанные тексты:
+    исходные тексты и идентификаторы сразу пишутся в файлы, документы предобрабатываются через nlp.pipe,
+    а в памяти накапливаются только разреженные количества терминов, собираемые порциями по chunk_size
+    :param documents: Поток документов
+    :param work_folder: Папка для файлов с текстами и идентификаторами
+    :param batch_size: количество текстов в одном пакете spaCy
+    :param n_process: количество процессов для обработки
+    :param chunk_size: количество документов в одной порции подсчёта терминов
+    :param progress_every: через сколько текстов выводить прогресс
+    :param token_cache: кэш результатов предобработки на диске
+    :param n_features: количество хэшированных признаков (0 — модель со словарём)
+    :return: модель TF-IDF, матрица TF-IDF, исходные тексты и идентификаторы документов
+    """
+    texts_paths = (work_folder / "texts.bin", work_folder / "texts_offsets.npy")
+    ids_paths = (work_folder / "doc_ids.bin", work_folder / "doc_ids_offsets.npy")
+    # В режиме хэширования словарь не накапливается и при сборке
+    hashing = HashingTfidfVectorizer(n_features) if n_features else None
+    counter = TermCounter()
+    counts = []
+    start = time.perf_counter()
+    with TextStoreWriter(*texts_paths) as text_writer, TextStoreWriter(*ids_paths) as id_writer:
+        def feed() -> Iterator[str]:
+            for document in documents:
+                if not isinstance(document.text, str):
+                    raise ValueError("Входной текст должен быть строкой")
+                text_writer.append(document.text)
+                id_writer.append(document.doc_id)
+                yield document.text
+
+        n_done = 0
+        tokens_stream = preprocess_texts_batch(feed(), batch_size=batch_size, n_process=n_process,
+                                               token_cache=token_cache)
+        for chunk in chunked((" ".join(tokens) for tokens in tokens_stream), chunk_size):
+            counts.append(hashing.count(chunk) if hashing else counter.count(chunk))
+            previous, n_done = n_done, n_done + len(chunk)
+            if n_done // progress_every > previous // progress_every:
+                print(f"Обработано {n_done} текстов ({n_done / (time.perf_counter() - start):.0f} док/с)")
+
+    if n_done:
+        elapsed = time.perf_counter() - start
+        print(f"Обработано {n_done} текстов за {elapsed:.1f} с ({n_done / elapsed:.0f} док/с, процессов: {n_process})")
+    if token_cache is not None:
+        print_token_cache_stats(token_cache)
+    if hashing is not None:
+        counts = vstack(counts, format="csr") if counts else csr_matrix((0, n_features))
+        vectorizer, tfidf_matrix = hashing, hashing.fit_counts(counts)
+    else:
+        counts = vstack([counter.widen(chunk) for chunk in counts], format="csr") if counts \
+            else csr_matrix((0, 0), dtype=np.int32)
+        vectorizer, tfidf_matrix = create_tfidf_from_counts(counts, counter.terms)
+    return vectorizer, tfidf_matrix, TextStore(*texts_paths), TextStore(*ids_paths)
+
+
+def save_tfidf_model_and_index(data_folder, tfidf_folder, n_process: int = 1, batch_size: int = DEFAULT_BATCH_SIZE,
+                               chunk_size: int = DEFAULT_CHUNK_SIZE, use_token_cache: bool = True, n_shards: int = 1,
+                               n_features: int = 0, lsa_components: int = 0, ivf_lists: int = 0,
+                               impact_bits: int = 0, text_block_size: int = DEFAULT_BLOCK_SIZE):
+    try:
+        data_folder, tfidf_folder = Path(data_folder), Path(tfidf_folder)
         tfidf_folder.mkdir(parents=True, exist_ok=True)
 
-        with open(tfidf_folder / "texts.pkl", "wb") as texts_file:
-            pickle.dump(texts, texts_file)
-        with open(tfidf_folder / "tfidf_model.pkl", "wb") as model_file:
-            pickle.dump(vectorizer, model_file)
-        with open(tfidf_folder / "tfidf_matrix.pkl", "wb") as matrix_file:
-            pickle.dump(tfidf_matrix, matrix_file)
+        # Тексты читаются потоково и сразу предобрабатываются, без загрузки всего корпуса в память.
+        # Результаты предобработки сохраняются в кэш, и неизменённые тексты при следующей сборке не обрабатываются
+        print("Загрузка и предобработка текстов...")
+        documents = iter_folder_documents(data_folder, "text")
+        with ExitStack() as stack:
+            token_cache = stack.enter_context(open_token_cache(tfidf_folder / TOKEN_CACHE_FILE)) \
+                if use_token_cache else None
+            work_folder = stack.enter_context(
+                tempfile.TemporaryDirectory(dir=tfidf_folder, prefix=".build-", ignore_cleanup_errors=True))
+            vectorizer, tfidf_matrix, texts, doc_ids = stream_tfidf_index(
+                documents, Path(work_folder), batch_size=batch_size, n_process=n_process, chunk_size=chunk_size,
+                token_cache=token_cache, n_features=n_features)
 
-        print("TF-IDF индекс успешно создан и сохранён")
+            # Сохранение модели и индекса
+            print("Сохранение модели и матрицы...")
+            # Части индекса делят общий словарь и IDF и при поиске оцениваются параллельно
+            shard_bounds = get_shard_bounds(tfidf_matrix, n_shards) if n_shards > 1 else None
+            semantic_index = None
+            if lsa_components:
+                print("Построение семантического индекса (LSA + IVF)...")
+                start = time.perf_counter()
+                semantic_index = build_semantic_index(tfidf_matrix, lsa_components, ivf_lists)
+                print(f"Семантический индекс построен за {time.perf_counter() - start:.1f} с "
+                      f"(размерность {semantic_index.n_components}, списков IVF: {semantic_index.n_lists})")
+            impact_index = build_impact_index(tfidf_matrix, impact_bits) if impact_bits else None
+            if impact_index is not None:
+                print(f"Индекс квантованных оценок ({impact_bits} бит): {impact_index.nbytes / 2 ** 20:.1f} МБ "
+                      f"против {get_matrix_nbytes(tfidf_matrix) / 2 ** 20:.1f} МБ у матрицы TF-IDF")
+            # Тексты сжимаются блоками: при поиске распаковываются только блоки документов выдачи
+            snapshot = save_index(tfidf_folder, vectorizer, tfidf_matrix, texts, doc_ids, shard_bounds,
+                                  semantic_index, impact_index, text_block_size)
+
+        print(f"TF-IDF индекс успешно создан и сохранён ({snapshot})")
     except Exception as e:
         print(f"Ошибка: {e}")
 
 
 if __name__ == "__main__":
-    save_tfidf_model_and_index(DATA_FOLDER, TFIDF_FOLDER)
+    parser = argparse.ArgumentParser(description="Создание и сохранение TF-IDF модели и индекса")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Количество процессов для предобработки текстов")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Количество текстов в одном пакете spaCy")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Количество документов в одной порции подсчёта терминов")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Количество частей индекса, оцениваемых при поиске параллельно")
+    parser.add_argument("--hashing", nargs="?", type=int, const=DEFAULT_N_FEATURES, default=0, metavar="N_FEATURES",
+                        help="Модель на хэшированных признаках без словаря "
+                             f"(по умолчанию {DEFAULT_N_FEATURES} признаков)")
+    parser.add_argument("--lsa-components", nargs="?", type=int, const=DEFAULT_N_COMPONENTS, default=0,
+                        metavar="N_COMPONENTS",
+                        help="Собрать семантический индекс для движка поиска semantic: проекция LSA "
+                             f"(по умолчанию размерность {DEFAULT_N_COMPONENTS}) и индекс IVF")
+    parser.add_argument("--ivf-lists", type=int, default=0,
+                        help="Количество списков IVF семантического индекса (0 — около 4·√n документов)")
+    parser.add_argument("--impact-bits", type=int, choices=sorted(IMPACT_DTYPES), default=0,
+                        help="Собрать индекс квантованных оценок заданной разрядности для движка поиска impact")
+    parser.add_argument("--text-block-size", type=int, default=DEFAULT_BLOCK_SIZE,
+                        help="Размер блока сжатия текстов в байтах (0 — хранить тексты без сжатия)")
+    parser.add_argument("--no-token-cache", action="store_true",
+                        help="Не использовать кэш результатов предобработки с прошлых сборок")
+    args = parser.parse_args()
+
+    save_tfidf_model_and_index(DATA_FOLDER, TFIDF_FOLDER, n_process=args.workers, batch_size=args.batch_size,
+                               chunk_size=args.chunk_size, use_token_cache=not args.no_token_cache,
+                               n_shards=args.shards, n_features=args.hashing, lsa_components=args.lsa_components,
+                               ivf_lists=args.ivf_lists, impact_bits=args.impact_bits,
+                               text_block_size=args.text_block_size)
@@ -0,0 +1,180 @@
+import mmap
+import os
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+import numpy as np
+from app.cache import LRUCache
+
+# Размер блока текстов до сжатия: блок закрывается, как только тексты в нём занимают не меньше этого размера,
+# поэтому текст целиком находится в одном блоке. Блоки больше сжимаются лучше, но на каждый текст выдачи
+# распаковывается весь его блок (см. benchmarks/bench_doc_store.py)
+DEFAULT_BLOCK_SIZE = 16 * 1024
+
+# Уровень сжатия zlib: выше — меньше файл, но дольше сборка; скорость распаковки от уровня почти не зависит
+COMPRESSION_LEVEL = 6
+
+# Количество распакованных блоков в LRU-кэше хранилища по умолчанию
+DEFAULT_CACHE_BLOCKS = 1024
+
+
+class CompressedTextStore(Sequence):
+    """
+    Тексты документов в блоках, сжатых zlib, с массивами смещений: начала каждого текста в распакованном
+    потоке, начала каждого блока в файле и номера первого документа каждого блока. Файл открывается через mmap,
+    при обращении к тексту распаковывается только его блок; недавно распакованные блоки хранятся в LRU-кэше
+    """
+
+    def __init__(self, blob_path: Path, offsets_path: Path, block_offsets_path: Path, block_docs_path: Path,
+                 cache_blocks: int = DEFAULT_CACHE_BLOCKS):
+        self.offsets = np.load(offsets_path, mmap_mode="r")
+        self.block_offsets = np.load(block_offsets_path, mmap_mode="r")
+        self.block_docs = np.load(block_docs_path, mmap_mode="r")
+        with open(blob_path, "rb") as blob_file:
+            # mmap пустого файла невозможен
+            self._blob = mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ) \
+                if os.fstat(blob_file.fileno()).st_size else b""
+        if (len(self.offsets) == 0 or len(self.block_offsets) != len(self.block_docs)
+                or int(self.block_offsets[-1]) != len(self._blob) or int(self.block_docs[-1]) != len(self)):
+            raise ValueError(f"Файлы сжатых текстов '{blob_path}' и их смещений не согласованы между собой")
+        self.blocks = LRUCache(cache_blocks)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def n_blocks(self) -> int:
+        return len(self.block_offsets) - 1
+
+    def _block(self, block: int) -> bytes:
+        """Возвращает распакованный блок из кэша или распаковывает его"""
+        data = self.blocks.get(block, None)
+        if data is None:
+            start, end = int(self.block_offsets[block]), int(self.block_offsets[block + 1])
+            data = zlib.decompress(self._blob[start:end])
+            self.blocks.put(block, data)
+        return data
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Номер документа вне диапазона")
+        block = int(np.searchsorted(self.block_docs, i, side="right")) - 1
+        base = int(self.offsets[self.block_docs[block]])
+        start, end = int(self.offsets[i]) - base, int(self.offsets[i + 1]) - base
+        return self._block(block)[start:end].decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+class CompressedTextStoreWriter:
+    """Последовательно записывает тексты в файлы CompressedTextStore, сжимая их блоками"""
+
+    def __init__(self, blob_path: Path, offsets_path: Path, block_offsets_path: Path, block_docs_path: Path,
+                 block_size: int = DEFAULT_BLOCK_SIZE):
+        if block_size < 1:
+            raise ValueError("Размер блока должен быть положительным")
+        self.paths = (offsets_path, block_offsets_path, block_docs_path)
+        self.block_size = block_size
+        self.offsets = [0]
+        self.block_offsets = [0]
+        self.block_docs = [0]
+        self._block: List[bytes] = []
+        self._block_bytes = 0
+        self._blob_file = open(blob_path, "wb")
+
+    def append(self, text: str):
+        """Дописывает текст"""
+        data = text.encode("utf-8")
+        self._block.append(data)
+        self._block_bytes += len(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+        if self._block_bytes >= self.block_size:
+            self._flush()
+
+    def _flush(self):
+        """Сжимает и записывает накопленный блок"""
+        if not self._block:
+            return
+        written = self._blob_file.write(zlib.compress(b"".join(self._block), COMPRESSION_LEVEL))
+        self.block_offsets.append(self.block_offsets[-1] + written)
+        self.block_docs.append(len(self.offsets) - 1)
+        self._block, self._block_bytes = [], 0
+
+    def close(self):
+        """Завершает запись и сохраняет смещения"""
+        if not self._blob_file.closed:
+            self._flush()
+            self._blob_file.close()
+            for path, values in zip(self.paths, (self.offsets, self.block_offsets, self.block_docs)):
+                np.save(path, np.array(values, dtype=np.int64))
+
+    def __enter__(self) -> "CompressedTextStoreWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def make_snippet(text: str, length: int) -> str:
+    """
+    Сокращает текст до фрагмента не длиннее length символов по границе слова
+    :param text: Текст
+    :param length: Максимальная длина фрагмента без многоточия
+    :return: Текст целиком, если он не длиннее length, иначе начало текста с многоточием
+    """
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    # Слово, разрезанное границей фрагмента, отбрасывается, если до него есть пробел
+    space = cut.rfind(" ")
+    if space > 0 and not text[length].isspace():
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+class DocumentSnippets(Sequence):
+    """
+    Представление документов индекса для выдачи без полных текстов: по номеру документа возвращает
+    его идентификатор и начало текста. Передаётся в функции поиска вместо списка текстов
+    """
+
+    def __init__(self, texts: Sequence[str], doc_ids: Optional[Sequence[str]], length: int):
+        if length < 1:
+            raise ValueError("Длина фрагмента должна быть положительной")
+        self.texts = texts
+        self.doc_ids = doc_ids
+        self.length = length
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, i: int) -> Dict[str, str]:
+        # В индексах без идентификаторов документ обозначается номером
+        doc_id = self.doc_ids[i] if self.doc_ids is not None else str(i)
+        return {"id": doc_id, "snippet": make_snippet(self.texts[i], self.length)}
+
+
+def find_document(doc_ids: Sequence[str], order: Sequence[int], doc_id: str) -> Optional[int]:
+    """
+    Находит номер документа по идентификатору двоичным поиском по идентификаторам в порядке сортировки
+    :param doc_ids: Идентификаторы документов
+    :param order: Номера документов в порядке возрастания идентификаторов
+    :param doc_id: Искомый идентификатор
+    :return: Номер документа или None, если документа нет
+    """
+    low, high = 0, len(order)
+    while low < high:
+        middle = (low + high) // 2
+        if doc_ids[int(order[middle])] < doc_id:
+            low = middle + 1
+        else:
+            high = middle
+    if low < len(order) and doc_ids[int(order[low])] == doc_id:
+        return int(order[low])
+    return None
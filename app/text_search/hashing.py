@@ -0,0 +1,81 @@
+from typing import Iterable, Optional
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Количество признаков по умолчанию: при словаре в сотни тысяч слов коллизии редки, а IDF занимает 8 МБ
+DEFAULT_N_FEATURES = 2 ** 20
+
+
+class HashingTfidfVectorizer:
+    """
+    TF-IDF на хэшированных признаках: номер столбца слова вычисляется хэш-функцией, поэтому словарь
+    не хранится, а размер модели — плотный массив IDF из n_features чисел — не зависит от количества слов.
+    Текст разбивается на слова так же, как в TfidfVectorizer, IDF сглаженный, строки нормируются по L2.
+    У признаков, не встречавшихся в документах индекса, IDF равен нулю: такие слова запроса отбрасываются,
+    как неизвестные слова в TfidfVectorizer, и без коллизий оценки совпадают с режимом со словарём
+    """
+
+    def __init__(self, n_features: int = DEFAULT_N_FEATURES, idf: Optional[np.ndarray] = None):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        if n_features < 1:
+            raise ValueError("Количество признаков должно быть положительным")
+        if idf is not None and len(idf) != n_features:
+            raise ValueError("Размер массива IDF не соответствует количеству признаков")
+        self.n_features = n_features
+        self.idf_ = idf
+        self._hasher = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None, dtype=np.float64)
+
+    def get_params(self) -> dict:
+        """Параметры модели для сохранения"""
+        return {"n_features": self.n_features}
+
+    def count(self, texts: Iterable[str]) -> csr_matrix:
+        """
+        Считает количества слов по хэшированным признакам
+        :param texts: Обработанные тексты (леммы через пробел)
+        :return: Матрица количеств (тексты x признаки)
+        """
+        return csr_matrix(self._hasher.transform(texts))
+
+    def fit_counts(self, counts: csr_matrix) -> csr_matrix:
+        """
+        Вычисляет IDF по количествам слов в документах индекса и возвращает матрицу TF-IDF
+        :param counts: Матрица количеств (документы x признаки)
+        :return: Разреженная матрица TF-IDF (строки нормированы по L2)
+        """
+        n_docs = counts.shape[0]
+        if n_docs == 0:
+            raise ValueError("Обработанные тексты пусты. Создание TF-IDF невозможно")
+        counts = csr_matrix(counts)
+        if counts.nnz == 0:
+            raise ValueError("Словарь пуст: обработанные тексты не содержат слов")
+        df = np.bincount(counts.indices, minlength=self.n_features)
+        self.idf_ = np.where(df > 0, np.log((n_docs + 1) / (df + 1)) + 1, 0.0)
+        return self.transform_counts(counts)
+
+    def transform_counts(self, counts: csr_matrix) -> csr_matrix:
+        """Умножает количества слов на IDF и нормирует строки по L2"""
+        from sklearn.preprocessing import normalize
+
+        if self.idf_ is None:
+            raise ValueError("Модель TF-IDF не обучена")
+        tfidf = csr_matrix(counts.multiply(self.idf_), dtype=np.float64)
+        tfidf.eliminate_zeros()
+        return normalize(tfidf, norm="l2", copy=False)
+
+    def fit_transform(self, texts: Iterable[str]) -> csr_matrix:
+        """
+        Обучает модель на обработанных текстах
+        :param texts: Обработанные тексты (леммы через пробел)
+        :return: Разреженная матрица TF-IDF
+        """
+        return self.fit_counts(self.count(texts))
+
+    def transform(self, texts: Iterable[str]) -> csr_matrix:
+        """
+        Преобразует обработанные тексты в векторы TF-IDF
+        :param texts: Обработанные тексты (леммы через пробел)
+        :return: Разреженная матрица TF-IDF
+        """
+        return self.transform_counts(self.count(texts))
@@ -0,0 +1,145 @@
+from typing import Tuple
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix, spmatrix
+from app.text_search.ranking import select_top_k, top_k_by_score
+
+# Допустимые разрядности квантованных оценок и их типы
+IMPACT_DTYPES = {8: np.uint8, 16: np.uint16}
+
+# Разрядность квантования весов запроса
+QUERY_BITS = 8
+
+# Количество кандидатов по целочисленной оценке, которые переоцениваются точно, на один требуемый результат
+DEFAULT_RESCORE_FACTOR = 4
+
+
+def quantize(weights: np.ndarray, scale: float, bits: int) -> np.ndarray:
+    """
+    Квантует неотрицательные веса линейно в целые от 1 до 2^bits - 1: ненулевой вес не становится нулевым,
+    поэтому документы с ненулевой точной оценкой не теряются
+    :param weights: Веса
+    :param scale: Вес, соответствующий максимальному значению
+    :param bits: Разрядность
+    :return: Квантованные веса
+    """
+    max_value = (1 << bits) - 1
+    return np.clip(np.rint(weights * (max_value / scale)), 1, max_value).astype(IMPACT_DTYPES[bits])
+
+
+class ImpactIndex:
+    """
+    Инвертированный индекс с квантованными оценками вклада (impact): для каждого термина хранятся номера
+    документов (int32) и вес TF-IDF термина в документе, квантованный в uint8 или uint16 по общей шкале.
+    Список занимает 5 или 6 байт на ненулевой элемент вместо 12 у float64 и int32, а запрос оценивается
+    целочисленным накоплением вкладов своих терминов
+    """
+
+    def __init__(self, n_docs: int, indptr: np.ndarray, doc_ids: np.ndarray, impacts: np.ndarray, scale: float):
+        if impacts.dtype not in (np.uint8, np.uint16) or len(doc_ids) != len(impacts) or indptr[-1] != len(impacts):
+            raise ValueError("Массивы индекса квантованных оценок не согласованы между собой")
+        self.n_docs = n_docs
+        self.n_terms = len(indptr) - 1
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.scale = scale
+
+    @property
+    def bits(self) -> int:
+        return self.impacts.dtype.itemsize * 8
+
+    @property
+    def nbytes(self) -> int:
+        """Размер массивов индекса в байтах"""
+        return self.indptr.nbytes + self.doc_ids.nbytes + self.impacts.nbytes
+
+    def score(self, query_vector: spmatrix) -> np.ndarray:
+        """
+        Оценивает документы целочисленно: веса запроса квантуются в 8 бит относительно максимального веса,
+        вклады терминов запроса накапливаются в целочисленном массиве по документам
+        :param query_vector: Разреженный вектор запроса (1 x термины)
+        :return: Целочисленные оценки всех документов
+        """
+        query_vector = csr_matrix(query_vector)
+        terms, weights = query_vector.indices, query_vector.data
+        keep = weights > 0
+        terms, weights = terms[keep], weights[keep]
+        # Сумма вкладов накапливается в int32, если она заведомо не переполняется
+        max_score = len(terms) * ((1 << self.bits) - 1) * ((1 << QUERY_BITS) - 1)
+        accumulator = np.zeros(self.n_docs, dtype=np.int32 if max_score <= np.iinfo(np.int32).max else np.int64)
+        if len(terms) == 0:
+            return accumulator
+
+        query_impacts = quantize(weights, weights.max(), QUERY_BITS).astype(accumulator.dtype)
+        for term, query_impact in zip(terms, query_impacts):
+            start, end = self.indptr[term], self.indptr[term + 1]
+            # Номера документов в списке термина не повторяются, поэтому сложение по индексам корректно
+            accumulator[self.doc_ids[start:end]] += self.impacts[start:end] * query_impact
+        return accumulator
+
+    def search(self, query_vector: spmatrix, tfidf_matrix: csr_matrix, top_k: int,
+               rescore_factor: int = DEFAULT_RESCORE_FACTOR) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Находит top_k документов: отбирает top_k * rescore_factor кандидатов по целочисленной оценке
+        и переоценивает только их точно по весам float матрицы TF-IDF. Оценки результатов точные,
+        а состав может отличаться от полного перебора, если документ из точного top_k не попал в кандидаты
+        :param query_vector: Разреженный вектор запроса (1 x термины)
+        :param tfidf_matrix: Матрица TF-IDF (документы x термины)
+        :param top_k: Количество возвращаемых документов
+        :param rescore_factor: Количество кандидатов на один результат
+        :return: Номера документов и их оценки по убыванию оценки
+        """
+        if rescore_factor < 1:
+            raise ValueError("Количество кандидатов на один результат должно быть положительным")
+        scores = self.score(query_vector)
+        candidates = select_top_k(scores, top_k * rescore_factor)
+        # Документы без общих с запросом терминов не возвращаются, как и в движке "inverted"
+        candidates = candidates[scores[candidates] > 0]
+        return top_k_by_score(candidates, rescore(tfidf_matrix, candidates, query_vector), top_k)
+
+
+def rescore(tfidf_matrix: csr_matrix, doc_ids: np.ndarray, query_vector: spmatrix) -> np.ndarray:
+    """
+    Вычисляет точные оценки нескольких документов по строкам матрицы TF-IDF. Строки читаются напрямую
+    из массивов матрицы, без построения подматрицы
+    :param tfidf_matrix: Матрица TF-IDF (документы x термины)
+    :param doc_ids: Номера документов
+    :param query_vector: Разреженный вектор запроса (1 x термины)
+    :return: Скалярные произведения строк документов с вектором запроса
+    """
+    query_vector = csr_matrix(query_vector).sorted_indices()
+    terms, weights = query_vector.indices, query_vector.data
+    starts, ends = tfidf_matrix.indptr[doc_ids], tfidf_matrix.indptr[np.asarray(doc_ids) + 1]
+    lengths = ends - starts
+    if len(terms) == 0 or lengths.sum() == 0:
+        return np.zeros(len(doc_ids))
+    # Позиции элементов всех строк подряд: начало строки плюс номер элемента внутри неё
+    rows = np.repeat(np.arange(len(doc_ids)), lengths)
+    positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    columns = tfidf_matrix.indices[positions]
+    found = np.minimum(np.searchsorted(terms, columns), len(terms) - 1)
+    contributions = np.where(terms[found] == columns, tfidf_matrix.data[positions] * weights[found], 0.0)
+    return np.bincount(rows, weights=contributions, minlength=len(doc_ids))
+
+
+def get_matrix_nbytes(tfidf_matrix: csr_matrix) -> int:
+    """Размер массивов разреженной матрицы в байтах (для сравнения с индексом квантованных оценок)"""
+    return tfidf_matrix.data.nbytes + tfidf_matrix.indices.nbytes + tfidf_matrix.indptr.nbytes
+
+
+def build_impact_index(tfidf_matrix: csr_matrix, bits: int = 8) -> ImpactIndex:
+    """
+    Строит индекс квантованных оценок из матрицы TF-IDF
+    :param tfidf_matrix: Матрица TF-IDF (документы x термины)
+    :param bits: Разрядность оценок: 8 или 16
+    :return: Индекс квантованных оценок
+    """
+    if bits not in IMPACT_DTYPES:
+        raise ValueError(f"Разрядность оценок должна быть одной из: {', '.join(map(str, IMPACT_DTYPES))}")
+    postings = csc_matrix(tfidf_matrix)
+    postings.sort_indices()
+    if postings.nnz and postings.data.min() < 0:
+        raise ValueError("Квантуются только неотрицательные веса TF-IDF")
+    scale = float(postings.data.max()) if postings.nnz else 1.0
+    return ImpactIndex(postings.shape[0], postings.indptr.astype(np.int64), postings.indices.astype(np.int32),
+                       quantize(postings.data, scale, bits), scale)
@@ -0,0 +1,419 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.text_search.corpus import iter_documents, list_data_files
+from app.text_search.create_tfidf import (DATA_FOLDER, TFIDF_FOLDER, TOKEN_CACHE_FILE, TermCounter,
+                                          create_tfidf_from_counts, preprocess_texts)
+from app.text_processing.service import DEFAULT_BATCH_SIZE, open_token_cache
+from app.text_processing.token_cache import TokenCache
+from app.text_search.doc_store import DEFAULT_BLOCK_SIZE
+from app.text_search.storage import TextStore, save_index, write_texts
+
+# Состояние инкрементального индексатора хранится рядом со снимками индекса
+STATE_FOLDER = "incremental"
+STATE_FILE = "state.json"
+STATE_VERSION = 2
+SEGMENT_PREFIX = "segment-"
+
+COUNTS_DATA_FILE = "counts_data.npy"
+COUNTS_INDICES_FILE = "counts_indices.npy"
+COUNTS_INDPTR_FILE = "counts_indptr.npy"
+DOC_IDS_FILE = "doc_ids.npy"
+TEXTS_BLOB_FILE = "texts.bin"
+TEXTS_OFFSETS_FILE = "texts_offsets.npy"
+NAMES_BLOB_FILE = "names.bin"
+NAMES_OFFSETS_FILE = "names_offsets.npy"
+
+
+def file_hash(file_path: Path) -> str:
+    """
+    Вычисляет хэш содержимого файла
+    :param file_path: Путь к файлу
+    :return: SHA-256 в шестнадцатеричном виде
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class Segment:
+    """Сегмент индекса: количества терминов в документах, их номера, исходные тексты и идентификаторы"""
+    name: str
+    doc_ids: np.ndarray
+    counts: csr_matrix
+    texts: TextStore
+    names: TextStore
+
+
+@dataclass
+class UpdateStats:
+    """Результат обновления индекса"""
+    added_files: int = 0
+    changed_files: int = 0
+    deleted_files: int = 0
+    added_docs: int = 0
+    deleted_docs: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added_files or self.changed_files or self.deleted_files)
+
+
+class IncrementalIndexer:
+    """
+    Инкрементальный индексатор: сегменты с количествами терминов, пометки удалённых документов
+    и частоты документов по терминам. Папку состояния в каждый момент изменяет только один индексатор
+    """
+
+    def __init__(self, state_folder: Path):
+        self.state_folder = Path(state_folder)
+        self.counter = TermCounter()
+        self.df = np.zeros(0, dtype=np.int64)
+        self.segments: List[Segment] = []
+        self.deleted = set()
+        self.files: Dict[str, dict] = {}
+        self.next_doc_id = 0
+        if (self.state_folder / STATE_FILE).exists():
+            self._load()
+
+    @property
+    def terms(self) -> List[str]:
+        """Словарь: термин по номеру столбца в сегментах"""
+        return self.counter.terms
+
+    @property
+    def n_docs(self) -> int:
+        """Количество неудалённых документов"""
+        return sum(len(segment.doc_ids) for segment in self.segments) - len(self.deleted)
+
+    def _load(self):
+        """Загружает состояние с диска и пересчитывает частоты документов"""
+        state = json.loads((self.state_folder / STATE_FILE).read_text(encoding="utf-8"))
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"Неподдерживаемая версия состояния индексатора: {state.get('version')}")
+        self.counter = TermCounter(state["terms"])
+        self.deleted = set(state["deleted"])
+        self.files = state["files"]
+        self.next_doc_id = state["next_doc_id"]
+        self.segments = [self._load_segment(name) for name in state["segments"]]
+
+        self.df = np.zeros(len(self.terms), dtype=np.int64)
+        for segment in self.segments:
+            self.df += self._document_frequencies(segment, self._live_mask(segment))
+
+    def _load_segment(self, name: str) -> Segment:
+        """Загружает сегмент с диска"""
+        folder = self.state_folder / name
+        doc_ids = np.load(folder / DOC_IDS_FILE)
+        data, indices, indptr = (np.load(folder / file_name, mmap_mode="r")
+                                 for file_name in (COUNTS_DATA_FILE, COUNTS_INDICES_FILE, COUNTS_INDPTR_FILE))
+        counts = csr_matrix((data, indices, indptr), shape=(len(doc_ids), len(self.terms)), copy=False)
+        return Segment(name, doc_ids, counts, TextStore(folder / TEXTS_BLOB_FILE, folder / TEXTS_OFFSETS_FILE),
+                       TextStore(folder / NAMES_BLOB_FILE, folder / NAMES_OFFSETS_FILE))
+
+    def _save_state(self):
+        """Атомарно записывает состояние и удаляет папки сегментов, на которые оно больше не ссылается"""
+        state = {
+            "version": STATE_VERSION,
+            "next_doc_id": self.next_doc_id,
+            "segments": [segment.name for segment in self.segments],
+            "deleted": sorted(self.deleted),
+            "files": self.files,
+            "terms": self.terms,
+        }
+        tmp_path = self.state_folder / f"{STATE_FILE}.tmp"
+        tmp_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.state_folder / STATE_FILE)
+
+        names = {segment.name for segment in self.segments}
+        for path in self.state_folder.glob(f"{SEGMENT_PREFIX}*"):
+            if path.name not in names:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _live_mask(self, segment: Segment) -> np.ndarray:
+        """Возвращает маску неудалённых документов сегмента"""
+        if not self.deleted:
+            return np.ones(len(segment.doc_ids), dtype=bool)
+        return ~np.isin(segment.doc_ids, np.fromiter(self.deleted, dtype=np.int64))
+
+    def _segment_counts(self, segment: Segment, rows: np.ndarray) -> csr_matrix:
+        """
+        Возвращает количества терминов в выбранных документах сегмента. Сегмент хранит столбцы только
+        для терминов, известных на момент его записи, поэтому матрица расширяется до текущего словаря
+        """
+        return self.counter.widen(segment.counts)[rows]
+
+    def _document_frequencies(self, segment: Segment, mask: np.ndarray) -> np.ndarray:
+        """Считает, в скольких выбранных документах сегмента встречается каждый термин"""
+        counts = self._segment_counts(segment, np.flatnonzero(mask))
+        return np.bincount(counts.indices, minlength=len(self.terms)).astype(np.int64)
+
+    def _write_segment(self, doc_ids: np.ndarray, counts: csr_matrix, texts: List[str], names: List[str]) -> Segment:
+        """Записывает новый сегмент на диск"""
+        numbers = [int(path.name[len(SEGMENT_PREFIX):]) for path in self.state_folder.glob(f"{SEGMENT_PREFIX}*")
+                   if path.name[len(SEGMENT_PREFIX):].isdigit()]
+        name = f"{SEGMENT_PREFIX}{max(numbers, default=0) + 1:06d}"
+        folder = self.state_folder / name
+        folder.mkdir(parents=True)
+        np.save(folder / DOC_IDS_FILE, doc_ids)
+        np.save(folder / COUNTS_DATA_FILE, counts.data)
+        np.save(folder / COUNTS_INDICES_FILE, counts.indices)
+        np.save(folder / COUNTS_INDPTR_FILE, counts.indptr)
+        write_texts(folder / TEXTS_BLOB_FILE, folder / TEXTS_OFFSETS_FILE, texts)
+        write_texts(folder / NAMES_BLOB_FILE, folder / NAMES_OFFSETS_FILE, names)
+        return self._load_segment(name)
+
+    def add_documents(self, texts: List[str], processed_texts: List[str],
+                      names: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Добавляет документы новым сегментом
+        :param texts: Исходные тексты
+        :param processed_texts: Обработанные тексты (леммы через пробел)
+        :param names: Идентификаторы документов из исходных данных (по умолчанию — номера документов)
+        :return: Номера добавленных документов
+        """
+        if len(texts) != len(processed_texts) or (names is not None and len(names) != len(texts)):
+            raise ValueError("Количество исходных и обработанных текстов не совпадает")
+        doc_ids = np.arange(self.next_doc_id, self.next_doc_id + len(texts), dtype=np.int64)
+        if not texts:
+            return doc_ids
+
+        counts = self.counter.count(processed_texts)
+        names = names if names is not None else [str(doc_id) for doc_id in doc_ids]
+        self.segments.append(self._write_segment(doc_ids, counts, texts, names))
+        self.next_doc_id += len(texts)
+        self.df = np.concatenate([self.df, np.zeros(len(self.terms) - len(self.df), dtype=np.int64)])
+        self.df += np.bincount(counts.indices, minlength=len(self.terms))
+        return doc_ids
+
+    def delete_documents(self, doc_ids: np.ndarray):
+        """
+        Помечает документы удалёнными; они исключаются из поиска сразу, а с диска удаляются при слиянии
+        :param doc_ids: Номера документов
+        """
+        doc_ids = set(np.asarray(doc_ids).tolist()) - self.deleted
+        if not doc_ids:
+            return
+        removed = np.fromiter(doc_ids, dtype=np.int64)
+        for segment in self.segments:
+            self.df -= self._document_frequencies(segment, np.isin(segment.doc_ids, removed))
+        self.deleted |= doc_ids
+
+    def scan(self, data_folder: Path) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Сравнивает файлы папки с данными с проиндексированными
+        :param data_folder: Путь к папке с файлами данных
+        :return: Хэши новых и изменённых файлов и список удалённых файлов
+        """
+        if not data_folder.exists():
+            raise FileNotFoundError(f"Папка '{data_folder}' не найдена")
+        current = {path.name: file_hash(path) for path in list_data_files(data_folder)}
+        changed = {name: digest for name, digest in current.items()
+                   if self.files.get(name, {}).get("hash") != digest}
+        deleted = [name for name in self.files if name not in current]
+        return changed, deleted
+
+    def update(self, data_folder: Path, key: str = "text", batch_size: int = DEFAULT_BATCH_SIZE,
+               n_process: int = 1, token_cache: Optional[TokenCache] = None) -> UpdateStats:
+        """
+        Обновляет индекс по папке с данными: предобрабатываются только документы новых и изменённых файлов
+        :param data_folder: Путь к папке с файлами данных
+        :param key: Ключ для извлечения текстов из объектов JSON
+        :param batch_size: Количество текстов в одном пакете spaCy
+        :param n_process: Количество процессов для предобработки
+        :param token_cache: Кэш результатов предобработки на диске
+        :return: Статистика обновления
+        """
+        changed, deleted = self.scan(data_folder)
+        stats = UpdateStats(deleted_files=len(deleted))
+        if not changed and not deleted:
+            return stats
+
+        # Тексты всех изменённых файлов обрабатываются одним пакетом
+        file_documents = {name: list(iter_documents(data_folder / name, key)) for name in changed}
+        documents = [document for name in changed for document in file_documents[name]]
+        texts = [document.text for document in documents]
+        processed_texts = preprocess_texts(texts, batch_size=batch_size, n_process=n_process, token_cache=token_cache)
+
+        self.state_folder.mkdir(parents=True, exist_ok=True)
+        for name in list(changed) + deleted:
+            previous = self.files.pop(name, None)
+            if previous is not None:
+                if name in changed:
+                    stats.changed_files += 1
+                stats.deleted_docs += previous["n_docs"]
+                self.delete_documents(np.arange(previous["first_doc"], previous["first_doc"] + previous["n_docs"]))
+            elif name in changed:
+                stats.added_files += 1
+
+        doc_ids = self.add_documents(texts, processed_texts, [document.doc_id for document in documents])
+        start = 0
+        for name, digest in changed.items():
+            n_docs = len(file_documents[name])
+            first_doc = int(doc_ids[start]) if n_docs else self.next_doc_id
+            self.files[name] = {"hash": digest, "first_doc": first_doc, "n_docs": n_docs}
+            start += n_docs
+        stats.added_docs = len(texts)
+
+        self._save_state()
+        return stats
+
+    def build_index(self) -> Tuple[TfidfVectorizer, csr_matrix, List[str], List[str]]:
+        """
+        Собирает модель TF-IDF и матрицу по неудалённым документам. IDF считается по текущим частотам
+        документов так же, как в TfidfVectorizer, а неиспользуемые термины в словарь не попадают,
+        поэтому оценки совпадают с полной пересборкой индекса
+        :return: Модель TF-IDF, матрица TF-IDF, исходные тексты и идентификаторы документов
+        """
+        if self.n_docs == 0:
+            raise ValueError("В индексе нет документов. Создание TF-IDF невозможно")
+
+        counts, texts, names = self._collect_live()
+        vectorizer, tfidf_matrix = create_tfidf_from_counts(counts, self.terms)
+        return vectorizer, tfidf_matrix, texts, names
+
+    def _collect_live(self) -> Tuple[csr_matrix, List[str], List[str]]:
+        """Собирает количества терминов, тексты и идентификаторы неудалённых документов всех сегментов"""
+        counts, texts, names = [], [], []
+        for segment in self.segments:
+            rows = np.flatnonzero(self._live_mask(segment))
+            counts.append(self._segment_counts(segment, rows))
+            texts.extend(segment.texts[int(i)] for i in rows)
+            names.extend(segment.names[int(i)] for i in rows)
+        return vstack(counts, format="csr"), texts, names
+
+    def publish(self, tfidf_folder: Path, text_block_size: int = DEFAULT_BLOCK_SIZE) -> Path:
+        """
+        Сохраняет собранный индекс новым снимком для поиска
+        :param tfidf_folder: Путь к папке индекса
+        :param text_block_size: Размер блока для сжатия текстов снимка (0 — без сжатия)
+        :return: Путь к папке снимка
+        """
+        vectorizer, tfidf_matrix, texts, names = self.build_index()
+        return save_index(Path(tfidf_folder), vectorizer, tfidf_matrix, texts, names, text_block_size=text_block_size)
+
+    def needs_compaction(self, max_segments: int = 8, max_deleted_ratio: float = 0.2) -> bool:
+        """
+        Проверяет, пора ли сливать сегменты
+        :param max_segments: Максимальное количество сегментов
+        :param max_deleted_ratio: Максимальная доля удалённых документов
+        :return: True, если сегментов или удалённых документов слишком много
+        """
+        total = sum(len(segment.doc_ids) for segment in self.segments)
+        return len(self.segments) > max_segments or (total > 0 and len(self.deleted) / total > max_deleted_ratio)
+
+    def compact(self):
+        """
+        Сливает все сегменты в один: физически удаляет помеченные документы и неиспользуемые термины,
+        а частоты документов пересчитывает заново
+        """
+        if not self.segments:
+            return
+        doc_ids = np.concatenate([segment.doc_ids[self._live_mask(segment)] for segment in self.segments])
+        counts, texts, names = self._collect_live()
+
+        used_terms = np.flatnonzero(np.bincount(counts.indices, minlength=len(self.terms)))
+        counts = csr_matrix(counts[:, used_terms])
+        counts.sort_indices()
+        self.counter = TermCounter([self.terms[term] for term in used_terms])
+        self.df = np.bincount(counts.indices, minlength=len(self.terms)).astype(np.int64)
+        self.deleted = set()
+        self.segments = [self._write_segment(doc_ids, counts, texts, names)] if len(doc_ids) else []
+        self._save_state()
+
+
+def run(data_folder: Path, tfidf_folder: Path, max_segments: int = 8, max_deleted_ratio: float = 0.2,
+        batch_size: int = DEFAULT_BATCH_SIZE, n_process: int = 1, force_compact: bool = False,
+        indexer: Optional[IncrementalIndexer] = None) -> IncrementalIndexer:
+    """
+    Выполняет один проход обновления: изменения данных, при необходимости слияние сегментов и публикация снимка
+    :param data_folder: Путь к папке с файлами данных
+    :param tfidf_folder: Путь к папке индекса
+    :param max_segments: Максимальное количество сегментов до слияния
+    :param max_deleted_ratio: Максимальная доля удалённых документов до слияния
+    :param batch_size: Количество текстов в одном пакете spaCy
+    :param n_process: Количество процессов для предобработки
+    :param force_compact: Слить сегменты независимо от их количества
+    :param indexer: Индексатор, сохранённый с прошлого прохода
+    :return: Индексатор
+    """
+    indexer = indexer or IncrementalIndexer(Path(tfidf_folder) / STATE_FOLDER)
+    with open_token_cache(Path(tfidf_folder) / TOKEN_CACHE_FILE) as token_cache:
+        stats = indexer.update(data_folder, batch_size=batch_size, n_process=n_process, token_cache=token_cache)
+    if stats.changed:
+        print(f"Файлов: новых {stats.added_files}, изменённых {stats.changed_files}, удалённых {stats.deleted_files}; "
+              f"документов: добавлено {stats.added_docs}, удалено {stats.deleted_docs}")
+    compacted = force_compact or indexer.needs_compaction(max_segments, max_deleted_ratio)
+    if compacted:
+        indexer.compact()
+        print(f"Сегменты слиты, документов в индексе: {indexer.n_docs}")
+    if stats.changed or compacted:
+        snapshot = indexer.publish(tfidf_folder)
+        print(f"TF-IDF индекс обновлён ({snapshot})")
+    return indexer
+
+
+def watch(data_folder: Path, tfidf_folder: Path, interval: float, max_segments: int = 8,
+          max_deleted_ratio: float = 0.2, batch_size: int = DEFAULT_BATCH_SIZE, n_process: int = 1,
+          force_compact: bool = False, max_passes: Optional[int] = None):
+    """
+    Выполняет проходы обновления каждые interval секунд. Ошибка прохода (недописанный файл данных, занятый
+    кэш предобработки, неудачная публикация снимка) не останавливает наблюдение: индексатор мог успеть
+    изменить состояние в памяти, поэтому следующий проход загружает его заново из сохранённого состояния
+    :param data_folder: Путь к папке с файлами данных
+    :param tfidf_folder: Путь к папке индекса
+    :param interval: Пауза между проходами в секундах
+    :param max_segments: Максимальное количество сегментов до слияния
+    :param max_deleted_ratio: Максимальная доля удалённых документов до слияния
+    :param batch_size: Количество текстов в одном пакете spaCy
+    :param n_process: Количество процессов для предобработки
+    :param force_compact: Слить сегменты при первом проходе независимо от их количества
+    :param max_passes: Количество проходов, по умолчанию без ограничения
+    """
+    indexer = None
+    n_passes = 0
+    while True:
+        try:
+            indexer = run(data_folder, tfidf_folder, max_segments, max_deleted_ratio, batch_size, n_process,
+                          force_compact and n_passes == 0, indexer)
+        except Exception as e:
+            print(f"Ошибка: {e}")
+            indexer = None
+        n_passes += 1
+        if max_passes is not None and n_passes >= max_passes:
+            return
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Инкрементальное обновление TF-IDF индекса")
+    parser.add_argument("--watch", type=float, default=0,
+                        help="Проверять папку с данными каждые N секунд (0 — один проход)")
+    parser.add_argument("--max-segments", type=int, default=8,
+                        help="Количество сегментов, после которого они сливаются")
+    parser.add_argument("--max-deleted-ratio", type=float, default=0.2,
+                        help="Доля удалённых документов, после которой сегменты сливаются")
+    parser.add_argument("--compact", action="store_true", help="Слить сегменты в один")
+    parser.add_argument("--workers", type=int, default=1, help="Количество процессов для предобработки текстов")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Количество текстов в одном пакете spaCy")
+    args = parser.parse_args()
+
+    if args.watch > 0:
+        watch(DATA_FOLDER, TFIDF_FOLDER, args.watch, args.max_segments, args.max_deleted_ratio, args.batch_size,
+              args.workers, args.compact)
+    else:
+        run(DATA_FOLDER, TFIDF_FOLDER, args.max_segments, args.max_deleted_ratio, args.batch_size, args.workers,
+            args.compact)
@@ -0,0 +1,262 @@
+import hashlib
+import pickle
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from app import config
+from app.metrics import stage_timer
+from app.text_search.doc_store import find_document
+from app.text_search.impact_index import ImpactIndex
+from app.text_search.inverted_index import InvertedIndex
+from app.text_search.semantic import SemanticIndex
+from app.text_search.shards import Shard, get_shard_bounds, split_shards
+from app.text_search.storage import (CURRENT_FILE, Vectorizer, get_doc_ids_order, get_n_features, get_snapshot_folder,
+                                     load_snapshot, load_snapshot_doc_ids, load_snapshot_doc_ids_order,
+                                     load_snapshot_impact_index, load_snapshot_semantic_index,
+                                     load_snapshot_shard_bounds)
+
+# Файлы индекса в прежнем формате (pickle); загружаются, если индекс в новом формате не сохранялся
+MODEL_FILE = "tfidf_model.pkl"
+MATRIX_FILE = "tfidf_matrix.pkl"
+TEXTS_FILE = "texts.pkl"
+
+
+@dataclass(frozen=True)
+class TfidfIndex:
+    """Загруженный в память TF-IDF индекс"""
+    vectorizer: Vectorizer
+    tfidf_matrix: csr_matrix
+    texts: Sequence[str]
+    generation: int
+    # Идентификаторы документов (поле name исходных данных); в индексах прежнего формата не хранятся
+    doc_ids: Optional[Sequence[str]] = None
+    # Границы частей, на которые индекс разбит при сохранении
+    shard_bounds: Optional[np.ndarray] = None
+    # Версия файлов индекса, одинаковая во всех процессах, которые загрузили эти файлы (см. get_index_version)
+    version: str = ""
+    # Семантический индекс LSA + IVF, если индекс собран с ним
+    semantic_index: Optional[SemanticIndex] = None
+    # Индекс квантованных оценок, если индекс собран с ним
+    impact_index: Optional[ImpactIndex] = None
+    # Номера документов в порядке возрастания идентификаторов; в снимках прежних версий не хранятся
+    doc_ids_order: Optional[np.ndarray] = None
+
+    @cached_property
+    def inverted_index(self) -> InvertedIndex:
+        """Инвертированный индекс, строится из матрицы при первом обращении"""
+        return InvertedIndex(self.tfidf_matrix)
+
+    @cached_property
+    def _sorted_doc_ids(self) -> np.ndarray:
+        """Порядок идентификаторов документов: сохранённый в снимке или вычисленный при первом обращении"""
+        if self.doc_ids_order is not None:
+            return self.doc_ids_order
+        return get_doc_ids_order(self.doc_ids)
+
+    def find_document(self, doc_id: str) -> Optional[int]:
+        """
+        Находит номер документа по идентификатору
+        :param doc_id: Идентификатор документа (поле name исходных данных)
+        :return: Номер документа или None, если документа нет
+        """
+        if self.doc_ids is None:
+            # В индексах без идентификаторов выдача обозначает документ его номером (см. DocumentSnippets)
+            if doc_id.isascii() and doc_id.isdigit() and str(int(doc_id)) == doc_id and int(doc_id) < len(self.texts):
+                return int(doc_id)
+            return None
+        return find_document(self.doc_ids, self._sorted_doc_ids, doc_id)
+
+    @cached_property
+    def shards(self) -> List[Shard]:
+        """
+        Части матрицы для параллельной оценки запроса: по настройке SEARCH_SHARDS,
+        а если она не задана — как при сохранении индекса
+        """
+        if config.SEARCH_SHARDS > 0:
+            bounds = get_shard_bounds(self.tfidf_matrix, config.SEARCH_SHARDS)
+        elif self.shard_bounds is not None:
+            bounds = self.shard_bounds
+        else:
+            bounds = [0, self.tfidf_matrix.shape[0]]
+        return split_shards(self.tfidf_matrix, bounds)
+
+
+def get_index_files(tfidf_folder: Path) -> List[Tuple[Path, str]]:
+    """
+    Возвращает пути к файлам индекса и их описания
+    :param tfidf_folder: Путь к папке с TF-IDF моделью и матрицей
+    :return: Список пар (путь к файлу, описание)
+    """
+    return [(tfidf_folder / MODEL_FILE, "модель TF-IDF"),
+            (tfidf_folder / MATRIX_FILE, "матрица TF-IDF"),
+            (tfidf_folder / TEXTS_FILE, "исходные тексты")]
+
+
+def get_index_signature(tfidf_folder: Path) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Возвращает сигнатуру файлов индекса (время изменения и размер каждого файла).
+    Для индекса из снимков достаточно файла CURRENT: он подменяется при каждом сохранении
+    :param tfidf_folder: Путь к папке с TF-IDF моделью и матрицей
+    :return: Кортеж характеристик файлов (для файлов прежнего формата — mtime в наносекундах и размер)
+    """
+    try:
+        stat = (tfidf_folder / CURRENT_FILE).stat()
+        return ((stat.st_ino, stat.st_mtime_ns, stat.st_size),)
+    except FileNotFoundError:
+        pass
+
+    signature = []
+    missing_files = []
+    for file_path, description in get_index_files(tfidf_folder):
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            missing_files.append(f"{description} ({file_path})")
+            continue
+        signature.append((stat.st_mtime_ns, stat.st_size))
+
+    if missing_files:
+        raise FileNotFoundError(f"Следующие файлы не найдены: {', '.join(missing_files)}")
+
+    return tuple(signature)
+
+
+def get_index_version(signature: Tuple[Tuple[int, ...], ...]) -> str:
+    """
+    Возвращает версию индекса по сигнатуре его файлов. В отличие от номера поколения, который ведётся
+    в каждом процессе отдельно, версия совпадает у всех процессов, загрузивших одни и те же файлы
+    :param signature: Сигнатура файлов индекса (см. get_index_signature)
+    :return: Шестнадцатеричная строка
+    """
+    return hashlib.blake2b(repr(signature).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def load_index(tfidf_folder: Path, generation: int = 0, version: str = "") -> TfidfIndex:
+    """
+    Загружает модель TF-IDF, матрицу и исходные тексты из папки: активный снимок индекса,
+    а если его нет — файлы прежнего формата
+    :param tfidf_folder: Путь к папке с TF-IDF моделью и матрицей
+    :param generation: Номер поколения загружаемого индекса
+    :param version: Версия файлов индекса
+    :return: Загруженный индекс
+    """
+    snapshot = get_snapshot_folder(tfidf_folder)
+    if snapshot is not None:
+        vectorizer, tfidf_matrix, texts = load_snapshot(snapshot, config.DOC_STORE_CACHE_BLOCKS)
+        doc_ids = load_snapshot_doc_ids(snapshot)
+        doc_ids_order = load_snapshot_doc_ids_order(snapshot)
+        semantic_index = load_snapshot_semantic_index(snapshot)
+        impact_index = load_snapshot_impact_index(snapshot)
+        # Размеры необязательных индексов сверяются с матрицей
+        shapes = [(semantic_index.n_docs, semantic_index.n_features)] if semantic_index is not None else []
+        shapes += [(impact_index.n_docs, impact_index.n_terms)] if impact_index is not None else []
+        if tfidf_matrix.shape != (len(texts), get_n_features(vectorizer)) or (
+                doc_ids is not None and len(doc_ids) != len(texts)) or (
+                doc_ids_order is not None and len(doc_ids_order) != len(texts)) or any(
+                shape != tfidf_matrix.shape for shape in shapes):
+            raise ValueError(f"Файлы индекса в папке '{snapshot}' не согласованы между собой")
+        return TfidfIndex(vectorizer, tfidf_matrix, texts, generation, doc_ids, load_snapshot_shard_bounds(snapshot),
+                          version, semantic_index, impact_index, doc_ids_order)
+
+    (model_path, _), (matrix_path, _), (texts_path, _) = get_index_files(tfidf_folder)
+    with open(model_path, "rb") as model_file:
+        vectorizer = pickle.load(model_file)
+    with open(matrix_path, "rb") as matrix_file:
+        tfidf_matrix = pickle.load(matrix_file)
+    with open(texts_path, "rb") as texts_file:
+        texts = pickle.load(texts_file)
+
+    # Индексы, сохранённые до перехода на разреженный формат, хранят плотную матрицу
+    tfidf_matrix = csr_matrix(tfidf_matrix)
+
+    # Файлы из разных версий индекса не согласуются по размерностям
+    if tfidf_matrix.shape != (len(texts), get_n_features(vectorizer)):
+        raise ValueError(f"Файлы индекса в папке '{tfidf_folder}' не согласованы между собой")
+
+    return TfidfIndex(vectorizer, tfidf_matrix, texts, generation, version=version)
+
+
+class IndexHolder:
+    """
+    Хранит загруженный индекс в памяти процесса и перезагружает его при изменении файлов на диске.
+    Пока новый индекс загружается, запросы обслуживаются старым
+    """
+
+    def __init__(self, tfidf_folder: Path):
+        self.tfidf_folder = tfidf_folder
+        self._index: Optional[TfidfIndex] = None
+        self._signature = None
+        # Версия файлов, которую не удалось загрузить: повторная попытка — только после их следующего изменения
+        self._failed_signature = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """Номер поколения текущего индекса (0 — индекс ещё не загружен)"""
+        return self._generation
+
+    def get(self) -> TfidfIndex:
+        """
+        Возвращает актуальный индекс, при необходимости загружая его с диска
+        :return: Загруженный индекс
+        """
+        signature = get_index_signature(self.tfidf_folder)
+        index = self._index
+        if index is not None and signature in (self._signature, self._failed_signature):
+            return index
+
+        # Если индекс уже перезагружается в другом потоке, отдаём старый
+        if not self._lock.acquire(blocking=index is None):
+            return index
+
+        try:
+            # Индекс мог быть загружен, пока поток ждал блокировку
+            if self._index is not None and signature in (self._signature, self._failed_signature):
+                return self._index
+            try:
+                with stage_timer("index_load"):
+                    new_index = load_index(self.tfidf_folder, self._generation + 1, get_index_version(signature))
+                    # Части матрицы готовятся до подмены, ошибка в их границах оставляет старый индекс
+                    new_index.shards
+            except Exception:
+                if self._index is None:
+                    raise
+                # Файлы могли быть записаны не полностью — продолжаем работать со старым индексом
+                # и не загружаем те же файлы на каждом запросе
+                self._failed_signature = signature
+                return self._index
+            # Файлы изменились во время загрузки — повторим перезагрузку при следующем запросе
+            if self._index is not None and get_index_signature(self.tfidf_folder) != signature:
+                return self._index
+            if config.SEARCH_ENGINE == "inverted":
+                # Инвертированный индекс строится до подмены, пока запросы обслуживает старый индекс
+                new_index.inverted_index
+            self._signature = signature
+            self._generation = new_index.generation
+            self._index = new_index
+            return new_index
+        finally:
+            self._lock.release()
+
+
+_holders: Dict[Path, IndexHolder] = {}
+_holders_lock = threading.Lock()
+
+
+def get_index_holder(tfidf_folder: Path) -> IndexHolder:
+    """
+    Возвращает общий для процесса хранитель индекса для указанной папки
+    :param tfidf_folder: Путь к папке с TF-IDF моделью и матрицей
+    :return: Хранитель индекса
+    """
+    key = Path(tfidf_folder).resolve()
+    with _holders_lock:
+        holder = _holders.get(key)
+        if holder is None:
+            holder = _holders[key] = IndexHolder(key)
+        return holder
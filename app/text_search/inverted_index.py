@@ -0,0 +1,89 @@
+from typing import Tuple
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix, spmatrix
+from app.text_search.ranking import top_k_by_score
+
+
+class InvertedIndex:
+    """
+    Инвертированный индекс: для каждого термина хранится список документов (posting list)
+    с весами TF-IDF, отсортированный по номеру документа
+    """
+
+    def __init__(self, tfidf_matrix: csr_matrix):
+        postings = csc_matrix(tfidf_matrix)
+        postings.sort_indices()
+        self.n_docs, self.n_terms = postings.shape
+        self.indptr = postings.indptr
+        self.doc_ids = postings.indices.astype(np.int32, copy=False)
+        self.weights = postings.data
+
+        # Максимальный вес термина — верхняя граница его вклада в оценку документа
+        lengths = np.diff(self.indptr)
+        self.max_weights = np.zeros(self.n_terms, dtype=self.weights.dtype)
+        non_empty = lengths > 0
+        if non_empty.any():
+            self.max_weights[non_empty] = np.maximum.reduceat(self.weights, self.indptr[:-1][non_empty])
+
+    def postings(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Возвращает список документов термина
+        :param term: Номер термина в словаре
+        :return: Номера документов и веса термина в них
+        """
+        start, end = self.indptr[term], self.indptr[term + 1]
+        return self.doc_ids[start:end], self.weights[start:end]
+
+    def search(self, query_vector: spmatrix, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Находит top_k документов с наибольшим скалярным произведением с вектором запроса.
+        Термины обходятся по убыванию верхней границы вклада; как только сумма границ оставшихся
+        терминов становится меньше текущей k-й оценки, новые документы в кандидаты не добавляются,
+        а кандидаты, которые уже не могут попасть в топ, отбрасываются (MaxScore).
+        Время работы зависит от длины списков терминов запроса, а не от размера корпуса
+        :param query_vector: Разреженный вектор запроса (1 x термины)
+        :param top_k: Количество возвращаемых документов
+        :return: Номера документов и их оценки по убыванию оценки
+        """
+        query_vector = csr_matrix(query_vector)
+        terms, query_weights = query_vector.indices, query_vector.data
+        upper_bounds = query_weights * self.max_weights[terms]
+
+        # Термины без документов ничего не добавляют к оценке
+        order = np.argsort(-upper_bounds, kind="stable")
+        order = order[upper_bounds[order] > 0]
+        # remaining[i] — максимальный суммарный вклад терминов, начиная с i-го
+        remaining = np.append(np.cumsum(upper_bounds[order][::-1])[::-1], 0.0)
+
+        candidate_ids = np.empty(0, dtype=np.int32)
+        candidate_scores = np.empty(0, dtype=np.float64)
+        pruning = False
+        for position, i in enumerate(order):
+            doc_ids, weights = self.postings(terms[i])
+            contributions = weights * query_weights[i]
+
+            if not pruning:
+                # Объединение кандидатов с документами термина
+                all_ids = np.concatenate([candidate_ids, doc_ids])
+                all_scores = np.concatenate([candidate_scores, contributions])
+                candidate_ids, inverse = np.unique(all_ids, return_inverse=True)
+                candidate_scores = np.bincount(inverse, weights=all_scores)
+            else:
+                # Обновление оценок только у существующих кандидатов
+                positions = np.searchsorted(doc_ids, candidate_ids)
+                positions[positions == len(doc_ids)] = 0
+                found = doc_ids[positions] == candidate_ids
+                candidate_scores[found] += contributions[positions[found]]
+
+            if len(candidate_ids) < top_k:
+                continue
+            threshold = np.partition(candidate_scores, -top_k)[-top_k]
+            rest = remaining[position + 1]
+            # Документы вне кандидатов набирают не больше rest
+            if rest < threshold:
+                pruning = True
+                keep = candidate_scores + rest >= threshold
+                candidate_ids, candidate_scores = candidate_ids[keep], candidate_scores[keep]
+
+        return top_k_by_score(candidate_ids, candidate_scores, top_k)
+
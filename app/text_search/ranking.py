@@ -0,0 +1,70 @@
+from typing import Tuple
+import numpy as np
+
+
+def select_top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Выбирает позиции top_k наибольших оценок: частичный отбор argpartition за O(n),
+    затем сортировка только отобранных (при равенстве оценок — по возрастанию позиции)
+    :param scores: Оценки
+    :param top_k: Количество выбираемых позиций
+    :return: Позиции по убыванию оценки
+    """
+    n = len(scores)
+    top_k = min(top_k, n)
+    if top_k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if top_k < n:
+        selected = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        selected = np.arange(n)
+    order = np.lexsort((selected, -scores[selected]))
+    return selected[order]
+
+
+def top_k_by_score(doc_ids: np.ndarray, scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Выбирает top_k документов по убыванию оценки (при равенстве — по возрастанию номера)
+    :param doc_ids: Номера документов
+    :param scores: Оценки документов
+    :param top_k: Количество документов
+    :return: Номера и оценки выбранных документов
+    """
+    selected = select_top_k(scores, top_k)
+    selected = selected[np.lexsort((doc_ids[selected], -scores[selected]))]
+    return doc_ids[selected], scores[selected]
+
+
+def pad_with_zero_scores(doc_ids: np.ndarray, scores: np.ndarray, n_docs: int,
+                         top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Дополняет результаты до top_k документами с нулевой оценкой, как это происходит при полном
+    переборе, когда с запросом совпадает меньше top_k документов
+    :param doc_ids: Номера найденных документов
+    :param scores: Оценки найденных документов
+    :param n_docs: Количество документов в индексе
+    :param top_k: Требуемое количество результатов
+    :return: Номера и оценки документов
+    """
+    missing = min(top_k, n_docs) - len(doc_ids)
+    if missing <= 0:
+        return doc_ids, scores
+    # Среди первых len(doc_ids) + missing номеров хватит не найденных документов
+    candidates = np.arange(len(doc_ids) + missing)
+    extra = candidates[~np.isin(candidates, doc_ids)][:missing]
+    return np.concatenate([doc_ids, extra]), np.concatenate([scores, np.zeros(len(extra))])
+
+
+def paginate(doc_ids: np.ndarray, scores: np.ndarray, offset: int = 0,
+             min_score: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Пропускает первые offset результатов и отбрасывает результаты с оценкой ниже min_score
+    :param doc_ids: Номера документов по убыванию оценки
+    :param scores: Оценки документов
+    :param offset: Количество пропускаемых результатов
+    :param min_score: Минимальная оценка
+    :return: Номера и оценки оставшихся документов
+    """
+    doc_ids, scores = doc_ids[offset:], scores[offset:]
+    keep = scores >= min_score
+    return doc_ids[keep], scores[keep]
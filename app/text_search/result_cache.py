@@ -0,0 +1,306 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from app import config
+from app.cache import MISSING, LRUCache
+from app.metrics import MetricGroup, registry
+
+# Сохранённая выдача: время вычисления в секундах и список пар (текст, релевантность)
+CachedResults = Tuple[float, List[Tuple[str, float]]]
+
+SEARCH_CACHE_BACKENDS = ("local", "sqlite")
+
+# Общий кэш проверяет размер не при каждой записи, а раз в столько записей
+SQLITE_EVICT_INTERVAL = 64
+
+
+def make_search_cache_key(index_version: str, engine: str, tokens: Sequence[str], top_k: int, min_score: float,
+                          offset: int, snippet_length: int = 0) -> str:
+    """
+    Составляет ключ выдачи. Запрос представлен обработанными словами в алфавитном порядке: TF-IDF не учитывает
+    порядок слов, поэтому запросы, различающиеся регистром, формой или порядком слов, получают одну запись.
+    Версия индекса меняется при каждой перезагрузке, поэтому выдачи старого индекса больше не находятся
+    :param index_version: Версия индекса
+    :param engine: Движок поиска
+    :param tokens: Обработанные слова запроса
+    :param top_k: Количество результатов
+    :param min_score: Минимальная релевантность
+    :param offset: Количество пропускаемых результатов
+    :param snippet_length: Длина фрагментов текстов в выдаче (0 — полные тексты)
+    :return: Ключ записи
+    """
+    return json.dumps([index_version, engine, sorted(tokens), top_k, float(min_score), offset, snippet_length],
+                      ensure_ascii=False)
+
+
+class LocalResultBackend:
+    """Хранилище выдач в памяти процесса: LRU-кэш ограниченного размера со сроком жизни записей"""
+
+    name = "local"
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._cache = LRUCache(maxsize)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, key: str) -> Optional[CachedResults]:
+        """Возвращает сохранённую выдачу или None, если её нет или срок её жизни истёк"""
+        entry = self._cache.get(key)
+        if entry is MISSING or (entry[0] and entry[0] < time.time()):
+            return None
+        return entry[1], entry[2]
+
+    def put(self, key: str, cost: float, results: List[Tuple[str, float]], ttl: float):
+        """Сохраняет выдачу на ttl секунд (0 — без ограничения срока)"""
+        self._cache.put(key, (time.time() + ttl if ttl else 0.0, cost, results))
+
+    def clear(self):
+        """Удаляет все выдачи"""
+        self._cache.clear()
+
+    def close(self):
+        """Освобождает ресурсы хранилища"""
+
+
+class SqliteResultBackend:
+    """
+    Хранилище выдач в файле SQLite, общее для всех процессов на сервере (воркеров uvicorn и пула процессов).
+    Ключи хранятся хэшами, выдачи — в JSON. Давно не использованные записи вытесняются раз
+    в SQLITE_EVICT_INTERVAL записей, поэтому размер может ненадолго превышать ограничение.
+    Ошибки базы (например, долгая блокировка другим процессом) не прерывают поиск: выдача вычисляется заново
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Path, maxsize: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.maxsize = maxsize
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), timeout=1.0, check_same_thread=False)
+        # Кэш восстанавливается повторным поиском, поэтому надёжность записи не важна
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = OFF")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, expires_at REAL NOT NULL, "
+                "used_at REAL NOT NULL, cost REAL NOT NULL, results TEXT NOT NULL) WITHOUT ROWID")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at)")
+
+    @staticmethod
+    def key_hash(key: str) -> bytes:
+        """Возвращает хэш ключа, по которому хранится выдача"""
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key: str) -> Optional[CachedResults]:
+        """Возвращает сохранённую выдачу или None, если её нет или срок её жизни истёк"""
+        now = time.time()
+        key_hash = self.key_hash(key)
+        try:
+            with self._lock, self._connection:
+                row = self._connection.execute(
+                    "SELECT cost, results FROM results WHERE key = ? AND (expires_at = 0 OR expires_at >= ?)",
+                    (key_hash, now)).fetchone()
+                if row is None:
+                    return None
+                self._connection.execute("UPDATE results SET used_at = ? WHERE key = ?", (now, key_hash))
+        except sqlite3.Error:
+            return None
+        return row[0], [(text, score) for text, score in json.loads(row[1])]
+
+    def put(self, key: str, cost: float, results: List[Tuple[str, float]], ttl: float):
+        """Сохраняет выдачу на ttl секунд (0 — без ограничения срока)"""
+        now = time.time()
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO results (key, expires_at, used_at, cost, results) VALUES (?, ?, ?, ?, ?)",
+                    (self.key_hash(key), now + ttl if ttl else 0.0, now, cost,
+                     json.dumps(results, ensure_ascii=False)))
+                self._puts += 1
+                if self._puts % SQLITE_EVICT_INTERVAL == 0:
+                    self._evict(now)
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, now: float):
+        """Удаляет записи с истёкшим сроком и давно не использованные записи сверх ограничения"""
+        self._connection.execute("DELETE FROM results WHERE expires_at != 0 AND expires_at < ?", (now,))
+        self._connection.execute(
+            "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,))
+
+    def clear(self):
+        """Удаляет все выдачи"""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM results")
+
+    def close(self):
+        """Закрывает базу кэша"""
+        self._connection.close()
+
+
+class SearchResultCache:
+    """
+    Кэш выдач поиска перед оценкой документов. Считает попадания, промахи и сэкономленное время:
+    при промахе запоминается время вычисления выдачи, и каждое попадание добавляет его к сэкономленному.
+    Счётчики ведутся в каждом процессе отдельно, даже если записи хранятся в общем хранилище
+    """
+
+    def __init__(self, backend, ttl: float = 0.0):
+        if ttl < 0:
+            raise ValueError("Срок жизни записей кэша не может быть отрицательным")
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend.maxsize > 0
+
+    def get(self, key: str) -> Optional[List[Tuple[str, float]]]:
+        """
+        Возвращает сохранённую выдачу и учитывает попадание или промах
+        :param key: Ключ выдачи (см. make_search_cache_key)
+        :return: Список текстов и их релевантности или None, если выдачи нет
+        """
+        if not self.enabled:
+            return None
+        entry = self.backend.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            cost, results = entry
+            self.hits += 1
+            self.saved_seconds += cost
+        return results
+
+    def put(self, key: str, results: List[Tuple[str, float]], cost: float):
+        """
+        Сохраняет выдачу
+        :param key: Ключ выдачи
+        :param results: Список текстов и их релевантности
+        :param cost: Время вычисления выдачи в секундах
+        """
+        if self.enabled:
+            self.backend.put(key, cost, results, self.ttl)
+
+    def get_or_compute(self, key: str, compute: Callable[[], List[Tuple[str, float]]]) -> List[Tuple[str, float]]:
+        """
+        Возвращает сохранённую выдачу, а при промахе вычисляет и сохраняет её
+        :param key: Ключ выдачи (см. make_search_cache_key)
+        :param compute: Функция вычисления выдачи
+        :return: Список текстов и их релевантности
+        """
+        if not self.enabled:
+            return compute()
+        results = self.get(key)
+        if results is not None:
+            return results
+
+        start = time.perf_counter()
+        results = compute()
+        self.put(key, results, time.perf_counter() - start)
+        return results
+
+    def clear(self):
+        """Очищает кэш и счётчики"""
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.saved_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает статистику кэша
+        :return: Словарь с хранилищем, размером, ограничениями, попаданиями, промахами, долей попаданий
+            и сэкономленным временем в секундах
+        """
+        size = len(self.backend)
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "backend": self.backend.name,
+                "size": size,
+                "maxsize": self.backend.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / requests if requests else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
+
+
+def create_search_cache(backend: str, maxsize: int, ttl: float, path: Optional[Path] = None) -> SearchResultCache:
+    """
+    Создаёт кэш выдач поиска
+    :param backend: Хранилище: "local" — память процесса, "sqlite" — файл, общий для процессов
+    :param maxsize: Максимальное количество выдач (0 — кэш отключён)
+    :param ttl: Срок жизни выдачи в секундах (0 — без ограничения)
+    :param path: Путь к файлу общего кэша
+    :return: Кэш выдач
+    """
+    if maxsize < 0:
+        raise ValueError("Размер кэша не может быть отрицательным")
+    if backend == "local":
+        return SearchResultCache(LocalResultBackend(maxsize), ttl)
+    if backend == "sqlite":
+        if path is None:
+            raise ValueError("Для общего кэша выдач нужно указать путь к файлу")
+        return SearchResultCache(SqliteResultBackend(path, maxsize), ttl)
+    raise ValueError(f"Неизвестное хранилище кэша '{backend}', доступны: {', '.join(SEARCH_CACHE_BACKENDS)}")
+
+
+_search_cache: Optional[SearchResultCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchResultCache:
+    """Возвращает общий для процесса кэш выдач, созданный по настройкам приложения"""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = create_search_cache(config.SEARCH_CACHE_BACKEND, config.SEARCH_CACHE_SIZE,
+                                                config.SEARCH_CACHE_TTL, Path(config.SEARCH_CACHE_PATH))
+        return _search_cache
+
+
+def configure_search_cache(cache: SearchResultCache) -> SearchResultCache:
+    """
+    Заменяет общий кэш выдач новым
+    :param cache: Новый кэш
+    :return: Новый кэш
+    """
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is not None:
+            _search_cache.backend.close()
+        _search_cache = cache
+        return cache
+
+
+# Статистика кэша выдач в метриках приложения: stats() вызывается один раз при каждой выгрузке метрик.
+# Попадания, промахи и сэкономленное время только растут за время работы процесса, поэтому это счётчики
+registry.register(MetricGroup("search_cache", {
+    "size": ("gauge", "Количество выдач в кэше"),
+    "hit_ratio": ("gauge", "Доля попаданий в кэш выдач"),
+    "hits": ("counter", "Количество попаданий в кэш выдач"),
+    "misses": ("counter", "Количество промахов кэша выдач"),
+    "saved_seconds": ("counter", "Сэкономленное кэшем выдач время поиска в секундах"),
+}, lambda: get_search_cache().stats()))
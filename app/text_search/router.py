@@ -1,20 +1,73 @@
 from typing import Optional
 from fastapi import APIRouter, HTTPException
-from app.text_processing.schemas import TextRequest
-from app.text_search.service import get_relevant_texts
-from app.text_search.create_tfidf import TFIDF_FOLDER
+from app.executor import ExecutorOverloadedError, get_executor
+from app.text_processing.schemas import BatchSearchRequest, SearchRequest
+from app.text_search.batcher import get_search_batcher
+from app.text_search.result_cache import get_search_cache
+from app.text_search.service import get_document, get_relevant_texts, get_relevant_texts_batch
+from app.config import TFIDF_FOLDER
 
 router = APIRouter()
 
 
-@router.post("/search", summary="Поиск по тексту", description="Возвращает 3 наиболее релевантных текста для запроса")
-async def search_endpoint(request: Optional[TextRequest]):
+@router.post("/search", summary="Поиск по тексту",
+             description="Возвращает top_k наиболее релевантных текстов для запроса (по умолчанию 3); "
+                         "при snippet_length > 0 — идентификаторы документов и фрагменты текстов")
+async def search_endpoint(request: Optional[SearchRequest]):
     """Эндпоинт для поиска текста"""
     try:
         query = request.text
-        results = get_relevant_texts(query, TFIDF_FOLDER)
+        batcher = get_search_batcher()
+        if batcher.enabled:
+            # Одновременные запросы объединяются в пакеты
+            results = await batcher.search(query, TFIDF_FOLDER, request.top_k, request.min_score, request.offset,
+                                           request.snippet_length)
+        else:
+            results = await get_executor().run(get_relevant_texts, query, TFIDF_FOLDER, None, request.top_k,
+                                               request.min_score, request.offset, request.snippet_length)
         return {"query": query, "results": results}
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except FileNotFoundError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/search/batch", summary="Пакетный поиск по тексту",
+             description="Возвращает top_k наиболее релевантных текстов для каждого запроса из списка")
+async def search_batch_endpoint(request: BatchSearchRequest):
+    """Эндпоинт для пакетного поиска текста"""
+    try:
+        results = await get_executor().run(get_relevant_texts_batch, request.queries, TFIDF_FOLDER,
+                                           request.top_k, request.min_score, request.offset)
+        return {"results": [{"query": query, "results": query_results}
+                            for query, query_results in zip(request.queries, results)]}
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/search/documents/{doc_id}", summary="Текст документа",
+            description="Возвращает полный текст документа по идентификатору из выдачи с фрагментами")
+async def document_endpoint(doc_id: str):
+    """Эндпоинт получения документа"""
+    try:
+        text = await get_executor().run(get_document, doc_id, TFIDF_FOLDER)
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if text is None:
+        raise HTTPException(status_code=404, detail=f"Документ '{doc_id}' не найден")
+    return {"id": doc_id, "text": text}
+
+
+@router.get("/search/cache", summary="Статистика кэша выдач",
+            description="Возвращает размер кэша выдач поиска, долю попаданий и сэкономленное время в секундах")
+async def search_cache_endpoint():
+    """Эндпоинт статистики кэша выдач (при EXECUTOR_KIND=process поиск и счётчики находятся в рабочих процессах)"""
+    return get_search_cache().stats()
@@ -0,0 +1,205 @@
+import math
+from typing import Sequence, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix, spmatrix
+from app.text_search.ranking import select_top_k, top_k_by_score
+
+# Размерность пространства LSA по умолчанию
+DEFAULT_N_COMPONENTS = 256
+
+# Количество итераций k-средних при обучении центроидов списков IVF
+# и количество векторов обучающей выборки на один список
+DEFAULT_N_ITER = 10
+SAMPLES_PER_LIST = 256
+
+# Количество векторов, которые распределяются по спискам за одно умножение на матрицу центроидов
+ASSIGN_CHUNK_SIZE = 65536
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Нормирует строки по L2 на месте; нулевые строки остаются нулевыми
+    :param vectors: Плотная матрица
+    :return: Та же матрица
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def get_default_n_lists(n_docs: int) -> int:
+    """Количество списков IVF по умолчанию — порядка 4·√n, как принято для IVF"""
+    return max(1, min(n_docs, round(4 * math.sqrt(n_docs))))
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    Относит каждый вектор к ближайшему по косинусу центроиду
+    :param vectors: Нормированные векторы
+    :param centroids: Нормированные центроиды
+    :return: Номера списков
+    """
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_CHUNK_SIZE):
+        chunk = vectors[start:start + ASSIGN_CHUNK_SIZE]
+        assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(vectors: np.ndarray, n_lists: int, n_iter: int = DEFAULT_N_ITER, seed: int = 0) -> np.ndarray:
+    """
+    Обучает центроиды сферическим k-средних на случайной выборке векторов
+    :param vectors: Нормированные векторы документов
+    :param n_lists: Количество центроидов
+    :param n_iter: Количество итераций
+    :param seed: Зерно генератора случайных чисел
+    :return: Нормированные центроиды (n_lists x размерность)
+    """
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > n_lists * SAMPLES_PER_LIST:
+        sample = vectors[np.sort(rng.choice(len(vectors), n_lists * SAMPLES_PER_LIST, replace=False))]
+    centroids = np.array(sample[rng.choice(len(sample), n_lists, replace=False)], dtype=np.float32)
+
+    for _ in range(n_iter):
+        assignments = assign_lists(sample, centroids)
+        # Сумма векторов каждого списка — одно произведение разреженной матрицы принадлежности на выборку
+        membership = csr_matrix((np.ones(len(sample), dtype=np.float32), (assignments, np.arange(len(sample)))),
+                                shape=(n_lists, len(sample)))
+        sums = np.asarray(membership @ sample, dtype=np.float32)
+        # Пустые списки получают новый центроид из случайного вектора выборки
+        empty = np.flatnonzero(np.diff(membership.indptr) == 0)
+        sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class SemanticIndex:
+    """
+    Семантический индекс: документы в пространстве LSA (проекция матрицы TF-IDF на первые сингулярные векторы)
+    и индекс приближённого поиска ближайших соседей IVF. Векторы документов разбиты на списки по ближайшему
+    центроиду и хранятся подряд по спискам; запрос сравнивается только с векторами n_probe списков
+    с ближайшими центроидами
+    """
+
+    def __init__(self, components: np.ndarray, centroids: np.ndarray, vectors: np.ndarray, order: np.ndarray,
+                 offsets: np.ndarray):
+        """
+        :param components: Матрица проекции (размерность x признаки TF-IDF)
+        :param centroids: Нормированные центроиды списков (списки x размерность)
+        :param vectors: Нормированные векторы документов в порядке списков (документы x размерность)
+        :param order: Номера документов в порядке списков
+        :param offsets: Начала списков в vectors и order и общее количество документов в конце
+        """
+        n_lists = len(centroids)
+        if (centroids.shape[1] != components.shape[0] or vectors.shape[1] != components.shape[0]
+                or len(order) != len(vectors) or len(offsets) != n_lists + 1 or offsets[0] != 0
+                or offsets[-1] != len(vectors) or np.any(np.diff(offsets) < 0)):
+            raise ValueError("Массивы семантического индекса не согласованы между собой")
+        self.components = components
+        self.centroids = centroids
+        self.vectors = vectors
+        self.order = order
+        self.offsets = offsets
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def n_components(self) -> int:
+        return self.components.shape[0]
+
+    @property
+    def n_features(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def transform(self, query_vectors: spmatrix) -> np.ndarray:
+        """
+        Проецирует векторы TF-IDF запросов в пространство LSA
+        :param query_vectors: Разреженная матрица векторов запросов (запросы x признаки)
+        :return: Нормированные плотные векторы (запросы x размерность)
+        """
+        return normalize_rows(np.asarray(query_vectors @ self.components.T, dtype=np.float32))
+
+    def search(self, query_vector: np.ndarray, top_k: int, n_probe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Находит top_k документов с наибольшим косинусным сходством с запросом среди n_probe списков
+        с ближайшими центроидами. Время работы пропорционально доле просмотренных списков, а не размеру корпуса;
+        при n_probe, равном количеству списков, результат совпадает с search_exact
+        :param query_vector: Нормированный вектор запроса (см. transform)
+        :param top_k: Количество возвращаемых документов
+        :param n_probe: Количество просматриваемых списков
+        :return: Номера документов и их оценки по убыванию оценки
+        """
+        if n_probe < 1:
+            raise ValueError("Количество просматриваемых списков должно быть положительным")
+        lists = select_top_k(self.centroids @ query_vector, n_probe)
+        doc_ids, scores = [], []
+        for list_id in lists:
+            start, end = self.offsets[list_id], self.offsets[list_id + 1]
+            doc_ids.append(self.order[start:end])
+            scores.append(self.vectors[start:end] @ query_vector)
+        if not doc_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return top_k_by_score(np.concatenate(doc_ids), np.concatenate(scores), top_k)
+
+    def search_exact(self, query_vector: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Находит top_k документов полным перебором векторов LSA (для оценки полноты search)
+        :param query_vector: Нормированный вектор запроса (см. transform)
+        :param top_k: Количество возвращаемых документов
+        :return: Номера документов и их оценки по убыванию оценки
+        """
+        return top_k_by_score(np.asarray(self.order), self.vectors @ query_vector, top_k)
+
+
+def build_semantic_index(tfidf_matrix: csr_matrix, n_components: int = DEFAULT_N_COMPONENTS, n_lists: int = 0,
+                         n_iter: int = DEFAULT_N_ITER, seed: int = 0) -> SemanticIndex:
+    """
+    Строит семантический индекс: проецирует матрицу TF-IDF в пространство LSA усечённым SVD,
+    обучает центроиды IVF и раскладывает векторы документов по спискам
+    :param tfidf_matrix: Матрица TF-IDF (документы x признаки)
+    :param n_components: Размерность пространства LSA (не больше количества признаков без одного)
+    :param n_lists: Количество списков IVF (0 — по количеству документов, см. get_default_n_lists)
+    :param n_iter: Количество итераций k-средних
+    :param seed: Зерно генератора случайных чисел
+    :return: Семантический индекс
+    """
+    from sklearn.decomposition import TruncatedSVD
+
+    n_docs, n_features = tfidf_matrix.shape
+    if n_components < 1 or n_lists < 0:
+        raise ValueError("Размерность LSA должна быть положительной, а количество списков — неотрицательным")
+    if n_docs < 2 or n_features < 2:
+        raise ValueError("Для семантического индекса нужно не меньше двух документов и двух признаков")
+    # TruncatedSVD требует размерность меньше количества признаков
+    n_components = min(n_components, n_features - 1)
+    n_lists = min(n_lists or get_default_n_lists(n_docs), n_docs)
+
+    svd = TruncatedSVD(n_components, algorithm="randomized", random_state=seed)
+    vectors = normalize_rows(np.asarray(svd.fit_transform(tfidf_matrix), dtype=np.float32))
+    components = np.asarray(svd.components_, dtype=np.float32)
+
+    centroids = train_centroids(vectors, n_lists, n_iter, seed)
+    assignments = assign_lists(vectors, centroids)
+    order = np.argsort(assignments, kind="stable").astype(np.int64)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))]).astype(np.int64)
+    return SemanticIndex(components, centroids, vectors[order], order, offsets)
+
+
+def recall_at_k(found: Sequence[int], exact: Sequence[int]) -> float:
+    """
+    Полнота приближённого поиска: доля документов точного top_k, найденных приближённым поиском
+    :param found: Номера документов приближённого поиска
+    :param exact: Номера документов точного поиска
+    :return: Полнота от 0 до 1 (1 — если точный поиск ничего не нашёл)
+    """
+    if len(exact) == 0:
+        return 1.0
+    return len(set(np.asarray(found).tolist()) & set(np.asarray(exact).tolist())) / len(exact)
+
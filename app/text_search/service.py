@@ -1,14 +1,99 @@
 import pickle
 from pathlib import Path
-from typing import List, Tuple
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from app.text_processing.service import preprocess_text
+from scipy.sparse import csr_matrix, spmatrix
+from app import config
+from app.metrics import stage_timer
+from app.text_processing.service import preprocess_text, preprocess_texts_batch, preprocess_texts_many
+from app.text_search.doc_store import DocumentSnippets
+from app.text_search.impact_index import ImpactIndex
+from app.text_search.index import TfidfIndex, get_index_holder
+from app.text_search.inverted_index import InvertedIndex
+from app.text_search.ranking import pad_with_zero_scores, paginate, select_top_k
+from app.text_search.result_cache import get_search_cache, make_search_cache_key
+from app.text_search.semantic import SemanticIndex
+from app.text_search.shards import Shard, rank_shards
+from app.text_search.storage import Vectorizer
+
+SEARCH_ENGINES = ("matrix", "inverted", "semantic", "impact")
+
+
+class SearchParams(NamedTuple):
+    """Запрос к поиску с параметрами выдачи"""
+    query: str
+    top_k: int = 3
+    min_score: float = 0.0
+    offset: int = 0
+    snippet_length: int = 0
+
+
+def validate_query(query: str):
+    """
+    Проверяет, что запрос является непустой строкой
+    :param query: Текст запроса
+    """
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("Запрос должен быть непустой строкой")
+
+
+def validate_search_params(top_k: int, min_score: float = 0.0, offset: int = 0):
+    """
+    Проверяет параметры выдачи результатов поиска
+    :param top_k: Количество возвращаемых текстов
+    :param min_score: Минимальная релевантность возвращаемых текстов
+    :param offset: Количество пропускаемых результатов
+    """
+    if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= config.MAX_TOP_K:
+        raise ValueError(f"Количество результатов top_k должно быть целым числом от 1 до {config.MAX_TOP_K}")
+    if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0:
+        raise ValueError("Смещение offset должно быть неотрицательным целым числом")
+    if isinstance(min_score, bool) or not isinstance(min_score, (int, float)) or not np.isfinite(min_score):
+        raise ValueError("Минимальная релевантность min_score должна быть числом")
+
+
+def validate_snippet_length(snippet_length: int):
+    """
+    Проверяет длину фрагментов текстов в выдаче
+    :param snippet_length: Длина фрагментов (0 — полные тексты)
+    """
+    if isinstance(snippet_length, bool) or not isinstance(snippet_length, int) or snippet_length < 0:
+        raise ValueError("Длина фрагмента snippet_length должна быть неотрицательным целым числом")
+
+
+def get_result_texts(index: TfidfIndex, snippet_length: int = 0) -> Sequence[Union[str, Dict[str, str]]]:
+    """
+    Возвращает последовательность, из которой берутся результаты выдачи: полные тексты индекса или
+    идентификаторы документов с фрагментами текстов. Тексты читаются только для документов выдачи
+    :param index: Загруженный индекс
+    :param snippet_length: Длина фрагментов (0 — полные тексты)
+    :return: Тексты или фрагменты документов по номерам
+    """
+    if snippet_length:
+        return DocumentSnippets(index.texts, index.doc_ids, snippet_length)
+    return index.texts
+
+
+def validate_batch(queries: List[str], top_k: int, min_score: float = 0.0, offset: int = 0):
+    """
+    Проверяет пакет запросов и параметры выдачи результатов
+    :param queries: Тексты запросов
+    :param top_k: Количество возвращаемых текстов для каждого запроса
+    :param min_score: Минимальная релевантность возвращаемых текстов
+    :param offset: Количество пропускаемых результатов
+    """
+    if not isinstance(queries, list) or not queries:
+        raise ValueError("Список запросов должен быть непустым")
+    if len(queries) > config.MAX_BATCH_QUERIES:
+        raise ValueError(f"В одном пакете допускается не более {config.MAX_BATCH_QUERIES} запросов")
+    validate_search_params(top_k, min_score, offset)
+    for query in queries:
+        validate_query(query)
 
 
 # Загрузка модели и индекса
-def load_tfidf_model_and_index(model_path: Path, matrix_path: Path) -> Tuple[TfidfVectorizer, np.ndarray]:
+def load_tfidf_model_and_index(model_path: Path, matrix_path: Path) -> Tuple[Vectorizer, csr_matrix]:
     """
     Загружает модель TF-IDF и матрицу индекса из файлов
     :param model_path: Путь к файлу с моделью TF-IDF
@@ -22,64 +107,482 @@ def load_tfidf_model_and_index(model_path: Path, matrix_path: Path) -> Tuple[Tfi
     return vectorizer, tfidf_matrix
 
 
+def compute_similarities(query_vectors: spmatrix, tfidf_matrix: Union[csr_matrix, np.ndarray]) -> np.ndarray:
+    """
+    Вычисляет косинусное сходство запросов с документами индекса.
+    Строки матрицы и векторы запросов нормированы по L2, поэтому сходство — это скалярное
+    произведение, которое для разреженной матрицы считается без перевода её в плотный вид
+    :param query_vectors: Разреженная матрица векторов запросов (запросы x термины)
+    :param tfidf_matrix: Матрица TF-IDF (документы x термины)
+    :return: Плотная матрица сходства (запросы x документы)
+    """
+    if query_vectors.shape[0] == 1:
+        # Для одного запроса быстрее всего умножить CSR матрицу на плотный вектор
+        query_vector = query_vectors.toarray().ravel()
+        return np.asarray(tfidf_matrix @ query_vector).reshape(1, -1)
+    from sklearn.utils.extmath import safe_sparse_dot
+
+    return safe_sparse_dot(query_vectors, tfidf_matrix.T, dense_output=True)
+
+
+def get_processed_query(query: str, query_tokens: Optional[List[str]] = None) -> str:
+    """
+    Возвращает обработанный запрос для векторизации
+    :param query: Текст запроса
+    :param query_tokens: Обработанные слова запроса, если запрос уже обработан
+    :return: Обработанные слова запроса через пробел
+    """
+    if query_tokens is None:
+        with stage_timer("preprocess"):
+            query_tokens = preprocess_text(query)
+    return " ".join(query_tokens)
+
+
 # Поиск релевантных текстов
 def search_texts(
-        query: str, vectorizer: TfidfVectorizer, tfidf_matrix: np.ndarray, texts: List[str]
+        query: str, vectorizer: Vectorizer, tfidf_matrix: Union[csr_matrix, np.ndarray], texts: List[str],
+        top_k: int = 3, min_score: float = 0.0, offset: int = 0, query_tokens: Optional[List[str]] = None
 ) -> List[Tuple[str, float]]:
     """
-    Ищет 3 наиболее релевантных текста для запроса
+    Ищет top_k наиболее релевантных текстов для запроса
     :param query: Текст запроса
     :param vectorizer: Модель TF-IDF
     :param tfidf_matrix: Матрица TF-IDF
     :param texts: Исходные тексты, соответствующие индексу
-    :return: Список из 3 текстов и их релевантности
+    :param top_k: Количество возвращаемых текстов
+    :param min_score: Минимальная релевантность возвращаемых текстов
+    :param offset: Количество пропускаемых результатов (для постраничной выдачи)
+    :param query_tokens: Обработанные слова запроса, если запрос уже обработан
+    :return: Список текстов и их релевантности
     """
-    if not isinstance(query, str) or not query.strip():
-        raise ValueError("Запрос должен быть непустой строкой")
+    validate_query(query)
+    validate_search_params(top_k, min_score, offset)
 
     # Обработка запроса
-    processed_query = " ".join(preprocess_text(query))
+    processed_query = get_processed_query(query, query_tokens)
 
     # Преобразование запроса в вектор
-    query_vector = vectorizer.transform([processed_query]).toarray()
+    with stage_timer("vectorize"):
+        query_vector = vectorizer.transform([processed_query])
 
     # Вычисление косинусного сходства
-    similarities = cosine_similarity(query_vector, tfidf_matrix).flatten()
+    with stage_timer("score"):
+        similarities = compute_similarities(query_vector, tfidf_matrix).ravel()
 
-    # Получение индексов топ-3 результатов
-    top_indices = similarities.argsort()[-3:][::-1]
+    # Частичный отбор offset + top_k лучших документов за O(n) и сортировка только отобранных
+    with stage_timer("top_k"):
+        top_indices = select_top_k(similarities, offset + top_k)
+        doc_ids, scores = paginate(top_indices, similarities[top_indices], offset, min_score)
 
     # Возврат текстов и их релевантности
-    results = [(texts[i], similarities[i]) for i in top_indices]
+    results = [(texts[i], float(score)) for i, score in zip(doc_ids, scores)]
+    return results
+
+
+# Поиск релевантных текстов по инвертированному индексу
+def search_texts_inverted(
+        query: str, vectorizer: Vectorizer, inverted_index: InvertedIndex, texts: List[str], top_k: int = 3,
+        min_score: float = 0.0, offset: int = 0, query_tokens: Optional[List[str]] = None
+) -> List[Tuple[str, float]]:
+    """
+    Ищет top_k наиболее релевантных текстов для запроса, оценивая только документы,
+    в которых встречается хотя бы один термин запроса
+    :param query: Текст запроса
+    :param vectorizer: Модель TF-IDF
+    :param inverted_index: Инвертированный индекс
+    :param texts: Исходные тексты, соответствующие индексу
+    :param top_k: Количество возвращаемых текстов
+    :param min_score: Минимальная релевантность возвращаемых текстов
+    :param offset: Количество пропускаемых результатов (для постраничной выдачи)
+    :param query_tokens: Обработанные слова запроса, если запрос уже обработан
+    :return: Список текстов и их релевантности
+    """
+    validate_query(query)
+    validate_search_params(top_k, min_score, offset)
+
+    processed_query = get_processed_query(query, query_tokens)
+    with stage_timer("vectorize"):
+        query_vector = vectorizer.transform([processed_query])
+    # Инвертированный индекс отбирает лучшие документы во время оценки
+    with stage_timer("score"):
+        doc_ids, scores = inverted_index.search(query_vector, offset + top_k)
+
+    # Как и при полном переборе, недостающие результаты дополняются документами с нулевой релевантностью
+    with stage_timer("top_k"):
+        doc_ids, scores = pad_with_zero_scores(doc_ids, scores, len(texts), offset + top_k)
+        doc_ids, scores = paginate(doc_ids, scores, offset, min_score)
+    return [(texts[i], float(score)) for i, score in zip(doc_ids, scores)]
+
+
+# Поиск релевантных текстов по частям индекса
+def search_texts_sharded(
+        query: str, vectorizer: Vectorizer, shards: List[Shard], texts: List[str], top_k: int = 3,
+        min_score: float = 0.0, offset: int = 0, query_tokens: Optional[List[str]] = None
+) -> List[Tuple[str, float]]:
+    """
+    Ищет top_k наиболее релевантных текстов для запроса, оценивая части индекса параллельно
+    в пуле потоков и объединяя их top_k. Результат совпадает с search_texts
+    :param query: Текст запроса
+    :param vectorizer: Модель TF-IDF
+    :param shards: Части индекса с общим словарём
+    :param texts: Исходные тексты, соответствующие индексу
+    :param top_k: Количество возвращаемых текстов
+    :param min_score: Минимальная релевантность возвращаемых текстов
+    :param offset: Количество пропускаемых результатов (для постраничной выдачи)
+    :param query_tokens: Обработанные слова запроса, если запрос уже обработан
+    :return: Список текстов и их релевантности
+    """
+    validate_query(query)
+    validate_search_params(top_k, min_score, offset)
+
+    processed_query = get_processed_query(query, query_tokens)
+    with stage_timer("vectorize"):
+        query_vector = vectorizer.transform([processed_query]).toarray().ravel()
+    # Части оцениваются и отбирают свои top_k параллельно, поэтому этапы не разделяются
+    with stage_timer("score"):
+        doc_ids, scores = rank_shards(query_vector, shards, offset + top_k)
+    with stage_timer("top_k"):
+        doc_ids, scores = paginate(doc_ids, scores, offset, min_score)
+    return [(texts[i], float(score)) for i, score in zip(doc_ids, scores)]
+
+
+# Поиск релевантных текстов по квантованным оценкам
+def search_texts_impact(
+        query: str, vectorizer: Vectorizer, impact_index: ImpactIndex, tfidf_matrix: csr_matrix, texts: List[str],
+        top_k: int = 3, min_score: float = 0.0, offset: int = 0, rescore_factor: int = None,
+        query_tokens: Optional[List[str]] = None
+) -> List[Tuple[str, float]]:
+    """
+    Ищет top_k наиболее релевантных текстов для запроса: документы оцениваются целочисленно по квантованным
+    весам, а лучшие кандидаты переоцениваются точно по матрице TF-IDF
+    :param query: Текст запроса
+    :param vectorizer: Модель TF-IDF
+    :param impact_index: Индекс квантованных оценок
+    :param tfidf_matrix: Матрица TF-IDF
+    :param texts: Исходные тексты, соответствующие индексу
+    :param top_k: Количество возвращаемых текстов
+    :param min_score: Минимальная релевантность возвращаемых текстов
+    :param offset: Количество пропускаемых результатов (для постраничной выдачи)
+    :param rescore_factor: Количество переоцениваемых кандидатов на один результат, по умолчанию из настроек
+    :param query_tokens: Обработанные слова запроса, если запрос уже обработан
+    :return: Список текстов и их релевантности
+    """
+    validate_query(query)
+    validate_search_params(top_k, min_score, offset)
+
+    processed_query = get_processed_query(query, query_tokens)
+    with stage_timer("vectorize"):
+        query_vector = vectorizer.transform([processed_query])
+    with stage_timer("score"):
+        doc_ids, scores = impact_index.search(query_vector, tfidf_matrix, offset + top_k,
+                                              rescore_factor or config.IMPACT_RESCORE_FACTOR)
+    with stage_timer("top_k"):
+        doc_ids, scores = pad_with_zero_scores(doc_ids, scores, len(texts), offset + top_k)
+        doc_ids, scores = paginate(doc_ids, scores, offset, min_score)
+    return [(texts[i], float(score)) for i, score in zip(doc_ids, scores)]
+
+
+# Поиск близких по смыслу текстов по семантическому индексу
+def search_texts_semantic(
+        query: str, vectorizer: Vectorizer, semantic_index: SemanticIndex, texts: List[str], top_k: int = 3,
+        min_score: float = 0.0, offset: int = 0, n_probe: int = None, query_tokens: Optional[List[str]] = None
+) -> List[Tuple[str, float]]:
+    """
+    Ищет top_k текстов, ближайших к запросу по косинусу в пространстве LSA. В отличие от поиска по TF-IDF,
+    находит и тексты без общих с запросом лемм. Поиск приближённый: оцениваются только документы
+    n_probe списков IVF с ближайшими к запросу центроидами
+    :param query: Текст запроса
+    :param vectorizer: Модель TF-IDF
+    :param semantic_index: Семантический индекс
+    :param texts: Исходные тексты, соответствующие индексу
+    :param top_k: Количество возвращаемых текстов
+    :param min_score: Минимальная релевантность возвращаемых текстов
+    :param offset: Количество пропускаемых результатов (для постраничной выдачи)
+    :param n_probe: Количество просматриваемых списков IVF, по умолчанию берётся из настроек
+    :param query_tokens: Обработанные слова запроса, если запрос уже обработан
+    :return: Список текстов и их релевантности
+    """
+    validate_query(query)
+    validate_search_params(top_k, min_score, offset)
+
+    processed_query = get_processed_query(query, query_tokens)
+    with stage_timer("vectorize"):
+        query_vector = semantic_index.transform(vectorizer.transform([processed_query]))[0]
+    with stage_timer("score"):
+        doc_ids, scores = semantic_index.search(query_vector, offset + top_k, n_probe or config.SEMANTIC_N_PROBE)
+    with stage_timer("top_k"):
+        doc_ids, scores = pad_with_zero_scores(doc_ids, scores, len(texts), offset + top_k)
+        doc_ids, scores = paginate(doc_ids, scores, offset, min_score)
+    return [(texts[i], float(score)) for i, score in zip(doc_ids, scores)]
+
+
+def rank_batch(query_vectors: spmatrix, tfidf_matrix: csr_matrix,
+               top_k: Union[int, Sequence[int]]) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Оценивает все запросы одним произведением разреженных матриц и выбирает top_k документов
+    для каждого запроса. Матрица оценок остаётся разреженной, поэтому отбор идёт только среди
+    документов с ненулевой оценкой
+    :param query_vectors: Разреженная матрица векторов запросов (запросы x термины)
+    :param tfidf_matrix: Матрица TF-IDF (документы x термины)
+    :param top_k: Количество документов, общее для всех запросов или своё для каждого
+    :return: Номера и оценки выбранных документов для каждого запроса
+    """
+    if isinstance(top_k, int):
+        top_k = [top_k] * query_vectors.shape[0]
+    # Матрица индекса умножается слева: так её строки читаются как есть, без перестройки транспонированной
+    # матрицы на каждый пакет, а перестраивается только небольшая матрица оценок
+    scores = csr_matrix((csr_matrix(tfidf_matrix) @ csr_matrix(query_vectors).T).T)
+    # При равных оценках документы упорядочиваются по номеру
+    scores.sort_indices()
+
+    ranked = []
+    for row in range(scores.shape[0]):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        doc_ids, row_scores = scores.indices[start:end], scores.data[start:end]
+        selected = select_top_k(row_scores, top_k[row])
+        ranked.append((doc_ids[selected], row_scores[selected]))
+    return ranked
+
+
+# Пакетный поиск релевантных текстов
+def search_texts_batch(
+        queries: List[str], vectorizer: Vectorizer, tfidf_matrix: csr_matrix, texts: List[str], top_k: int = 3,
+        min_score: float = 0.0, offset: int = 0
+) -> List[List[Tuple[str, float]]]:
+    """
+    Ищет top_k наиболее релевантных текстов для каждого запроса пакета.
+    Запросы обрабатываются через nlp.pipe, векторизуются одним вызовом transform и оцениваются одним
+    произведением разреженных матриц
+    :param queries: Тексты запросов
+    :param vectorizer: Модель TF-IDF
+    :param tfidf_matrix: Матрица TF-IDF
+    :param texts: Исходные тексты, соответствующие индексу
+    :param top_k: Количество возвращаемых текстов для каждого запроса
+    :param min_score: Минимальная релевантность возвращаемых текстов
+    :param offset: Количество пропускаемых результатов для каждого запроса
+    :return: Списки текстов и их релевантности в порядке запросов
+    """
+    validate_batch(queries, top_k, min_score, offset)
+
+    with stage_timer("preprocess"):
+        processed_queries = [" ".join(tokens) for tokens in preprocess_texts_batch(queries)]
+    with stage_timer("vectorize"):
+        query_vectors = vectorizer.transform(processed_queries)
+    with stage_timer("score"):
+        ranked = rank_batch(query_vectors, tfidf_matrix, offset + top_k)
+
+    results = []
+    with stage_timer("top_k"):
+        for doc_ids, scores in ranked:
+            doc_ids, scores = pad_with_zero_scores(doc_ids, scores, len(texts), offset + top_k)
+            doc_ids, scores = paginate(doc_ids, scores, offset, min_score)
+            results.append([(texts[i], float(score)) for i, score in zip(doc_ids, scores)])
     return results
 
 
 # Получение релевантных текстов
-def get_relevant_texts(query: str, tfidf_folder: Path) -> List[Tuple[str, float]]:
+def get_relevant_texts(query: str, tfidf_folder: Path, engine: str = None, top_k: int = 3, min_score: float = 0.0,
+                       offset: int = 0, snippet_length: int = 0) -> List[Tuple[Union[str, Dict[str, str]], float]]:
     """
-    Возвращает топ-3 релевантных текста для запроса
+    Возвращает top_k релевантных текстов для запроса.
+    Индекс загружается один раз на процесс и перезагружается при изменении файлов.
+    Выдачи сохраняются в кэше по обработанным словам запроса, параметрам выдачи и версии индекса
     :param query: Текст запроса
     :param tfidf_folder: Путь к папке с TF-IDF моделью и матрицей
-    :return: Список из 3 текстов и их релевантности
+    :param engine: Движок поиска (см. SEARCH_ENGINES), по умолчанию берётся из настроек
+    :param top_k: Количество возвращаемых текстов
+    :param min_score: Минимальная релевантность возвращаемых текстов
+    :param offset: Количество пропускаемых результатов (для постраничной выдачи)
+    :param snippet_length: Длина фрагментов: если больше нуля, вместо текстов возвращаются
+        идентификаторы документов и фрагменты текстов
+    :return: Список текстов (или идентификаторов с фрагментами) и их релевантности
+    """
+    validate_query(query)
+    validate_search_params(top_k, min_score, offset)
+    validate_snippet_length(snippet_length)
+    engine = validate_engine(engine)
+
+    index = get_index_holder(tfidf_folder).get()
+    texts = get_result_texts(index, snippet_length)
+    # Запрос обрабатывается один раз — и для ключа кэша, и для поиска при промахе
+    with stage_timer("preprocess"):
+        query_tokens = preprocess_text(query)
+
+    def compute() -> List[Tuple[Union[str, Dict[str, str]], float]]:
+        if engine == "semantic":
+            return search_texts_semantic(query, index.vectorizer, get_semantic_index(index), texts,
+                                         top_k, min_score, offset, query_tokens=query_tokens)
+        if engine == "impact":
+            return search_texts_impact(query, index.vectorizer, get_impact_index(index), index.tfidf_matrix,
+                                       texts, top_k, min_score, offset, query_tokens=query_tokens)
+        if engine == "inverted":
+            return search_texts_inverted(query, index.vectorizer, index.inverted_index, texts,
+                                         top_k, min_score, offset, query_tokens)
+        if len(index.shards) > 1:
+            return search_texts_sharded(query, index.vectorizer, index.shards, texts, top_k, min_score, offset,
+                                        query_tokens)
+        return search_texts(query, index.vectorizer, index.tfidf_matrix, texts, top_k, min_score, offset, query_tokens)
+
+    cache = get_search_cache()
+    if not cache.enabled:
+        return compute()
+    key = make_search_cache_key(get_cache_index_version(tfidf_folder, index), engine, query_tokens,
+                                top_k, min_score, offset, snippet_length)
+    return cache.get_or_compute(key, compute)
+
+
+def validate_engine(engine: str = None) -> str:
+    """
+    Проверяет движок поиска
+    :param engine: Движок поиска, по умолчанию берётся из настроек
+    :return: Движок поиска
+    """
+    engine = engine or config.SEARCH_ENGINE
+    if engine not in SEARCH_ENGINES:
+        raise ValueError(f"Неизвестный движок поиска '{engine}', доступны: {', '.join(SEARCH_ENGINES)}")
+    return engine
+
+
+def get_semantic_index(index: TfidfIndex) -> SemanticIndex:
+    """
+    Возвращает семантический индекс для движка "semantic"
+    :param index: Загруженный индекс
+    :return: Семантический индекс
+    """
+    if index.semantic_index is None:
+        raise FileNotFoundError("Семантический индекс не найден: соберите индекс с параметром --lsa-components")
+    return index.semantic_index
+
+
+def get_impact_index(index: TfidfIndex) -> ImpactIndex:
+    """
+    Возвращает индекс квантованных оценок для движка "impact"
+    :param index: Загруженный индекс
+    :return: Индекс квантованных оценок
+    """
+    if index.impact_index is None:
+        raise FileNotFoundError("Индекс квантованных оценок не найден: соберите индекс с параметром --impact-bits")
+    return index.impact_index
+
+
+def get_cache_index_version(tfidf_folder: Path, index: TfidfIndex) -> str:
+    """Версия индекса для ключа кэша выдач: папка и версия файлов (или номер загрузки)"""
+    return f"{Path(tfidf_folder).resolve()}#{index.version or index.generation}"
+
+
+# Поиск по одновременным запросам, объединённым в пакет
+def get_relevant_texts_many(requests: List[SearchParams], tfidf_folder: Path,
+                            engine: str = None) -> List[Union[List[Tuple[str, float]], Exception]]:
+    """
+    Возвращает выдачи для независимых запросов со своими параметрами выдачи (см. app.text_search.batcher).
+    Выдача каждого запроса совпадает с get_relevant_texts и так же сохраняется в кэше выдач.
+    Запросы, которых нет в кэше, обрабатываются одним вызовом nlp.pipe, векторизуются одним вызовом transform
+    и оцениваются одним произведением разреженных матриц (в движках "inverted", "semantic" и "impact" —
+    каждый по своему индексу). Ошибка в параметрах одного запроса не мешает остальным: вместо его выдачи
+    возвращается исключение
+    :param requests: Запросы с параметрами выдачи
+    :param tfidf_folder: Путь к папке с TF-IDF моделью и матрицей
+    :param engine: Движок поиска (см. SEARCH_ENGINES), по умолчанию берётся из настроек
+    :return: Списки текстов и их релевантности (или исключения) в порядке запросов
     """
-    model_path = tfidf_folder / "tfidf_model.pkl"
-    matrix_path = tfidf_folder / "tfidf_matrix.pkl"
-    texts_path = tfidf_folder / "texts.pkl"
+    engine = validate_engine(engine)
+    index = get_index_holder(tfidf_folder).get()
+    semantic_index = get_semantic_index(index) if engine == "semantic" else None
+    impact_index = get_impact_index(index) if engine == "impact" else None
+
+    results: List[Union[List[Tuple[str, float]], Exception, None]] = [None] * len(requests)
+    valid = []
+    for i, request in enumerate(requests):
+        try:
+            validate_query(request.query)
+            validate_search_params(request.top_k, request.min_score, request.offset)
+            validate_snippet_length(request.snippet_length)
+            valid.append(i)
+        except ValueError as e:
+            results[i] = e
 
-    # Проверяем наличие всех необходимых файлов
-    missing_files = []
-    for file_path, description in [(model_path, "модель TF-IDF"),
-                                   (matrix_path, "матрица TF-IDF"),
-                                   (texts_path, "исходные тексты")]:
-        if not file_path.exists():
-            missing_files.append(f"{description} ({file_path})")
+    with stage_timer("preprocess"):
+        tokens = preprocess_texts_many([requests[i].query for i in valid])
 
-    if missing_files:
-        raise FileNotFoundError(f"Следующие файлы не найдены: {', '.join(missing_files)}")
+    cache = get_search_cache()
+    index_version = get_cache_index_version(tfidf_folder, index)
+    keys = {}
+    missing = []
+    for i, query_tokens in zip(valid, tokens):
+        request = requests[i]
+        if cache.enabled:
+            keys[i] = make_search_cache_key(index_version, engine, query_tokens, request.top_k, request.min_score,
+                                            request.offset, request.snippet_length)
+            results[i] = cache.get(keys[i])
+        if results[i] is None:
+            missing.append((i, " ".join(query_tokens)))
+    if not missing:
+        return results
 
-    vectorizer, tfidf_matrix = load_tfidf_model_and_index(model_path, matrix_path)
-    with open(texts_path, "rb") as texts_file:
-        texts = pickle.load(texts_file)
-    results = search_texts(query, vectorizer, tfidf_matrix, texts)
+    start = time.perf_counter()
+    limits = [requests[i].offset + requests[i].top_k for i, _ in missing]
+    with stage_timer("vectorize"):
+        query_vectors = index.vectorizer.transform([processed_query for _, processed_query in missing])
+        if semantic_index is not None:
+            query_vectors = semantic_index.transform(query_vectors)
+    with stage_timer("score"):
+        if semantic_index is not None:
+            ranked = [semantic_index.search(query_vectors[row], limit, config.SEMANTIC_N_PROBE)
+                      for row, limit in enumerate(limits)]
+        elif impact_index is not None:
+            ranked = [impact_index.search(query_vectors[row], index.tfidf_matrix, limit, config.IMPACT_RESCORE_FACTOR)
+                      for row, limit in enumerate(limits)]
+        elif engine == "inverted":
+            ranked = [index.inverted_index.search(query_vectors[row], limit) for row, limit in enumerate(limits)]
+        elif len(missing) == 1:
+            # Один запрос быстрее оценить умножением матрицы на плотный вектор, как в search_texts
+            similarities = compute_similarities(query_vectors, index.tfidf_matrix).ravel()
+            selected = select_top_k(similarities, limits[0])
+            ranked = [(selected, similarities[selected])]
+        else:
+            ranked = rank_batch(query_vectors, index.tfidf_matrix, limits)
 
+    with stage_timer("top_k"):
+        for (i, _), limit, (doc_ids, scores) in zip(missing, limits, ranked):
+            doc_ids, scores = pad_with_zero_scores(doc_ids, scores, len(index.texts), limit)
+            doc_ids, scores = paginate(doc_ids, scores, requests[i].offset, requests[i].min_score)
+            texts = get_result_texts(index, requests[i].snippet_length)
+            results[i] = [(texts[doc_id], float(score)) for doc_id, score in zip(doc_ids, scores)]
+
+    # Время оценки пакета делится поровну между вычисленными выдачами
+    cost = (time.perf_counter() - start) / len(missing)
+    for i, _ in missing:
+        if i in keys:
+            cache.put(keys[i], results[i], cost)
     return results
+
+
+# Пакетное получение релевантных текстов
+def get_relevant_texts_batch(queries: List[str], tfidf_folder: Path, top_k: int = 3, min_score: float = 0.0,
+                             offset: int = 0) -> List[List[Tuple[str, float]]]:
+    """
+    Возвращает top_k релевантных текстов для каждого запроса пакета
+    :param queries: Тексты запросов
+    :param tfidf_folder: Путь к папке с TF-IDF моделью и матрицей
+    :param top_k: Количество возвращаемых текстов для каждого запроса
+    :param min_score: Минимальная релевантность возвращаемых текстов
+    :param offset: Количество пропускаемых результатов для каждого запроса
+    :return: Списки текстов и их релевантности в порядке запросов
+    """
+    validate_batch(queries, top_k, min_score, offset)
+    index = get_index_holder(tfidf_folder).get()
+    return search_texts_batch(queries, index.vectorizer, index.tfidf_matrix, index.texts, top_k, min_score, offset)
+
+
+# Получение текста документа по идентификатору
+def get_document(doc_id: str, tfidf_folder: Path) -> Optional[str]:
+    """
+    Возвращает полный текст документа по идентификатору, например для результата выдачи с фрагментом.
+    Из сжатого хранилища распаковывается только блок с этим документом
+    :param doc_id: Идентификатор документа
+    :param tfidf_folder: Путь к папке с TF-IDF моделью и матрицей
+    :return: Текст документа или None, если документа нет
+    """
+    index = get_index_holder(tfidf_folder).get()
+    doc = index.find_document(doc_id)
+    return index.texts[doc] if doc is not None else None
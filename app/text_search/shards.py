@@ -0,0 +1,109 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from app import config
+from app.text_search.ranking import select_top_k, top_k_by_score
+
+
+@dataclass(frozen=True)
+class Shard:
+    """Часть индекса: подряд идущие документы с общим для всех частей словарём и IDF"""
+    start: int
+    tfidf_matrix: csr_matrix
+
+    @property
+    def n_docs(self) -> int:
+        return self.tfidf_matrix.shape[0]
+
+
+def get_shard_bounds(tfidf_matrix: csr_matrix, n_shards: int) -> np.ndarray:
+    """
+    Делит документы индекса на n_shards частей с примерно равным количеством ненулевых элементов,
+    от которого зависит время оценки части
+    :param tfidf_matrix: Матрица TF-IDF
+    :param n_shards: Количество частей
+    :return: Границы частей: номера первых документов и общее количество документов в конце
+    """
+    if n_shards < 1:
+        raise ValueError("Количество частей индекса должно быть положительным")
+    n_docs = tfidf_matrix.shape[0]
+    n_shards = min(n_shards, max(n_docs, 1))
+    targets = np.linspace(0, tfidf_matrix.indptr[-1], n_shards + 1)[1:-1]
+    inner = np.searchsorted(tfidf_matrix.indptr, targets).astype(np.int64)
+    # Границы сдвигаются так, чтобы ни одна часть не оказалась пустой
+    steps = np.arange(1, n_shards)
+    inner = np.clip(np.maximum.accumulate(inner - steps), 0, n_docs - n_shards) + steps
+    return np.concatenate([[0], inner, [n_docs]]).astype(np.int64)
+
+
+def split_shards(tfidf_matrix: csr_matrix, bounds: Sequence[int]) -> List[Shard]:
+    """
+    Разбивает матрицу индекса на части по строкам без копирования данных и номеров столбцов
+    :param tfidf_matrix: Матрица TF-IDF
+    :param bounds: Границы частей (см. get_shard_bounds)
+    :return: Части индекса
+    """
+    bounds = np.asarray(bounds, dtype=np.int64)
+    if len(bounds) < 2 or bounds[0] != 0 or bounds[-1] != tfidf_matrix.shape[0] or np.any(np.diff(bounds) < 0):
+        raise ValueError("Границы частей индекса не соответствуют матрице TF-IDF")
+
+    data, indices, indptr = tfidf_matrix.data, tfidf_matrix.indices, tfidf_matrix.indptr
+    shards = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        first, last = indptr[start], indptr[end]
+        # Конструктор csr_matrix копирует срезы, которые меньше половины исходного массива,
+        # поэтому массивы присваиваются напрямую и части ссылаются на страницы общего индекса
+        matrix = csr_matrix((int(end - start), tfidf_matrix.shape[1]), dtype=data.dtype)
+        matrix.data, matrix.indices = data[first:last], indices[first:last]
+        matrix.indptr = indptr[start:end + 1] - first
+        shards.append(Shard(int(start), matrix))
+    return shards
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_shard_pool() -> ThreadPoolExecutor:
+    """
+    Возвращает общий для процесса пул потоков для оценки частей индекса. Умножение разреженной
+    матрицы на вектор и argpartition выполняются без GIL, поэтому части оцениваются на разных ядрах
+    :return: Пул потоков
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=config.SEARCH_THREADS, thread_name_prefix="shard")
+        return _pool
+
+
+def _rank_shard(shard: Shard, query_vector: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Оценивает документы части и выбирает её top_k"""
+    scores = np.asarray(shard.tfidf_matrix @ query_vector).ravel()
+    selected = select_top_k(scores, top_k)
+    return selected + shard.start, scores[selected]
+
+
+def rank_shards(query_vector: np.ndarray, shards: Sequence[Shard], top_k: int,
+                pool: Optional[ThreadPoolExecutor] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Оценивает части индекса параллельно и объединяет их top_k. Лучшие top_k документов индекса
+    входят в top_k своих частей, поэтому оценки совпадают с оценкой всей матрицы (при равных оценках
+    на границе выдачи, как и в select_top_k, может быть выбран любой из документов)
+    :param query_vector: Плотный вектор запроса
+    :param shards: Части индекса
+    :param top_k: Количество документов
+    :param pool: Пул потоков (по умолчанию общий для процесса)
+    :return: Номера и оценки документов по убыванию оценки (при равенстве — по возрастанию номера)
+    """
+    if len(shards) == 1:
+        ranked = [_rank_shard(shards[0], query_vector, top_k)]
+    else:
+        pool = pool or get_shard_pool()
+        ranked = list(pool.map(lambda shard: _rank_shard(shard, query_vector, top_k), shards))
+    doc_ids = np.concatenate([doc_ids for doc_ids, _ in ranked])
+    scores = np.concatenate([scores for _, scores in ranked])
+    return top_k_by_score(doc_ids, scores, top_k)
@@ -0,0 +1,405 @@
+import json
+import mmap
+import os
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from scipy.sparse import csr_matrix
+from app.text_search.doc_store import DEFAULT_CACHE_BLOCKS, CompressedTextStore, CompressedTextStoreWriter
+from app.text_search.hashing import HashingTfidfVectorizer
+from app.text_search.impact_index import ImpactIndex
+from app.text_search.semantic import SemanticIndex
+
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Формат индекса без pickle: массивы CSR матрицы и IDF хранятся в файлах .npy и открываются через mmap,
+# поэтому процессы-обработчики делят страницы в кэше ОС, а не держат собственные копии
+FORMAT_NAME = "tfidf-npy"
+FORMAT_VERSION = 1
+
+# Файл с именем активного снимка индекса; подменяется атомарно после записи снимка целиком
+CURRENT_FILE = "CURRENT"
+SNAPSHOT_PREFIX = "index-"
+
+META_FILE = "meta.json"
+DATA_FILE = "data.npy"
+INDICES_FILE = "indices.npy"
+INDPTR_FILE = "indptr.npy"
+IDF_FILE = "idf.npy"
+VOCABULARY_FILE = "vocabulary.txt"
+TEXTS_BLOB_FILE = "texts.bin"
+TEXTS_OFFSETS_FILE = "texts_offsets.npy"
+DOC_IDS_BLOB_FILE = "doc_ids.bin"
+DOC_IDS_OFFSETS_FILE = "doc_ids_offsets.npy"
+# Номера документов в порядке возрастания идентификаторов для поиска документа по идентификатору
+DOC_IDS_ORDER_FILE = "doc_ids_order.npy"
+
+# Тексты, сжатые блоками (смещения текстов — в TEXTS_OFFSETS_FILE, как и без сжатия)
+TEXTS_BLOCKS_FILE = "texts_blocks.bin"
+TEXTS_BLOCK_OFFSETS_FILE = "texts_block_offsets.npy"
+TEXTS_BLOCK_DOCS_FILE = "texts_block_docs.npy"
+
+# Файлы семантического индекса (необязательного): проекция LSA, центроиды и списки IVF
+LSA_COMPONENTS_FILE = "lsa_components.npy"
+LSA_VECTORS_FILE = "lsa_vectors.npy"
+IVF_CENTROIDS_FILE = "ivf_centroids.npy"
+IVF_ORDER_FILE = "ivf_order.npy"
+IVF_OFFSETS_FILE = "ivf_offsets.npy"
+SEMANTIC_FILES = (LSA_COMPONENTS_FILE, IVF_CENTROIDS_FILE, LSA_VECTORS_FILE, IVF_ORDER_FILE, IVF_OFFSETS_FILE)
+
+# Файлы индекса квантованных оценок (необязательного): списки документов терминов и оценки uint8 или uint16
+IMPACT_INDPTR_FILE = "impact_indptr.npy"
+IMPACT_DOC_IDS_FILE = "impact_doc_ids.npy"
+IMPACT_SCORES_FILE = "impact_scores.npy"
+
+# Типы моделей: "tfidf" — TfidfVectorizer со словарём, "hashing" — TF-IDF на хэшированных признаках без словаря
+VECTORIZER_TYPES = ("tfidf", "hashing")
+
+Vectorizer = Union["TfidfVectorizer", HashingTfidfVectorizer]
+
+
+class TextStore(Sequence):
+    """
+    Тексты документов в одном файле UTF-8 с массивом смещений начала каждого текста.
+    Файл открывается через mmap, текст декодируется только при обращении к нему
+    """
+
+    def __init__(self, blob_path: Path, offsets_path: Path):
+        self.offsets = np.load(offsets_path, mmap_mode="r")
+        with open(blob_path, "rb") as blob_file:
+            # mmap пустого файла невозможен
+            self._blob = mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ) \
+                if os.fstat(blob_file.fileno()).st_size else b""
+        if len(self.offsets) == 0 or int(self.offsets[-1]) != len(self._blob):
+            raise ValueError(f"Файлы текстов '{blob_path}' и '{offsets_path}' не согласованы между собой")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Номер документа вне диапазона")
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self._blob[start:end].decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+class TextStoreWriter:
+    """Последовательно записывает тексты в файлы TextStore, не накапливая их в памяти"""
+
+    def __init__(self, blob_path: Path, offsets_path: Path):
+        self.offsets_path = offsets_path
+        self.offsets = [0]
+        self._blob_file = open(blob_path, "wb")
+
+    def append(self, text: str):
+        """Дописывает текст"""
+        self.offsets.append(self.offsets[-1] + self._blob_file.write(text.encode("utf-8")))
+
+    def close(self):
+        """Завершает запись и сохраняет смещения"""
+        if not self._blob_file.closed:
+            self._blob_file.close()
+            np.save(self.offsets_path, np.array(self.offsets, dtype=np.int64))
+
+    def __enter__(self) -> "TextStoreWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_texts(blob_path: Path, offsets_path: Path, texts: Iterable[str]):
+    """
+    Записывает тексты одним блоком UTF-8 и массивом смещений начала каждого текста для TextStore
+    :param blob_path: Путь к файлу с текстами
+    :param offsets_path: Путь к файлу со смещениями
+    :param texts: Тексты
+    """
+    with TextStoreWriter(blob_path, offsets_path) as writer:
+        for text in texts:
+            writer.append(text)
+
+
+def get_doc_ids_order(doc_ids: Iterable[str]) -> np.ndarray:
+    """
+    Возвращает номера документов в порядке возрастания идентификаторов (при равных — по номеру)
+    :param doc_ids: Идентификаторы документов
+    :return: Номера документов
+    """
+    return np.argsort(np.array(list(doc_ids), dtype=object), kind="stable").astype(np.int64)
+
+
+def get_snapshot_folder(tfidf_folder: Path) -> Optional[Path]:
+    """
+    Возвращает папку активного снимка индекса
+    :param tfidf_folder: Путь к папке индекса
+    :return: Путь к папке снимка или None, если индекс в этом формате не сохранялся
+    """
+    current_path = tfidf_folder / CURRENT_FILE
+    try:
+        name = current_path.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    if not name.startswith(SNAPSHOT_PREFIX) or "/" in name or "\\" in name:
+        raise ValueError(f"Некорректное имя снимка индекса в файле '{current_path}'")
+    return tfidf_folder / name
+
+
+def get_n_features(vectorizer: Vectorizer) -> int:
+    """
+    Возвращает количество признаков модели (столбцов матрицы TF-IDF)
+    :param vectorizer: Модель TF-IDF
+    :return: Размер словаря или количество хэшированных признаков
+    """
+    if isinstance(vectorizer, HashingTfidfVectorizer):
+        return vectorizer.n_features
+    return len(vectorizer.vocabulary_)
+
+
+def _vectorizer_params(vectorizer: "TfidfVectorizer") -> dict:
+    """Возвращает параметры модели TF-IDF в виде, пригодном для JSON"""
+    params = vectorizer.get_params()
+    params["dtype"] = np.dtype(params["dtype"]).name
+    # Словарь сохраняется отдельно в порядке столбцов матрицы
+    params["vocabulary"] = None
+    if isinstance(params["stop_words"], (set, frozenset)):
+        params["stop_words"] = sorted(params["stop_words"])
+    unsupported = [name for name, value in params.items() if callable(value)]
+    if unsupported:
+        raise ValueError(f"Параметры модели TF-IDF не сохраняются без pickle: {', '.join(unsupported)}")
+    return params
+
+
+def _write_snapshot(folder: Path, vectorizer: Vectorizer, tfidf_matrix: csr_matrix, texts: Sequence[str],
+                    doc_ids: Optional[Sequence[str]], shard_bounds: Optional[Sequence[int]],
+                    semantic_index: Optional[SemanticIndex], impact_index: Optional[ImpactIndex],
+                    text_block_size: int):
+    """Записывает файлы снимка индекса в папку"""
+    tfidf_matrix = csr_matrix(tfidf_matrix)
+    tfidf_matrix.sort_indices()
+    np.save(folder / DATA_FILE, tfidf_matrix.data)
+    np.save(folder / INDICES_FILE, tfidf_matrix.indices)
+    np.save(folder / INDPTR_FILE, tfidf_matrix.indptr)
+    if isinstance(vectorizer, HashingTfidfVectorizer):
+        # Словаря нет, IDF хранится плотным массивом по всем признакам
+        vectorizer_type, params = "hashing", vectorizer.get_params()
+        np.save(folder / IDF_FILE, vectorizer.idf_)
+    else:
+        vectorizer_type, params = "tfidf", _vectorizer_params(vectorizer)
+        if vectorizer.use_idf:
+            np.save(folder / IDF_FILE, vectorizer.idf_)
+
+        # Словарь — термины по одному на строку в порядке столбцов матрицы
+        terms = vectorizer.get_feature_names_out()
+        if any("\n" in term for term in terms):
+            raise ValueError("Термины словаря не должны содержать перевод строки")
+        (folder / VOCABULARY_FILE).write_text("".join(f"{term}\n" for term in terms), encoding="utf-8")
+
+    if text_block_size:
+        with CompressedTextStoreWriter(folder / TEXTS_BLOCKS_FILE, folder / TEXTS_OFFSETS_FILE,
+                                       folder / TEXTS_BLOCK_OFFSETS_FILE, folder / TEXTS_BLOCK_DOCS_FILE,
+                                       text_block_size) as writer:
+            for text in texts:
+                writer.append(text)
+    else:
+        write_texts(folder / TEXTS_BLOB_FILE, folder / TEXTS_OFFSETS_FILE, texts)
+    if doc_ids is not None:
+        write_texts(folder / DOC_IDS_BLOB_FILE, folder / DOC_IDS_OFFSETS_FILE, doc_ids)
+        np.save(folder / DOC_IDS_ORDER_FILE, get_doc_ids_order(doc_ids))
+    if semantic_index is not None:
+        arrays = (semantic_index.components, semantic_index.centroids, semantic_index.vectors,
+                  semantic_index.order, semantic_index.offsets)
+        for name, array in zip(SEMANTIC_FILES, arrays):
+            np.save(folder / name, array)
+    if impact_index is not None:
+        np.save(folder / IMPACT_INDPTR_FILE, impact_index.indptr)
+        np.save(folder / IMPACT_DOC_IDS_FILE, impact_index.doc_ids)
+        np.save(folder / IMPACT_SCORES_FILE, impact_index.impacts)
+
+    meta = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "n_docs": tfidf_matrix.shape[0],
+        "n_features": tfidf_matrix.shape[1],
+        "vectorizer_type": vectorizer_type,
+        "vectorizer": params,
+    }
+    if shard_bounds is not None:
+        meta["shards"] = [int(bound) for bound in shard_bounds]
+    if semantic_index is not None:
+        meta["semantic"] = {"n_components": semantic_index.n_components, "n_lists": semantic_index.n_lists}
+    if impact_index is not None:
+        meta["impact"] = {"bits": impact_index.bits, "scale": impact_index.scale}
+    if text_block_size:
+        meta["texts"] = {"compression": "zlib", "block_size": text_block_size}
+    (folder / META_FILE).write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def save_index(tfidf_folder: Path, vectorizer: Vectorizer, tfidf_matrix: csr_matrix, texts: Sequence[str],
+               doc_ids: Optional[Sequence[str]] = None, shard_bounds: Optional[Sequence[int]] = None,
+               semantic_index: Optional[SemanticIndex] = None, impact_index: Optional[ImpactIndex] = None,
+               text_block_size: int = 0) -> Path:
+    """
+    Сохраняет индекс новым снимком и атомарно делает его активным, чтобы работающий сервер
+    не прочитал индекс, записанный наполовину. Старые снимки, кроме предыдущего, удаляются
+    :param tfidf_folder: Путь к папке индекса
+    :param vectorizer: Модель TF-IDF
+    :param tfidf_matrix: Матрица TF-IDF
+    :param texts: Исходные тексты, соответствующие индексу
+    :param doc_ids: Идентификаторы документов (необязательно)
+    :param shard_bounds: Границы частей индекса для параллельного поиска (необязательно)
+    :param semantic_index: Семантический индекс LSA + IVF (необязательно)
+    :param impact_index: Индекс квантованных оценок (необязательно)
+    :param text_block_size: Размер блока для сжатия текстов (0 — тексты хранятся без сжатия)
+    :return: Путь к папке нового снимка
+    """
+    if tfidf_matrix.shape != (len(texts), get_n_features(vectorizer)):
+        raise ValueError("Размеры матрицы TF-IDF не соответствуют текстам и словарю модели")
+    if doc_ids is not None and len(doc_ids) != len(texts):
+        raise ValueError("Количество идентификаторов документов не соответствует количеству текстов")
+    if shard_bounds is not None and (len(shard_bounds) < 2 or shard_bounds[0] != 0
+                                     or shard_bounds[-1] != len(texts) or np.any(np.diff(shard_bounds) < 0)):
+        raise ValueError("Границы частей индекса не соответствуют количеству текстов")
+    if semantic_index is not None and (semantic_index.n_docs, semantic_index.n_features) != tfidf_matrix.shape:
+        raise ValueError("Размеры семантического индекса не соответствуют матрице TF-IDF")
+    if impact_index is not None and (impact_index.n_docs, impact_index.n_terms) != tfidf_matrix.shape:
+        raise ValueError("Размеры индекса квантованных оценок не соответствуют матрице TF-IDF")
+    if text_block_size < 0:
+        raise ValueError("Размер блока текстов не может быть отрицательным")
+
+    tfidf_folder.mkdir(parents=True, exist_ok=True)
+    snapshots = sorted(path for path in tfidf_folder.glob(f"{SNAPSHOT_PREFIX}*") if path.is_dir())
+    numbers = [int(path.name[len(SNAPSHOT_PREFIX):]) for path in snapshots
+               if path.name[len(SNAPSHOT_PREFIX):].isdigit()]
+    snapshot = tfidf_folder / f"{SNAPSHOT_PREFIX}{max(numbers, default=0) + 1:06d}"
+    snapshot.mkdir()
+    try:
+        _write_snapshot(snapshot, vectorizer, tfidf_matrix, texts, doc_ids, shard_bounds, semantic_index,
+                        impact_index, text_block_size)
+    except Exception:
+        shutil.rmtree(snapshot, ignore_errors=True)
+        raise
+
+    previous = get_snapshot_folder(tfidf_folder)
+    tmp_path = tfidf_folder / f"{CURRENT_FILE}.tmp"
+    tmp_path.write_text(snapshot.name, encoding="utf-8")
+    os.replace(tmp_path, tfidf_folder / CURRENT_FILE)
+
+    # Предыдущий снимок остаётся для процессов, которые ещё не перечитали CURRENT
+    for path in snapshots:
+        if path != previous:
+            shutil.rmtree(path, ignore_errors=True)
+    return snapshot
+
+
+def load_snapshot(folder: Path, cache_blocks: int = DEFAULT_CACHE_BLOCKS
+                  ) -> Tuple[Vectorizer, csr_matrix, Union[TextStore, CompressedTextStore]]:
+    """
+    Загружает снимок индекса: массивы матрицы и тексты открываются через mmap без копирования в память процесса
+    :param folder: Путь к папке снимка
+    :param cache_blocks: Количество распакованных блоков сжатых текстов в кэше
+    :return: Модель TF-IDF, матрица индекса и тексты
+    """
+    meta_path = folder / META_FILE
+    if not meta_path.exists():
+        raise FileNotFoundError(f"Следующие файлы не найдены: описание индекса ({meta_path})")
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    if meta.get("format") != FORMAT_NAME or meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемый формат индекса {meta.get('format')} версии {meta.get('version')} "
+                         f"в папке '{folder}'")
+
+    shape = (meta["n_docs"], meta["n_features"])
+    data, indices, indptr = (np.load(folder / name, mmap_mode="r") for name in (DATA_FILE, INDICES_FILE, INDPTR_FILE))
+    tfidf_matrix = csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+    vectorizer_type = meta.get("vectorizer_type", "tfidf")
+    if vectorizer_type not in VECTORIZER_TYPES:
+        raise ValueError(f"Неподдерживаемый тип модели TF-IDF '{vectorizer_type}' в папке '{folder}'")
+    params = dict(meta["vectorizer"])
+    if vectorizer_type == "hashing":
+        # Плотный IDF по всем признакам открывается через mmap, как и массивы матрицы
+        vectorizer = HashingTfidfVectorizer(params["n_features"], np.load(folder / IDF_FILE, mmap_mode="r"))
+    else:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        params["dtype"] = np.dtype(params["dtype"]).type
+        params["ngram_range"] = tuple(params["ngram_range"])
+        vectorizer = TfidfVectorizer(**params)
+        terms = (folder / VOCABULARY_FILE).read_text(encoding="utf-8").split("\n")[:-1]
+        vectorizer.vocabulary_ = {term: i for i, term in enumerate(terms)}
+        if vectorizer.use_idf:
+            vectorizer.idf_ = np.load(folder / IDF_FILE)
+
+    if "texts" in meta:
+        texts = CompressedTextStore(folder / TEXTS_BLOCKS_FILE, folder / TEXTS_OFFSETS_FILE,
+                                    folder / TEXTS_BLOCK_OFFSETS_FILE, folder / TEXTS_BLOCK_DOCS_FILE, cache_blocks)
+    else:
+        texts = TextStore(folder / TEXTS_BLOB_FILE, folder / TEXTS_OFFSETS_FILE)
+    return vectorizer, tfidf_matrix, texts
+
+
+def load_snapshot_shard_bounds(folder: Path) -> Optional[np.ndarray]:
+    """
+    Загружает границы частей индекса снимка
+    :param folder: Путь к папке снимка
+    :return: Границы частей или None, если индекс сохранён одной частью
+    """
+    shards = json.loads((folder / META_FILE).read_text(encoding="utf-8")).get("shards")
+    return np.asarray(shards, dtype=np.int64) if shards is not None else None
+
+
+def load_snapshot_doc_ids(folder: Path) -> Optional[TextStore]:
+    """
+    Загружает идентификаторы документов снимка
+    :param folder: Путь к папке снимка
+    :return: Идентификаторы документов или None, если они не сохранялись
+    """
+    if not (folder / DOC_IDS_OFFSETS_FILE).exists():
+        return None
+    return TextStore(folder / DOC_IDS_BLOB_FILE, folder / DOC_IDS_OFFSETS_FILE)
+
+
+def load_snapshot_semantic_index(folder: Path) -> Optional[SemanticIndex]:
+    """
+    Загружает семантический индекс снимка; массивы открываются через mmap, как и матрица TF-IDF
+    :param folder: Путь к папке снимка
+    :return: Семантический индекс или None, если индекс собран без него
+    """
+    if "semantic" not in json.loads((folder / META_FILE).read_text(encoding="utf-8")):
+        return None
+    return SemanticIndex(*(np.load(folder / name, mmap_mode="r") for name in SEMANTIC_FILES))
+
+
+def load_snapshot_impact_index(folder: Path) -> Optional[ImpactIndex]:
+    """
+    Загружает индекс квантованных оценок снимка; массивы открываются через mmap
+    :param folder: Путь к папке снимка
+    :return: Индекс квантованных оценок или None, если индекс собран без него
+    """
+    meta = json.loads((folder / META_FILE).read_text(encoding="utf-8"))
+    if "impact" not in meta:
+        return None
+    indptr, doc_ids, impacts = (np.load(folder / name, mmap_mode="r")
+                                for name in (IMPACT_INDPTR_FILE, IMPACT_DOC_IDS_FILE, IMPACT_SCORES_FILE))
+    return ImpactIndex(meta["n_docs"], indptr, doc_ids, impacts, meta["impact"]["scale"])
+
+
+def load_snapshot_doc_ids_order(folder: Path) -> Optional[np.ndarray]:
+    """
+    Загружает порядок идентификаторов документов снимка
+    :param folder: Путь к папке снимка
+    :return: Номера документов в порядке возрастания идентификаторов или None, если порядок не сохранялся
+    """
+    if not (folder / DOC_IDS_ORDER_FILE).exists():
+        return None
+    return np.load(folder / DOC_IDS_ORDER_FILE, mmap_mode="r")
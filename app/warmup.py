@@ -0,0 +1,136 @@
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from app import config
+from app.executor import TaskExecutor
+
+# Режимы прогрева при старте приложения
+WARM_UP_MODES = ("background", "blocking", "lazy")
+
+# Текст, которым прогревается конвейер предобработки
+WARM_UP_TEXT = "Прогрев модели перед первым запросом"
+
+
+@dataclass
+class WarmUpReport:
+    """Итоги прогрева одного процесса"""
+    # Время загрузки по компонентам в секундах: "preprocessor" — модель spaCy, "index" — TF-IDF индекс
+    seconds: Dict[str, float] = field(default_factory=dict)
+    # Ошибки по компонентам
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """Без модели предобработка невозможна; без индекса работает предобработка, а индекс может появиться позже"""
+        return "preprocessor" not in self.errors
+
+
+def warm_up(tfidf_folder: Optional[Path] = None) -> WarmUpReport:
+    """
+    Загружает в текущем процессе модель spaCy и TF-IDF индекс вместе со структурами движка поиска из настроек
+    и один раз прогоняет через них текст, чтобы первый запрос не ждал загрузки.
+    Ошибки не выбрасываются, а записываются в итоги
+    :param tfidf_folder: Путь к папке индекса (по умолчанию из настроек)
+    :return: Итоги прогрева
+    """
+    from app.text_processing.service import get_preprocessor
+    from app.text_search.index import get_index_holder
+    from app.text_search.service import get_impact_index, get_semantic_index
+
+    report = WarmUpReport()
+    start = time.perf_counter()
+    try:
+        get_preprocessor().preprocess(WARM_UP_TEXT)
+    except Exception as e:
+        report.errors["preprocessor"] = f"{type(e).__name__}: {e}"
+    report.seconds["preprocessor"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        index = get_index_holder(tfidf_folder or config.TFIDF_FOLDER).get()
+        index.vectorizer.transform([WARM_UP_TEXT])
+        # Структуры движка поиска строятся при первом обращении
+        if config.SEARCH_ENGINE == "inverted":
+            index.inverted_index
+        elif config.SEARCH_ENGINE == "semantic":
+            get_semantic_index(index)
+        elif config.SEARCH_ENGINE == "impact":
+            get_impact_index(index)
+        else:
+            index.shards
+    except Exception as e:
+        report.errors["index"] = f"{type(e).__name__}: {e}"
+    report.seconds["index"] = time.perf_counter() - start
+    return report
+
+
+class Readiness:
+    """
+    Состояние прогрева приложения для эндпоинта /ready: "starting" — прогрев идёт, "ready" — модель
+    загружена во всех процессах, "failed" — модель загрузить не удалось
+    """
+
+    def __init__(self):
+        self.status = "starting"
+        self.seconds: Optional[float] = None
+        self.reports: List[WarmUpReport] = []
+        self.error: Optional[str] = None
+        self._started = time.perf_counter()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def start(self):
+        """Отмечает начало прогрева"""
+        self.status = "starting"
+        self.seconds = None
+        self.reports = []
+        self.error = None
+        self._started = time.perf_counter()
+
+    def finish(self, reports: List[WarmUpReport]):
+        """Отмечает окончание прогрева по итогам всех процессов"""
+        self.reports = reports
+        self.seconds = time.perf_counter() - self._started
+        self.status = "ready" if all(report.ok for report in reports) else "failed"
+
+    def fail(self, error: Exception):
+        """Отмечает прогрев, прерванный ошибкой"""
+        self.error = f"{type(error).__name__}: {error}"
+        self.seconds = time.perf_counter() - self._started
+        self.status = "failed"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Состояние для ответа эндпоинта"""
+        state = {"status": self.status, "seconds": self.seconds, "workers": [asdict(report) for report in self.reports]}
+        if self.error is not None:
+            state["error"] = self.error
+        return state
+
+
+readiness = Readiness()
+
+
+def get_readiness() -> Readiness:
+    """Возвращает состояние прогрева приложения"""
+    return readiness
+
+
+async def run_warm_up(executor: TaskExecutor, state: Readiness):
+    """
+    Прогревает обработчики исполнителя и записывает итоги в состояние прогрева
+    :param executor: Исполнитель приложения
+    :param state: Состояние прогрева
+    """
+    state.start()
+    try:
+        reports = await executor.warm_up()
+    except Exception as e:
+        state.fail(e)
+        return
+    state.finish(reports)
+    for report in reports:
+        for component, error in report.errors.items():
+            print(f"Прогрев: компонент {component} не загружен: {error}")
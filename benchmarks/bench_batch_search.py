@@ -0,0 +1,54 @@
+"""
+Сравнение оценки пакета запросов по одному и одним произведением разреженных матриц.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_batch_search --docs 100000 --batch 500
+"""
+import argparse
+import time
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.text_search.ranking import top_k_by_score
+from app.text_search.service import compute_similarities, rank_batch
+from benchmarks.synthetic import make_corpus, make_queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение поиска по одному запросу и пакетом")
+    parser.add_argument("--docs", type=int, default=100000, help="Количество документов")
+    parser.add_argument("--vocab", type=int, default=50000, help="Размер словаря")
+    parser.add_argument("--batch", type=int, default=500, help="Количество запросов в пакете")
+    parser.add_argument("--top-k", type=int, default=3, help="Количество результатов")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.docs, args.vocab)
+    vectorizer = TfidfVectorizer(norm="l2")
+    matrix = vectorizer.fit_transform(corpus).tocsr()
+    queries = make_queries(args.batch, args.vocab)
+
+    # По одному запросу: отдельные transform и умножение на матрицу для каждого запроса
+    start = time.perf_counter()
+    single = []
+    for query in queries:
+        scores = compute_similarities(vectorizer.transform([query]), matrix).ravel()
+        single.append(top_k_by_score(np.arange(args.docs), scores, args.top_k))
+    single_time = time.perf_counter() - start
+
+    # Пакетом: один transform и одно произведение разреженных матриц
+    start = time.perf_counter()
+    batch = rank_batch(vectorizer.transform(queries), matrix, args.top_k)
+    batch_time = time.perf_counter() - start
+
+    # Документы с нулевой оценкой при переборе не сравниваются
+    matches = sum(np.array_equal(doc_ids[scores > 0], found)
+                  for (doc_ids, scores), (found, _) in zip(single, batch))
+
+    print(f"Документов: {args.docs}, запросов в пакете: {args.batch}")
+    print(f"{'':12}{'Пакет, мс':>12}{'Запрос, мс':>14}")
+    print(f"{'По одному':12}{single_time * 1000:>12.1f}{single_time / args.batch * 1000:>14.3f}")
+    print(f"{'Пакетом':12}{batch_time * 1000:>12.1f}{batch_time / args.batch * 1000:>14.3f}")
+    print(f"Ускорение: x{single_time / batch_time:.1f}, совпадение результатов: {matches / args.batch:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Объединение одновременных запросов /api/search в пакеты: пропускная способность и задержка при разном
+количестве параллельных клиентов без объединения и с ним. Запросы отправляются приложению в том же
+процессе (транспорт ASGI), кэш выдач отключён, все запросы разные.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_batching --docs 100000 --clients 1 4 16 64
+"""
+import argparse
+import asyncio
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+
+async def benchmark(max_size: int, clients: int, args, queries):
+    """Запускает приложение с заданным размером пакета и измеряет нагрузку"""
+    import httpx
+    from api_scripts.load_test import run_load
+    from app.executor import configure_executor
+    from app.main import app
+    from app.text_search.batcher import SearchBatcher, configure_search_batcher
+
+    configure_executor("thread", args.workers, 100000)
+    configure_search_batcher(SearchBatcher(max_size, args.max_wait_ms / 1000, args.in_flight, 100000))
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await run_load(client, queries[:clients], concurrency=clients, duration=60, max_requests=clients)
+            report = await run_load(client, queries, concurrency=clients, duration=args.duration)
+
+    mode = f"пакеты до {max_size}" if max_size else "по одному"
+    print(f"{mode:16}{clients:>9}{report.rps:>10.1f}{report.latency_ms['p50']:>12.1f}"
+          f"{report.latency_ms['p99']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Объединение запросов поиска в пакеты")
+    parser.add_argument("--docs", type=int, default=100000, help="Количество документов в индексе")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 64],
+                        help="Количество параллельных клиентов")
+    parser.add_argument("--duration", type=float, default=5.0, help="Длительность нагрузки в секундах")
+    parser.add_argument("--workers", type=int, default=4, help="Количество потоков исполнителя")
+    parser.add_argument("--max-size", type=int, default=32, help="Максимальный размер пакета")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Максимальное ожидание пакета, мс")
+    parser.add_argument("--in-flight", type=int, default=1, help="Количество одновременно выполняемых пакетов")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tfidf_folder:
+        # Настройки задаются до импорта приложения
+        os.environ["TFIDF_FOLDER"] = tfidf_folder
+        os.environ["SEARCH_CACHE_SIZE"] = "0"
+        os.environ["WARM_UP"] = "blocking"
+        from app.text_search.create_tfidf import create_tfidf_model_and_index
+        from app.text_search.storage import save_index
+        from benchmarks.synthetic import make_corpus, make_queries
+
+        corpus = make_corpus(args.docs)
+        vectorizer, tfidf_matrix = create_tfidf_model_and_index(corpus)
+        save_index(Path(tfidf_folder), vectorizer, tfidf_matrix, corpus)
+        queries = make_queries(20000, query_length=3, seed=1)
+
+        print(f"Документов: {args.docs}, потоков: {args.workers}, длительность: {args.duration} с")
+        print(f"{'Режим':16}{'Клиентов':>9}{'RPS':>10}{'p50, мс':>12}{'p99, мс':>12}")
+        for clients in args.clients:
+            for max_size in (0, args.max_size):
+                asyncio.run(benchmark(max_size, clients, args, queries))
+
+
+if __name__ == "__main__":
+    main()
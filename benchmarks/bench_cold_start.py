@@ -0,0 +1,51 @@
+"""
+Время холодного старта: каждый замер выполняется в новом процессе интерпретатора, как при запуске
+воркера uvicorn, сборе тестов или запуске утилиты сборки индекса. Выводится медиана по нескольким запускам.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_cold_start --runs 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# Замеры: название и код, выполняемый в новом процессе
+CASES = {
+    "import app.main": "import app.main",
+    "import + прогрев": "import app.main\nfrom app.warmup import warm_up\nwarm_up()",
+    "create_tfidf --help": "import runpy, sys\nsys.argv = ['create_tfidf', '--help']\n"
+                           "runpy.run_module('app.text_search.create_tfidf', run_name='__main__')",
+}
+
+
+def measure(code: str, runs: int) -> float:
+    """
+    Запускает код в новых процессах и измеряет время до их завершения
+    :param code: Код на Python
+    :param runs: Количество запусков
+    :return: Медиана времени в секундах
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время холодного старта")
+    parser.add_argument("--runs", type=int, default=5, help="Количество запусков каждого замера")
+    args = parser.parse_args()
+
+    baseline = measure("pass", args.runs)
+    print(f"{'Замер':24}{'Время, с':>10}")
+    print(f"{'пустой интерпретатор':24}{baseline:>10.2f}")
+    for name, code in CASES.items():
+        print(f"{name:24}{measure(code, args.runs):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
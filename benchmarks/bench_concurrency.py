@@ -0,0 +1,94 @@
+"""
+Пропускная способность /api/search при параллельных клиентах для разных способов выполнения
+CPU-ёмкой работы: прямо в обработчике (inline), в пуле потоков (thread) и в пуле процессов (process).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_concurrency --clients 16 --requests 400
+"""
+import argparse
+import asyncio
+import os
+import time
+from tempfile import TemporaryDirectory
+import numpy as np
+
+
+async def run_load(client, queries, clients: int):
+    """
+    Отправляет запросы параллельными клиентами
+    :return: Задержки успешных запросов в секундах, количество ответов 503 и общее время
+    """
+    latencies, rejected = [], 0
+    queue = list(queries)
+
+    async def worker():
+        nonlocal rejected
+        while queue:
+            query = queue.pop()
+            start = time.perf_counter()
+            response = await client.post("/api/search", json={"text": query})
+            if response.status_code == 503:
+                rejected += 1
+            else:
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return latencies, rejected, time.perf_counter() - start
+
+
+async def benchmark(kind: str, args, queries):
+    """Запускает приложение с заданным исполнителем и измеряет нагрузку"""
+    import httpx
+    from app.executor import configure_executor
+    from app.main import app
+
+    configure_executor(kind, args.workers, args.max_pending)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Прогрев: загрузка индекса и моделей в обработчиках
+            await run_load(client, queries[:args.workers * 2], args.workers)
+            latencies, rejected, elapsed = await run_load(client, queries, args.clients)
+
+    latencies = np.array(latencies) * 1000
+    print(f"{kind:10}{len(latencies) / elapsed:>10.1f}{np.percentile(latencies, 50):>12.1f}"
+          f"{np.percentile(latencies, 99):>12.1f}{rejected:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный замер способов выполнения задач")
+    parser.add_argument("--docs", type=int, default=50000, help="Количество документов в индексе")
+    parser.add_argument("--clients", type=int, default=16, help="Количество параллельных клиентов")
+    parser.add_argument("--requests", type=int, default=400, help="Количество запросов")
+    parser.add_argument("--workers", type=int, default=4, help="Количество потоков или процессов")
+    parser.add_argument("--max-pending", type=int, default=1000, help="Максимальная длина очереди")
+    parser.add_argument("--kinds", nargs="+", default=["inline", "thread", "process"],
+                        help="Способы выполнения задач")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tfidf_folder:
+        # Папка индекса задаётся до импорта приложения и наследуется процессами-обработчиками
+        os.environ["TFIDF_FOLDER"] = tfidf_folder
+        from pathlib import Path
+        from app.text_search.create_tfidf import create_tfidf_model_and_index, dump_atomic
+        from app.text_search.index import MODEL_FILE, MATRIX_FILE, TEXTS_FILE
+        from benchmarks.synthetic import make_corpus, make_queries
+
+        corpus = make_corpus(args.docs)
+        vectorizer, tfidf_matrix = create_tfidf_model_and_index(corpus)
+        dump_atomic(corpus, Path(tfidf_folder) / TEXTS_FILE)
+        dump_atomic(vectorizer, Path(tfidf_folder) / MODEL_FILE)
+        dump_atomic(tfidf_matrix, Path(tfidf_folder) / MATRIX_FILE)
+        # Разные запросы, чтобы не срабатывал кэш предобработки
+        queries = make_queries(args.requests, query_length=8)
+
+        print(f"Документов: {args.docs}, клиентов: {args.clients}, запросов: {args.requests}")
+        print(f"{'Режим':10}{'RPS':>10}{'p50, мс':>12}{'p99, мс':>12}{'503':>8}")
+        for kind in args.kinds:
+            asyncio.run(benchmark(kind, args, queries))
+
+
+if __name__ == "__main__":
+    main()
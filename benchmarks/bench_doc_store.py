@@ -0,0 +1,89 @@
+"""
+Хранилище текстов: размер на диске (pickle, файл без сжатия, блоки zlib разного размера), время загрузки
+и время получения текстов top_k документов выдачи — из файла без сжатия, из сжатых блоков без кэша
+и с LRU-кэшем распакованных блоков. Номера документов выдачи берутся с распределением Ципфа: популярные
+документы попадают в выдачу чаще, как и в настоящем поиске.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_doc_store --docs 100000 --block-sizes 4096 16384 65536 --cache-blocks 0 1024
+"""
+import argparse
+import pickle
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from app.text_search.doc_store import DEFAULT_CACHE_BLOCKS, CompressedTextStore, CompressedTextStoreWriter
+from app.text_search.storage import TextStore, write_texts
+from benchmarks.synthetic import make_corpus
+
+
+def measure_fetch(texts, results: np.ndarray) -> float:
+    """Возвращает среднее время получения текстов одной выдачи в микросекундах"""
+    start = time.perf_counter()
+    for doc_ids in results:
+        for doc_id in doc_ids:
+            texts[int(doc_id)]
+    return (time.perf_counter() - start) / len(results) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Хранилище текстов")
+    parser.add_argument("--docs", type=int, default=100000, help="Количество документов")
+    parser.add_argument("--doc-length", type=int, default=60, help="Средняя длина документа в словах")
+    parser.add_argument("--block-sizes", type=int, nargs="+", default=[4096, 16384, 65536],
+                        help="Размеры блоков сжатия в байтах")
+    parser.add_argument("--cache-blocks", type=int, nargs="+", default=[0, DEFAULT_CACHE_BLOCKS],
+                        help="Размеры LRU-кэша распакованных блоков")
+    parser.add_argument("--queries", type=int, default=10000, help="Количество выдач")
+    parser.add_argument("--top-k", type=int, default=3, help="Количество текстов в выдаче")
+    args = parser.parse_args()
+
+    texts = make_corpus(args.docs, doc_length=args.doc_length)
+    rng = np.random.default_rng(1)
+    popularity = 1 / np.arange(1, args.docs + 1)
+    results = rng.permutation(args.docs)[rng.choice(args.docs, size=(args.queries, args.top_k),
+                                                    p=popularity / popularity.sum())]
+
+    with tempfile.TemporaryDirectory() as folder:
+        folder = Path(folder)
+        print(f"Документов: {args.docs}, выдач: {args.queries}, top_k: {args.top_k}")
+        print(f"{'Хранилище':30}{'МБ':>8}{'Загрузка, мс':>14}{'Выдача, мкс':>13}")
+
+        pickle_path = folder / "texts.pkl"
+        with open(pickle_path, "wb") as pickle_file:
+            pickle.dump(texts, pickle_file)
+        start = time.perf_counter()
+        with open(pickle_path, "rb") as pickle_file:
+            loaded = pickle.load(pickle_file)
+        load_time = time.perf_counter() - start
+        print(f"{'pickle (весь список в памяти)':30}{pickle_path.stat().st_size / 2 ** 20:>8.1f}"
+              f"{load_time * 1000:>14.1f}{measure_fetch(loaded, results):>13.1f}")
+        del loaded
+
+        paths = (folder / "texts.bin", folder / "texts_offsets.npy")
+        write_texts(*paths, texts)
+        start = time.perf_counter()
+        store = TextStore(*paths)
+        load_time = time.perf_counter() - start
+        print(f"{'Без сжатия (mmap)':30}{paths[0].stat().st_size / 2 ** 20:>8.1f}"
+              f"{load_time * 1000:>14.1f}{measure_fetch(store, results):>13.1f}")
+
+        for block_size in args.block_sizes:
+            paths = (folder / "blocks.bin", folder / "offsets.npy", folder / "block_offsets.npy",
+                     folder / "block_docs.npy")
+            with CompressedTextStoreWriter(*paths, block_size=block_size) as writer:
+                for text in texts:
+                    writer.append(text)
+            size = sum(path.stat().st_size for path in paths) - paths[1].stat().st_size
+            for cache_blocks in args.cache_blocks:
+                start = time.perf_counter()
+                store = CompressedTextStore(*paths, cache_blocks=cache_blocks)
+                load_time = time.perf_counter() - start
+                name = f"zlib {block_size // 1024} КБ, кэш {cache_blocks} бл."
+                print(f"{name:30}{size / 2 ** 20:>8.1f}{load_time * 1000:>14.1f}"
+                      f"{measure_fetch(store, results):>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
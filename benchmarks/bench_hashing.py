@@ -0,0 +1,98 @@
+"""
+Сравнение модели TF-IDF со словарём и модели на хэшированных признаках: полнота выдачи (recall@k)
+относительно модели со словарём, память и время загрузки модели.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_hashing --docs 200000 --vocab 300000 --features 65536 262144 1048576
+"""
+import argparse
+import pickle
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.text_search.hashing import HashingTfidfVectorizer
+from app.text_search.ranking import select_top_k
+from app.text_search.storage import IDF_FILE, VOCABULARY_FILE, load_snapshot, save_index
+from benchmarks.synthetic import make_corpus, make_queries
+
+
+def measure_load(load, repeats: int = 3):
+    """
+    Измеряет время загрузки (лучшее из повторов) и память, выделенную при загрузке
+    :param load: Функция загрузки
+    :param repeats: Количество повторов
+    :return: Время в миллисекундах и пиковая память в МБ
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 2 ** 20
+
+
+def recall_at_k(matrix, query_vectors, truth, top_k: int) -> float:
+    """Доля документов эталонной выдачи, найденных моделью"""
+    found = 0
+    for query_vector, expected in zip(query_vectors, truth):
+        scores = np.asarray(matrix @ query_vector.toarray().ravel()).ravel()
+        selected = select_top_k(scores, top_k)
+        found += len(np.intersect1d(selected[scores[selected] > 0], expected))
+    return found / max(sum(len(expected) for expected in truth), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение модели со словарём и модели на хэшированных признаках")
+    parser.add_argument("--docs", type=int, default=200000, help="Количество документов")
+    parser.add_argument("--vocab", type=int, default=300000, help="Размер словаря корпуса")
+    parser.add_argument("--features", type=int, nargs="+", default=[2 ** 16, 2 ** 18, 2 ** 20],
+                        help="Количество хэшированных признаков")
+    parser.add_argument("--queries", type=int, default=200, help="Количество запросов")
+    parser.add_argument("--top-k", type=int, default=10, help="Количество результатов")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.docs, args.vocab)
+    queries = make_queries(args.queries, args.vocab)
+
+    vectorizer = TfidfVectorizer(norm="l2")
+    matrix = vectorizer.fit_transform(corpus).tocsr()
+    query_vectors = vectorizer.transform(queries)
+    truth = []
+    for query_vector in query_vectors:
+        scores = np.asarray(matrix @ query_vector.toarray().ravel()).ravel()
+        selected = select_top_k(scores, args.top_k)
+        truth.append(selected[scores[selected] > 0])
+    print(f"Документов: {args.docs}, слов в словаре: {len(vectorizer.vocabulary_)}, top_k: {args.top_k}")
+    print(f"{'Модель':>22}{'Recall@k':>10}{'Файлы модели, МБ':>18}{'Загрузка, мс':>14}{'Память, МБ':>12}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        folder = Path(folder)
+        snapshot = save_index(folder / "vocabulary", vectorizer, matrix, corpus)
+        model_size = sum((snapshot / name).stat().st_size for name in (VOCABULARY_FILE, IDF_FILE)) / 2 ** 20
+        load_ms, memory = measure_load(lambda: load_snapshot(snapshot))
+        print(f"{'словарь':>22}{1:>10.3f}{model_size:>18.1f}{load_ms:>14.1f}{memory:>12.1f}")
+
+        # Прежний формат: модель со словарём в pickle
+        pickled = pickle.dumps(vectorizer)
+        load_ms, memory = measure_load(lambda: pickle.loads(pickled))
+        print(f"{'словарь (pickle)':>22}{'':>10}{len(pickled) / 2 ** 20:>18.1f}{load_ms:>14.1f}{memory:>12.1f}")
+
+        for n_features in args.features:
+            hashing = HashingTfidfVectorizer(n_features)
+            hashed_matrix = hashing.fit_transform(corpus)
+            recall = recall_at_k(hashed_matrix, hashing.transform(queries), truth, args.top_k)
+            snapshot = save_index(folder / f"hashing-{n_features}", hashing, hashed_matrix, corpus)
+            model_size = (snapshot / IDF_FILE).stat().st_size / 2 ** 20
+            load_ms, memory = measure_load(lambda: load_snapshot(snapshot))
+            print(f"{f'хэширование {n_features}':>22}{recall:>10.3f}{model_size:>18.1f}{load_ms:>14.1f}{memory:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
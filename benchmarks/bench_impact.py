@@ -0,0 +1,88 @@
+"""
+Индекс квантованных оценок: размер по сравнению с матрицей TF-IDF (float64 и int32), задержка по сравнению
+с полным перебором и инвертированным индексом и расхождение выдачи с полным перебором — доля запросов
+с той же выдачей и полнота recall@k, без точной переоценки (только целочисленные оценки) и с ней.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_impact --docs 100000 --bits 8 16 --rescore 1 2 4
+"""
+import argparse
+import time
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.text_search.impact_index import build_impact_index, get_matrix_nbytes
+from app.text_search.inverted_index import InvertedIndex
+from app.text_search.ranking import top_k_by_score
+from app.text_search.semantic import recall_at_k
+from app.text_search.service import compute_similarities
+from benchmarks.synthetic import make_corpus, make_queries
+
+
+def report(name: str, elapsed: float, baseline: float, found, exact):
+    """Выводит задержку, ускорение и расхождение выдачи с полным перебором"""
+    n_queries = len(exact)
+    same = np.mean([np.array_equal(a, b) for a, b in zip(found, exact)])
+    recall = np.mean([recall_at_k(a, b) for a, b in zip(found, exact)])
+    print(f"{name:26}{elapsed / n_queries * 1000:>11.2f}{baseline / elapsed:>10.1f}x{same:>13.1%}{recall:>11.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Индекс квантованных оценок")
+    parser.add_argument("--docs", type=int, default=100000, help="Количество документов")
+    parser.add_argument("--vocab", type=int, default=20000, help="Размер словаря")
+    parser.add_argument("--bits", type=int, nargs="+", default=[8, 16], help="Разрядности оценок")
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 2, 4],
+                        help="Количество переоцениваемых кандидатов на один результат")
+    parser.add_argument("--queries", type=int, default=300, help="Количество запросов")
+    parser.add_argument("--top-k", type=int, default=10, help="Количество результатов")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.docs, args.vocab)
+    vectorizer = TfidfVectorizer(norm="l2")
+    matrix = vectorizer.fit_transform(corpus).tocsr()
+    query_vectors = [vectorizer.transform([query]) for query in make_queries(args.queries, args.vocab, seed=1)]
+    all_docs = np.arange(args.docs)
+
+    # Документы с нулевой оценкой в выдачу полного перебора не включаются, как и в индексах
+    start = time.perf_counter()
+    exact = []
+    for query_vector in query_vectors:
+        scores = compute_similarities(query_vector, matrix).ravel()
+        doc_ids, doc_scores = top_k_by_score(all_docs, scores, args.top_k)
+        exact.append(doc_ids[doc_scores > 0])
+    baseline = time.perf_counter() - start
+
+    print(f"Документов: {args.docs}, запросов: {args.queries}, top_k: {args.top_k}")
+    print(f"Матрица TF-IDF ({matrix.dtype}, {matrix.indices.dtype}): {get_matrix_nbytes(matrix) / 2 ** 20:.1f} МБ")
+    impact_indexes = {}
+    for bits in args.bits:
+        impact_indexes[bits] = build_impact_index(matrix, bits)
+        print(f"Индекс квантованных оценок ({bits} бит, int32): {impact_indexes[bits].nbytes / 2 ** 20:.1f} МБ")
+
+    print(f"{'Поиск':26}{'мс/запрос':>11}{'Ускорение':>11}{'Та же выдача':>13}{'recall@' + str(args.top_k):>11}")
+    report("Полный перебор", baseline, baseline, exact, exact)
+
+    inverted_index = InvertedIndex(matrix)
+    start = time.perf_counter()
+    found = [inverted_index.search(query_vector, args.top_k)[0] for query_vector in query_vectors]
+    report("Инвертированный индекс", time.perf_counter() - start, baseline, found, exact)
+
+    for bits, impact_index in impact_indexes.items():
+        # Выдача только по целочисленным оценкам показывает расхождение, которое исправляет переоценка
+        start = time.perf_counter()
+        found = []
+        for query_vector in query_vectors:
+            scores = impact_index.score(query_vector)
+            doc_ids, doc_scores = top_k_by_score(all_docs, scores, args.top_k)
+            found.append(doc_ids[doc_scores > 0])
+        report(f"{bits} бит, без переоценки", time.perf_counter() - start, baseline, found, exact)
+
+        for rescore_factor in args.rescore:
+            start = time.perf_counter()
+            found = [impact_index.search(query_vector, matrix, args.top_k, rescore_factor)[0]
+                     for query_vector in query_vectors]
+            report(f"{bits} бит, переоценка x{rescore_factor}", time.perf_counter() - start, baseline, found, exact)
+
+
+if __name__ == "__main__":
+    main()
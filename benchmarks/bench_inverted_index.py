@@ -0,0 +1,58 @@
+"""
+Сравнение задержки поиска полным перебором матрицы и по инвертированному индексу с отсечением MaxScore.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_inverted_index --docs 100000 200000 400000
+"""
+import argparse
+import time
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.text_search.inverted_index import InvertedIndex
+from app.text_search.ranking import top_k_by_score
+from app.text_search.service import compute_similarities
+from benchmarks.synthetic import make_corpus, make_queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение полного перебора и инвертированного индекса")
+    parser.add_argument("--docs", type=int, nargs="+", default=[100000, 200000, 400000],
+                        help="Размеры корпусов")
+    parser.add_argument("--vocab", type=int, default=50000, help="Размер словаря")
+    parser.add_argument("--queries", type=int, default=200, help="Количество запросов")
+    parser.add_argument("--top-k", type=int, default=3, help="Количество результатов")
+    args = parser.parse_args()
+
+    print(f"{'Документов':>12}{'Перебор, мс':>14}{'Инв. индекс, мс':>18}{'Совпадение':>12}")
+    for n_docs in args.docs:
+        corpus = make_corpus(n_docs, args.vocab)
+        vectorizer = TfidfVectorizer(norm="l2")
+        matrix = vectorizer.fit_transform(corpus).tocsr()
+        # Редкие слова словаря — типичные поисковые запросы
+        query_vectors = vectorizer.transform(make_queries(args.queries, args.vocab, seed=n_docs))
+        inverted_index = InvertedIndex(matrix)
+
+        matrix_time = inverted_time = 0.0
+        matches = 0
+        for i in range(args.queries):
+            query = query_vectors[i]
+
+            start = time.perf_counter()
+            scores = compute_similarities(query, matrix).ravel()
+            expected, _ = top_k_by_score(np.arange(n_docs), scores, args.top_k)
+            matrix_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            found, _ = inverted_index.search(query, args.top_k)
+            inverted_time += time.perf_counter() - start
+
+            # Документы с нулевой оценкой при переборе не сравниваются
+            expected = expected[scores[expected] > 0]
+            matches += np.array_equal(expected, found)
+
+        print(f"{n_docs:>12}{matrix_time / args.queries * 1000:>14.2f}"
+              f"{inverted_time / args.queries * 1000:>18.2f}{matches / args.queries:>12.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Накладные расходы метрик: таймер этапа и middleware со счётчиками и гистограммами на каждый запрос.
+Middleware вызывается напрямую как ASGI-приложение вокруг пустого приложения, без HTTP-клиента,
+поэтому разница с пустым приложением — это вся его стоимость на запрос.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_metrics --calls 200000 --requests 100000
+"""
+import argparse
+import asyncio
+import time
+from contextlib import nullcontext
+from unittest.mock import patch
+from app.metrics import MetricsMiddleware, _request_stages, stage_timer
+
+SCOPE = {"type": "http", "method": "POST", "path": "/api/search", "headers": []}
+
+
+def measure_timer(make_context, calls: int) -> float:
+    """
+    Измеряет среднее время пустого блока with
+    :param make_context: Функция, создающая контекстный менеджер
+    :param calls: Количество вызовов
+    :return: Среднее время, мкс
+    """
+    start = time.perf_counter()
+    for _ in range(calls):
+        with make_context():
+            pass
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def empty_app(scope, receive, send):
+    """ASGI-приложение, сразу отвечающее пустым телом"""
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def measure_app(app, requests: int) -> float:
+    """
+    Измеряет среднее время обработки запроса приложением
+    :return: Среднее время, мкс
+    """
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Накладные расходы метрик")
+    parser.add_argument("--calls", type=int, default=200000, help="Количество вызовов таймера этапа")
+    parser.add_argument("--requests", type=int, default=100000, help="Количество запросов к приложению")
+    args = parser.parse_args()
+
+    print(f"{'Таймер этапа':30}{'мкс/вызов':>12}")
+    print(f"{'пустой with':30}{measure_timer(nullcontext, args.calls):>12.2f}")
+    print(f"{'stage_timer':30}{measure_timer(lambda: stage_timer('bench'), args.calls):>12.2f}")
+    # В режиме отладки этап дополнительно записывается для заголовка Server-Timing
+    token = _request_stages.set([])
+    print(f"{'stage_timer + Server-Timing':30}{measure_timer(lambda: stage_timer('bench'), args.calls):>12.2f}")
+    _request_stages.reset(token)
+
+    print(f"\n{'Middleware':30}{'мкс/запрос':>12}")
+    baseline = asyncio.run(measure_app(empty_app, args.requests))
+    print(f"{'пустое приложение':30}{baseline:>12.2f}")
+    instrumented = asyncio.run(measure_app(MetricsMiddleware(empty_app), args.requests))
+    print(f"{'с метриками':30}{instrumented:>12.2f}")
+    with patch("app.config.DEBUG", True):
+        debug = asyncio.run(measure_app(MetricsMiddleware(empty_app), args.requests))
+    print(f"{'с метриками и Server-Timing':30}{debug:>12.2f}")
+    print(f"\nНакладные расходы middleware: {instrumented - baseline:.2f} мкс на запрос")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Потоковая предобработка: пропускная способность /api/preprocess/stream (JSON-массив и NDJSON) по сравнению
+с циклом запросов к /api/preprocess — последовательным и с несколькими параллельными клиентами.
+Запросы отправляются приложению в том же процессе (транспорт ASGI), кэши предобработки отключены,
+тексты — отзывы из папки data, повторённые до нужного количества.
+
+Запуск из корня проекта:
+    TEXT_PROCESSING_MODE=pymorphy python -m benchmarks.bench_preprocess_stream --texts 5000 --clients 1 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import List
+
+
+async def benchmark(args, texts: List[str]):
+    """Запускает приложение и измеряет пропускную способность каждого способа"""
+    import httpx
+    from app.executor import configure_executor
+    from app.main import app
+
+    configure_executor("thread", args.workers, 100000)
+    print(f"{'Способ':28}{'Текстов/с':>12}{'Время, с':>10}")
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            async def preprocess(text: str, semaphore: asyncio.Semaphore) -> List[str]:
+                async with semaphore:
+                    response = await client.post("/api/preprocess", json={"text": text})
+                    return response.json()["processed_text"]
+
+            expected = None
+            for clients in args.clients:
+                semaphore = asyncio.Semaphore(clients)
+                start = time.perf_counter()
+                expected = await asyncio.gather(*(preprocess(text, semaphore) for text in texts))
+                report(f"/preprocess, клиентов: {clients}", len(texts), time.perf_counter() - start)
+
+            ndjson = "".join(json.dumps(text, ensure_ascii=False) + "\n" for text in texts).encode("utf-8")
+            chunk_size = 64 * 1024
+            for name, content, media_type in (
+                    ("/preprocess/stream, JSON", json.dumps(texts, ensure_ascii=False).encode("utf-8"),
+                     "application/json"),
+                    ("/preprocess/stream, NDJSON", ndjson, "application/x-ndjson")):
+                start = time.perf_counter()
+                response = await client.post("/api/preprocess/stream", content=iter_chunks(content, chunk_size),
+                                             headers={"Content-Type": media_type})
+                results = [json.loads(line)["processed_text"] for line in response.text.splitlines()]
+                report(name, len(texts), time.perf_counter() - start)
+                assert results == expected, "Результаты потоковой предобработки расходятся с /api/preprocess"
+
+
+async def iter_chunks(content: bytes, size: int):
+    """Отдаёт тело запроса частями, как при загрузке большого файла"""
+    for start in range(0, len(content), size):
+        yield content[start:start + size]
+
+
+def report(name: str, n_texts: int, elapsed: float):
+    print(f"{name:28}{n_texts / elapsed:>12.0f}{elapsed:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Потоковая предобработка текстов")
+    parser.add_argument("--texts", type=int, default=5000, help="Количество текстов")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 16],
+                        help="Количество параллельных клиентов /api/preprocess")
+    parser.add_argument("--workers", type=int, default=4, help="Количество потоков исполнителя")
+    args = parser.parse_args()
+
+    # Настройки задаются до импорта приложения
+    os.environ["PREPROCESS_CACHE_SIZE"] = "0"
+    os.environ["LEMMA_CACHE_SIZE"] = "0"
+    os.environ["WARM_UP"] = "blocking"
+    from app.text_search.create_tfidf import DATA_FOLDER, load_texts_from_folder
+
+    reviews = load_texts_from_folder(DATA_FOLDER, "text")
+    texts = [reviews[i % len(reviews)] for i in range(args.texts)]
+    print(f"Текстов: {len(texts)}, потоков исполнителя: {args.workers}")
+    asyncio.run(benchmark(args, texts))
+
+
+if __name__ == "__main__":
+    main()
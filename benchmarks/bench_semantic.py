@@ -0,0 +1,67 @@
+"""
+Семантический индекс (LSA + IVF): время сборки, задержка поиска и полнота recall@k при разном количестве
+просматриваемых списков n_probe относительно точного перебора векторов LSA, а также задержка точного поиска
+по матрице TF-IDF для сравнения.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_semantic --docs 100000 --components 256 --n-probe 1 4 16 64 256
+"""
+import argparse
+import time
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.text_search.ranking import select_top_k
+from app.text_search.semantic import build_semantic_index, recall_at_k
+from app.text_search.service import compute_similarities
+from benchmarks.synthetic import make_corpus, make_queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Семантический индекс LSA + IVF")
+    parser.add_argument("--docs", type=int, default=100000, help="Количество документов")
+    parser.add_argument("--vocab", type=int, default=20000, help="Размер словаря")
+    parser.add_argument("--components", type=int, default=256, help="Размерность пространства LSA")
+    parser.add_argument("--lists", type=int, default=0, help="Количество списков IVF (0 — около 4·√n)")
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 16, 64, 256],
+                        help="Количество просматриваемых списков")
+    parser.add_argument("--queries", type=int, default=200, help="Количество запросов")
+    parser.add_argument("--top-k", type=int, default=10, help="Количество результатов")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.docs, args.vocab)
+    vectorizer = TfidfVectorizer(norm="l2")
+    matrix = vectorizer.fit_transform(corpus).tocsr()
+    query_vectors = vectorizer.transform(make_queries(args.queries, args.vocab, seed=1))
+
+    start = time.perf_counter()
+    semantic_index = build_semantic_index(matrix, args.components, args.lists)
+    print(f"Документов: {args.docs}, размерность LSA: {semantic_index.n_components}, "
+          f"списков IVF: {semantic_index.n_lists}, сборка: {time.perf_counter() - start:.1f} с")
+    lsa_vectors = semantic_index.transform(query_vectors)
+
+    start = time.perf_counter()
+    for i in range(args.queries):
+        select_top_k(compute_similarities(query_vectors[i], matrix).ravel(), args.top_k)
+    matrix_ms = (time.perf_counter() - start) / args.queries * 1000
+
+    start = time.perf_counter()
+    exact = [semantic_index.search_exact(vector, args.top_k)[0] for vector in lsa_vectors]
+    exact_ms = (time.perf_counter() - start) / args.queries * 1000
+
+    print(f"{'Поиск':22}{'мс/запрос':>12}{'Доля док.':>12}{'recall@' + str(args.top_k):>12}")
+    print(f"{'TF-IDF, перебор':22}{matrix_ms:>12.2f}{1:>12.1%}{'—':>12}")
+    print(f"{'LSA, перебор':22}{exact_ms:>12.2f}{1:>12.1%}{1:>12.3f}")
+    list_sizes = np.diff(semantic_index.offsets)
+    for n_probe in args.n_probe:
+        start = time.perf_counter()
+        found = [semantic_index.search(vector, args.top_k, n_probe)[0] for vector in lsa_vectors]
+        elapsed_ms = (time.perf_counter() - start) / args.queries * 1000
+        recall = np.mean([recall_at_k(approx, expected) for approx, expected in zip(found, exact)])
+        # Доля просмотренных документов — по n_probe ближайших центроидов каждого запроса
+        scanned = np.mean([list_sizes[select_top_k(semantic_index.centroids @ vector, n_probe)].sum()
+                           for vector in lsa_vectors]) / args.docs
+        print(f"{'IVF, n_probe=' + str(n_probe):22}{elapsed_ms:>12.2f}{scanned:>12.1%}{recall:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
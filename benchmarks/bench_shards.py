@@ -0,0 +1,65 @@
+"""
+Задержка поиска по одному запросу в зависимости от количества частей индекса, оцениваемых параллельно.
+
+Корпус из миллионов документов генерируется сразу в виде матрицы TF-IDF. Ускорение ограничено
+количеством ядер: на одном ядре части оцениваются по очереди.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_shards --docs 2000000 --shards 1 2 4 8
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from app.text_search.ranking import select_top_k
+from app.text_search.shards import get_shard_bounds, rank_shards, split_shards
+from benchmarks.synthetic import make_tfidf_matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка поиска в зависимости от количества частей индекса")
+    parser.add_argument("--docs", type=int, default=2000000, help="Количество документов")
+    parser.add_argument("--vocab", type=int, default=50000, help="Размер словаря")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8], help="Количество частей")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="Количество потоков")
+    parser.add_argument("--queries", type=int, default=50, help="Количество запросов")
+    parser.add_argument("--top-k", type=int, default=10, help="Количество результатов")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    matrix = make_tfidf_matrix(args.docs, args.vocab)
+    print(f"Документов: {args.docs}, ненулевых элементов: {matrix.nnz}, "
+          f"генерация {time.perf_counter() - start:.1f} с, потоков: {args.threads}")
+    query_vectors = make_tfidf_matrix(args.queries, args.vocab, doc_length=3, seed=1).toarray()
+
+    # Опорный результат — оценки top-k при оценке всей матрицы в одном потоке
+    expected = []
+    for query in query_vectors:
+        scores = matrix @ query
+        expected.append(np.sort(scores[select_top_k(scores, args.top_k)]))
+
+    print(f"{'Частей':>8}{'Среднее, мс':>14}{'p95, мс':>10}{'Ускорение':>12}{'Совпадение':>12}")
+    baseline = None
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        for n_shards in args.shards:
+            shards = split_shards(matrix, get_shard_bounds(matrix, n_shards))
+            # Прогрев пула потоков
+            rank_shards(query_vectors[0], shards, args.top_k, pool)
+
+            latencies = []
+            matches = 0
+            for query, scores in zip(query_vectors, expected):
+                start = time.perf_counter()
+                _, found = rank_shards(query, shards, args.top_k, pool)
+                latencies.append(time.perf_counter() - start)
+                matches += np.allclose(np.sort(found), scores)
+
+            mean = np.mean(latencies) * 1000
+            baseline = baseline or mean
+            print(f"{len(shards):>8}{mean:>14.2f}{np.percentile(latencies, 95) * 1000:>10.2f}"
+                  f"{baseline / mean:>11.1f}x{matches / args.queries:>12.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Сравнение памяти и задержки поиска для плотной и разреженной (CSR) матрицы TF-IDF.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_sparse_index --docs 100000
+"""
+import argparse
+import time
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from app.text_search.service import compute_similarities
+from benchmarks.synthetic import make_corpus, make_queries
+
+
+def measure_latency(score, query_vectors, repeats: int) -> float:
+    """
+    Измеряет среднюю задержку оценки одного запроса в миллисекундах
+    :param score: Функция оценки, принимающая вектор запроса
+    :param query_vectors: Векторы запросов
+    :param repeats: Количество запросов
+    :return: Средняя задержка, мс
+    """
+    start = time.perf_counter()
+    for i in range(repeats):
+        score(query_vectors[i % query_vectors.shape[0]])
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение плотного и разреженного индекса TF-IDF")
+    parser.add_argument("--docs", type=int, default=100000, help="Количество документов")
+    parser.add_argument("--vocab", type=int, default=20000, help="Размер словаря")
+    parser.add_argument("--queries", type=int, default=50, help="Количество запросов")
+    parser.add_argument("--dense-limit-mb", type=int, default=1024,
+                        help="Ограничение памяти на плотную матрицу; при превышении она строится "
+                             "по части документов, а результаты экстраполируются")
+    args = parser.parse_args()
+
+    print(f"Генерация корпуса: {args.docs} документов, словарь {args.vocab} слов...")
+    corpus = make_corpus(args.docs, args.vocab)
+    queries = make_queries(args.queries, args.vocab)
+
+    vectorizer = TfidfVectorizer(norm="l2")
+    sparse_matrix = vectorizer.fit_transform(corpus).tocsr()
+    query_vectors = vectorizer.transform(queries)
+    n_docs, n_features = sparse_matrix.shape
+
+    # Разреженный путь: хранение CSR и скалярное произведение
+    sparse_mb = (sparse_matrix.data.nbytes + sparse_matrix.indices.nbytes + sparse_matrix.indptr.nbytes) / 2 ** 20
+    sparse_ms = measure_latency(lambda q: compute_similarities(q, sparse_matrix), query_vectors, args.queries)
+
+    # Плотный путь: .toarray() и cosine_similarity, как было раньше
+    dense_full_mb = n_docs * n_features * 8 / 2 ** 20
+    dense_rows = min(n_docs, int(args.dense_limit_mb * 2 ** 20 // (n_features * 8)))
+    dense_matrix = sparse_matrix[:dense_rows].toarray()
+    dense_ms = measure_latency(lambda q: cosine_similarity(q.toarray(), dense_matrix).flatten(),
+                               query_vectors, args.queries) * n_docs / dense_rows
+    extrapolated = " (экстраполяция)" if dense_rows < n_docs else ""
+
+    print(f"Матрица: {n_docs} x {n_features}, ненулевых элементов: {sparse_matrix.nnz} "
+          f"({sparse_matrix.nnz / (n_docs * n_features):.4%})")
+    print(f"{'':10}{'Память, МБ':>14}{'Запрос, мс':>14}")
+    print(f"{'Плотная':10}{dense_full_mb:>14.1f}{dense_ms:>14.2f}{extrapolated}")
+    print(f"{'CSR':10}{sparse_mb:>14.1f}{sparse_ms:>14.2f}")
+    print(f"Экономия памяти: x{dense_full_mb / sparse_mb:.0f}, ускорение запроса: x{dense_ms / sparse_ms:.1f}")
+
+    # Проверка, что результаты совпадают
+    check_rows = min(dense_rows, 1000)
+    expected = cosine_similarity(query_vectors.toarray(), dense_matrix[:check_rows])
+    actual = compute_similarities(query_vectors, sparse_matrix[:check_rows])
+    print(f"Максимальное расхождение оценок: {np.abs(expected - actual).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Проверка совпадения результатов и ускорения режимов предобработки "fast" и "pymorphy"
+относительно полной модели spaCy на отзывах из папки data.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_text_processing_modes --repeat 20
+"""
+import argparse
+import time
+from app import config
+from app.text_processing.service import PROCESSING_MODES, TextPreprocessor
+from app.text_search.create_tfidf import DATA_FOLDER, load_texts_from_folder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение режимов предобработки текста")
+    parser.add_argument("--repeat", type=int, default=20, help="Сколько раз обработать корпус")
+    args = parser.parse_args()
+
+    texts = load_texts_from_folder(DATA_FOLDER, "text")
+    corpus = texts * args.repeat
+    print(f"Отзывов: {len(texts)}, обрабатывается текстов: {len(corpus)}")
+
+    reference = None
+    reference_time = None
+    print(f"{'Режим':10}{'Загрузка, с':>13}{'Поштучно, док/с':>18}{'nlp.pipe, док/с':>18}"
+          f"{'Совпадение текстов':>21}{'Совпадение слов':>18}")
+    for mode in PROCESSING_MODES:
+        start = time.perf_counter()
+        preprocessor = TextPreprocessor(mode, config.SPACY_MODEL)
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        single = [preprocessor.preprocess(text) for text in corpus]
+        single_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = list(preprocessor.preprocess_batch(corpus))
+        batch_time = time.perf_counter() - start
+        assert batched == single, f"Пакетная обработка в режиме '{mode}' расходится с поштучной"
+
+        if reference is None:
+            reference, reference_time = single[:len(texts)], single_time
+        results = single[:len(texts)]
+        same_texts = sum(a == b for a, b in zip(results, reference)) / len(texts)
+        same_words = sum(x == y for a, b in zip(results, reference) for x, y in zip(a, b))
+        total_words = sum(max(len(a), len(b)) for a, b in zip(results, reference))
+
+        print(f"{mode:10}{load_time:>13.2f}{len(corpus) / single_time:>18.0f}{len(corpus) / batch_time:>18.0f}"
+              f"{same_texts:>21.0%}{same_words / max(total_words, 1):>18.1%}"
+              f"   ускорение x{reference_time / single_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
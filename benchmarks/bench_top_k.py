@@ -0,0 +1,53 @@
+"""
+Сравнение выбора top-k результатов полной сортировкой (argsort) и частичным отбором (argpartition).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_top_k --scores 1000000 --top-k 3 10 100 1000
+"""
+import argparse
+import time
+import numpy as np
+from app.text_search.ranking import select_top_k
+
+
+def measure(select, scores: np.ndarray, repeats: int) -> float:
+    """
+    Измеряет среднее время выбора в миллисекундах
+    :param select: Функция выбора, принимающая массив оценок
+    :param scores: Оценки
+    :param repeats: Количество повторов
+    :return: Среднее время, мс
+    """
+    start = time.perf_counter()
+    for _ in range(repeats):
+        select(scores)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение argsort и argpartition для выбора top-k")
+    parser.add_argument("--scores", type=int, default=1000000, help="Количество оценок")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[3, 10, 100, 1000], help="Размеры выдачи")
+    parser.add_argument("--repeats", type=int, default=20, help="Количество повторов")
+    args = parser.parse_args()
+
+    # Большинство документов не совпадает с запросом и имеет нулевую оценку
+    rng = np.random.default_rng(0)
+    scores = np.zeros(args.scores)
+    matched = rng.choice(args.scores, size=args.scores // 20, replace=False)
+    scores[matched] = rng.random(len(matched))
+
+    print(f"Оценок: {args.scores}")
+    print(f"{'top_k':>8}{'argsort, мс':>14}{'argpartition, мс':>19}{'Ускорение':>12}")
+    for top_k in args.top_k:
+        argsort_ms = measure(lambda s: s.argsort()[-top_k:][::-1], scores, args.repeats)
+        partition_ms = measure(lambda s: select_top_k(s, top_k), scores, args.repeats)
+
+        # Оценки выбранных документов совпадают (номера при равных оценках могут отличаться)
+        expected = scores[scores.argsort()[-top_k:][::-1]]
+        assert np.array_equal(scores[select_top_k(scores, top_k)], expected)
+        print(f"{top_k:>8}{argsort_ms:>14.2f}{partition_ms:>19.2f}{argsort_ms / partition_ms:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
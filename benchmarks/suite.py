@@ -0,0 +1,228 @@
+"""
+Набор замеров производительности для сравнения между коммитами: предобработка текста (поштучно и пакетом),
+построение индекса (create_tfidf_model_and_index) и поиск (search_texts) на синтетических корпусах
+с фиксированными зёрнами генератора. Для каждого замера выводятся пропускная способность, задержки p50/p99
+(для поштучных операций) и пиковый объём памяти, выделенной Python и numpy (tracemalloc, отдельным
+прогоном, чтобы трассировка не искажала время). Результаты сохраняются в JSON.
+
+Запуск из корня проекта:
+    python -m benchmarks.suite --sizes 1000 100000 1000000 --output results.json
+    python -m benchmarks.suite --sizes 1000 100000 --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+import numpy as np
+import scipy
+import sklearn
+
+# Версия формата результатов: меняется, если замеры перестают быть сравнимыми с прежними
+SUITE_VERSION = 1
+
+# Зёрна генератора: корпус, запросы и исходные тексты для предобработки
+CORPUS_SEED = 0
+QUERIES_SEED = 1
+RAW_TEXTS_SEED = 2
+
+
+@dataclass
+class BenchmarkResult:
+    """Результат одного замера"""
+    name: str
+    # Количество документов в индексе (для предобработки — 0)
+    docs: int
+    # Количество обработанных элементов (текстов, документов или запросов)
+    items: int
+    seconds: float
+    throughput: float
+    p50_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    peak_memory_mb: Optional[float] = None
+
+
+def time_each(func: Callable, items: Sequence) -> np.ndarray:
+    """
+    Вызывает функцию для каждого элемента и измеряет время каждого вызова
+    :return: Время вызовов в секундах
+    """
+    latencies = np.empty(len(items))
+    for i, item in enumerate(items):
+        start = time.perf_counter()
+        func(item)
+        latencies[i] = time.perf_counter() - start
+    return latencies
+
+
+def peak_memory(func: Callable) -> float:
+    """
+    Измеряет пиковый объём памяти, выделенной во время вызова функции
+    :return: Пиковый объём в мегабайтах
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(name: str, docs: int, items: Sequence, func: Callable, per_item: bool, memory: bool,
+             prepare: Callable = lambda: None) -> BenchmarkResult:
+    """
+    Выполняет замер
+    :param name: Название замера
+    :param docs: Количество документов в индексе
+    :param items: Элементы: при per_item функция вызывается для каждого, иначе один раз для всех
+    :param func: Замеряемая функция
+    :param per_item: Измерять задержку каждого вызова
+    :param memory: Измерять пиковую память повторным прогоном
+    :param prepare: Подготовка перед каждым прогоном (например, очистка кэшей)
+    :return: Результат замера
+    """
+    def run():
+        if per_item:
+            return time_each(func, items)
+        func(items)
+
+    prepare()
+    start = time.perf_counter()
+    latencies = run()
+    seconds = time.perf_counter() - start
+    result = BenchmarkResult(name, docs, len(items), seconds, len(items) / seconds)
+    if latencies is not None:
+        result.p50_ms = float(np.percentile(latencies, 50) * 1000)
+        result.p99_ms = float(np.percentile(latencies, 99) * 1000)
+    if memory:
+        prepare()
+        result.peak_memory_mb = peak_memory(run)
+    return result
+
+
+def bench_index(size: int, queries: List[str], top_k: int, memory: bool) -> Iterator[BenchmarkResult]:
+    """
+    Замеряет построение индекса и поиск на корпусе заданного размера
+    :param size: Количество документов
+    :param queries: Поисковые запросы
+    :param top_k: Количество результатов поиска
+    :param memory: Измерять пиковую память
+    :return: Результаты замеров
+    """
+    from app.text_processing.service import get_preprocessor
+    from app.text_search.create_tfidf import create_tfidf_model_and_index
+    from app.text_search.service import search_texts
+    from benchmarks.synthetic import make_corpus
+
+    corpus = make_corpus(size, seed=CORPUS_SEED)
+    yield run_case("create_tfidf", size, corpus, create_tfidf_model_and_index, False, memory)
+
+    vectorizer, tfidf_matrix = create_tfidf_model_and_index(corpus)
+    yield run_case("search_texts", size, queries,
+                   lambda query: search_texts(query, vectorizer, tfidf_matrix, corpus, top_k=top_k),
+                   True, memory, get_preprocessor().clear_caches)
+
+
+def print_result(result: BenchmarkResult):
+    """Выводит строку таблицы результатов"""
+    def optional(value: Optional[float], width: int) -> str:
+        return f"{value:>{width}.2f}" if value is not None else f"{'-':>{width}}"
+
+    print(f"{result.name:22}{result.docs:>12}{result.items:>11}{result.throughput:>14.1f}"
+          f"{optional(result.p50_ms, 10)}{optional(result.p99_ms, 10)}{optional(result.peak_memory_mb, 12)}")
+
+
+def get_environment() -> Dict[str, object]:
+    """Описание окружения, от которого зависят результаты"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    from app import config
+    return {
+        "suite_version": SUITE_VERSION,
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "text_processing_mode": config.TEXT_PROCESSING_MODE,
+    }
+
+
+def compare(results: List[BenchmarkResult], baseline_path: str):
+    """Сравнивает результаты с сохранёнными ранее по совпадающим замерам"""
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = json.load(file)
+    if baseline["environment"].get("suite_version") != SUITE_VERSION:
+        print(f"\nРезультаты в '{baseline_path}' получены другой версией набора замеров и несравнимы")
+        return
+    previous = {(item["name"], item["docs"], item["items"]): item for item in baseline["results"]}
+
+    print(f"\nСравнение с {baseline_path} (коммит {baseline['environment'].get('commit')})")
+    print(f"{'Замер':22}{'Документов':>12}{'Пропускная способность':>25}{'p50':>10}")
+    for result in results:
+        old = previous.get((result.name, result.docs, result.items))
+        if old is None:
+            continue
+        p50 = (f"{result.p50_ms / old['p50_ms'] - 1:>+10.1%}"
+               if result.p50_ms is not None and old.get("p50_ms") else f"{'-':>10}")
+        print(f"{result.name:22}{result.docs:>12}{result.throughput / old['throughput'] - 1:>+25.1%}{p50}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Набор замеров предобработки, построения индекса и поиска")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="Размеры корпусов в документах")
+    parser.add_argument("--queries", type=int, default=500, help="Количество поисковых запросов")
+    parser.add_argument("--texts", type=int, default=2000, help="Количество текстов для предобработки")
+    parser.add_argument("--top-k", type=int, default=10, help="Количество результатов поиска")
+    parser.add_argument("--no-memory", action="store_true", help="Не измерять пиковую память")
+    parser.add_argument("--output", help="Файл JSON для сохранения результатов")
+    parser.add_argument("--compare", help="Файл JSON с прежними результатами для сравнения")
+    args = parser.parse_args()
+
+    from app.text_processing.service import get_preprocessor, preprocess_text, preprocess_texts_batch
+    from benchmarks.synthetic import make_queries, make_raw_texts
+
+    memory = not args.no_memory
+    preprocessor = get_preprocessor()
+
+    print(f"{'Замер':22}{'Документов':>12}{'Элементов':>11}{'Элементов/с':>14}{'p50, мс':>10}{'p99, мс':>10}"
+          f"{'Память, МБ':>12}")
+    results = []
+    raw_texts = make_raw_texts(args.texts, seed=RAW_TEXTS_SEED)
+    results.append(run_case("preprocess_text", 0, raw_texts, preprocess_text, True, memory,
+                            preprocessor.clear_caches))
+    print_result(results[-1])
+    results.append(run_case("preprocess_texts_batch", 0, raw_texts, lambda texts: list(preprocess_texts_batch(texts)),
+                            False, memory, preprocessor.clear_caches))
+    print_result(results[-1])
+
+    queries = make_queries(args.queries, query_length=3, seed=QUERIES_SEED)
+    for size in args.sizes:
+        for result in bench_index(size, queries, args.top_k, memory):
+            results.append(result)
+            print_result(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"environment": get_environment(), "results": [asdict(result) for result in results]},
+                      file, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты сохранены в {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
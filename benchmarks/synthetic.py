@@ -0,0 +1,125 @@
+import numpy as np
+from typing import List
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+
+# Слоги для генерации «русскоподобных» слов
+SYLLABLES = [
+    "ба", "ва", "га", "да", "жа", "за", "ка", "ла", "ма", "на", "па", "ра", "са", "та", "фа", "ха",
+    "бо", "во", "го", "до", "жо", "зо", "ко", "ло", "мо", "но", "по", "ро", "со", "то", "хо", "що",
+    "би", "ви", "ги", "ди", "зи", "ки", "ли", "ми", "ни", "пи", "ри", "си", "ти", "чи", "ши", "щи",
+    "бе", "ве", "ге", "де", "же", "зе", "ке", "ле", "ме", "не", "пе", "ре", "се", "те", "че", "ше",
+    "бу", "ву", "гу", "ду", "жу", "зу", "ку", "лу", "му", "ну", "пу", "ру", "су", "ту", "чу", "шу",
+    "ый", "ой", "ий", "ть", "ия", "ость", "ение", "ник", "тель",
+]
+
+# Словарь один и тот же для корпуса и запросов
+VOCABULARY_SEED = 0
+
+
+def make_vocabulary(size: int, seed: int = VOCABULARY_SEED) -> List[str]:
+    """
+    Генерирует словарь из уникальных «русскоподобных» слов
+    :param size: Количество слов
+    :param seed: Зерно генератора случайных чисел
+    :return: Список слов
+    """
+    rng = np.random.default_rng(seed)
+    words = set()
+    while len(words) < size:
+        n_syllables = rng.integers(2, 5)
+        words.add("".join(rng.choice(SYLLABLES, size=n_syllables)))
+    return sorted(words)
+
+
+def make_corpus(n_docs: int, vocab_size: int = 20000, doc_length: int = 30,
+                seed: int = 0) -> List[str]:
+    """
+    Генерирует корпус уже обработанных текстов (лемм через пробел)
+    с распределением частот слов по закону Ципфа
+    :param n_docs: Количество документов
+    :param vocab_size: Размер словаря
+    :param doc_length: Средняя длина документа в словах
+    :param seed: Зерно генератора случайных чисел
+    :return: Список текстов
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(make_vocabulary(vocab_size))
+    ranks = np.arange(1, vocab_size + 1)
+    probabilities = 1.0 / ranks
+    probabilities /= probabilities.sum()
+
+    lengths = np.maximum(1, rng.poisson(doc_length, size=n_docs))
+    word_ids = rng.choice(vocab_size, size=int(lengths.sum()), p=probabilities)
+    corpus = []
+    start = 0
+    for length in lengths:
+        corpus.append(" ".join(vocabulary[word_ids[start:start + length]]))
+        start += length
+    return corpus
+
+
+def make_queries(n_queries: int, vocab_size: int = 20000, query_length: int = 3,
+                 seed: int = 1) -> List[str]:
+    """
+    Генерирует запросы из слов того же словаря, что и корпус
+    :param n_queries: Количество запросов
+    :param vocab_size: Размер словаря
+    :param query_length: Количество слов в запросе
+    :param seed: Зерно генератора случайных чисел
+    :return: Список запросов
+    """
+    return make_corpus(n_queries, vocab_size, query_length, seed)
+
+
+def make_tfidf_matrix(n_docs: int, vocab_size: int = 50000, doc_length: int = 30, seed: int = 0) -> csr_matrix:
+    """
+    Генерирует матрицу TF-IDF сразу в разреженном виде, без текстов — для корпусов из миллионов
+    документов, которые долго векторизовать. Частоты слов распределены по закону Ципфа, IDF сглаженный,
+    строки нормированы по L2, как у TfidfVectorizer
+    :param n_docs: Количество документов
+    :param vocab_size: Размер словаря
+    :param doc_length: Средняя длина документа в словах
+    :param seed: Зерно генератора случайных чисел
+    :return: Матрица TF-IDF (документы x термины)
+    """
+    rng = np.random.default_rng(seed)
+    probabilities = 1.0 / np.arange(1, vocab_size + 1)
+    probabilities /= probabilities.sum()
+
+    lengths = np.maximum(1, rng.poisson(doc_length, size=n_docs))
+    indptr = np.concatenate([[0], np.cumsum(lengths)])
+    word_ids = rng.choice(vocab_size, size=int(indptr[-1]), p=probabilities).astype(np.int32)
+    counts = csr_matrix((np.ones(len(word_ids)), word_ids, indptr), shape=(n_docs, vocab_size))
+    counts.sum_duplicates()
+
+    df = np.bincount(counts.indices, minlength=vocab_size)
+    idf = np.log((n_docs + 1) / (df + 1)) + 1
+    return normalize(csr_matrix(counts.multiply(idf)), norm="l2", copy=False)
+
+
+# Служебные слова, которые вставляются в исходные тексты и удаляются при предобработке
+STOP_WORDS = ["и", "в", "не", "на", "что", "с", "по", "это", "но", "как"]
+
+
+def make_raw_texts(n_texts: int, vocab_size: int = 20000, doc_length: int = 30, seed: int = 2) -> List[str]:
+    """
+    Генерирует исходные тексты для предобработки: предложения с заглавной буквой, запятыми,
+    служебными словами и точкой на основе слов того же словаря, что и корпус
+    :param n_texts: Количество текстов
+    :param vocab_size: Размер словаря
+    :param doc_length: Средняя длина текста в словах (без служебных слов)
+    :param seed: Зерно генератора случайных чисел
+    :return: Список текстов
+    """
+    rng = np.random.default_rng(seed)
+    texts = []
+    for document in make_corpus(n_texts, vocab_size, doc_length, seed):
+        words = []
+        for i, word in enumerate(document.split()):
+            if rng.random() < 0.2:
+                words.append(STOP_WORDS[rng.integers(len(STOP_WORDS))])
+            words.append(word + ("," if i % 7 == 6 else ""))
+        text = " ".join(words).rstrip(",")
+        texts.append(text[:1].upper() + text[1:] + ".")
+    return texts
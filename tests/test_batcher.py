@@ -0,0 +1,120 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.executor import ExecutorOverloadedError, TaskExecutor
+from app.main import app
+from app.text_search.batcher import SearchBatcher
+
+
+def fake_search_many(requests, tfidf_folder, batches, delay=0.05):
+    """Поиск без индекса: запоминает размер пакета, запрос «ошибка» получает ValueError"""
+    batches.append(len(requests))
+    time.sleep(delay)
+    return [ValueError("некорректный запрос") if request.query == "ошибка" else [(request.query, float(request.top_k))]
+            for request in requests]
+
+
+class TestSearchBatcher(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.batches = []
+        self.executor = TaskExecutor("thread", max_workers=4, max_pending=16)
+        for patcher in (patch("app.text_search.batcher.get_executor", return_value=self.executor),
+                        patch("app.text_search.batcher.get_relevant_texts_many",
+                              side_effect=lambda requests, folder: fake_search_many(requests, folder, self.batches))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.executor.shutdown)
+
+    def search_all(self, batcher, queries, interval=0.0):
+        """Отправляет запросы одновременно (или с интервалом) и возвращает выдачи или ошибки"""
+        async def search(i, query):
+            await asyncio.sleep(i * interval)
+            return await batcher.search(query, "tfidf", top_k=i + 1)
+
+        async def run():
+            return await asyncio.gather(*(search(i, query) for i, query in enumerate(queries)),
+                                        return_exceptions=True)
+        return asyncio.run(run())
+
+    def test_low_traffic_not_delayed(self):
+        """Тест: при свободном месте запрос отправляется сразу, без ожидания пакета"""
+        batcher = SearchBatcher(max_size=8, max_wait=1.0)
+        start = time.perf_counter()
+        self.assertEqual(self.search_all(batcher, ["запрос"]), [[("запрос", 1.0)]])
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(self.batches, [1])
+
+    def test_coalesces_while_busy(self):
+        """Тест: пока пакет выполняется, запросы копятся и уходят одним пакетом, каждый получает свою выдачу"""
+        batcher = SearchBatcher(max_size=8, max_wait=1.0)
+        queries = [f"запрос {i}" for i in range(6)]
+        results = self.search_all(batcher, queries)
+        self.assertEqual(results, [[(query, float(i + 1))] for i, query in enumerate(queries)])
+        self.assertEqual(self.batches, [1, 5])
+        self.assertEqual(batcher.in_flight, 0)
+
+    def test_max_size(self):
+        """Тест: заполненный пакет отправляется, не дожидаясь свободного места"""
+        batcher = SearchBatcher(max_size=2, max_wait=1.0)
+        self.search_all(batcher, [f"запрос {i}" for i in range(5)])
+        self.assertEqual(self.batches, [1, 2, 2])
+
+    def test_max_wait(self):
+        """Тест: накопленные запросы отправляются по истечении времени ожидания"""
+        batcher = SearchBatcher(max_size=8, max_wait=0.01)
+        with patch("app.text_search.batcher.get_relevant_texts_many",
+                   side_effect=lambda requests, folder: fake_search_many(requests, folder, self.batches, 0.5)):
+            start = time.perf_counter()
+            self.search_all(batcher, ["первый", "второй"], interval=0.05)
+        self.assertEqual(self.batches, [1, 1])
+        self.assertLess(time.perf_counter() - start, 0.9)
+
+    def test_errors_per_request(self):
+        """Тест: ошибка одного запроса передаётся только ему"""
+        batcher = SearchBatcher(max_size=8, max_wait=1.0)
+        results = self.search_all(batcher, ["запрос", "ошибка", "другой запрос"])
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], [("другой запрос", 3.0)])
+
+    def test_overloaded(self):
+        """Тест: при заполненной очереди запрос отклоняется"""
+        batcher = SearchBatcher(max_size=8, max_wait=1.0, max_pending=2)
+        results = self.search_all(batcher, [f"запрос {i}" for i in range(4)])
+        self.assertIsInstance(results[3], ExecutorOverloadedError)
+        self.assertEqual(self.batches, [1, 2])
+
+    def test_invalid_config(self):
+        """Тест обработки некорректных настроек"""
+        for kwargs in ({"max_size": -1}, {"max_wait": -1}, {"max_in_flight": 0}):
+            with self.subTest(kwargs=kwargs), self.assertRaises(ValueError):
+                SearchBatcher(**kwargs)
+
+
+class TestSearchBatchingEndpoint(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.client = TestClient(app)
+        patcher = patch("app.text_search.router.get_search_batcher", return_value=SearchBatcher(8, 0.001))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("app.text_search.batcher.get_relevant_texts_many")
+    def test_search_endpoint(self, mock_search_many):
+        """Тест: при включённом объединении эндпоинт возвращает выдачу из пакета и ошибки как раньше"""
+        mock_search_many.return_value = [[("текст", 0.5)]]
+        response = self.client.post("/api/search", json={"text": "запрос", "top_k": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"query": "запрос", "results": [["текст", 0.5]]})
+        self.assertEqual(mock_search_many.call_args.args[0][0].top_k, 2)
+
+        mock_search_many.return_value = [ValueError("некорректный запрос")]
+        self.assertEqual(self.client.post("/api/search", json={"text": "запрос"}).status_code, 400)
+        mock_search_many.side_effect = FileNotFoundError("нет индекса")
+        self.assertEqual(self.client.post("/api/search", json={"text": "запрос"}).status_code, 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
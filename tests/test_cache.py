@@ -0,0 +1,64 @@
+import threading
+import unittest
+from app.cache import MISSING, LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get_put(self):
+        """Тест сохранения и получения значений со счётчиками"""
+        cache = LRUCache(2)
+        self.assertIs(cache.get("a"), MISSING)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("b", None), None)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 2, 1))
+        self.assertAlmostEqual(stats["hit_ratio"], 1 / 3)
+
+    def test_eviction(self):
+        """Тест вытеснения давно не использованной записи"""
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual(len(cache), 2)
+
+    def test_merge(self):
+        """Тест объединения нового значения с сохранённым"""
+        cache = LRUCache(10)
+        cache.merge("a", 1, lambda old, new: old + new)
+        cache.merge("a", 2, lambda old, new: old + new)
+        self.assertEqual(cache.get("a"), 3)
+
+    def test_disabled(self):
+        """Тест: кэш нулевого размера ничего не хранит"""
+        cache = LRUCache(0)
+        cache.put("a", 1)
+        self.assertIs(cache.get("a"), MISSING)
+        with self.assertRaises(ValueError):
+            LRUCache(-1)
+
+    def test_concurrent_access(self):
+        """Тест: счётчики и размер согласованы при обращении из нескольких потоков"""
+        cache = LRUCache(50)
+
+        def worker(offset):
+            for i in range(1000):
+                cache.merge(i % 100, 1, lambda old, new: old + new)
+                cache.get((i + offset) % 100)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = cache.stats()
+        self.assertEqual(stats["hits"] + stats["misses"], 8000)
+        self.assertLessEqual(stats["size"], 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
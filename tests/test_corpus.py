@@ -0,0 +1,95 @@
+import gzip
+import json
+import unittest
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from app.text_search.corpus import chunked, iter_documents, iter_folder_documents, iter_json_array, list_data_files
+
+# Тестовые данные
+records = [
+    {"name": "doc-1", "text": "Python - это отличный язык программирования."},
+    {"name": "doc-2", "text": "FastAPI позволяет создавать быстрые веб-приложения.", "score": 15000000000.5},
+    {"text": "Машинное обучение важно для современного мира.", "tags": ["ml", {"nested": [1, 2.5e-3]}]},
+    {"name": 42, "text": "Строка с \"кавычками\", запятыми и ] скобками"},
+]
+
+
+class TestCorpus(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        self.folder = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def test_iter_json_array_small_chunks(self):
+        """Тест: массив разбирается одинаково при любом размере порции чтения"""
+        data = json.dumps(records + [1, 2.75, "строка", None, [], {}], ensure_ascii=False, indent=1)
+        for chunk_size in range(1, 40):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_json_array(StringIO(data), chunk_size)), json.loads(data))
+
+    def test_iter_json_array_empty(self):
+        """Тест: пустой массив не содержит элементов"""
+        self.assertEqual(list(iter_json_array(StringIO(" [ ] "), 1)), [])
+
+    def test_iter_json_array_invalid(self):
+        """Тест: некорректный или незавершённый массив вызывает ошибку разбора"""
+        for data in ('{"text": 1}', '[1, 2', '[1 2]', '[1,, 2]', '[{"text": "a"}'):
+            with self.subTest(data=data), self.assertRaises(json.JSONDecodeError):
+                list(iter_json_array(StringIO(data), 2))
+
+    def test_iter_documents_formats(self):
+        """Тест: документы одинаково читаются из JSON, JSON Lines и их сжатых версий"""
+        lines = "\n".join(json.dumps(record, ensure_ascii=False) for record in records) + "\n\n"
+        (self.folder / "a.json").write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+        (self.folder / "b.jsonl").write_text(lines, encoding="utf-8")
+        with gzip.open(self.folder / "c.json.gz", "wt", encoding="utf-8") as file:
+            json.dump(records, file)
+        with gzip.open(self.folder / "d.jsonl.gz", "wt", encoding="utf-8") as file:
+            file.write(lines)
+
+        for path in list_data_files(self.folder):
+            with self.subTest(path=path.name):
+                documents = list(iter_documents(path, "text"))
+                self.assertEqual([document.text for document in documents], [record["text"] for record in records])
+                # Идентификатор берётся из поля name, а без него составляется из имени файла и номера записи
+                self.assertEqual([document.doc_id for document in documents],
+                                 ["doc-1", "doc-2", f"{path.name}:2", "42"])
+
+    def test_iter_documents_single_object(self):
+        """Тест: файл с одним объектом JSON даёт один документ"""
+        (self.folder / "a.json").write_text(json.dumps(records[0]), encoding="utf-8")
+        self.assertEqual([document.text for document in iter_documents(self.folder / "a.json", "text")],
+                         [records[0]["text"]])
+
+    def test_iter_documents_skips_records_without_key(self):
+        """Тест: записи без текстового поля и не словари пропускаются"""
+        (self.folder / "a.json").write_text(json.dumps([{"title": "нет текста"}, "строка", records[0]]),
+                                            encoding="utf-8")
+        self.assertEqual(len(list(iter_documents(self.folder / "a.json", "text"))), 1)
+
+    def test_iter_documents_invalid(self):
+        """Тест: неподдерживаемые данные и ошибки в строках JSON Lines вызывают ValueError"""
+        (self.folder / "a.json").write_text("42", encoding="utf-8")
+        (self.folder / "b.jsonl").write_text('{"text": "a"}\n{"text": \n', encoding="utf-8")
+        for name in ("a.json", "b.jsonl"):
+            with self.subTest(name=name), self.assertRaises(ValueError):
+                list(iter_documents(self.folder / name, "text"))
+
+    def test_iter_folder_documents_no_folder(self):
+        """Тест обработки отсутствия папки"""
+        with self.assertRaises(FileNotFoundError):
+            list(iter_folder_documents(self.folder / "missing", "text"))
+
+    def test_chunked(self):
+        """Тест разбиения потока на порции"""
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(chunked([], 2)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,12 +3,18 @@ from io import StringIO
 from unittest.mock import patch
 from pathlib import Path
 from tempfile import TemporaryDirectory
+import numpy as np
+from scipy.sparse import issparse
+from scipy.sparse.linalg import norm as sparse_norm
 from app.text_search.create_tfidf import (
     load_texts_from_folder,
     preprocess_texts,
     create_tfidf_model_and_index,
     save_tfidf_model_and_index,
+    stream_tfidf_index,
 )
+from app.text_search.corpus import Document
+from app.text_search.storage import get_snapshot_folder, load_snapshot, load_snapshot_doc_ids
 
 # Тестовые данные
 test_data = [
@@ -73,11 +79,35 @@ class TestCreateTfidf(unittest.TestCase):
         self.assertEqual(len(vectorizer.get_feature_names_out()), 4)
         self.assertEqual(tfidf_matrix.shape, (2, 4))
 
+    def test_create_tfidf_model_and_index_sparse(self):
+        """Тест: индекс хранится в разреженном виде, строки нормированы по L2"""
+        processed_texts = ['текст тестирование', 'тестирование tf idf']
+        _, tfidf_matrix = create_tfidf_model_and_index(processed_texts)
+        self.assertTrue(issparse(tfidf_matrix))
+        self.assertEqual(tfidf_matrix.format, "csr")
+        np.testing.assert_allclose(sparse_norm(tfidf_matrix, axis=1), [1.0, 1.0])
+
     def test_create_tfidf_model_and_index_empty(self):
         """Тест обработки пустого списка текстов при создании TF-IDF"""
         with self.assertRaises(ValueError):
             create_tfidf_model_and_index([])
 
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_stream_tfidf_index_matches_vectorizer(self, mock_stdout):
+        """Тест: потоковая сборка порциями даёт ту же модель и матрицу, что и TfidfVectorizer"""
+        raw_texts = [item["text"] for item in test_data] * 3
+        documents = (Document(f"doc-{i}", text) for i, text in enumerate(raw_texts))
+        work_folder = Path(self.temp_dir.name) / "work"
+        work_folder.mkdir()
+        vectorizer, tfidf_matrix, texts, doc_ids = stream_tfidf_index(documents, work_folder, chunk_size=2)
+
+        expected_vectorizer, expected_matrix = create_tfidf_model_and_index(preprocess_texts(raw_texts))
+        self.assertEqual(vectorizer.vocabulary_, expected_vectorizer.vocabulary_)
+        np.testing.assert_allclose(vectorizer.idf_, expected_vectorizer.idf_)
+        np.testing.assert_allclose(tfidf_matrix.toarray(), expected_matrix.toarray())
+        self.assertEqual(list(texts), raw_texts)
+        self.assertEqual(list(doc_ids), [f"doc-{i}" for i in range(len(raw_texts))])
+
     @patch("sys.stdout", new_callable=StringIO)
     def test_save_tfidf_model_and_index_mocked(self, mock_stdout):
         """Тест успешного создания и сохранения TF-IDF модели в тестовой директории"""
@@ -88,11 +118,13 @@ class TestCreateTfidf(unittest.TestCase):
         # Вывод из mock_stdout
         output = mock_stdout.getvalue()
 
-        # Убедимся, что файл действительно был сохранён
-        tfidf_model_file = self.test_folder / "tfidf_model.pkl"
-        self.assertTrue(tfidf_model_file.exists(), "TF-IDF модель не была сохранена в файле.")
-        tfidf_matrix_file = self.test_folder / "tfidf_matrix.pkl"
-        self.assertTrue(tfidf_matrix_file.exists(), "TF-IDF модель не была сохранена в файле.")
+        # Убедимся, что индекс действительно был сохранён и загружается
+        snapshot = get_snapshot_folder(self.test_folder)
+        self.assertIsNotNone(snapshot, "TF-IDF индекс не был сохранён.")
+        vectorizer, tfidf_matrix, texts = load_snapshot(snapshot)
+        self.assertEqual(list(texts), [item["text"] for item in test_data])
+        self.assertEqual(tfidf_matrix.shape, (len(test_data), len(vectorizer.vocabulary_)))
+        self.assertEqual(list(load_snapshot_doc_ids(snapshot)), [f"test.json:{i}" for i in range(len(test_data))])
 
         # Проверка вывода
         self.assertIn("TF-IDF индекс успешно создан и сохранён", output)
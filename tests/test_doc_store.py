@@ -0,0 +1,195 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.text_search.doc_store import (CompressedTextStore, CompressedTextStoreWriter, DocumentSnippets,
+                                       find_document, make_snippet)
+from app.text_search.index import load_index
+from app.text_search.result_cache import create_search_cache
+from app.text_search.service import SearchParams, get_document, get_relevant_texts, get_relevant_texts_many
+from app.text_search.storage import META_FILE, get_doc_ids_order, get_snapshot_folder, save_index
+
+sample_texts = [
+    "python отличный язык программирование",
+    "fastapi позволять создавать быстрый веб приложение",
+    "машинный обучение важный современный мир",
+    "язык python быстрый и удобный",
+    "веб приложение на python",
+]
+sample_ids = ["отзыв-3", "отзыв-1", "отзыв-5", "отзыв-2", "отзыв-4"]
+
+
+class TestCompressedTextStore(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        folder = Path(self.temp_dir.name)
+        self.paths = (folder / "texts.bin", folder / "offsets.npy", folder / "block_offsets.npy",
+                      folder / "block_docs.npy")
+        self.texts = [f"отзыв номер {i} " + "текст " * (i % 7) for i in range(100)] + ["", "ёжик 🦔"]
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def write(self, texts, block_size):
+        with CompressedTextStoreWriter(*self.paths, block_size=block_size) as writer:
+            for text in texts:
+                writer.append(text)
+
+    def test_roundtrip(self):
+        """Тест: тексты читаются без изменений при любом размере блока"""
+        for block_size in (1, 100, 10 ** 6):
+            with self.subTest(block_size=block_size):
+                self.write(self.texts, block_size)
+                store = CompressedTextStore(*self.paths)
+                self.assertEqual(list(store), self.texts)
+                self.assertEqual(store[-1], self.texts[-1])
+                self.assertEqual(store[10:13], self.texts[10:13])
+                with self.assertRaises(IndexError):
+                    store[len(self.texts)]
+
+    def test_empty(self):
+        """Тест: хранилище без текстов"""
+        self.write([], 100)
+        store = CompressedTextStore(*self.paths)
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.n_blocks, 0)
+
+    def test_block_cache(self):
+        """Тест: распаковывается только блок запрошенного текста, повторное обращение берёт его из кэша"""
+        self.write(self.texts, 200)
+        store = CompressedTextStore(*self.paths, cache_blocks=2)
+        self.assertGreater(store.n_blocks, 5)
+        # Первые два текста всегда в одном блоке: блок закрывается, только когда в нём набралось block_size байт
+        store[0]
+        store[1]
+        self.assertEqual(len(store.blocks), 1)
+        self.assertEqual((store.blocks.hits, store.blocks.misses), (1, 1))
+        store[50]
+        store[99]
+        self.assertEqual(len(store.blocks), 2)
+        self.assertEqual(store.blocks.misses, 3)
+
+    def test_inconsistent_files(self):
+        """Тест: смещения другого хранилища не принимаются"""
+        self.write(self.texts, 100)
+        blob = self.paths[0].read_bytes()
+        self.write(self.texts[:10], 100)
+        self.paths[0].write_bytes(blob)
+        with self.assertRaises(ValueError):
+            CompressedTextStore(*self.paths)
+
+
+class TestSnippets(unittest.TestCase):
+    def test_make_snippet(self):
+        """Тест: фрагмент обрезается по границе слова и заканчивается многоточием"""
+        self.assertEqual(make_snippet("короткий текст", 20), "короткий текст")
+        self.assertEqual(make_snippet("очень длинный текст отзыва", 15), "очень длинный…")
+        self.assertEqual(make_snippet("очень длинный текст", 13), "очень длинный…")
+        self.assertEqual(make_snippet("словобезпробелов", 5), "слово…")
+
+    def test_document_snippets(self):
+        """Тест: по номеру документа возвращаются идентификатор и фрагмент, без идентификаторов — номер"""
+        snippets = DocumentSnippets(sample_texts, sample_ids, 10)
+        self.assertEqual(len(snippets), len(sample_texts))
+        self.assertEqual(snippets[2], {"id": "отзыв-5", "snippet": "машинный…"})
+        self.assertEqual(DocumentSnippets(sample_texts, None, 100)[4], {"id": "4", "snippet": sample_texts[4]})
+        with self.assertRaises(ValueError):
+            DocumentSnippets(sample_texts, sample_ids, 0)
+
+    def test_find_document(self):
+        """Тест: документ находится по идентификатору двоичным поиском"""
+        order = get_doc_ids_order(sample_ids)
+        for i, doc_id in enumerate(sample_ids):
+            self.assertEqual(find_document(sample_ids, order, doc_id), i)
+        self.assertIsNone(find_document(sample_ids, order, "отзыв-0"))
+        self.assertIsNone(find_document(sample_ids, order, "отзыв-9"))
+        self.assertIsNone(find_document([], get_doc_ids_order([]), "отзыв-1"))
+
+
+class TestDocumentStoreSearch(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        self.tfidf_folder = Path(self.temp_dir.name)
+        self.vectorizer = TfidfVectorizer(norm="l2")
+        self.tfidf_matrix = self.vectorizer.fit_transform(sample_texts).tocsr()
+
+        # Каждый вызов поиска выполняется полностью
+        cache_patcher = patch("app.text_search.service.get_search_cache",
+                              return_value=create_search_cache("local", 0, 0))
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def test_save_and_load(self):
+        """Тест: сжатые тексты сохраняются в снимке и читаются так же, как без сжатия"""
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, sample_texts, sample_ids,
+                   text_block_size=50)
+        snapshot = get_snapshot_folder(self.tfidf_folder)
+        meta = json.loads((snapshot / META_FILE).read_text(encoding="utf-8"))
+        self.assertEqual(meta["texts"], {"compression": "zlib", "block_size": 50})
+        self.assertFalse((snapshot / "texts.bin").exists())
+
+        index = load_index(self.tfidf_folder)
+        self.assertIsInstance(index.texts, CompressedTextStore)
+        self.assertEqual(list(index.texts), sample_texts)
+        self.assertEqual(index.find_document("отзыв-2"), 3)
+        self.assertIsNone(index.find_document("отзыв-9"))
+
+        with self.assertRaises(ValueError):
+            save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, sample_texts, text_block_size=-1)
+
+    def test_snippets_in_results(self):
+        """Тест: с snippet_length выдача содержит идентификаторы и фрагменты тех же документов"""
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, sample_texts, sample_ids,
+                   text_block_size=50)
+        for engine in ("matrix", "inverted"):
+            with self.subTest(engine=engine):
+                texts = get_relevant_texts("python", self.tfidf_folder, engine, 3)
+                snippets = get_relevant_texts("python", self.tfidf_folder, engine, 3, snippet_length=10)
+                self.assertEqual([score for _, score in snippets], [score for _, score in texts])
+                for (text, _), (doc, _) in zip(texts, snippets):
+                    self.assertEqual(sample_texts[sample_ids.index(doc["id"])], text)
+                    self.assertEqual(doc["snippet"], make_snippet(text, 10))
+
+        requests = [SearchParams("python", 2, snippet_length=10), SearchParams("python", 2),
+                    SearchParams("python", 2, snippet_length=-1)]
+        results = get_relevant_texts_many(requests, self.tfidf_folder, engine="matrix")
+        self.assertEqual(results[0], get_relevant_texts("python", self.tfidf_folder, "matrix", 2, snippet_length=10))
+        self.assertEqual(results[1], get_relevant_texts("python", self.tfidf_folder, "matrix", 2))
+        self.assertIsInstance(results[2], ValueError)
+
+    def test_get_document(self):
+        """Тест: полный текст документа возвращается по идентификатору, в том числе без сохранённого порядка"""
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, sample_texts, sample_ids,
+                   text_block_size=50)
+        self.assertEqual(get_document("отзыв-4", self.tfidf_folder), sample_texts[4])
+        self.assertIsNone(get_document("отзыв-9", self.tfidf_folder))
+
+        (get_snapshot_folder(self.tfidf_folder) / "doc_ids_order.npy").unlink()
+        self.assertEqual(load_index(self.tfidf_folder).find_document("отзыв-1"), 1)
+
+        # Индекс без идентификаторов документов: документ обозначается номером
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, sample_texts)
+        index = load_index(self.tfidf_folder)
+        for doc_id in ("отзыв-1", "01", "-1", "5", "²"):
+            self.assertIsNone(index.find_document(doc_id))
+
+    def test_get_document_without_ids(self):
+        """Тест: идентификатор из выдачи индекса без идентификаторов документов возвращает текст документа"""
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, sample_texts)
+        results = get_relevant_texts("python", self.tfidf_folder, "matrix", 3, snippet_length=10)
+        self.assertTrue(results)
+        for doc, _ in results:
+            self.assertEqual(get_document(doc["id"], self.tfidf_folder), sample_texts[int(doc["id"])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.executor import ExecutorOverloadedError, TaskExecutor
+from app.main import app
+from app.text_processing.service import preprocess_text
+
+
+class TestTaskExecutor(unittest.TestCase):
+    def run_task(self, executor, func, *args):
+        """Выполняет задачу в исполнителе и останавливает его"""
+        try:
+            return asyncio.run(executor.run(func, *args))
+        finally:
+            executor.shutdown()
+
+    def test_thread_executor(self):
+        """Тест выполнения задачи в пуле потоков"""
+        executor = TaskExecutor("thread", max_workers=2, max_pending=4)
+        self.assertEqual(self.run_task(executor, sum, [1, 2, 3]), 6)
+        self.assertEqual(executor.pending, 0)
+
+    def test_inline_executor(self):
+        """Тест выполнения задачи прямо в обработчике"""
+        executor = TaskExecutor("inline")
+        self.assertEqual(self.run_task(executor, max, 1, 5), 5)
+
+    def test_process_executor(self):
+        """Тест выполнения предобработки в пуле процессов"""
+        executor = TaskExecutor("process", max_workers=1, max_pending=2)
+        text = "Наушники удобные, звук шикарный!"
+        self.assertEqual(self.run_task(executor, preprocess_text, text), preprocess_text(text))
+
+    def test_process_warm_up(self):
+        """Тест: прогрев дожидается загрузки модели в каждом процессе пула"""
+        executor = TaskExecutor("process", max_workers=2, max_pending=2)
+        try:
+            reports = asyncio.run(executor.warm_up())
+        finally:
+            executor.shutdown()
+        self.assertEqual(len(reports), 2)
+        self.assertTrue(all(report.ok for report in reports))
+
+    def test_exception_propagated(self):
+        """Тест: исключение из задачи передаётся вызывающему"""
+        executor = TaskExecutor("thread", max_workers=1, max_pending=1)
+        with self.assertRaises(ValueError):
+            self.run_task(executor, preprocess_text, 12345)
+        self.assertEqual(executor.pending, 0)
+
+    def test_overloaded(self):
+        """Тест: при заполненной очереди задача отклоняется"""
+        executor = TaskExecutor("thread", max_workers=1, max_pending=1)
+        executor.pending = 1
+        with self.assertRaises(ExecutorOverloadedError):
+            self.run_task(executor, sum, [1])
+
+    def test_invalid_config(self):
+        """Тест обработки некорректных настроек исполнителя"""
+        with self.assertRaises(ValueError):
+            TaskExecutor("unknown")
+        with self.assertRaises(ValueError):
+            TaskExecutor("thread", max_workers=0)
+
+
+class TestLoadShedding(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.client = TestClient(app)
+        self.executor = TaskExecutor("thread", max_workers=1, max_pending=1)
+        self.executor.pending = 1
+
+    def test_search_overloaded(self):
+        """Тест: перегруженный сервер отвечает 503 на поиск"""
+        with patch("app.text_search.router.get_executor", return_value=self.executor):
+            response = self.client.post("/api/search", json={"text": "пример запроса"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+
+    def test_preprocess_overloaded(self):
+        """Тест: перегруженный сервер отвечает 503 на предобработку"""
+        with patch("app.text_processing.router.get_executor", return_value=self.executor):
+            response = self.client.post("/api/preprocess", json={"text": "пример запроса"})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("detail", response.json())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import numpy as np
+from scipy.sparse.linalg import norm as sparse_norm
+from app.text_search.corpus import Document
+from app.text_search.create_tfidf import create_tfidf_model_and_index, preprocess_texts, stream_tfidf_index
+from app.text_search.hashing import HashingTfidfVectorizer
+from app.text_search.index import load_index
+from app.text_search.service import search_texts
+from app.text_search.storage import VOCABULARY_FILE, save_index
+
+# Тестовые данные
+sample_raw_texts = [
+    "Python - это отличный язык программирования.",
+    "FastAPI позволяет создавать быстрые веб-приложения.",
+    "Машинное обучение важно для современного мира.",
+    "Язык Python популярен в машинном обучении.",
+]
+sample_processed_texts = [
+    'python отличный язык программирование',
+    'fastapi позволять создавать быстрый веб приложение',
+    'машинный обучение важный современный мир',
+    'язык python популярный машинный обучение',
+]
+# В запросах есть слова, которых нет в индексе
+queries = ["язык python", "машинный обучение абракадабра", "быстрый веб приложение неизвестный"]
+
+
+class TestHashingTfidfVectorizer(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        self.folder = Path(self.temp_dir.name)
+        self.vectorizer = HashingTfidfVectorizer()
+        self.matrix = self.vectorizer.fit_transform(sample_processed_texts)
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def test_scores_match_vocabulary_mode(self):
+        """Тест: без коллизий оценки совпадают с TfidfVectorizer, неизвестные слова запроса отбрасываются"""
+        expected_vectorizer, expected_matrix = create_tfidf_model_and_index(sample_processed_texts)
+        scores = (self.matrix @ self.vectorizer.transform(queries).T).toarray()
+        expected = (expected_matrix @ expected_vectorizer.transform(queries).T).toarray()
+        np.testing.assert_allclose(scores, expected, atol=1e-12)
+
+    def test_dense_idf(self):
+        """Тест: IDF хранится плотным массивом, у невстречавшихся признаков он равен нулю"""
+        self.assertEqual(self.vectorizer.idf_.shape, (self.vectorizer.n_features,))
+        self.assertEqual(np.count_nonzero(self.vectorizer.idf_), len(set(" ".join(sample_processed_texts).split())))
+
+    def test_collisions(self):
+        """Тест: при малом количестве признаков коллизии не нарушают нормировку строк"""
+        vectorizer = HashingTfidfVectorizer(n_features=4)
+        matrix = vectorizer.fit_transform(sample_processed_texts)
+        self.assertEqual(matrix.shape, (len(sample_processed_texts), 4))
+        np.testing.assert_allclose(sparse_norm(matrix, axis=1), 1.0)
+
+    def test_invalid(self):
+        """Тест обработки некорректных параметров и пустых текстов"""
+        with self.assertRaises(ValueError):
+            HashingTfidfVectorizer(n_features=0)
+        with self.assertRaises(ValueError):
+            HashingTfidfVectorizer(n_features=8, idf=np.ones(4))
+        with self.assertRaises(ValueError):
+            HashingTfidfVectorizer().fit_transform(["", "!!!"])
+        with self.assertRaises(ValueError):
+            HashingTfidfVectorizer().transform(queries)
+
+    def test_snapshot_roundtrip(self):
+        """Тест: снимок хранит только IDF без словаря, загруженный индекс ищет так же"""
+        snapshot = save_index(self.folder, self.vectorizer, self.matrix, sample_raw_texts)
+        self.assertFalse((snapshot / VOCABULARY_FILE).exists())
+        index = load_index(self.folder)
+        self.assertIsInstance(index.vectorizer, HashingTfidfVectorizer)
+        np.testing.assert_array_equal(index.vectorizer.idf_, self.vectorizer.idf_)
+
+        expected = search_texts("язык программирования", self.vectorizer, self.matrix, sample_raw_texts)
+        results = search_texts("язык программирования", index.vectorizer, index.tfidf_matrix, index.texts)
+        self.assertEqual(results, expected)
+        self.assertEqual(results[0][0], sample_raw_texts[0])
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_stream_build(self, mock_stdout):
+        """Тест: потоковая сборка в режиме хэширования совпадает с обучением на всех текстах сразу"""
+        documents = (Document(str(i), text) for i, text in enumerate(sample_raw_texts))
+        vectorizer, matrix, texts, _ = stream_tfidf_index(documents, self.folder, chunk_size=3, n_features=2 ** 18)
+        expected_vectorizer = HashingTfidfVectorizer(2 ** 18)
+        expected_matrix = expected_vectorizer.fit_transform(preprocess_texts(sample_raw_texts))
+        self.assertIsInstance(vectorizer, HashingTfidfVectorizer)
+        np.testing.assert_allclose(vectorizer.idf_, expected_vectorizer.idf_)
+        self.assertEqual((matrix != expected_matrix).nnz, 0)
+        self.assertEqual(list(texts), sample_raw_texts)
+
+
+if __name__ == "__main__":
+    unittest.main()
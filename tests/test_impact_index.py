@@ -0,0 +1,157 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.text_search.impact_index import build_impact_index, get_matrix_nbytes, quantize, rescore
+from app.text_search.index import load_index
+from app.text_search.ranking import top_k_by_score
+from app.text_search.result_cache import create_search_cache
+from app.text_search.service import SearchParams, get_relevant_texts, get_relevant_texts_many
+from app.text_search.storage import META_FILE, get_snapshot_folder, save_index
+
+sample_texts = [
+    "python отличный язык программирование",
+    "fastapi позволять создавать быстрый веб приложение",
+    "машинный обучение важный современный мир",
+    "язык python быстрый и удобный",
+    "веб приложение на python",
+]
+
+
+class TestImpactIndex(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        rng = np.random.default_rng(0)
+        vocabulary = [f"слово{i}" for i in range(200)]
+        # Частоты слов неравномерны, чтобы оценки документов различались
+        probabilities = 1 / np.arange(1, len(vocabulary) + 1)
+        corpus = [" ".join(rng.choice(vocabulary, size=10, p=probabilities / probabilities.sum()))
+                  for _ in range(500)]
+        self.vectorizer = TfidfVectorizer(norm="l2")
+        self.tfidf_matrix = self.vectorizer.fit_transform(corpus).tocsr()
+        queries = [" ".join(rng.choice(vocabulary, size=3)) for _ in range(30)]
+        self.query_vectors = [self.vectorizer.transform([query]) for query in queries]
+
+    def exact_top_k(self, query_vector, top_k):
+        """Полный перебор без документов с нулевой оценкой"""
+        scores = (self.tfidf_matrix @ query_vector.T).toarray().ravel()
+        doc_ids, doc_scores = top_k_by_score(np.arange(len(scores)), scores, top_k)
+        keep = doc_scores > 0
+        return doc_ids[keep], doc_scores[keep]
+
+    def test_quantize(self):
+        """Тест: ненулевые веса квантуются в диапазон от 1 до максимального значения"""
+        quantized = quantize(np.array([1e-9, 0.25, 0.5, 1.0]), 1.0, 8)
+        self.assertEqual(quantized.dtype, np.uint8)
+        np.testing.assert_array_equal(quantized, [1, 64, 128, 255])
+        self.assertEqual(quantize(np.array([1.0]), 1.0, 16)[0], 65535)
+
+    def test_build(self):
+        """Тест: оценки хранятся в uint8 или uint16, номера документов — в int32, индекс меньше матрицы"""
+        for bits, dtype in ((8, np.uint8), (16, np.uint16)):
+            impact_index = build_impact_index(self.tfidf_matrix, bits)
+            self.assertEqual(impact_index.impacts.dtype, dtype)
+            self.assertEqual(impact_index.doc_ids.dtype, np.int32)
+            self.assertEqual(impact_index.bits, bits)
+            self.assertEqual((impact_index.n_docs, impact_index.n_terms), self.tfidf_matrix.shape)
+            self.assertLess(impact_index.nbytes, get_matrix_nbytes(self.tfidf_matrix))
+
+    def test_score(self):
+        """Тест: целочисленные оценки ненулевые ровно у документов с общими с запросом терминами"""
+        impact_index = build_impact_index(self.tfidf_matrix)
+        for query_vector in self.query_vectors:
+            scores = impact_index.score(query_vector)
+            self.assertEqual(scores.dtype, np.int32)
+            exact = (self.tfidf_matrix @ query_vector.T).toarray().ravel()
+            np.testing.assert_array_equal(scores > 0, exact > 0)
+
+    def test_rescore(self):
+        """Тест: точная переоценка совпадает с произведением строк матрицы на вектор запроса"""
+        doc_ids = np.array([3, 0, 499, 42, 42])
+        for query_vector in self.query_vectors:
+            expected = (self.tfidf_matrix[doc_ids] @ query_vector.T).toarray().ravel()
+            np.testing.assert_allclose(rescore(self.tfidf_matrix, doc_ids, query_vector), expected)
+        self.assertEqual(len(rescore(self.tfidf_matrix, np.empty(0, dtype=np.int64), self.query_vectors[0])), 0)
+
+    def test_search_matches_exact(self):
+        """Тест: с достаточным количеством кандидатов выдача совпадает с полным перебором, оценки точные"""
+        for bits in (8, 16):
+            impact_index = build_impact_index(self.tfidf_matrix, bits)
+            for query_vector in self.query_vectors:
+                doc_ids, scores = impact_index.search(query_vector, self.tfidf_matrix, 5, rescore_factor=20)
+                expected_ids, expected_scores = self.exact_top_k(query_vector, 5)
+                np.testing.assert_array_equal(doc_ids, expected_ids)
+                np.testing.assert_allclose(scores, expected_scores)
+
+    def test_invalid_params(self):
+        """Тест обработки некорректных параметров"""
+        with self.assertRaises(ValueError):
+            build_impact_index(self.tfidf_matrix, 4)
+        with self.assertRaises(ValueError):
+            build_impact_index(-self.tfidf_matrix)
+        with self.assertRaises(ValueError):
+            build_impact_index(self.tfidf_matrix).search(self.query_vectors[0], self.tfidf_matrix, 5, 0)
+
+
+class TestImpactSearch(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        self.tfidf_folder = Path(self.temp_dir.name)
+        self.vectorizer = TfidfVectorizer(norm="l2")
+        self.tfidf_matrix = self.vectorizer.fit_transform(sample_texts).tocsr()
+        self.impact_index = build_impact_index(self.tfidf_matrix)
+
+        # Каждый вызов поиска выполняется полностью
+        cache_patcher = patch("app.text_search.service.get_search_cache",
+                              return_value=create_search_cache("local", 0, 0))
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def test_save_and_load(self):
+        """Тест: индекс квантованных оценок сохраняется в снимке и загружается через mmap"""
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, sample_texts,
+                   impact_index=self.impact_index)
+        meta = json.loads((get_snapshot_folder(self.tfidf_folder) / META_FILE).read_text(encoding="utf-8"))
+        self.assertEqual(meta["impact"], {"bits": 8, "scale": self.impact_index.scale})
+
+        loaded = load_index(self.tfidf_folder).impact_index
+        self.assertIsInstance(loaded.impacts, np.memmap)
+        for name in ("indptr", "doc_ids", "impacts"):
+            np.testing.assert_array_equal(getattr(loaded, name), getattr(self.impact_index, name))
+
+        with self.assertRaises(ValueError):
+            save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix[:2], sample_texts[:2],
+                       impact_index=self.impact_index)
+
+    def test_matches_matrix_engine(self):
+        """Тест: выдачи движков impact и matrix совпадают, включая дополнение нулевыми оценками"""
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, sample_texts,
+                   impact_index=self.impact_index)
+        for query, top_k, offset in (("python", 3, 0), ("веб приложение", 4, 1), ("неизвестный", 2, 0)):
+            with self.subTest(query=query):
+                self.assertEqual(get_relevant_texts(query, self.tfidf_folder, "impact", top_k, 0.0, offset),
+                                 get_relevant_texts(query, self.tfidf_folder, "matrix", top_k, 0.0, offset))
+
+        requests = [SearchParams("python", 3), SearchParams("быстрый язык", 2, 0.1)]
+        results = get_relevant_texts_many(requests, self.tfidf_folder, engine="impact")
+        for request, result in zip(requests, results):
+            self.assertEqual(result, get_relevant_texts(request.query, self.tfidf_folder, "matrix",
+                                                        request.top_k, request.min_score))
+
+    def test_missing_impact_index(self):
+        """Тест: движок impact без индекса квантованных оценок сообщает, как его собрать"""
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, sample_texts)
+        with self.assertRaises(FileNotFoundError):
+            get_relevant_texts("python", self.tfidf_folder, engine="impact")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import json
+import unittest
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import numpy as np
+from app.text_search.create_tfidf import create_tfidf_model_and_index
+from app.text_search.incremental import IncrementalIndexer, run, watch
+from app.text_search.index import load_index
+
+# Тестовые данные
+sample_raw_texts = [
+    "Python - это отличный язык программирования.",
+    "FastAPI позволяет создавать быстрые веб-приложения.",
+    "Машинное обучение важно для современного мира.",
+    "Язык Python популярен в машинном обучении.",
+]
+sample_processed_texts = [
+    'python отличный язык программирование',
+    'fastapi позволять создавать быстрый веб приложение',
+    'машинный обучение важный современный мир',
+    'язык python популярный машинный обучение',
+]
+queries = ["язык python", "машинный обучение мир", "быстрый веб приложение"]
+
+
+class TestIncrementalIndexer(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        self.folder = Path(self.temp_dir.name)
+        self.indexer = IncrementalIndexer(self.folder / "state")
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def assert_matches_rebuild(self, indexer, raw_texts, processed_texts):
+        """Проверяет, что оценки документов совпадают с полной пересборкой индекса"""
+        vectorizer, matrix, texts, _ = indexer.build_index()
+        expected_vectorizer, expected_matrix = create_tfidf_model_and_index(processed_texts)
+        order = [list(texts).index(text) for text in raw_texts]
+        scores = (matrix @ vectorizer.transform(queries).T).toarray()[order]
+        expected = (expected_matrix @ expected_vectorizer.transform(queries).T).toarray()
+        np.testing.assert_allclose(scores, expected, atol=1e-12)
+
+    def test_add_documents_in_segments(self):
+        """Тест: документы, добавленные несколькими сегментами, оцениваются как при полной пересборке"""
+        self.indexer.add_documents(sample_raw_texts[:2], sample_processed_texts[:2])
+        self.indexer.add_documents(sample_raw_texts[2:], sample_processed_texts[2:])
+        self.assertEqual(len(self.indexer.segments), 2)
+        self.assert_matches_rebuild(self.indexer, sample_raw_texts, sample_processed_texts)
+
+    def test_delete_documents(self):
+        """Тест: удалённые документы исключаются из индекса, частоты документов пересчитываются"""
+        doc_ids = self.indexer.add_documents(sample_raw_texts, sample_processed_texts)
+        self.indexer.delete_documents(doc_ids[[1, 3]])
+        self.assertEqual(self.indexer.n_docs, 2)
+        self.assert_matches_rebuild(self.indexer, sample_raw_texts[::2], sample_processed_texts[::2])
+
+        # Термины, оставшиеся только в удалённых документах, не попадают в словарь
+        vectorizer, _, _, _ = self.indexer.build_index()
+        self.assertNotIn("fastapi", vectorizer.vocabulary_)
+
+    def test_compact(self):
+        """Тест: слияние сегментов удаляет помеченные документы и не меняет оценки"""
+        self.indexer.add_documents(sample_raw_texts[:2], sample_processed_texts[:2])
+        doc_ids = self.indexer.add_documents(sample_raw_texts[2:], sample_processed_texts[2:])
+        self.indexer.delete_documents(doc_ids[:1])
+        self.assertTrue(self.indexer.needs_compaction(max_segments=1))
+
+        self.indexer.compact()
+        self.assertEqual(len(self.indexer.segments), 1)
+        self.assertEqual(self.indexer.deleted, set())
+        expected_texts = sample_raw_texts[:2] + sample_raw_texts[3:]
+        expected_processed = sample_processed_texts[:2] + sample_processed_texts[3:]
+        self.assert_matches_rebuild(self.indexer, expected_texts, expected_processed)
+
+    def test_update_from_folder(self):
+        """Тест: обновление по папке обрабатывает только новые, изменённые и удалённые файлы"""
+        data_folder = self.folder / "data"
+        data_folder.mkdir()
+
+        def write(name, texts):
+            (data_folder / name).write_text(json.dumps([{"text": text} for text in texts]), encoding="utf-8")
+
+        write("a.json", sample_raw_texts[:2])
+        write("b.json", sample_raw_texts[2:3])
+        with patch("sys.stdout", new_callable=StringIO):
+            stats = self.indexer.update(data_folder)
+            self.assertEqual((stats.added_files, stats.added_docs), (2, 3))
+            self.assertFalse(self.indexer.update(data_folder).changed)
+
+            write("b.json", sample_raw_texts[3:])
+            (data_folder / "a.json").unlink()
+            stats = self.indexer.update(data_folder)
+        self.assertEqual((stats.changed_files, stats.deleted_files), (1, 1))
+        self.assertEqual((stats.added_docs, stats.deleted_docs), (1, 3))
+
+        # Состояние сохраняется между запусками
+        reloaded = IncrementalIndexer(self.folder / "state")
+        _, _, texts, _ = reloaded.build_index()
+        self.assertEqual(list(texts), sample_raw_texts[3:])
+        np.testing.assert_array_equal(reloaded.df, self.indexer.df)
+
+    def test_run_publishes_snapshot(self):
+        """Тест: проход обновления публикует снимок, который загружается сервером"""
+        data_folder = self.folder / "data"
+        data_folder.mkdir()
+        (data_folder / "a.json").write_text(json.dumps([{"text": text} for text in sample_raw_texts]),
+                                            encoding="utf-8")
+        with patch("sys.stdout", new_callable=StringIO):
+            run(data_folder, self.folder / "tfidf")
+        index = load_index(self.folder / "tfidf")
+        self.assertEqual(sorted(index.texts), sorted(sample_raw_texts))
+        self.assertEqual(sorted(index.doc_ids), [f"a.json:{i}" for i in range(len(sample_raw_texts))])
+
+    def test_watch_survives_failed_pass(self):
+        """Тест: ошибка прохода не останавливает наблюдение, следующий проход начинается с сохранённого состояния"""
+        data_folder = self.folder / "data"
+        data_folder.mkdir()
+
+        def write(name, texts):
+            (data_folder / name).write_text(json.dumps([{"text": text} for text in texts]), encoding="utf-8")
+
+        def change_data():
+            write("a.json", sample_raw_texts[:1])
+            (data_folder / "b.json").write_text('[{"text": "недописанный', encoding="utf-8")
+
+        add_documents = IncrementalIndexer.add_documents
+        failures = []
+
+        def failing_add_documents(indexer, *args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return add_documents(indexer, *args, **kwargs)
+
+        def fail_next_write():
+            write("b.json", sample_raw_texts[2:3])
+            failures.append(OSError("Нет места на диске"))
+
+        # Первый проход индексирует a.json; во втором b.json ещё не дописан; в третьем сегмент не записывается,
+        # когда изменённый a.json уже исключён из индексатора в памяти; четвёртый проходит успешно
+        write("a.json", sample_raw_texts[:2])
+        actions = [change_data, fail_next_write, lambda: None]
+        with patch("sys.stdout", new_callable=StringIO) as stdout, \
+                patch("time.sleep", side_effect=lambda _: actions.pop(0)()), \
+                patch.object(IncrementalIndexer, "add_documents", failing_add_documents):
+            watch(data_folder, self.folder / "tfidf", 60, max_passes=4)
+        output = stdout.getvalue()
+        self.assertEqual(output.count("Ошибка:"), 2)
+        # a.json остался в сохранённом состоянии, поэтому в последнем проходе считается изменённым, а не новым
+        self.assertIn("Файлов: новых 1, изменённых 1, удалённых 0; документов: добавлено 2, удалено 2", output)
+        index = load_index(self.folder / "tfidf")
+        self.assertEqual(sorted(index.texts), sorted([sample_raw_texts[0], sample_raw_texts[2]]))
+
+    def test_update_reads_jsonl_with_names(self):
+        """Тест: файлы JSON Lines читаются построчно, идентификаторы документов берутся из поля name"""
+        data_folder = self.folder / "data"
+        data_folder.mkdir()
+        lines = [json.dumps({"name": f"doc-{i}", "text": text}) for i, text in enumerate(sample_raw_texts)]
+        (data_folder / "a.jsonl").write_text("\n".join(lines), encoding="utf-8")
+        with patch("sys.stdout", new_callable=StringIO):
+            self.indexer.update(data_folder)
+        _, _, texts, names = self.indexer.build_index()
+        self.assertEqual(list(texts), sample_raw_texts)
+        self.assertEqual(names, [f"doc-{i}" for i in range(len(sample_raw_texts))])
+
+
+if __name__ == "__main__":
+    unittest.main()
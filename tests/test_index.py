@@ -0,0 +1,130 @@
+import os
+import pickle
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from scipy.sparse import issparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.text_search.index import IndexHolder, get_index_holder, load_index, MODEL_FILE, MATRIX_FILE, TEXTS_FILE
+from app.text_search.storage import save_index
+
+# Тестовые данные
+sample_raw_texts = [
+    "Python - это отличный язык программирования.",
+    "FastAPI позволяет создавать быстрые веб-приложения.",
+]
+sample_processed_texts = [
+    'python отличный язык программирование',
+    'fastapi позволять создавать быстрый веб приложение',
+]
+
+
+def write_index(folder: Path, processed_texts, raw_texts):
+    """Сохраняет TF-IDF индекс в папку"""
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(processed_texts).toarray()
+    for name, obj in [(MODEL_FILE, vectorizer), (MATRIX_FILE, matrix), (TEXTS_FILE, raw_texts)]:
+        with open(folder / name, "wb") as f:
+            pickle.dump(obj, f)
+
+
+def touch(folder: Path, shift_ns: int):
+    """Сдвигает время изменения файлов индекса"""
+    for name in (MODEL_FILE, MATRIX_FILE, TEXTS_FILE):
+        stat = (folder / name).stat()
+        os.utime(folder / name, ns=(stat.st_atime_ns, stat.st_mtime_ns + shift_ns))
+
+
+class TestIndexHolder(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        self.folder = Path(self.temp_dir.name)
+        write_index(self.folder, sample_processed_texts, sample_raw_texts)
+        self.holder = IndexHolder(self.folder)
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def test_index_loaded_once(self):
+        """Тест: индекс загружается один раз, пока файлы не меняются"""
+        first = self.holder.get()
+        second = self.holder.get()
+        self.assertIs(first, second)
+        self.assertEqual(self.holder.generation, 1)
+        self.assertEqual(first.texts, sample_raw_texts)
+        # Плотная матрица из старого формата переводится в CSR
+        self.assertTrue(issparse(first.tfidf_matrix))
+
+    def test_index_reloaded_on_change(self):
+        """Тест: индекс перезагружается при изменении файлов"""
+        first = self.holder.get()
+        write_index(self.folder, sample_processed_texts[:1], sample_raw_texts[:1])
+        touch(self.folder, 10 ** 9)
+        second = self.holder.get()
+        self.assertIsNot(first, second)
+        self.assertEqual(second.generation, 2)
+        self.assertEqual(second.texts, sample_raw_texts[:1])
+
+    def test_old_index_served_when_reload_fails(self):
+        """Тест: при ошибке загрузки новых файлов продолжает работать старый индекс"""
+        first = self.holder.get()
+        (self.folder / MATRIX_FILE).write_bytes(b"broken")
+        touch(self.folder, 10 ** 9)
+        self.assertIs(self.holder.get(), first)
+        self.assertEqual(self.holder.generation, 1)
+
+    def test_failed_reload_not_retried_until_change(self):
+        """Тест: файлы, которые не удалось загрузить, загружаются повторно только после их изменения"""
+        first = self.holder.get()
+        (self.folder / MATRIX_FILE).write_bytes(b"broken")
+        touch(self.folder, 10 ** 9)
+        with patch("app.text_search.index.load_index", wraps=load_index) as mock_load_index:
+            for _ in range(3):
+                self.assertIs(self.holder.get(), first)
+            self.assertEqual(mock_load_index.call_count, 1)
+
+            write_index(self.folder, sample_processed_texts[:1], sample_raw_texts[:1])
+            touch(self.folder, 2 * 10 ** 9)
+            self.assertEqual(self.holder.get().texts, sample_raw_texts[:1])
+            self.assertEqual(mock_load_index.call_count, 2)
+
+    def test_inconsistent_files_rejected(self):
+        """Тест: файлы из разных версий индекса не загружаются"""
+        with open(self.folder / TEXTS_FILE, "wb") as f:
+            pickle.dump(sample_raw_texts[:1], f)
+        with self.assertRaises(ValueError):
+            self.holder.get()
+
+    def test_missing_files(self):
+        """Тест обработки ошибки при отсутствии файлов"""
+        (self.folder / MODEL_FILE).unlink()
+        with self.assertRaises(FileNotFoundError) as context:
+            self.holder.get()
+        self.assertIn("Следующие файлы не найдены", str(context.exception))
+
+    def test_snapshot_preferred_and_reloaded(self):
+        """Тест: индекс из снимков загружается вместо файлов прежнего формата и перезагружается при сохранении"""
+        vectorizer = TfidfVectorizer()
+        matrix = vectorizer.fit_transform(sample_processed_texts[:1])
+        save_index(self.folder, vectorizer, matrix, sample_raw_texts[:1])
+        first = self.holder.get()
+        self.assertEqual(list(first.texts), sample_raw_texts[:1])
+
+        vectorizer = TfidfVectorizer()
+        matrix = vectorizer.fit_transform(sample_processed_texts)
+        save_index(self.folder, vectorizer, matrix, sample_raw_texts)
+        second = self.holder.get()
+        self.assertIsNot(first, second)
+        self.assertEqual(list(second.texts), sample_raw_texts)
+
+    def test_holder_shared_per_folder(self):
+        """Тест: для одной папки возвращается один и тот же хранитель"""
+        self.assertIs(get_index_holder(self.folder), get_index_holder(self.folder / "."))
+
+
+if __name__ == "__main__":
+    unittest.main()
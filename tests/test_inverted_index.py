@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+from scipy.sparse import csr_matrix, random as sparse_random
+from sklearn.preprocessing import normalize
+from app.text_search.inverted_index import InvertedIndex
+from app.text_search.ranking import top_k_by_score
+
+
+class TestInvertedIndex(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        rng = np.random.default_rng(0)
+        self.matrix = normalize(sparse_random(500, 200, density=0.05, format="csr", random_state=rng))
+        self.queries = normalize(sparse_random(30, 200, density=0.03, format="csr", random_state=rng))
+        self.index = InvertedIndex(self.matrix)
+
+    def test_postings(self):
+        """Тест: список документов термина совпадает со столбцом матрицы"""
+        column = self.matrix[:, 7].toarray().ravel()
+        doc_ids, weights = self.index.postings(7)
+        np.testing.assert_array_equal(doc_ids, np.flatnonzero(column))
+        np.testing.assert_allclose(weights, column[doc_ids])
+
+    def test_search_matches_exhaustive(self):
+        """Тест: результаты совпадают с полным перебором документов"""
+        for top_k in (1, 3, 10):
+            for row in range(self.queries.shape[0]):
+                query = self.queries[row]
+                scores = (self.matrix @ query.T).toarray().ravel()
+                doc_ids, found_scores = self.index.search(query, top_k)
+
+                matched = np.flatnonzero(scores > 0)
+                expected_ids, expected_scores = top_k_by_score(matched, scores[matched], top_k)
+                np.testing.assert_allclose(found_scores, expected_scores)
+                np.testing.assert_array_equal(doc_ids, expected_ids)
+
+    def test_search_unknown_terms(self):
+        """Тест: запрос без общих с корпусом терминов не находит документов"""
+        doc_ids, scores = self.index.search(csr_matrix((1, 200)), 3)
+        self.assertEqual(len(doc_ids), 0)
+        self.assertEqual(len(scores), 0)
+
+    def test_top_k_by_score_ties(self):
+        """Тест: при равных оценках документы упорядочены по номеру"""
+        doc_ids, scores = top_k_by_score(np.array([5, 2, 9]), np.array([0.5, 0.5, 0.7]), 3)
+        np.testing.assert_array_equal(doc_ids, [9, 2, 5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import httpx
+from api_scripts.load_test import DEFAULT_QUERY, load_queries, run_load
+from app.main import app
+
+
+def fake_search(query, *args):
+    """Поиск без индекса: запрос «ошибка» вызывает ответ 400"""
+    if query == "ошибка":
+        raise ValueError("некорректный запрос")
+    return [(query, 1.0)]
+
+
+class TestLoadTest(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        self.folder = Path(self.temp_dir.name)
+        patcher = patch("app.text_search.router.get_relevant_texts", side_effect=fake_search)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def run_load(self, queries, **kwargs):
+        """Запускает нагрузку на приложение в том же процессе"""
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await run_load(client, queries, **kwargs)
+        return asyncio.run(run())
+
+    def test_load_queries(self):
+        """Тест чтения запросов из текстового файла и JSON, пустые строки пропускаются"""
+        (self.folder / "queries.txt").write_text("первый\n\n  второй  \n", encoding="utf-8")
+        (self.folder / "queries.json").write_text(json.dumps(["первый", {"text": "второй"}, ""]), encoding="utf-8")
+        for name in ("queries.txt", "queries.json"):
+            with self.subTest(name=name):
+                self.assertEqual(load_queries(self.folder / name), ["первый", "второй"])
+        self.assertEqual(load_queries(None), [DEFAULT_QUERY])
+
+        (self.folder / "empty.txt").write_text("\n", encoding="utf-8")
+        with self.assertRaises(ValueError):
+            load_queries(self.folder / "empty.txt")
+
+    def test_closed_loop(self):
+        """Тест: запросы повторяются по кругу, ошибки разбиваются по коду ответа"""
+        report = self.run_load(["запрос", "ошибка", "другой запрос"], concurrency=3, duration=30, max_requests=9)
+        self.assertEqual((report.requests, report.succeeded), (9, 6))
+        self.assertEqual(report.errors, {"400": 3})
+        self.assertEqual(set(report.latency_ms), {"p50", "p90", "p99", "max"})
+        self.assertGreater(report.rps, 0)
+
+    def test_open_loop_rate(self):
+        """Тест: с заданной частотой запросы отправляются по расписанию в течение длительности"""
+        report = self.run_load(["запрос"], concurrency=2, rate=40, duration=0.5)
+        self.assertEqual(report.succeeded, report.requests)
+        self.assertEqual(report.requests, 20)
+        self.assertGreaterEqual(report.seconds, 0.45)
+
+    def test_connection_errors(self):
+        """Тест: ошибки соединения учитываются по типу исключения"""
+        async def run():
+            async with httpx.AsyncClient(base_url="http://127.0.0.1:9", timeout=1) as client:
+                return await run_load(client, ["запрос"], concurrency=1, max_requests=2)
+        report = asyncio.run(run())
+        self.assertEqual(report.succeeded, 0)
+        self.assertEqual(report.errors, {"ConnectError": 2})
+
+    def test_invalid_params(self):
+        """Тест обработки некорректных параметров нагрузки"""
+        for kwargs in ({"endpoint": "unknown"}, {"concurrency": 0}, {"rate": -1}, {"duration": 0}):
+            with self.subTest(kwargs=kwargs), self.assertRaises(ValueError):
+                self.run_load(["запрос"], **kwargs)
+
+
+if __name__ == "__main__":
+    unittest.main()
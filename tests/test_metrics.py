@@ -0,0 +1,159 @@
+import pickle
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.main import app
+from starlette.routing import Route
+from app.metrics import (Counter, Histogram, MetricGroup, Registry, format_server_timing, get_route_name,
+                         http_errors, http_requests, registry, stage_latency, stage_timer)
+from app.text_search.result_cache import create_search_cache
+
+# Тестовые данные
+sample_raw_texts = [
+    "Python - это отличный язык программирования.",
+    "FastAPI позволяет создавать быстрые веб-приложения.",
+]
+sample_processed_texts = [
+    "python отличный язык программирование",
+    "fastapi позволять создавать быстрый веб приложение",
+]
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render(self):
+        """Тест выгрузки счётчика и гистограммы в текстовом формате Prometheus"""
+        registry = Registry()
+        counter = registry.register(Counter("requests_total", "Запросы", ("route",)))
+        histogram = registry.register(Histogram("latency_seconds", "Время", ("route",), buckets=(0.1, 1.0)))
+        counter.inc('/a"b')
+        counter.inc('/a"b', amount=2)
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, "/a")
+
+        lines = registry.render().splitlines()
+        self.assertIn("# TYPE requests_total counter", lines)
+        self.assertIn('requests_total{route="/a\\"b"} 3.0', lines)
+        self.assertIn("# TYPE latency_seconds histogram", lines)
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{route="/a",le="1.0"} 2', lines)
+        self.assertIn('latency_seconds_bucket{route="/a",le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_sum{route="/a"} 5.55', lines)
+        self.assertIn('latency_seconds_count{route="/a"} 3', lines)
+
+    def test_metric_group(self):
+        """Тест: значения группы метрик вычисляются одним вызовом функции при каждой выгрузке"""
+        registry = Registry()
+        func = MagicMock(return_value={"size": 3, "hits": 5})
+        registry.register(MetricGroup("cache", {"size": ("gauge", "Размер"), "hits": ("counter", "Попадания")}, func))
+        lines = registry.render().splitlines()
+        self.assertEqual(func.call_count, 1)
+        self.assertEqual(lines, ["# HELP cache_size Размер", "# TYPE cache_size gauge", "cache_size 3.0",
+                                 "# HELP cache_hits_total Попадания", "# TYPE cache_hits_total counter",
+                                 "cache_hits_total 5.0"])
+
+    def test_search_cache_stats_once(self):
+        """Тест: статистика кэша выдач запрашивается один раз за выгрузку метрик"""
+        cache = create_search_cache("local", 10, 0)
+        with patch("app.text_search.result_cache.get_search_cache", return_value=cache), \
+                patch.object(cache, "stats", wraps=cache.stats) as stats:
+            text = registry.render()
+        self.assertEqual(stats.call_count, 1)
+        self.assertIn("search_cache_size 0", text)
+        self.assertIn("# TYPE search_cache_hit_ratio gauge", text)
+        self.assertIn("# TYPE search_cache_saved_seconds_total counter", text)
+
+    def test_stage_timer(self):
+        """Тест: время этапа попадает в гистограмму и при ошибке внутри этапа"""
+        before = stage_latency.count("test_stage")
+        with stage_timer("test_stage"):
+            pass
+        with self.assertRaises(ValueError), stage_timer("test_stage"):
+            raise ValueError
+        self.assertEqual(stage_latency.count("test_stage"), before + 2)
+
+    def test_format_server_timing(self):
+        """Тест: одинаковые этапы суммируются, время выводится в миллисекундах"""
+        self.assertEqual(format_server_timing([("score", 0.001), ("top_k", 0.0005), ("score", 0.002)], 0.01),
+                         "score;dur=3.000, top_k;dur=0.500, total;dur=10.000")
+
+    def test_route_name(self):
+        """Тест: меткой служит шаблон маршрута, без маршрута — unmatched"""
+        route = Route("/api/documents/{doc_id}", lambda request: None)
+        self.assertEqual(get_route_name({"route": route, "path": "/api/documents/42"}), "/api/documents/{doc_id}")
+        self.assertEqual(get_route_name({"path": "/missing/path"}), "unmatched")
+
+
+class TestMetricsMiddleware(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.client = TestClient(app)
+        self.temp_dir = TemporaryDirectory()
+        self.folder = Path(self.temp_dir.name)
+        vectorizer = TfidfVectorizer()
+        tfidf_matrix = vectorizer.fit_transform(sample_processed_texts)
+        for name, value in (("tfidf_model.pkl", vectorizer), ("tfidf_matrix.pkl", tfidf_matrix),
+                            ("texts.pkl", sample_raw_texts)):
+            with open(self.folder / name, "wb") as file:
+                pickle.dump(value, file)
+        for patcher in (patch("app.text_search.router.TFIDF_FOLDER", self.folder),
+                        patch("app.text_search.service.get_search_cache",
+                              return_value=create_search_cache("local", 0, 0))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def test_request_counters(self):
+        """Тест: запросы считаются по маршруту и коду ответа, несуществующие пути объединяются"""
+        before = http_requests.value("POST", "/api/search", "200")
+        unmatched_before = http_requests.value("GET", "unmatched", "404")
+        self.assertEqual(self.client.post("/api/search", json={"text": "язык программирования"}).status_code, 200)
+        self.assertEqual(self.client.get("/missing/path").status_code, 404)
+        self.assertEqual(http_requests.value("POST", "/api/search", "200"), before + 1)
+        self.assertEqual(http_requests.value("GET", "unmatched", "404"), unmatched_before + 1)
+
+        text = self.client.get("/metrics").text
+        self.assertIn('http_requests_total{method="POST",route="/api/search",status="200"}', text)
+        self.assertIn('http_request_duration_seconds_count{method="POST",route="/api/search"}', text)
+        self.assertIn('search_stage_duration_seconds_count{stage="score"}', text)
+        self.assertIn("search_cache_hit_ratio", text)
+
+    @patch("app.text_search.router.get_document", side_effect=lambda doc_id, folder: f"текст {doc_id}")
+    def test_route_with_path_params(self, _):
+        """Тест: запросы к документам с разными идентификаторами считаются под одной меткой маршрута"""
+        route = "/api/search/documents/{doc_id}"
+        before = http_requests.value("GET", route, "200")
+        for doc_id in ("отзыв-1", "отзыв-2"):
+            self.assertEqual(self.client.get(f"/api/search/documents/{doc_id}").status_code, 200)
+        self.assertEqual(http_requests.value("GET", route, "200"), before + 2)
+
+        text = self.client.get("/metrics").text
+        routes = {line.split('route="')[1].split('"')[0] for line in text.splitlines()
+                  if line.startswith('http_requests_total{method="GET",route="/api/search/documents')}
+        self.assertEqual(routes, {route})
+
+    @patch("app.text_search.router.get_relevant_texts", side_effect=FileNotFoundError("нет индекса"))
+    def test_error_counter(self, _):
+        """Тест: ответы с кодом 5xx считаются ошибками"""
+        before = http_errors.value("POST", "/api/search")
+        self.assertEqual(self.client.post("/api/search", json={"text": "запрос"}).status_code, 500)
+        self.assertEqual(http_errors.value("POST", "/api/search"), before + 1)
+
+    def test_server_timing(self):
+        """Тест: в режиме отладки ответ содержит время этапов поиска, без него заголовка нет"""
+        response = self.client.post("/api/search", json={"text": "язык программирования"})
+        self.assertNotIn("server-timing", response.headers)
+
+        with patch("app.config.DEBUG", True):
+            response = self.client.post("/api/search", json={"text": "язык программирования"})
+        stages = [item.split(";")[0] for item in response.headers["server-timing"].split(", ")]
+        self.assertEqual(stages, ["preprocess", "vectorize", "score", "top_k", "total"])
+
+
+if __name__ == "__main__":
+    unittest.main()
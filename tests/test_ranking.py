@@ -0,0 +1,35 @@
+import unittest
+import numpy as np
+from app.text_search.ranking import pad_with_zero_scores, paginate, select_top_k
+
+
+class TestRanking(unittest.TestCase):
+    def test_select_top_k(self):
+        """Тест: выбранные позиции совпадают с полной сортировкой"""
+        scores = np.random.default_rng(0).random(1000)
+        for top_k in (1, 5, 1000, 2000):
+            expected = np.argsort(-scores, kind="stable")[:top_k]
+            np.testing.assert_array_equal(select_top_k(scores, top_k), expected)
+
+    def test_select_top_k_ties(self):
+        """Тест: при равных оценках позиции упорядочены по возрастанию"""
+        np.testing.assert_array_equal(select_top_k(np.array([0.5, 0.7, 0.5, 0.5]), 3), [1, 0, 2])
+
+    def test_pad_with_zero_scores(self):
+        """Тест: результаты дополняются не найденными документами с нулевой оценкой"""
+        doc_ids, scores = pad_with_zero_scores(np.array([1]), np.array([0.9]), n_docs=4, top_k=3)
+        np.testing.assert_array_equal(doc_ids, [1, 0, 2])
+        np.testing.assert_allclose(scores, [0.9, 0.0, 0.0])
+
+        doc_ids, _ = pad_with_zero_scores(np.array([], dtype=int), np.array([]), n_docs=2, top_k=3)
+        np.testing.assert_array_equal(doc_ids, [0, 1])
+
+    def test_paginate(self):
+        """Тест: пропуск первых результатов и отсечение по минимальной оценке"""
+        doc_ids, scores = paginate(np.array([4, 1, 7, 2]), np.array([0.9, 0.5, 0.2, 0.0]), offset=1, min_score=0.1)
+        np.testing.assert_array_equal(doc_ids, [1, 7])
+        np.testing.assert_allclose(scores, [0.5, 0.2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+import os
+import pickle
+import threading
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.text_search.result_cache import (SQLITE_EVICT_INTERVAL, LocalResultBackend, SearchResultCache,
+                                          SqliteResultBackend, create_search_cache, make_search_cache_key)
+from app.metrics import stage_latency
+from app.text_processing.service import preprocess_text
+from app.text_search.service import get_relevant_texts
+
+# Тестовые данные
+sample_raw_texts = [
+    "Python - это отличный язык программирования.",
+    "FastAPI позволяет создавать быстрые веб-приложения.",
+    "Машинное обучение важно для современного мира.",
+]
+sample_processed_texts = [
+    "python отличный язык программирование",
+    "fastapi позволять создавать быстрый веб приложение",
+    "машинный обучение важный современный мир",
+]
+results = [("Текст", 0.5), ("Другой текст", 0.25)]
+
+
+class TestResultBackends(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "cache" / "results.sqlite3"
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def test_local_backend_ttl(self):
+        """Тест: выдача с истёкшим сроком жизни не возвращается, без срока — хранится"""
+        backend = LocalResultBackend(10)
+        with patch("app.text_search.result_cache.time.time", return_value=1000.0):
+            backend.put("a", 0.1, results, ttl=5)
+            backend.put("b", 0.1, results, ttl=0)
+        with patch("app.text_search.result_cache.time.time", return_value=1004.0):
+            self.assertEqual(backend.get("a"), (0.1, results))
+        with patch("app.text_search.result_cache.time.time", return_value=1006.0):
+            self.assertIsNone(backend.get("a"))
+            self.assertEqual(backend.get("b"), (0.1, results))
+
+    def test_local_backend_lru(self):
+        """Тест: при превышении размера вытесняется давно не использованная выдача"""
+        backend = LocalResultBackend(2)
+        backend.put("a", 0.1, results, ttl=0)
+        backend.put("b", 0.1, results, ttl=0)
+        backend.get("a")
+        backend.put("c", 0.1, results, ttl=0)
+        self.assertIsNotNone(backend.get("a"))
+        self.assertIsNone(backend.get("b"))
+
+    def test_sqlite_backend_shared(self):
+        """Тест: выдача, сохранённая одним процессом, доступна другому через общий файл"""
+        writer, reader = SqliteResultBackend(self.path, 10), SqliteResultBackend(self.path, 10)
+        try:
+            writer.put("a", 0.1, results, ttl=0)
+            self.assertEqual(reader.get("a"), (0.1, results))
+            self.assertIsNone(reader.get("b"))
+            self.assertEqual(len(reader), 1)
+        finally:
+            writer.close()
+            reader.close()
+
+    def test_sqlite_backend_ttl(self):
+        """Тест: выдача с истёкшим сроком жизни не возвращается из общего кэша"""
+        backend = SqliteResultBackend(self.path, 10)
+        try:
+            with patch("app.text_search.result_cache.time.time", return_value=1000.0):
+                backend.put("a", 0.1, results, ttl=5)
+            with patch("app.text_search.result_cache.time.time", return_value=1006.0):
+                self.assertIsNone(backend.get("a"))
+        finally:
+            backend.close()
+
+    def test_sqlite_backend_eviction(self):
+        """Тест: давно не использованные выдачи сверх ограничения вытесняются"""
+        backend = SqliteResultBackend(self.path, 4)
+        try:
+            for i in range(SQLITE_EVICT_INTERVAL):
+                with patch("app.text_search.result_cache.time.time", return_value=1000.0 + i):
+                    if i == SQLITE_EVICT_INTERVAL - 1:
+                        # Первая выдача использовалась недавно и не вытесняется
+                        backend.get("0")
+                    backend.put(str(i), 0.1, results, ttl=0)
+            self.assertEqual(len(backend), 4)
+            self.assertIsNotNone(backend.get("0"))
+            self.assertIsNone(backend.get("1"))
+        finally:
+            backend.close()
+
+
+class TestSearchResultCache(unittest.TestCase):
+    def test_key_normalization(self):
+        """Тест: ключ не зависит от порядка слов и различает версию индекса и параметры выдачи"""
+        key = make_search_cache_key("v1", "matrix", ["язык", "python"], 3, 0.0, 0)
+        self.assertEqual(key, make_search_cache_key("v1", "matrix", ["python", "язык"], 3, 0, 0))
+        for other in (make_search_cache_key("v2", "matrix", ["язык", "python"], 3, 0.0, 0),
+                      make_search_cache_key("v1", "inverted", ["язык", "python"], 3, 0.0, 0),
+                      make_search_cache_key("v1", "matrix", ["язык", "python"], 5, 0.0, 0),
+                      make_search_cache_key("v1", "matrix", ["язык", "python"], 3, 0.1, 0),
+                      make_search_cache_key("v1", "matrix", ["язык", "python"], 3, 0.0, 3)):
+            self.assertNotEqual(key, other)
+
+    def test_get_or_compute(self):
+        """Тест: выдача вычисляется один раз, попадания добавляют время её вычисления к сэкономленному"""
+        cache = SearchResultCache(LocalResultBackend(10), ttl=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return results
+
+        with patch("app.text_search.result_cache.time.perf_counter", side_effect=[10.0, 10.25]):
+            self.assertEqual(cache.get_or_compute("a", compute), results)
+        self.assertEqual(cache.get_or_compute("a", compute), results)
+        self.assertEqual(cache.get_or_compute("a", compute), results)
+        self.assertEqual(len(calls), 1)
+
+        stats = cache.stats()
+        self.assertEqual((stats["backend"], stats["size"], stats["hits"], stats["misses"]), ("local", 1, 2, 1))
+        self.assertAlmostEqual(stats["hit_ratio"], 2 / 3)
+        self.assertAlmostEqual(stats["saved_seconds"], 0.5)
+
+        cache.clear()
+        self.assertEqual((cache.stats()["size"], cache.stats()["hits"]), (0, 0))
+
+    def test_disabled(self):
+        """Тест: кэш нулевого размера всегда вычисляет выдачу и не считает промахи"""
+        cache = create_search_cache("local", 0, 60)
+        calls = []
+        for _ in range(2):
+            cache.get_or_compute("a", lambda: calls.append(1) or results)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache.stats()["misses"], 0)
+
+    def test_create_invalid(self):
+        """Тест обработки некорректных настроек кэша"""
+        for args in (("redis", 10, 0), ("local", -1, 0), ("local", 10, -1), ("sqlite", 10, 0)):
+            with self.subTest(args=args), self.assertRaises(ValueError):
+                create_search_cache(*args)
+
+    def test_concurrent_get_or_compute(self):
+        """Тест: счётчики согласованы при одновременных запросах из нескольких потоков"""
+        cache = SearchResultCache(LocalResultBackend(10))
+
+        def worker():
+            for i in range(200):
+                cache.get_or_compute(str(i % 5), lambda: results)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = cache.stats()
+        self.assertEqual(stats["hits"] + stats["misses"], 800)
+
+
+class TestGetRelevantTextsCache(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        self.folder = Path(self.temp_dir.name)
+        self.write_index(sample_raw_texts)
+        self.cache = create_search_cache("local", 100, 60)
+        cache_patcher = patch("app.text_search.service.get_search_cache", return_value=self.cache)
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def write_index(self, texts, mtime_ns=None):
+        """Сохраняет индекс в прежнем формате"""
+        vectorizer = TfidfVectorizer()
+        tfidf_matrix = vectorizer.fit_transform(sample_processed_texts)
+        for name, value in (("tfidf_model.pkl", vectorizer), ("tfidf_matrix.pkl", tfidf_matrix),
+                            ("texts.pkl", texts)):
+            with open(self.folder / name, "wb") as file:
+                pickle.dump(value, file)
+            if mtime_ns is not None:
+                os.utime(self.folder / name, ns=(mtime_ns, mtime_ns))
+
+    def test_repeated_query_is_cached(self):
+        """Тест: повторный и отличающийся порядком слов запрос не оценивает документы заново"""
+        expected = get_relevant_texts("язык программирования Python", self.folder, "matrix", top_k=2)
+        with patch("app.text_search.service.search_texts", side_effect=AssertionError("выдача вычислена повторно")):
+            self.assertEqual(get_relevant_texts("Python язык программирования", self.folder, "matrix", top_k=2),
+                             expected)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        # Другие параметры выдачи — другая запись
+        get_relevant_texts("язык программирования Python", self.folder, "matrix", top_k=3)
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_miss_preprocesses_query_once(self):
+        """Тест: при промахе кэша запрос обрабатывается один раз — и для ключа, и для поиска"""
+        for engine in ("matrix", "inverted"):
+            with self.subTest(engine=engine), \
+                    patch("app.text_search.service.preprocess_text", wraps=preprocess_text) as mock_preprocess:
+                before = stage_latency.count("preprocess")
+                get_relevant_texts("язык программирования", self.folder, engine, top_k=2)
+                self.assertEqual(mock_preprocess.call_count, 1)
+                self.assertEqual(stage_latency.count("preprocess"), before + 1)
+
+    def test_reloaded_index_invalidates_cache(self):
+        """Тест: после перезагрузки индекса выдача вычисляется по новым файлам"""
+        query = "язык программирования"
+        self.assertEqual(get_relevant_texts(query, self.folder, "matrix", top_k=1)[0][0], sample_raw_texts[0])
+
+        new_texts = ["Новый текст о языке программирования"] + sample_raw_texts[1:]
+        self.write_index(new_texts, mtime_ns=10 ** 18)
+        self.assertEqual(get_relevant_texts(query, self.folder, "matrix", top_k=1)[0][0], new_texts[0])
+        self.assertEqual(self.cache.misses, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.text_search.index import load_index
+from app.text_search.result_cache import create_search_cache
+from app.text_search.semantic import build_semantic_index, recall_at_k
+from app.text_search.service import SearchParams, get_relevant_texts, get_relevant_texts_many
+from app.text_search.storage import META_FILE, get_snapshot_folder, save_index
+
+# Две темы: документы одной темы пересекаются по словам, но не все содержат одни и те же слова
+TOPICS = [["кот", "кошка", "котёнок", "мяукать", "мурлыкать", "усатый"],
+          ["поезд", "вагон", "рельс", "вокзал", "машинист", "перрон"]]
+
+
+def make_topic_corpus(n_docs: int, seed: int = 0):
+    """Генерирует обработанные тексты из слов одной из тем"""
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(TOPICS[i % 2], size=3, replace=False)) for i in range(n_docs)]
+
+
+class TestSemanticIndex(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        rng = np.random.default_rng(0)
+        # Случайные тексты из большого словаря, чтобы списки IVF были разного размера
+        vocabulary = [f"слово{i}" for i in range(300)]
+        self.corpus = [" ".join(rng.choice(vocabulary, size=8)) for _ in range(400)]
+        self.vectorizer = TfidfVectorizer(norm="l2")
+        self.tfidf_matrix = self.vectorizer.fit_transform(self.corpus).tocsr()
+        self.semantic_index = build_semantic_index(self.tfidf_matrix, n_components=32, n_lists=16)
+        self.queries = self.semantic_index.transform(self.vectorizer.transform(self.corpus[:20]))
+
+    def test_build(self):
+        """Тест: векторы нормированы, списки IVF разбивают все документы"""
+        self.assertEqual((self.semantic_index.n_docs, self.semantic_index.n_components), (400, 32))
+        self.assertEqual(self.semantic_index.n_lists, 16)
+        self.assertEqual(self.semantic_index.vectors.dtype, np.float32)
+        np.testing.assert_allclose(np.linalg.norm(self.semantic_index.vectors, axis=1), 1, rtol=1e-5)
+        self.assertEqual(sorted(self.semantic_index.order), list(range(400)))
+        self.assertEqual(self.semantic_index.offsets[-1], 400)
+
+    def test_search_all_lists_matches_exact(self):
+        """Тест: при просмотре всех списков результат совпадает с точным перебором"""
+        for query in self.queries:
+            doc_ids, scores = self.semantic_index.search(query, 5, self.semantic_index.n_lists)
+            expected_ids, expected_scores = self.semantic_index.search_exact(query, 5)
+            np.testing.assert_array_equal(doc_ids, expected_ids)
+            np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+
+    def test_recall_grows_with_n_probe(self):
+        """Тест: полнота не убывает с количеством просматриваемых списков, документ находит сам себя"""
+        exact = [self.semantic_index.search_exact(query, 10)[0] for query in self.queries]
+        recalls = []
+        for n_probe in (1, 4, 16):
+            found = [self.semantic_index.search(query, 10, n_probe)[0] for query in self.queries]
+            recalls.append(np.mean([recall_at_k(a, b) for a, b in zip(found, exact)]))
+            self.assertTrue(all(i in ids for i, ids in enumerate(found)))
+        self.assertEqual(recalls, sorted(recalls))
+        self.assertEqual(recalls[-1], 1.0)
+
+    def test_invalid_params(self):
+        """Тест обработки некорректных параметров"""
+        with self.assertRaises(ValueError):
+            self.semantic_index.search(self.queries[0], 5, 0)
+        with self.assertRaises(ValueError):
+            build_semantic_index(self.tfidf_matrix, n_components=0)
+        with self.assertRaises(ValueError):
+            build_semantic_index(self.tfidf_matrix[:1])
+
+    def test_recall_at_k(self):
+        """Тест расчёта полноты"""
+        self.assertEqual(recall_at_k([1, 2, 3], [3, 2, 1]), 1.0)
+        self.assertEqual(recall_at_k([1, 5], [1, 2]), 0.5)
+        self.assertEqual(recall_at_k([], []), 1.0)
+
+
+class TestSemanticSearch(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        self.tfidf_folder = Path(self.temp_dir.name)
+        self.texts = make_topic_corpus(40)
+        self.vectorizer = TfidfVectorizer(norm="l2")
+        self.tfidf_matrix = self.vectorizer.fit_transform(self.texts).tocsr()
+        self.semantic_index = build_semantic_index(self.tfidf_matrix, n_components=2, n_lists=2)
+
+        # Каждый вызов поиска выполняется полностью
+        cache_patcher = patch("app.text_search.service.get_search_cache",
+                              return_value=create_search_cache("local", 0, 0))
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def test_save_and_load(self):
+        """Тест: семантический индекс сохраняется в снимке и загружается через mmap"""
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, self.texts,
+                   semantic_index=self.semantic_index)
+        meta = json.loads((get_snapshot_folder(self.tfidf_folder) / META_FILE).read_text(encoding="utf-8"))
+        self.assertEqual(meta["semantic"], {"n_components": 2, "n_lists": 2})
+
+        loaded = load_index(self.tfidf_folder).semantic_index
+        self.assertIsInstance(loaded.vectors, np.memmap)
+        for name in ("components", "centroids", "vectors", "order", "offsets"):
+            np.testing.assert_array_equal(getattr(loaded, name), getattr(self.semantic_index, name))
+
+        # Индекс без семантического этапа загружается без него
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, self.texts)
+        self.assertIsNone(load_index(self.tfidf_folder).semantic_index)
+
+    def test_save_mismatched(self):
+        """Тест: семантический индекс другой матрицы не сохраняется"""
+        with self.assertRaises(ValueError):
+            save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix[:20], self.texts[:20],
+                       semantic_index=self.semantic_index)
+
+    def test_finds_texts_without_common_words(self):
+        """Тест: движок semantic находит тексты темы запроса, даже если в них нет слов запроса"""
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, self.texts,
+                   semantic_index=self.semantic_index)
+        results = get_relevant_texts("кот", self.tfidf_folder, engine="semantic", top_k=20)
+        self.assertEqual(len(results), 20)
+        self.assertTrue(all(set(text.split()) <= set(TOPICS[0]) for text, _ in results))
+        self.assertTrue(all(score > 0 for _, score in results))
+        self.assertTrue(any("кот" not in text.split() for text, _ in results))
+
+        matrix_results = get_relevant_texts("кот", self.tfidf_folder, engine="matrix", top_k=20)
+        self.assertTrue(any(score == 0 for _, score in matrix_results))
+
+    def test_many_matches_single(self):
+        """Тест: пакетный поиск движком semantic совпадает с поиском по одному запросу"""
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, self.texts,
+                   semantic_index=self.semantic_index)
+        requests = [SearchParams("кот", 3), SearchParams("вокзал", 5, 0.0, 2), SearchParams("", 3)]
+        results = get_relevant_texts_many(requests, self.tfidf_folder, engine="semantic")
+        for request, result in zip(requests[:2], results):
+            self.assertEqual(result, get_relevant_texts(request.query, self.tfidf_folder, "semantic",
+                                                        request.top_k, request.min_score, request.offset))
+        self.assertIsInstance(results[2], ValueError)
+
+    def test_missing_semantic_index(self):
+        """Тест: движок semantic без семантического индекса сообщает, как его собрать"""
+        save_index(self.tfidf_folder, self.vectorizer, self.tfidf_matrix, self.texts)
+        with self.assertRaises(FileNotFoundError):
+            get_relevant_texts("кот", self.tfidf_folder, engine="semantic")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+from app.text_search.ranking import select_top_k
+from app.text_search.shards import get_shard_bounds, rank_shards, split_shards
+
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой матрицы с повторяющимися строками (равными оценками)"""
+        rng = np.random.default_rng(0)
+        dense = rng.random((40, 30)) * (rng.random((40, 30)) < 0.2)
+        dense[20:30] = dense[:10]
+        self.matrix = normalize(csr_matrix(dense))
+        self.pool = ThreadPoolExecutor(max_workers=4)
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.pool.shutdown()
+
+    def test_shard_bounds(self):
+        """Тест: границы частей покрывают все документы, части примерно равны по количеству элементов"""
+        bounds = get_shard_bounds(self.matrix, 4)
+        self.assertEqual((bounds[0], bounds[-1]), (0, self.matrix.shape[0]))
+        self.assertTrue(np.all(np.diff(bounds) > 0))
+        nnz = np.diff(self.matrix.indptr[bounds])
+        self.assertLess(nnz.max() - nnz.min(), self.matrix.nnz / 4)
+        # Частей не больше, чем документов
+        self.assertEqual(len(get_shard_bounds(self.matrix[:2], 8)), 3)
+        with self.assertRaises(ValueError):
+            get_shard_bounds(self.matrix, 0)
+
+    def test_split_shards_shares_data(self):
+        """Тест: части ссылаются на данные исходной матрицы и вместе составляют её"""
+        shards = split_shards(self.matrix, get_shard_bounds(self.matrix, 3))
+        self.assertTrue(all(np.shares_memory(shard.tfidf_matrix.data, self.matrix.data) for shard in shards))
+        self.assertEqual(sum(shard.n_docs for shard in shards), self.matrix.shape[0])
+        restored = np.vstack([shard.tfidf_matrix.toarray() for shard in shards])
+        np.testing.assert_array_equal(restored, self.matrix.toarray())
+        with self.assertRaises(ValueError):
+            split_shards(self.matrix, [0, 10])
+
+    def test_rank_shards_matches_full_matrix(self):
+        """Тест: объединённый top-k частей совпадает с top-k всей матрицы, включая порядок при равных оценках"""
+        queries = np.random.default_rng(1).random((5, 30))
+        for n_shards in (1, 2, 3, 7):
+            shards = split_shards(self.matrix, get_shard_bounds(self.matrix, n_shards))
+            for query in queries:
+                for top_k in (1, 5, 40, 100):
+                    with self.subTest(n_shards=n_shards, top_k=top_k):
+                        scores = self.matrix @ query
+                        expected = select_top_k(scores, top_k)
+                        doc_ids, found_scores = rank_shards(query, shards, top_k, self.pool)
+                        np.testing.assert_array_equal(found_scores, scores[expected])
+                        np.testing.assert_array_equal(found_scores, scores[doc_ids])
+                        # Документы с оценкой выше границы выдачи совпадают, равные оценки идут по номеру
+                        above = found_scores > found_scores[-1]
+                        np.testing.assert_array_equal(doc_ids[above], expected[above])
+                        order = np.lexsort((doc_ids, -found_scores))
+                        np.testing.assert_array_equal(order, np.arange(len(doc_ids)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from app.text_search.storage import (CURRENT_FILE, META_FILE, TextStore, get_snapshot_folder, load_snapshot,
+                                     load_snapshot_shard_bounds, save_index)
+
+# Тестовые данные
+sample_raw_texts = [
+    "Python - это отличный язык программирования.",
+    "",
+    "Машинное обучение важно для современного мира.",
+]
+sample_processed_texts = [
+    'python отличный язык программирование',
+    '',
+    'машинный обучение важный современный мир'
+]
+
+
+class TestIndexStorage(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        self.folder = Path(self.temp_dir.name)
+        self.vectorizer = TfidfVectorizer(sublinear_tf=True)
+        self.matrix = self.vectorizer.fit_transform(sample_processed_texts).tocsr()
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def test_roundtrip(self):
+        """Тест: загруженный снимок совпадает с сохранённым индексом"""
+        snapshot = save_index(self.folder, self.vectorizer, self.matrix, sample_raw_texts)
+        vectorizer, matrix, texts = load_snapshot(snapshot)
+
+        self.assertEqual(list(texts), sample_raw_texts)
+        self.assertEqual(texts[-1], sample_raw_texts[-1])
+        self.assertEqual(texts[0:2], sample_raw_texts[0:2])
+        self.assertEqual((matrix != self.matrix).nnz, 0)
+        # Массивы открыты через mmap только для чтения, а не скопированы в память процесса
+        self.assertFalse(matrix.data.flags.writeable)
+        self.assertTrue(vectorizer.sublinear_tf)
+
+        query = ["язык программирование мир"]
+        np.testing.assert_allclose(vectorizer.transform(query).toarray(), self.vectorizer.transform(query).toarray())
+
+    def test_shard_bounds(self):
+        """Тест: границы частей индекса сохраняются в описании снимка и проверяются"""
+        snapshot = save_index(self.folder, self.vectorizer, self.matrix, sample_raw_texts)
+        self.assertIsNone(load_snapshot_shard_bounds(snapshot))
+        snapshot = save_index(self.folder, self.vectorizer, self.matrix, sample_raw_texts, shard_bounds=[0, 2, 3])
+        np.testing.assert_array_equal(load_snapshot_shard_bounds(snapshot), [0, 2, 3])
+        with self.assertRaises(ValueError):
+            save_index(self.folder, self.vectorizer, self.matrix, sample_raw_texts, shard_bounds=[0, 2])
+
+    def test_snapshot_switch(self):
+        """Тест: новый снимок становится активным, старые снимки, кроме предыдущего, удаляются"""
+        first = save_index(self.folder, self.vectorizer, self.matrix, sample_raw_texts)
+        second = save_index(self.folder, self.vectorizer, self.matrix, sample_raw_texts)
+        self.assertEqual(get_snapshot_folder(self.folder), second)
+        self.assertTrue(first.exists())
+
+        third = save_index(self.folder, self.vectorizer, self.matrix, sample_raw_texts)
+        self.assertEqual(get_snapshot_folder(self.folder), third)
+        self.assertFalse(first.exists())
+        self.assertTrue(second.exists())
+
+    def test_no_snapshot(self):
+        """Тест: без файла CURRENT снимок не найден"""
+        self.assertIsNone(get_snapshot_folder(self.folder))
+        (self.folder / CURRENT_FILE).write_text("../outside")
+        with self.assertRaises(ValueError):
+            get_snapshot_folder(self.folder)
+
+    def test_unsupported_format_version(self):
+        """Тест: снимок неизвестной версии формата не загружается"""
+        snapshot = save_index(self.folder, self.vectorizer, self.matrix, sample_raw_texts)
+        meta = snapshot / META_FILE
+        meta.write_text(meta.read_text(encoding="utf-8").replace('"version": 1', '"version": 99'), encoding="utf-8")
+        with self.assertRaises(ValueError):
+            load_snapshot(snapshot)
+
+    def test_inconsistent_index_rejected(self):
+        """Тест: индекс, в котором тексты не соответствуют матрице, не сохраняется"""
+        with self.assertRaises(ValueError):
+            save_index(self.folder, self.vectorizer, self.matrix, sample_raw_texts[:1])
+        self.assertIsNone(get_snapshot_folder(self.folder))
+
+    def test_text_store_bounds(self):
+        """Тест: обращение к несуществующему документу"""
+        snapshot = save_index(self.folder, self.vectorizer, self.matrix, sample_raw_texts)
+        texts = TextStore(snapshot / "texts.bin", snapshot / "texts_offsets.npy")
+        self.assertEqual(len(texts), 3)
+        with self.assertRaises(IndexError):
+            texts[3]
+
+
+if __name__ == "__main__":
+    unittest.main()
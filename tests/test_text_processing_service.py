@@ -1,5 +1,16 @@
 import unittest
-from app.text_processing.service import preprocess_text
+from unittest.mock import patch
+from app import config
+from app.text_processing.service import TextPreprocessor, preprocess_text, preprocess_texts_batch, preprocess_texts_many
+
+# Тексты для проверки пакетной обработки
+batch_texts = [
+    "Привет! Как дела? Это пример текста для обработки с помощью NLP",
+    "",
+    "12345 !!!! ???",
+    "Телефон отличный, камера радует качеством, а батарея держит целый день!",
+    "Наушники удобные, звук шикарный, особенно басы. Покупкой доволен.",
+]
 
 
 class TestTextProcessingService(unittest.TestCase):
@@ -29,6 +40,80 @@ class TestTextProcessingService(unittest.TestCase):
         with self.assertRaises(ValueError):
             preprocess_text(12345)
 
+    def test_preprocess_texts_batch_matches_single(self):
+        """Тест: пакетная обработка совпадает с обработкой по одному тексту"""
+        expected = [preprocess_text(text) for text in batch_texts]
+        self.assertEqual(list(preprocess_texts_batch(batch_texts, batch_size=2)), expected)
+
+    def test_preprocess_texts_batch_multiprocess(self):
+        """Тест: обработка в нескольких процессах сохраняет порядок и результат"""
+        expected = [preprocess_text(text) for text in batch_texts]
+        self.assertEqual(list(preprocess_texts_batch(batch_texts, batch_size=2, n_process=2)), expected)
+
+    def test_preprocess_texts_many_matches_single(self):
+        """Тест: обработка нескольких текстов с кэшами совпадает с обработкой по одному тексту"""
+        texts = batch_texts + ["", batch_texts[0]]
+        expected = [preprocess_text(text) for text in texts]
+        self.assertEqual(preprocess_texts_many(texts), expected)
+        with self.assertRaises(ValueError):
+            preprocess_texts_many(["текст", 12345])
+
+    def test_preprocess_texts_batch_invalid_type(self):
+        """Тест обработки некорректного типа данных в пакете"""
+        with self.assertRaises(ValueError):
+            list(preprocess_texts_batch(["текст", 12345]))
+
+
+class TestTextPreprocessorModes(unittest.TestCase):
+    def test_fast_mode_matches_full(self):
+        """Тест: облегчённая модель без парсера и NER даёт те же леммы"""
+        full = TextPreprocessor("full", config.SPACY_MODEL)
+        fast = TextPreprocessor("fast", config.SPACY_MODEL)
+        self.assertNotIn("parser", fast.nlp.pipe_names)
+        self.assertNotIn("ner", fast.nlp.pipe_names)
+        self.assertEqual([fast.preprocess(text) for text in batch_texts],
+                         [full.preprocess(text) for text in batch_texts])
+
+    def test_pymorphy_mode(self):
+        """Тест лемматизации через pymorphy3"""
+        preprocessor = TextPreprocessor("pymorphy", config.SPACY_MODEL)
+        self.assertEqual(preprocessor.nlp.pipe_names, [])
+        self.assertEqual(preprocessor.preprocess("Наушники удобные, звук шикарный!"),
+                         ['наушник', 'удобный', 'звук', 'шикарный'])
+        self.assertEqual(list(preprocessor.preprocess_batch(["Это пример текста", ""])), [['пример', 'текст'], []])
+
+    def test_text_cache(self):
+        """Тест: повторная обработка строки берётся из кэша"""
+        preprocessor = TextPreprocessor("full", config.SPACY_MODEL, text_cache_size=10)
+        first = preprocessor.preprocess("Наушники удобные,  звук шикарный!")
+        second = preprocessor.preprocess("  Наушники удобные, звук шикарный! ")
+        self.assertEqual(first, second)
+        self.assertEqual(preprocessor.cache_stats()["text_cache"]["hits"], 1)
+        # Изменение результата не портит кэш
+        second.append("лишнее")
+        self.assertEqual(preprocessor.preprocess("Наушники удобные, звук шикарный!"), first)
+
+    def test_lemma_cache_skips_pipeline(self):
+        """Тест: короткий текст из известных слов обрабатывается без конвейера spaCy"""
+        preprocessor = TextPreprocessor("full", config.SPACY_MODEL, lemma_cache_size=100)
+        expected = preprocessor.preprocess("Наушники удобные, звук шикарный!")
+        with patch.object(preprocessor, "nlp", wraps=preprocessor.nlp) as nlp:
+            self.assertEqual(preprocessor.preprocess("шикарный звук, удобные наушники"), expected[::-1])
+            nlp.assert_not_called()
+        self.assertEqual(preprocessor.cache_stats()["lemma_cache"]["hits"], 4)
+
+    def test_lemma_cache_ambiguous_word(self):
+        """Тест: словоформа с разными леммами не используется для пропуска конвейера"""
+        preprocessor = TextPreprocessor("full", config.SPACY_MODEL, lemma_cache_size=100)
+        preprocessor.preprocess("удобные наушники")
+        preprocessor.lemma_cache.merge("удобные", "удобство", lambda old, new: old if old == new else None)
+        self.assertIsNone(preprocessor._lookup_lemmas("удобные наушники"))
+
+    def test_unknown_mode(self):
+        """Тест обработки неизвестного режима предобработки"""
+        with self.assertRaises(ValueError):
+            TextPreprocessor("unknown")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+from app.main import app
+from app.text_processing.service import preprocess_text
+from app.text_processing.stream import JsonArrayParser, iter_json_array_texts, iter_ndjson_texts, preprocess_stream
+
+sample_texts = [
+    "Привет! Как дела? Это пример текста для обработки.",
+    "",
+    "Быстрые веб-приложения на Python",
+    "Ёжик в тумане 🦔",
+    "Машинное обучение в современном мире",
+]
+
+
+async def aiter_chunks(data: bytes, size: int):
+    """Отдаёт данные частями заданного размера"""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def read_texts(reader, data: bytes, size: int, max_item_bytes: int = 1000):
+    return asyncio.run(collect(reader(aiter_chunks(data, size), max_item_bytes)))
+
+
+class TestStreamParsers(unittest.TestCase):
+    def test_json_array_any_chunking(self):
+        """Тест: JSON-массив разбирается одинаково при любом разбиении на части, в том числе внутри символа"""
+        items = sample_texts[:3] + [{"text": sample_texts[3], "id": 1}, "кавычка \" и \\n"]
+        data = json.dumps(items, ensure_ascii=False, indent=1).encode("utf-8")
+        expected = sample_texts[:4] + ["кавычка \" и \\n"]
+        for size in (1, 2, 7, len(data)):
+            with self.subTest(size=size):
+                self.assertEqual(read_texts(iter_json_array_texts, data, size), expected)
+        self.assertEqual(read_texts(iter_json_array_texts, b" [ ] ", 1), [])
+
+    def test_json_array_invalid(self):
+        """Тест: некорректный или незавершённый массив, элементы не строки"""
+        for data in (b'{"text": "a"}', b'["a", "b"', b'["a" "b"]', b'["a"] "b"', b'[1]', b'[{"name": "a"}]'):
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    read_texts(iter_json_array_texts, data, 3)
+
+    def test_json_array_item_limit(self):
+        """Тест: незавершённый элемент больше лимита не накапливается в буфере"""
+        parser = JsonArrayParser(10)
+        self.assertEqual(parser.feed('["короткий", "'), ["короткий"])
+        with self.assertRaises(ValueError):
+            parser.feed("очень длинный текст")
+
+    def test_json_array_item_limit_bytes(self):
+        """Тест: лимит элемента считается в байтах UTF-8, как и для строк NDJSON"""
+        JsonArrayParser(20).feed('["' + "a" * 15)
+        with self.assertRaises(ValueError):
+            JsonArrayParser(20).feed('["' + "ё" * 15)
+        with self.assertRaises(ValueError):
+            read_texts(iter_ndjson_texts, ('"' + "ё" * 15).encode("utf-8"), 4, max_item_bytes=20)
+
+    def test_ndjson(self):
+        """Тест: строки NDJSON разбираются при любом разбиении на части, пустые строки пропускаются"""
+        lines = [json.dumps(sample_texts[0], ensure_ascii=False), "", json.dumps({"text": sample_texts[2]}),
+                 json.dumps(sample_texts[3], ensure_ascii=False)]
+        data = "\n".join(lines).encode("utf-8")
+        expected = [sample_texts[0], sample_texts[2], sample_texts[3]]
+        for size in (1, 5, len(data)):
+            with self.subTest(size=size):
+                self.assertEqual(read_texts(iter_ndjson_texts, data, size), expected)
+        with self.assertRaises(ValueError):
+            read_texts(iter_ndjson_texts, b'"a"\nnot json\n', 4)
+        with self.assertRaises(ValueError):
+            read_texts(iter_ndjson_texts, b'"' + b"a" * 100, 10, max_item_bytes=50)
+
+    def test_preprocess_stream_order(self):
+        """Тест: результаты идут в порядке текстов при любом размере пакета, ошибка — последней строкой"""
+        expected = [preprocess_text(text) for text in sample_texts]
+
+        async def texts(fail: bool = False):
+            for text in sample_texts:
+                yield text
+            if fail:
+                raise ValueError("Некорректные данные")
+
+        for batch_size, in_flight in ((1, 1), (2, 3), (100, 2)):
+            with self.subTest(batch_size=batch_size, in_flight=in_flight):
+                lines = [json.loads(line) for line in asyncio.run(collect(
+                    preprocess_stream(texts(), batch_size, in_flight)))]
+                self.assertEqual([line["processed_text"] for line in lines], expected)
+
+        lines = [json.loads(line) for line in asyncio.run(collect(preprocess_stream(texts(True), 2, 1)))]
+        self.assertEqual([line["processed_text"] for line in lines[:-1]], expected)
+        self.assertEqual(lines[-1], {"error": "Некорректные данные"})
+
+
+    def test_preprocess_stream_backpressure(self):
+        """Тест: пока не отправлен первый результат, читается не больше batch_size * in_flight текстов"""
+        consumed = []
+
+        async def texts():
+            for i in range(1000):
+                consumed.append(i)
+                yield "текст"
+
+        async def first_line():
+            stream = preprocess_stream(texts(), 3, 2)
+            line = await stream.__anext__()
+            await stream.aclose()
+            return line
+
+        self.assertEqual(json.loads(asyncio.run(first_line())), {"processed_text": ["текст"]})
+        self.assertEqual(len(consumed), 6)
+
+
+class TestPreprocessStreamEndpoint(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.client = TestClient(app)
+        self.expected = [{"processed_text": preprocess_text(text)} for text in sample_texts]
+
+    def read_lines(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    def test_json_array(self):
+        """Тест потоковой обработки JSON-массива"""
+        response = self.client.post("/api/preprocess/stream", json=sample_texts)
+        self.assertEqual(self.read_lines(response), self.expected)
+
+    def test_ndjson(self):
+        """Тест потоковой обработки NDJSON, переданного частями"""
+        data = "".join(json.dumps({"text": text}, ensure_ascii=False) + "\n" for text in sample_texts).encode()
+        chunks = (data[i:i + 16] for i in range(0, len(data), 16))
+        response = self.client.post("/api/preprocess/stream", content=chunks,
+                                    headers={"Content-Type": "application/x-ndjson"})
+        self.assertEqual(self.read_lines(response), self.expected)
+
+    def test_invalid_item(self):
+        """Тест: ошибка в данных возвращается последней строкой после обработанных текстов"""
+        response = self.client.post("/api/preprocess/stream", json=sample_texts[:2] + [123])
+        lines = self.read_lines(response)
+        self.assertEqual(lines[:2], self.expected[:2])
+        self.assertIn("error", lines[2])
+
+    def test_client_disconnect(self):
+        """Тест: при отключении клиента посреди потока обрабатываемые пакеты отменяются"""
+        started, cancelled = [], []
+
+        class HangingExecutor:
+            async def run(self, func, *args):
+                started.append(args)
+                try:
+                    await asyncio.Event().wait()
+                except asyncio.CancelledError:
+                    cancelled.append(args)
+                    raise
+
+        messages = [{"type": "http.request", "body": b'["first", ', "more_body": True},
+                    {"type": "http.request", "body": b'"second", ', "more_body": True},
+                    {"type": "http.disconnect"}]
+
+        async def receive():
+            # Части тела запроса приходят по сети: пока их нет, работают уже запущенные задачи
+            await asyncio.sleep(0)
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+        async def send(message):
+            pass
+
+        async def call_app():
+            scope = {"type": "http", "http_version": "1.1", "method": "POST", "scheme": "http",
+                     "path": "/api/preprocess/stream", "raw_path": b"/api/preprocess/stream", "root_path": "",
+                     "query_string": b"", "headers": [(b"content-type", b"application/json")],
+                     "client": ("testclient", 50000), "server": ("testserver", 80)}
+            with self.assertRaises(Exception) as context:
+                await app(scope, receive, send)
+            # StreamingResponse в Starlette 0.41.3 передаёт ошибку потока в группе исключений anyio
+            errors = getattr(context.exception, "exceptions", [context.exception])
+            self.assertIsInstance(errors[0], ClientDisconnect)
+            # Отмена доходит до задач на следующей итерации цикла событий
+            await asyncio.sleep(0)
+
+        with patch("app.text_processing.stream.get_executor", return_value=HangingExecutor()), \
+                patch("app.config.PREPROCESS_STREAM_BATCH_SIZE", 1), patch("app.config.PREPROCESS_STREAM_IN_FLIGHT", 4):
+            asyncio.run(call_app())
+        self.assertEqual(started, [(["first"],), (["second"],)])
+        self.assertEqual(cancelled, started)
+
+    def test_unsupported_media_type(self):
+        """Тест неподдерживаемого типа содержимого"""
+        response = self.client.post("/api/preprocess/stream", content=b"text", headers={"Content-Type": "text/plain"})
+        self.assertEqual(response.status_code, 415)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -26,6 +26,19 @@ class TestTextSearchRouter(unittest.TestCase):
         self.assertEqual(data["results"][0][0], "Релевантный текст 1")
         self.assertEqual(data["results"][0][1], 0.9)
 
+    @patch("app.text_search.router.get_relevant_texts")
+    def test_search_endpoint_params(self, mock_get_relevant_texts):
+        """Тест передачи параметров top_k, min_score, offset и snippet_length в поиск"""
+        mock_get_relevant_texts.return_value = []
+        response = self.client.post("/api/search",
+                                    json={"text": "пример запроса", "top_k": 10, "min_score": 0.2, "offset": 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get_relevant_texts.call_args.args[3:], (10, 0.2, 20, 0))
+
+        response = self.client.post("/api/search", json={"text": "пример запроса", "snippet_length": 80})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get_relevant_texts.call_args.args[6], 80)
+
     def test_endpoint_search_empty(self):
         """Тест запроса к эндпоинту с пустым текстом"""
         response = self.client.post("/api/search", json={"text": ""})
@@ -63,6 +76,49 @@ class TestTextSearchRouter(unittest.TestCase):
         self.assertIn("detail", data)
         self.assertEqual(data["detail"], "Некорректное значение")
 
+    @patch("app.text_search.router.get_relevant_texts_batch")
+    def test_search_batch_endpoint_success(self, mock_get_relevant_texts_batch):
+        """Тест успешного выполнения эндпоинта /search/batch"""
+        mock_get_relevant_texts_batch.return_value = [
+            [("Релевантный текст 1", 0.9)],
+            [("Релевантный текст 2", 0.8)],
+        ]
+        response = self.client.post("/api/search/batch", json={"queries": ["запрос 1", "запрос 2"], "top_k": 1})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        self.assertEqual(mock_get_relevant_texts_batch.call_args.args[2], 1)
+        self.assertEqual([item["query"] for item in data["results"]], ["запрос 1", "запрос 2"])
+        self.assertEqual(data["results"][1]["results"][0][0], "Релевантный текст 2")
+        self.assertEqual(data["results"][1]["results"][0][1], 0.8)
+
+    def test_search_batch_endpoint_empty(self):
+        """Тест запроса к эндпоинту /search/batch с пустым списком запросов"""
+        response = self.client.post("/api/search/batch", json={"queries": []})
+        self.assertEqual(response.status_code, 400)
+
+    @patch("app.text_search.router.get_document")
+    def test_document_endpoint(self, mock_get_document):
+        """Тест эндпоинта получения документа по идентификатору"""
+        mock_get_document.return_value = "Полный текст отзыва"
+        response = self.client.get("/api/search/documents/отзыв-1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"id": "отзыв-1", "text": "Полный текст отзыва"})
+        self.assertEqual(mock_get_document.call_args.args[0], "отзыв-1")
+
+        mock_get_document.return_value = None
+        response = self.client.get("/api/search/documents/нет")
+        self.assertEqual(response.status_code, 404)
+
+    @patch("app.text_search.router.get_search_cache")
+    def test_search_cache_endpoint(self, mock_get_search_cache):
+        """Тест эндпоинта статистики кэша выдач"""
+        mock_get_search_cache.return_value.stats.return_value = {"hits": 3, "misses": 1, "hit_ratio": 0.75,
+                                                                  "saved_seconds": 0.12}
+        response = self.client.get("/api/search/cache")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["hit_ratio"], 0.75)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,11 +1,16 @@
 import unittest
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest.mock import patch
 
 import numpy as np
 import pickle
+from scipy.sparse import csr_matrix
 from sklearn.feature_extraction.text import TfidfVectorizer
-from app.text_search.service import load_tfidf_model_and_index, search_texts, get_relevant_texts
+from app.text_search.index import get_index_holder
+from app.text_search.result_cache import create_search_cache
+from app.text_search.service import (SearchParams, load_tfidf_model_and_index, search_texts, get_relevant_texts,
+                                     get_relevant_texts_batch, get_relevant_texts_many)
 
 # Тестовые данные
 sample_raw_texts = [
@@ -46,6 +51,12 @@ class TestTextSearchService(unittest.TestCase):
         with open(self.mock_texts_path, "wb") as f:
             pickle.dump(sample_raw_texts, f)
 
+        # Каждый вызов поиска выполняется полностью; кэш выдач проверяется в test_result_cache
+        cache_patcher = patch("app.text_search.service.get_search_cache",
+                              return_value=create_search_cache("local", 0, 0))
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+
     def tearDown(self):
         """Очистка тестовой среды"""
         self.temp_dir.cleanup()
@@ -70,6 +81,37 @@ class TestTextSearchService(unittest.TestCase):
         self.assertTrue(all(isinstance(r[0], str) and isinstance(r[1], float) for r in results))
         self.assertTrue("Python" in results[0][0])  # Ожидаем, что релевантный текст первый
 
+    def test_search_texts_sparse_matches_dense(self):
+        """Тест: поиск по разреженной матрице даёт те же результаты, что и по плотной"""
+        query = "язык программирования"
+        sparse_matrix = csr_matrix(self.sample_tfidf_matrix)
+        dense_results = search_texts(query, self.sample_vectorizer, self.sample_tfidf_matrix, sample_raw_texts)
+        sparse_results = search_texts(query, self.sample_vectorizer, sparse_matrix, sample_raw_texts)
+        self.assertEqual([r[0] for r in sparse_results], [r[0] for r in dense_results])
+        np.testing.assert_allclose([r[1] for r in sparse_results], [r[1] for r in dense_results])
+
+    def test_search_texts_top_k_and_offset(self):
+        """Тест: страницы выдачи складываются в полный список результатов"""
+        query = "язык программирования"
+        full = search_texts(query, self.sample_vectorizer, self.sample_tfidf_matrix, sample_raw_texts, top_k=3)
+        first = search_texts(query, self.sample_vectorizer, self.sample_tfidf_matrix, sample_raw_texts, top_k=1)
+        rest = search_texts(query, self.sample_vectorizer, self.sample_tfidf_matrix, sample_raw_texts,
+                            top_k=5, offset=1)
+        self.assertEqual(first + rest, full)
+
+    def test_search_texts_min_score(self):
+        """Тест: результаты с релевантностью ниже min_score отбрасываются"""
+        results = search_texts("язык программирования", self.sample_vectorizer, self.sample_tfidf_matrix,
+                               sample_raw_texts, min_score=0.01)
+        self.assertEqual(len(results), 1)
+        self.assertIn("Python", results[0][0])
+
+    def test_search_texts_invalid_params(self):
+        """Тест обработки некорректных параметров выдачи"""
+        for params in ({"top_k": 0}, {"top_k": 10 ** 6}, {"offset": -1}, {"min_score": float("nan")}):
+            with self.assertRaises(ValueError):
+                search_texts("язык", self.sample_vectorizer, self.sample_tfidf_matrix, sample_raw_texts, **params)
+
     def test_search_texts_invalid_query(self):
         """Тест обработки некорректного запроса функцией поиска"""
         with self.assertRaises(ValueError):
@@ -84,12 +126,102 @@ class TestTextSearchService(unittest.TestCase):
         self.assertIsInstance(results, list)
         self.assertEqual(len(results), 3)
 
+    def test_get_relevant_texts_inverted_engine(self):
+        """Тест: инвертированный индекс возвращает те же результаты, что и полный перебор"""
+        query = "язык программирования"
+        matrix_results = get_relevant_texts(query, self.mock_tfidf_folder, engine="matrix")
+        inverted_results = get_relevant_texts(query, self.mock_tfidf_folder, engine="inverted")
+        self.assertEqual(len(inverted_results), 3)
+        self.assertEqual(inverted_results[0][0], matrix_results[0][0])
+        self.assertAlmostEqual(inverted_results[0][1], matrix_results[0][1])
+
+    def test_get_relevant_texts_inverted_engine_pagination(self):
+        """Тест: постраничная выдача инвертированного индекса совпадает с полным перебором"""
+        query = "язык программирования"
+        for params in ({"top_k": 2, "offset": 1}, {"top_k": 3, "min_score": 0.01}):
+            matrix_results = get_relevant_texts(query, self.mock_tfidf_folder, engine="matrix", **params)
+            inverted_results = get_relevant_texts(query, self.mock_tfidf_folder, engine="inverted", **params)
+            self.assertEqual([r[0] for r in inverted_results], [r[0] for r in matrix_results])
+
+    def test_get_relevant_texts_sharded(self):
+        """Тест: поиск по частям индекса даёт те же результаты, что и по всей матрице"""
+        query = "язык программирования"
+        expected = get_relevant_texts(query, self.mock_tfidf_folder, engine="matrix", top_k=2, offset=1)
+        with patch("app.config.SEARCH_SHARDS", 3):
+            index = get_index_holder(self.mock_tfidf_folder).get()
+            index.__dict__.pop("shards", None)
+            self.assertEqual(len(index.shards), 3)
+            results = get_relevant_texts(query, self.mock_tfidf_folder, engine="matrix", top_k=2, offset=1)
+        index.__dict__.pop("shards", None)
+        self.assertEqual([r[0] for r in results], [r[0] for r in expected])
+        np.testing.assert_allclose([r[1] for r in results], [r[1] for r in expected])
+
+    def test_get_relevant_texts_unknown_engine(self):
+        """Тест обработки неизвестного движка поиска"""
+        with self.assertRaises(ValueError):
+            get_relevant_texts("веб-приложения", self.mock_tfidf_folder, engine="unknown")
+
     def test_get_relevant_texts_irrelevant_query(self):
         """Тест получения релевантных текстов с нерелевантным запросом"""
         query = "абракадабра"
         results = get_relevant_texts(query, self.mock_tfidf_folder)
         self.assertTrue(all(r[1] == 0.0 for r in results))
 
+    def test_get_relevant_texts_batch_matches_single(self):
+        """Тест: пакетный поиск даёт те же результаты, что и поиск по одному запросу"""
+        queries = ["язык программирования", "веб-приложения", "современный мир"]
+        batch_results = get_relevant_texts_batch(queries, self.mock_tfidf_folder, top_k=1)
+        self.assertEqual(len(batch_results), len(queries))
+        for query, results in zip(queries, batch_results):
+            expected = get_relevant_texts(query, self.mock_tfidf_folder)
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results[0][0], expected[0][0])
+            self.assertAlmostEqual(results[0][1], expected[0][1])
+
+    def test_get_relevant_texts_batch_pads_results(self):
+        """Тест: недостающие результаты пакетного поиска дополняются текстами с нулевой релевантностью"""
+        results = get_relevant_texts_batch(["абракадабра"], self.mock_tfidf_folder, top_k=5)
+        self.assertEqual(len(results[0]), len(sample_raw_texts))
+        self.assertTrue(all(r[1] == 0.0 for r in results[0]))
+
+    def test_get_relevant_texts_batch_invalid(self):
+        """Тест обработки некорректного пакета запросов"""
+        for queries, top_k in (([], 3), (["веб-приложения", ""], 3), (["веб-приложения"], 0)):
+            with self.assertRaises(ValueError):
+                get_relevant_texts_batch(queries, self.mock_tfidf_folder, top_k)
+
+    def test_get_relevant_texts_many_matches_single(self):
+        """Тест: выдачи одновременных запросов со своими параметрами совпадают с поиском по одному запросу"""
+        requests = [SearchParams("язык программирования", 2, 0.0, 1), SearchParams("веб-приложения"),
+                    SearchParams("абракадабра", 5), SearchParams("современный мир", 1, 0.01)]
+        for engine in ("matrix", "inverted"):
+            results = get_relevant_texts_many(requests, self.mock_tfidf_folder, engine)
+            for request, request_results in zip(requests, results):
+                with self.subTest(engine=engine, request=request):
+                    expected = get_relevant_texts(request.query, self.mock_tfidf_folder, engine, request.top_k,
+                                                  request.min_score, request.offset)
+                    self.assertEqual([r[0] for r in request_results], [r[0] for r in expected])
+                    np.testing.assert_allclose([r[1] for r in request_results], [r[1] for r in expected])
+
+    def test_get_relevant_texts_many_invalid(self):
+        """Тест: некорректный запрос получает ошибку вместо выдачи, не мешая остальным"""
+        results = get_relevant_texts_many([SearchParams(""), SearchParams("веб-приложения", 0),
+                                           SearchParams("веб-приложения", 1)], self.mock_tfidf_folder)
+        self.assertIsInstance(results[0], ValueError)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(len(results[2]), 1)
+
+    def test_get_relevant_texts_many_uses_cache(self):
+        """Тест: выдачи одновременных запросов сохраняются в том же кэше, что и выдачи по одному запросу"""
+        cache = create_search_cache("local", 10, 0)
+        with patch("app.text_search.service.get_search_cache", return_value=cache):
+            expected = get_relevant_texts("язык программирования", self.mock_tfidf_folder, top_k=2)
+            results = get_relevant_texts_many([SearchParams("программирования язык", 2),
+                                               SearchParams("веб-приложения", 2)], self.mock_tfidf_folder)
+        self.assertEqual(results[0], expected)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertEqual(len(cache.backend), 2)
+
     def test_get_relevant_texts_missing_files(self):
         """Тест обработки ошибки при отсутствии файлов"""
         with self.assertRaises(FileNotFoundError) as context:
@@ -0,0 +1,79 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from app.text_processing.service import get_preprocessor, open_token_cache, preprocess_text, preprocess_texts_batch
+from app.text_processing.token_cache import TokenCache
+
+# Тексты для проверки обработки с кэшем
+cache_texts = [
+    "Телефон отличный, камера радует качеством, а батарея держит целый день!",
+    "",
+    "Наушники удобные, звук шикарный, особенно басы. Покупкой доволен.",
+    "Телефон отличный, камера радует качеством, а батарея держит целый день!",
+]
+
+
+class TestTokenCache(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "cache" / "tokens.sqlite3"
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        """Тест: сохранённые результаты возвращаются после повторного открытия, промахи считаются"""
+        with TokenCache(self.path, "v1") as cache:
+            cache.put_many([("текст", ["текст"]), ("пустой", [])])
+        with TokenCache(self.path, "v1") as cache:
+            self.assertEqual(cache.get_many(["текст", "нет в кэше", "пустой"]), [["текст"], None, []])
+            stats = cache.stats()
+        self.assertEqual((stats["size"], stats["hits"], stats["misses"]), (2, 2, 1))
+        self.assertAlmostEqual(stats["hit_ratio"], 2 / 3)
+
+    def test_many_keys(self):
+        """Тест: запрос большого количества ключей разбивается на части"""
+        texts = [f"текст {i}" for i in range(1200)]
+        with TokenCache(self.path, "v1") as cache:
+            cache.put_many((text, [text]) for text in texts[::2])
+            results = cache.get_many(texts)
+        self.assertEqual(results[:4], [["текст 0"], None, ["текст 2"], None])
+        self.assertEqual(sum(result is not None for result in results), 600)
+
+    def test_fingerprint_change_clears_cache(self):
+        """Тест: при изменении настроек предобработки сохранённые результаты сбрасываются"""
+        with TokenCache(self.path, "v1") as cache:
+            cache.put_many([("текст", ["текст"])])
+        with TokenCache(self.path, "v2") as cache:
+            self.assertEqual(cache.get_many(["текст"]), [None])
+            self.assertEqual(len(cache), 0)
+
+    def test_fingerprint(self):
+        """Тест: отпечаток зависит от версии логики предобработки"""
+        fingerprint = get_preprocessor().fingerprint()
+        self.assertEqual(fingerprint, get_preprocessor().fingerprint())
+        with patch("app.text_processing.service.PREPROCESSING_VERSION", -1):
+            self.assertNotEqual(fingerprint, get_preprocessor().fingerprint())
+
+    def test_preprocess_batch_with_cache(self):
+        """Тест: результат обработки с кэшем совпадает с обработкой без него, повторно тексты не обрабатываются"""
+        expected = [preprocess_text(text) for text in cache_texts]
+        with open_token_cache(self.path) as cache:
+            self.assertEqual(list(preprocess_texts_batch(cache_texts, batch_size=1, token_cache=cache)), expected)
+            self.assertEqual(cache.hits, 0)
+
+            with patch.object(get_preprocessor().nlp, "pipe", side_effect=AssertionError("текст обработан повторно")):
+                self.assertEqual(list(preprocess_texts_batch(cache_texts, token_cache=cache)), expected)
+            self.assertEqual(cache.hits, len(cache_texts))
+
+    def test_preprocess_batch_with_cache_invalid_type(self):
+        """Тест обработки некорректного типа данных в пакете с кэшем"""
+        with open_token_cache(self.path) as cache, self.assertRaises(ValueError):
+            list(preprocess_texts_batch(["текст", 12345], token_cache=cache))
+
+
+if __name__ == "__main__":
+    unittest.main()
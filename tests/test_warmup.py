@@ -0,0 +1,86 @@
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.warmup import WarmUpReport, warm_up
+
+
+class TestWarmUp(unittest.TestCase):
+    def setUp(self):
+        """Создание тестовой среды"""
+        self.temp_dir = TemporaryDirectory()
+        patcher = patch("app.config.TFIDF_FOLDER", Path(self.temp_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Очистка тестовой среды"""
+        self.temp_dir.cleanup()
+
+    def test_import_is_lazy(self):
+        """Тест: импорт приложения не загружает spaCy и scikit-learn"""
+        code = "import sys, app.main; print(sorted({'spacy', 'sklearn'} & set(sys.modules)))"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    def test_warm_up_without_index(self):
+        """Тест: без индекса модель загружается, а ошибка индекса записывается в итоги"""
+        report = warm_up()
+        self.assertTrue(report.ok)
+        self.assertEqual(set(report.seconds), {"preprocessor", "index"})
+        self.assertIn("FileNotFoundError", report.errors["index"])
+
+    def test_ready_blocking(self):
+        """Тест: при прогреве до старта приложение сразу готово"""
+        with patch("app.config.WARM_UP", "blocking"), TestClient(app) as client:
+            response = client.get("/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "ready")
+        self.assertEqual(len(response.json()["workers"]), 1)
+
+    def test_ready_background(self):
+        """Тест: пока идёт фоновый прогрев, /ready отвечает 503, а остальные эндпоинты работают"""
+        release = threading.Event()
+
+        def slow_warm_up():
+            release.wait(10)
+            return WarmUpReport({"preprocessor": 0.0})
+
+        with patch("app.warmup.warm_up", side_effect=slow_warm_up), TestClient(app) as client:
+            response = client.get("/ready")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()["status"], "starting")
+            self.assertEqual(response.headers["Retry-After"], "1")
+            self.assertEqual(client.get("/metrics").status_code, 200)
+
+            release.set()
+            deadline = time.monotonic() + 10
+            while client.get("/ready").status_code != 200 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(client.get("/ready").json()["status"], "ready")
+
+    def test_ready_failed(self):
+        """Тест: если модель не загрузилась, приложение не готово"""
+        report = WarmUpReport({"preprocessor": 0.0}, {"preprocessor": "OSError: модель не найдена"})
+        with (patch("app.config.WARM_UP", "blocking"), patch("app.warmup.warm_up", return_value=report),
+              TestClient(app) as client):
+            response = client.get("/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["status"], "failed")
+
+    def test_lazy(self):
+        """Тест: без прогрева приложение готово сразу"""
+        with (patch("app.config.WARM_UP", "lazy"), patch("app.warmup.warm_up") as mock_warm_up,
+              TestClient(app) as client):
+            self.assertEqual(client.get("/ready").status_code, 200)
+        mock_warm_up.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()